@@ -6,63 +6,150 @@ import sqlite3
 import random
 import string
 
-from core.database import crear_conexion
+from core.database import session, inicializar_db
 from Pacientes import PacienteController
-from .models import CitaMedica, Notificacion
+from .models import AgendaDia, CitaMedica, Notificacion
+from .notificaciones import CANAL_AUTOMATICO, obtener_bandeja
 from .validaciones import ValidacionesCitas
 
 
+# --- Consultas de lectura (core/diagnostico verifica sus planes) ---
+SQL_MEDICOS_POR_ESPECIALIDAD = """
+    SELECT id, nombres || ' ' || apellidos 
+    FROM medicos 
+    WHERE especialidad = ? AND estado = 'Activo'
+    ORDER BY nombres ASC
+"""
+
+SQL_AGENDA_MEDICO = "SELECT hora_inicio, hora_fin FROM horarios_medicos WHERE id_medico = ?"
+
+# {marcas}: un "?" por médico
+SQL_HORARIOS_MEDICOS = "SELECT id_medico, hora_inicio, hora_fin FROM horarios_medicos WHERE id_medico IN ({marcas})"
+
+SQL_AGENDA_RANGO = """
+    SELECT 
+        c.codigo,              -- 0
+        c.cc_paciente,         -- 1
+        p.nombres || ' ' || p.apellidos AS nombre_paciente, -- 2
+        m.especialidad,        -- 3
+        m.nombres || ' ' || m.apellidos AS medico,          -- 4
+        c.fecha,               -- 5
+        c.hora,                -- 6
+        c.consultorio,         -- 7
+        c.estado,              -- 8
+        c.id_medico            -- 9
+    FROM citas c
+    INNER JOIN pacientes p ON c.cc_paciente = p.dni
+    INNER JOIN medicos m ON c.id_medico = m.id
+    WHERE c.id_medico IN ({marcas}) AND c.fecha BETWEEN ? AND ?
+    ORDER BY c.fecha ASC, c.hora ASC
+"""
+
+SQL_CITA_POR_CODIGO = """
+    SELECT c.codigo, c.cc_paciente, c.fecha, c.hora, c.consultorio, c.estado,
+                m.nombres || ' ' || m.apellidos, p.nombres || ' ' || p.apellidos,
+                m.especialidad, c.id_medico
+    FROM citas c
+    JOIN medicos m ON c.id_medico = m.id
+    JOIN pacientes p ON c.cc_paciente = p.dni
+    WHERE c.codigo = ?
+"""
+
+SQL_CITAS_POR_PACIENTE = """
+    SELECT c.codigo, c.cc_paciente, c.fecha, c.hora, c.consultorio, c.estado,
+           m.nombres || ' ' || m.apellidos AS nombre_medico,
+           m.especialidad,
+           p.nombres || ' ' || p.apellidos AS nombre_paciente,
+           c.id_medico
+    FROM citas c
+    JOIN medicos m ON c.id_medico = m.id
+    JOIN pacientes p ON c.cc_paciente = p.dni
+    WHERE c.cc_paciente = ?
+    ORDER BY c.fecha DESC, c.hora DESC
+"""
+
+# LEFT JOIN para buscar el nombre ya sea en pacientes o en médicos
+# (el médico por su clave primaria, sin recorrer la tabla)
+SQL_NOTIFICACIONES = """
+    SELECT 
+        n.destinatario, 
+        n.mensaje, 
+        n.canal, 
+        COALESCE(n.fecha_entrega, n.fecha_envio),
+        n.estado,
+        COALESCE(p.nombres || ' ' || p.apellidos, m.nombres || ' ' || m.apellidos, 'Desconocido') AS nombre_completo,
+        CASE 
+            WHEN p.dni IS NOT NULL THEN 'Paciente'
+            WHEN m.id IS NOT NULL THEN 'Médico'
+            ELSE 'Sistema'
+        END AS tipo_usuario,
+        n.id,
+        n.detalle_error
+    FROM notificaciones n
+    LEFT JOIN pacientes p ON n.destinatario = p.dni
+    LEFT JOIN medicos m ON m.id = CAST(n.destinatario AS INTEGER)
+                       AND n.destinatario = CAST(m.id AS TEXT)
+    {where}
+    ORDER BY n.id DESC
+    LIMIT ?
+"""
+
+
+def consulta_notificaciones(limite: int = 100, despues_de: Optional[int] = None,
+                            destinatario: Optional[str] = None, canal: Optional[str] = None,
+                            estado: Optional[str] = None, desde: Optional[date] = None,
+                            hasta: Optional[date] = None) -> Tuple[str, list]:
+    """(sql, parámetros) de una página del historial de notificaciones con los filtros dados."""
+    condiciones, parametros = [], []
+    if destinatario:
+        condiciones.append("n.destinatario = ?")
+        parametros.append(destinatario.strip())
+    if canal:
+        condiciones.append("n.canal = ?")
+        parametros.append(canal)
+    if estado:
+        condiciones.append("n.estado = ?")
+        parametros.append(estado)
+    if desde:
+        condiciones.append("n.fecha_envio >= ?")
+        parametros.append(desde.isoformat())
+    if hasta:
+        condiciones.append("n.fecha_envio < ?")
+        parametros.append((hasta + timedelta(days=1)).isoformat())
+    if despues_de:
+        condiciones.append("n.id < ?")
+        parametros.append(despues_de)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return SQL_NOTIFICACIONES.format(where=where), parametros + [limite]
+
+
 class CitasMedicasController:
     """
     Controlador del módulo de Citas Médicas (persistencia en memoria).
     """
 
+    # Reintentos ante un código CM-XXXXXX repetido
+    INTENTOS_CODIGO = 5
+
     def __init__(self, paciente_controller: Optional[PacienteController] = None):
         self.pacientes = paciente_controller or PacienteController()
         self._notificaciones: List[Notificacion] = []
         self._agenda_medicos = {}
         self._verificar_tabla_citas()
+        # Las notificaciones se entregan en segundo plano desde la bandeja
+        self.bandeja = obtener_bandeja()
+        self.bandeja.iniciar()
         
     def _verificar_tabla_citas(self):
         """
-        Crea la tabla de citas con integridad referencial.
-        Resuelve el Punto 3 evitando que existan citas sin médico o paciente real.
+        Garantiza que existan las tablas citas y horarios_medicos.
+        El esquema (con integridad referencial) vive en core/database.py y
+        solo se ejecuta si la BD no está al día.
         """
-        conn = crear_conexion()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                # Eliminamos la redundancia de nombres y usamos IDs vinculados
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS citas (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        codigo TEXT UNIQUE NOT NULL,
-                        cc_paciente TEXT NOT NULL,
-                        id_medico INTEGER NOT NULL,  -- Vinculación directa al módulo Médicos
-                        fecha TEXT NOT NULL,
-                        hora TEXT NOT NULL,
-                        consultorio TEXT,
-                        estado TEXT DEFAULT 'Programada',
-                        comentario TEXT,
-                        -- Estas reglas evitan las 'Citas Huérfanas' a nivel de Base de Datos
-                        FOREIGN KEY (cc_paciente) REFERENCES pacientes(dni) ON DELETE CASCADE,
-                        FOREIGN KEY (id_medico) REFERENCES medicos(id) ON DELETE CASCADE
-                    )
-                """)
-                
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS horarios_medicos (
-                        id_medico INTEGER PRIMARY KEY,
-                        hora_inicio INTEGER DEFAULT 9,
-                        hora_fin INTEGER DEFAULT 17,
-                        FOREIGN KEY (id_medico) REFERENCES medicos(id) ON DELETE CASCADE
-                    )
-                """)
-                conn.commit()
-            except Exception as e:
-                print(f"Error al estructurar tabla citas: {e}")
-            finally:
-                conn.close()
+        try:
+            inicializar_db()
+        except Exception as e:
+            print(f"Error al estructurar tabla citas: {e}")
 
     # ---------------------------
     # Validaciones
@@ -92,6 +179,32 @@ class CitasMedicasController:
         cuerpo = "".join(random.choices(caracteres, k=6))
         return f"CM-{cuerpo}"
 
+    def _insertar_cita(self, conn, cc: str, id_medico: int, fecha: date, hora: time,
+                       consultorio: str) -> str:
+        """
+        Inserta la cita confirmada y retorna su código. Si el código generado
+        ya existe se genera otro; un turno ya ocupado se propaga como
+        sqlite3.IntegrityError (índice ux_citas_turno_activo).
+        """
+        sql = """
+            INSERT INTO citas (codigo, cc_paciente, id_medico, fecha, hora, consultorio, estado)
+            VALUES (?, ?, ?, ?, ?, ?, 'Confirmada')
+        """
+        for _ in range(self.INTENTOS_CODIGO):
+            codigo = self._generar_codigo()
+            try:
+                conn.execute(sql, (codigo, cc, id_medico, fecha.isoformat(), hora.strftime("%H:%M"), consultorio))
+                return codigo
+            except sqlite3.IntegrityError as e:
+                if "citas.codigo" not in str(e):
+                    raise
+        raise sqlite3.IntegrityError("No se pudo generar un código de cita único.")
+
+    @staticmethod
+    def _es_turno_ocupado(error: sqlite3.IntegrityError) -> bool:
+        """True si el error viene del índice único de turnos activos."""
+        return "citas.id_medico" in str(error)
+
     # ---------------------------
     # Catálogo y agenda
     # ---------------------------
@@ -100,25 +213,20 @@ class CitasMedicasController:
         Trae las especialidades únicas de los médicos activos.
         Útil para filtrar opciones en el formulario de agendamiento.
         """
-        conn = crear_conexion()
         especialidades = []
-        if not conn:
-            return []
-            
         try:
-            cursor = conn.cursor()
-            # Añadimos ORDER BY para que en la UI aparezcan organizadas (A-Z)
-            sql = "SELECT DISTINCT especialidad FROM medicos WHERE estado = 'Activo' ORDER BY especialidad"
-            cursor.execute(sql)
-            
-            # Extraemos el primer elemento de cada tupla resultante
-            especialidades = [row[0] for row in cursor.fetchall() if row[0]]
-            
+            with session() as conn:
+                cursor = conn.cursor()
+                # Añadimos ORDER BY para que en la UI aparezcan organizadas (A-Z)
+                sql = "SELECT DISTINCT especialidad FROM medicos WHERE estado = 'Activo' ORDER BY especialidad"
+                cursor.execute(sql)
+
+                # Extraemos el primer elemento de cada tupla resultante
+                especialidades = [row[0] for row in cursor.fetchall() if row[0]]
+
         except Exception as e:
             print(f"Error técnico al obtener especialidades: {e}")
-        finally:
-            conn.close()
-            
+
         return especialidades
 
     def obtener_medicos_por_especialidad(self, especialidad: str) -> List[str]:
@@ -126,58 +234,39 @@ class CitasMedicasController:
         Trae ID y Nombre de médicos activos por especialidad.
         Garantiza que usemos el ID correcto para evitar citas huérfanas. [2026-02-01]
         """
-        conn = crear_conexion()
-        if not conn: return []
         try:
-            cursor = conn.cursor()
-            sql = """
-                SELECT id, nombres || ' ' || apellidos 
-                FROM medicos 
-                WHERE especialidad = ? AND estado = 'Activo'
-                ORDER BY nombres ASC
-            """
-            cursor.execute(sql, (especialidad,))
-            return cursor.fetchall() # Esto ya devuelve [(1, 'Dr...'), (2, 'Dr...')]
+            with session() as conn:
+                return conn.execute(SQL_MEDICOS_POR_ESPECIALIDAD, (especialidad,)).fetchall() # Esto ya devuelve [(1, 'Dr...'), (2, 'Dr...')]
         except Exception as e:
             print(f"Error: {e}")
             return []
-        finally:
-            conn.close()
 
     def obtener_todos_medicos(self) -> List[str]:
         """
         Obtiene la lista completa de médicos activos con sus identificadores.
         Retorna una lista de diccionarios para facilitar el manejo en la UI. [2026-02-01]
         """
-        conn = crear_conexion()
         medicos = []
-        if not conn:
-            return []
-            
         try:
-            cursor = conn.cursor()
-            # Seleccionamos ID, nombre completo y especialidad
-            # El orden del SELECT previene la 'Incoherencia de Columnas' (Punto 1)
-            sql = """
-                SELECT id, nombres || ' ' || apellidos, especialidad 
-                FROM medicos 
-                WHERE estado = 'Activo'
-                ORDER BY nombres ASC
-            """
-            cursor.execute(sql)
-            
-            for row in cursor.fetchall():
-                medicos.append({
-                    "id": row[0],
-                    "nombre_completo": row[1],
-                    "especialidad": row[2]
-                })
-                
+            with session() as conn:
+                # Seleccionamos ID, nombre completo y especialidad
+                # El orden del SELECT previene la 'Incoherencia de Columnas' (Punto 1)
+                sql = """
+                    SELECT id, nombres || ' ' || apellidos, especialidad 
+                    FROM medicos 
+                    WHERE estado = 'Activo'
+                    ORDER BY nombres ASC
+                """
+                for row in conn.execute(sql).fetchall():
+                    medicos.append({
+                        "id": row[0],
+                        "nombre_completo": row[1],
+                        "especialidad": row[2]
+                    })
+
         except Exception as e:
             print(f"Error técnico al recuperar lista de médicos: {e}")
-        finally:
-            conn.close()
-            
+
         return medicos
 
     def obtener_consultorio_medico(self, id_medico: int) -> str:
@@ -185,26 +274,18 @@ class CitasMedicasController:
         Busca el consultorio asignado al médico usando su ID único.
         Garantiza precisión absoluta incluso si hay médicos con nombres similares.
         """
-        conn = crear_conexion()
         consultorio = "Consultorio General" # Valor por defecto
-        
-        if not conn:
-            return consultorio
 
         try:
-            cursor = conn.cursor()
-            # Buscamos por ID, que es la forma más eficiente en SQL
-            cursor.execute("SELECT direccion FROM medicos WHERE id = ?", (id_medico,))
-            
-            row = cursor.fetchone()
-            if row and row[0]:
-                consultorio = row[0]
-                
+            with session() as conn:
+                # Buscamos por ID, que es la forma más eficiente en SQL
+                row = conn.execute("SELECT direccion FROM medicos WHERE id = ?", (id_medico,)).fetchone()
+                if row and row[0]:
+                    consultorio = row[0]
+
         except Exception as e:
             print(f"Error técnico al recuperar consultorio: {str(e)}")
-        finally:
-            conn.close()
-        
+
         return consultorio
 
     def obtener_agenda_medico(self, id_medico: int) -> Tuple[int, int]:
@@ -217,18 +298,12 @@ class CitasMedicasController:
             return self._agenda_medicos[id_medico]
 
         # 2. Si no está en memoria, buscamos en la nueva tabla
-        conn = crear_conexion()
         horario = (9, 17) # Por defecto
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT hora_inicio, hora_fin FROM horarios_medicos WHERE id_medico = ?", (id_medico,))
-                row = cursor.fetchone()
-                if row:
-                    horario = (row[0], row[1])
-                    self._agenda_medicos[id_medico] = horario # Guardamos en memoria
-            finally:
-                conn.close()
+        with session() as conn:
+            row = conn.execute(SQL_AGENDA_MEDICO, (id_medico,)).fetchone()
+            if row:
+                horario = (row[0], row[1])
+                self._agenda_medicos[id_medico] = horario # Guardamos en memoria
         return horario
 
     def registrar_agenda_medico(self, id_medico: int, hora_inicio: int, hora_fin: int) -> Tuple[bool, str]:
@@ -240,138 +315,121 @@ class CitasMedicasController:
         if not (0 <= hora_inicio <= 23 and 1 <= hora_fin <= 24 and hora_inicio < hora_fin):
             return False, "Error: Rango de horas inválido (Ej: 9 a 17)."
 
-        conn = crear_conexion()
-        if not conn:
-            return False, "Error de conexión."
-
         try:
-            cursor = conn.cursor()
-            # Usamos INSERT OR REPLACE para no duplicar filas por médico
-            sql = """
-                INSERT OR REPLACE INTO horarios_medicos (id_medico, hora_inicio, hora_fin)
-                VALUES (?, ?, ?)
-            """
-            cursor.execute(sql, (id_medico, hora_inicio, hora_fin))
-            conn.commit()
-            
+            with session() as conn:
+                # Usamos INSERT OR REPLACE para no duplicar filas por médico
+                sql = """
+                    INSERT OR REPLACE INTO horarios_medicos (id_medico, hora_inicio, hora_fin)
+                    VALUES (?, ?, ?)
+                """
+                conn.execute(sql, (id_medico, hora_inicio, hora_fin))
+
             # Sincronizamos la memoria
             self._agenda_medicos[id_medico] = (hora_inicio, hora_fin)
             return True, "Horario guardado correctamente en la tabla de horarios."
         except Exception as e:
             return False, f"Error al guardar horario: {e}"
-        finally:
-            conn.close()
 
     def obtener_horarios_disponibles(self, id_medico: int, fecha: date) -> List[time]:
         """
         Calcula los huecos libres cruzando el rango laboral con las citas ocupadas.
         Usa ID_MEDICO para evitar colisiones entre nombres iguales. [2026-02-01]
         """
-        # 1. Obtener el rango laboral (definido en el paso anterior)
-        # Si no tiene uno registrado, usamos el estándar 9-17
-        start, end = self.obtener_agenda_medico(id_medico)
-        horas_potenciales = [time(h, 0) for h in range(start, end)]
-
-        ocupadas = set()
-        conn = crear_conexion()
-        if not conn:
-            return []
-
         try:
-            cursor = conn.cursor()
-            # Buscamos por id_medico (numérico) y excluimos citas canceladas
-            sql = """
-                SELECT hora FROM citas 
-                WHERE id_medico = ? AND fecha = ? AND estado != 'Cancelada'
-            """
-            cursor.execute(sql, (id_medico, fecha.isoformat()))
-            
-            for row in cursor.fetchall():
-                try:
-                    # row[0] es la hora. Garantizamos el formato HH:MM
-                    # Esto evita errores si el string en DB está mal formado
-                    hora_str = row[0]
-                    hora_db = datetime.strptime(hora_str, "%H:%M").time()
-                    ocupadas.add(hora_db)
-                except ValueError:
-                    print(f"Aviso: Formato de hora inválido en DB: {row[0]}")
-                    
+            agenda = self.obtener_agenda_rango([id_medico], fecha, fecha)
         except Exception as e:
             print(f"Error técnico al consultar disponibilidad: {e}")
             return []
-        finally:
-            conn.close()
-                
-        # Retornamos solo las horas que no están en el set de ocupadas
-        return [h for h in horas_potenciales if h not in ocupadas]
+        return agenda[(id_medico, fecha)].horas_libres()
 
-    def     consultar_agenda(self, id_medico: int, fecha: date) -> List[CitaMedica]:
+    def consultar_agenda(self, id_medico: int, fecha: date) -> List[CitaMedica]:
         """
         Consulta la agenda de un médico garantizando la integridad de las columnas.
         Fundamental para el Módulo 4 (Consulta Externa). [2026-02-01]
         """
-        conn = crear_conexion()
-        citas = []
-        
-        if not conn:
-            return []
-            
         try:
-            cursor = conn.cursor()
-            # Mapeo Explícito: Evitamos SELECT * para prevenir el Punto 1.
-            # Traemos el nombre del paciente mediante JOIN para asegurar datos frescos.
-            sql = """
-            SELECT 
-                c.codigo,              -- 0
-                c.cc_paciente,         -- 1
-                p.nombres || ' ' || p.apellidos AS nombre_paciente, -- 2
-                m.especialidad,        -- 3
-                m.nombres || ' ' || m.apellidos AS medico,          -- 4
-                c.fecha,               -- 5
-                c.hora,                -- 6
-                c.consultorio,         -- 7
-                c.estado               -- 8
-            FROM citas c
-            INNER JOIN pacientes p ON c.cc_paciente = p.dni
-            INNER JOIN medicos m ON c.id_medico = m.id
-            WHERE c.id_medico = ? AND c.fecha = ?
-            ORDER BY c.hora ASC
-        """
-            cursor.execute(sql, (id_medico, fecha.isoformat()))
-            
-            for row in cursor.fetchall():
-                # Procesamiento flexible de Fecha
-                f_val = row[5]
-                if isinstance(f_val, str):
-                    f_val = datetime.strptime(f_val.split('T')[0], '%Y-%m-%d').date()
-
-                # Procesamiento flexible de Hora (Evita el error de match format)
-                h_val = row[6]
-                if isinstance(h_val, str):
-                    # Intentamos con segundos, si falla, probamos sin segundos
-                    try:
-                        h_val = datetime.strptime(h_val, '%H:%M:%S').time()
-                    except ValueError:
-                        h_val = datetime.strptime(h_val, '%H:%M').time()
-
-                cita = CitaMedica(
-                    codigo=row[0],
-                    cc_paciente=row[1],
-                    nombre_paciente=row[2],
-                    especialidad=row[3],
-                    medico=row[4],
-                    fecha=f_val,
-                    hora=h_val,
-                    consultorio=row[7],
-                    estado=row[8],
-                    id_medico=id_medico
-                )
-                citas.append(cita)
+            return self.obtener_agenda_rango([id_medico], fecha, fecha)[(id_medico, fecha)].citas
         except Exception as e:
             print(f"Error técnico al consultar agenda: {e}")
-        finally:
-            conn.close()
-        return citas
+            return []
+
+    def obtener_agenda_rango(self, ids_medicos: List[int], desde: date, hasta: date) -> Dict[Tuple[int, date], AgendaDia]:
+        """
+        Agenda de varios médicos en un rango de fechas (semana, mes) con una
+        sola consulta de citas, en lugar de una por médico y día.
+        Retorna {(id_medico, fecha): AgendaDia} para cada médico y cada día del
+        rango, con las horas ocupadas en un mapa de bits y las citas del día.
+        """
+        ids = list(dict.fromkeys(ids_medicos))
+        if not ids or hasta < desde:
+            return {}
+
+        with session() as conn:
+            # 1. Rango laboral de los médicos que aún no están en memoria
+            pendientes = [i for i in ids if i not in self._agenda_medicos]
+            if pendientes:
+                sql = SQL_HORARIOS_MEDICOS.format(marcas=", ".join("?" * len(pendientes)))
+                for id_medico, inicio, fin in conn.execute(sql, pendientes).fetchall():
+                    self._agenda_medicos[id_medico] = (inicio, fin)
+
+            # 2. Todas las citas del rango en una sola consulta
+            sql = SQL_AGENDA_RANGO.format(marcas=", ".join("?" * len(ids)))
+            filas = conn.execute(sql, ids + [desde.isoformat(), hasta.isoformat()]).fetchall()
+
+        agenda = {}
+        dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+        for id_medico in ids:
+            inicio, fin = self._agenda_medicos.get(id_medico, (9, 17))  # Por defecto 09:00 - 17:00
+            for dia in dias:
+                agenda[(id_medico, dia)] = AgendaDia(id_medico, dia, inicio, fin)
+
+        for row in filas:
+            try:
+                # Procesamiento flexible de Fecha y Hora (con o sin segundos)
+                f_val = datetime.strptime(row[5].split('T')[0], '%Y-%m-%d').date()
+                h_val = self._parsear_hora(row[6])
+            except ValueError:
+                print(f"Aviso: Formato de fecha/hora inválido en DB: {row[5]} {row[6]}")
+                continue
+
+            dia = agenda.get((row[9], f_val))
+            if dia is None:
+                continue
+            dia.citas.append(CitaMedica(
+                codigo=row[0],
+                cc_paciente=row[1],
+                nombre_paciente=row[2],
+                especialidad=row[3],
+                medico=row[4],
+                fecha=f_val,
+                hora=h_val,
+                consultorio=row[7],
+                estado=row[8],
+                id_medico=row[9]
+            ))
+            if row[8] != 'Cancelada':
+                dia.marcar_ocupada(h_val)
+        return agenda
+
+    @staticmethod
+    def calcular_rango(fecha: date, periodo: str) -> Tuple[date, date]:
+        """Rango de fechas para 'Día', 'Semana' (lunes a domingo) o 'Mes'."""
+        if periodo == "Semana":
+            inicio = fecha - timedelta(days=fecha.weekday())
+            return inicio, inicio + timedelta(days=6)
+        if periodo == "Mes":
+            inicio = fecha.replace(day=1)
+            siguiente = (inicio + timedelta(days=32)).replace(day=1)
+            return inicio, siguiente - timedelta(days=1)
+        return fecha, fecha
+
+    @staticmethod
+    def _parsear_hora(valor: str) -> time:
+        """Convierte 'HH:MM' o 'HH:MM:SS' de la BD en time."""
+        try:
+            return datetime.strptime(valor, '%H:%M:%S').time()
+        except ValueError:
+            return datetime.strptime(valor, '%H:%M').time()
 
     # ---------------------------
     # CRUD Citas
@@ -391,39 +449,30 @@ class CitasMedicasController:
         if not paciente:
             return False, "Paciente no registrado. Debe crearlo primero.", None
 
-        # 3. Verificamos Disponibilidad Real
-        # Esto ya valida si el médico existe y si el horario está libre
-        disponibles = self.obtener_horarios_disponibles(id_medico, fecha)
-        if not disponibles:
-            return False, "El médico no tiene horarios para esta fecha.", None
+        # 3 y 4 en una sola transacción BEGIN IMMEDIATE: otra recepción no puede
+        # tomar el turno entre la verificación y el INSERT.
+        try:
+            with session(inmediata=True) as conn:
+                # 3. Verificamos Disponibilidad Real
+                # Esto ya valida si el médico existe y si el horario está libre
+                disponibles = self.obtener_horarios_disponibles(id_medico, fecha)
+                if not disponibles:
+                    return False, "El médico no tiene horarios para esta fecha.", None
 
-        if hora not in disponibles:
-            return False, f"El horario {hora.strftime('%H:%M')} ya fue ocupado.", None
+                if hora not in disponibles:
+                    return False, f"El horario {hora.strftime('%H:%M')} ya fue ocupado.", None
 
-        # 4. Generación de Código Único
-        codigo = self._generar_codigo()
-        
-        conn = crear_conexion()
-        if not conn: return False, "Error de conexión", None
+                cursor = conn.cursor()
+                # RECUPERAR DATOS DEL MÉDICO PARA EL OBJETO CitaMedica
+                cursor.execute("SELECT nombres || ' ' || apellidos, especialidad, direccion FROM medicos WHERE id = ?", (id_medico,))
+                res_medico = cursor.fetchone()
+                if not res_medico:
+                    return False, "Médico no encontrado", None
 
-        try:
-            cursor = conn.cursor()
-            # RECUPERAR DATOS DEL MÉDICO PARA EL OBJETO CitaMedica
-            cursor.execute("SELECT nombres || ' ' || apellidos, especialidad, direccion FROM medicos WHERE id = ?", (id_medico,))
-            res_medico = cursor.fetchone()
-            if not res_medico:
-                return False, "Médico no encontrado", None
-            
-            nombre_medico_str, especialidad_str, consultorio = res_medico
+                nombre_medico_str, especialidad_str, consultorio = res_medico
 
-            # INSERTAR EN DB
-            codigo = self._generar_codigo()
-            sql = """
-                INSERT INTO citas (codigo, cc_paciente, id_medico, fecha, hora, consultorio, estado)
-                VALUES (?, ?, ?, ?, ?, ?, 'Confirmada')
-            """
-            cursor.execute(sql, (codigo, cc, id_medico, fecha.isoformat(), hora.strftime("%H:%M"), consultorio))
-            conn.commit()
+                # 4. INSERTAR EN DB con código único
+                codigo = self._insertar_cita(conn, cc, id_medico, fecha, hora, consultorio)
 
             # CREAR OBJETO CON LOS DATOS RECUPERADOS
             cita = CitaMedica(
@@ -440,10 +489,12 @@ class CitasMedicasController:
             )
             self._notificar_cita_programada(cita)
             return True, f"Cita {codigo} agendada con éxito.", cita
+        except sqlite3.IntegrityError as e:
+            if self._es_turno_ocupado(e):
+                return False, f"El horario {hora.strftime('%H:%M')} ya fue ocupado.", None
+            return False, f"Error técnico al agendar cita: {str(e)}", None
         except Exception as e:
             return False, f"Error técnico al agendar cita: {str(e)}", None
-        finally:
-            conn.close()
 
     def consultar_cita_por_codigo(self, codigo: str) -> Optional[CitaMedica]:
         """
@@ -451,25 +502,12 @@ class CitasMedicasController:
         Usa mapeo explícito para evitar desplazamientos de columnas. [2026-02-01]
         """
         codigo_limpio = (codigo or "").strip()
-        conn = crear_conexion()
-        if not conn:
-            return None
-            
+
         try:
-            cursor = conn.cursor()
             # Especificamos las columnas y traemos el nombre del médico mediante JOIN
-            sql = """
-                SELECT c.codigo, c.cc_paciente, c.fecha, c.hora, c.consultorio, c.estado,
-                            m.nombres || ' ' || m.apellidos, p.nombres || ' ' || p.apellidos,
-                            m.especialidad, c.id_medico
-                FROM citas c
-                JOIN medicos m ON c.id_medico = m.id
-                JOIN pacientes p ON c.cc_paciente = p.dni
-                WHERE c.codigo = ?
-            """
-            cursor.execute(sql, (codigo_limpio,))
-            row = cursor.fetchone()
-            
+            with session() as conn:
+                row = conn.execute(SQL_CITA_POR_CODIGO, (codigo_limpio,)).fetchone()
+
             if row:
                 # El orden del SELECT garantiza que row[0] siempre sea el código
                 try:
@@ -504,9 +542,7 @@ class CitasMedicasController:
                 
         except Exception as e:
             print(f"Error técnico al consultar cita {codigo_limpio}: {e}")
-        finally:
-            conn.close()
-            
+
         return None
 
     def consultar_citas_por_paciente(self, cc: str) -> List[CitaMedica]:
@@ -515,32 +551,16 @@ class CitasMedicasController:
         Garantiza la integridad mediante JOINs y evita errores de índices. [2026-02-01]
         """
         cc = (cc or "").strip()
-        conn = crear_conexion()
         citas = []
-        
-        if not conn:
-            return []
-            
+
         try:
-            cursor = conn.cursor()
             # Mapeo Explícito: Definimos exactamente qué columnas queremos.
             # Traemos nombres actualizados de médicos y pacientes.
             # CRÍTICO: Agregamos c.id_medico en la posición 9 (faltaba antes)
-            sql = """
-                SELECT c.codigo, c.cc_paciente, c.fecha, c.hora, c.consultorio, c.estado,
-                       m.nombres || ' ' || m.apellidos AS nombre_medico,
-                       m.especialidad,
-                       p.nombres || ' ' || p.apellidos AS nombre_paciente,
-                       c.id_medico
-                FROM citas c
-                JOIN medicos m ON c.id_medico = m.id
-                JOIN pacientes p ON c.cc_paciente = p.dni
-                WHERE c.cc_paciente = ?
-                ORDER BY c.fecha DESC, c.hora DESC
-            """
-            cursor.execute(sql, (cc,))
-            
-            for row in cursor.fetchall():
+            with session() as conn:
+                filas = conn.execute(SQL_CITAS_POR_PACIENTE, (cc,)).fetchall()
+
+            for row in filas:
                 # El orden del SELECT garantiza que el mapeo sea siempre el mismo
                 try:
                     # Procesar fecha con validación
@@ -573,9 +593,7 @@ class CitasMedicasController:
                     continue
         except Exception as e:
             print(f"Error técnico al consultar historial del paciente {cc}: {e}")
-        finally:
-            conn.close()
-            
+
         return citas
 
     def modificar_cita(self, codigo: str, nueva_fecha: date, nueva_hora: time) -> Tuple[bool, str, Optional[CitaMedica]]:
@@ -596,24 +614,19 @@ class CitasMedicasController:
         if datetime.now() > (momento_cita - timedelta(hours=12)):
             return False, "Política de preaviso: Las citas solo pueden modificarse con más de 12 horas de antelación.", None
 
-        # 3. Validación de Disponibilidad (Solo si cambió el horario)
-        if not (nueva_fecha == cita.fecha and nueva_hora == cita.hora):
-            # Usamos cita.id_medico (garantizado tras el JOIN en consultar_cita_por_codigo)
-            disponibles = self.obtener_horarios_disponibles(cita.id_medico, nueva_fecha)
-            if nueva_hora not in disponibles:
-                return False, "El médico no tiene disponibilidad en el nuevo horario seleccionado.", None
-
-        conn = crear_conexion()
-        if not conn:
-            return False, "Fallo de conexión a la base de datos.", None
-            
         try:
-            cursor = conn.cursor()
-            # 4. Actualización persistente
-            sql = "UPDATE citas SET fecha = ?, hora = ?, estado = 'Reprogramada' WHERE codigo = ?"
-            cursor.execute(sql, (nueva_fecha.isoformat(), nueva_hora.strftime("%H:%M"), codigo))
-            
-            conn.commit()
+            # 3 y 4 en una transacción BEGIN IMMEDIATE (igual que solicitar_cita)
+            with session(inmediata=True) as conn:
+                # 3. Validación de Disponibilidad (Solo si cambió el horario)
+                if not (nueva_fecha == cita.fecha and nueva_hora == cita.hora):
+                    # Usamos cita.id_medico (garantizado tras el JOIN en consultar_cita_por_codigo)
+                    disponibles = self.obtener_horarios_disponibles(cita.id_medico, nueva_fecha)
+                    if nueva_hora not in disponibles:
+                        return False, "El médico no tiene disponibilidad en el nuevo horario seleccionado.", None
+
+                # 4. Actualización persistente
+                sql = "UPDATE citas SET fecha = ?, hora = ?, estado = 'Reprogramada' WHERE codigo = ?"
+                conn.execute(sql, (nueva_fecha.isoformat(), nueva_hora.strftime("%H:%M"), codigo))
 
             # 5. Actualización del objeto local para la UI
             cita.fecha = nueva_fecha
@@ -625,10 +638,12 @@ class CitasMedicasController:
             
             return True, f"Cita {codigo} reprogramada exitosamente.", cita
 
+        except sqlite3.IntegrityError as e:
+            if self._es_turno_ocupado(e):
+                return False, "El médico no tiene disponibilidad en el nuevo horario seleccionado.", None
+            return False, f"Error técnico en la actualización: {str(e)}", None
         except Exception as e:
             return False, f"Error técnico en la actualización: {str(e)}", None
-        finally:
-            conn.close()
 
     def cancelar_cita(self, codigo: str) -> Tuple[bool, str]:
         """
@@ -649,20 +664,14 @@ class CitasMedicasController:
         if datetime.now() > (momento_cita - timedelta(hours=12)):
             return False, "No es posible cancelar: faltan menos de 12 horas para la cita."
 
-        conn = crear_conexion()
-        if not conn:
-            return False, "Error de conexión con la base de datos."
-            
         try:
-            cursor = conn.cursor()
-            # 3. Actualización persistente por Código Único
-            sql = "UPDATE citas SET estado = 'Cancelada' WHERE codigo = ?"
-            cursor.execute(sql, (codigo.strip(),))
-            
-            if cursor.rowcount == 0:
-                return False, "No se pudo actualizar el estado de la cita."
-                
-            conn.commit()
+            with session() as conn:
+                # 3. Actualización persistente por Código Único
+                sql = "UPDATE citas SET estado = 'Cancelada' WHERE codigo = ?"
+                cursor = conn.execute(sql, (codigo.strip(),))
+
+                if cursor.rowcount == 0:
+                    return False, "No se pudo actualizar el estado de la cita."
 
             # 4. Notificaciones centralizadas (Punto 2 del plan)
             # Notificamos tanto al paciente como al médico
@@ -672,8 +681,6 @@ class CitasMedicasController:
 
         except Exception as e:
             return False, f"Error técnico al procesar la cancelación: {str(e)}"
-        finally:
-            conn.close()
 
     # ---------------------------
     # Recepción: registrar estado
@@ -706,26 +713,20 @@ class CitasMedicasController:
         if cita.fecha != date.today() and nuevo_estado == "Asistió":
             return False, f"Fecha incorrecta: La cita es para el {cita.fecha.strftime('%d/%m/%Y')}.", None
 
-        conn = crear_conexion()
-        if not conn:
-            return False, "Fallo de conexión a la base de datos.", None
-            
         try:
-            cursor = conn.cursor()
             h_llegada_str = hora_llegada.strftime("%H:%M") if hora_llegada else None
-            
-            # 3. Actualización persistente
-            sql = """
-                UPDATE citas 
-                SET estado = ?, hora_llegada = ?, comentario = ?
-                WHERE codigo = ?
-            """
-            cursor.execute(sql, (nuevo_estado, h_llegada_str, comentario, codigo.strip()))
-            
-            if cursor.rowcount == 0:
-                return False, "No se pudo actualizar el registro en la base de datos.", None
-                
-            conn.commit()
+
+            with session() as conn:
+                # 3. Actualización persistente
+                sql = """
+                    UPDATE citas 
+                    SET estado = ?, hora_llegada = ?, comentario = ?
+                    WHERE codigo = ?
+                """
+                cursor = conn.execute(sql, (nuevo_estado, h_llegada_str, comentario, codigo.strip()))
+
+                if cursor.rowcount == 0:
+                    return False, "No se pudo actualizar el registro en la base de datos.", None
 
             # 4. Sincronización del objeto para la UI
             cita.estado = nuevo_estado
@@ -739,60 +740,61 @@ class CitasMedicasController:
 
         except Exception as e:
             return False, f"Error técnico en base de datos: {str(e)}", None
-        finally:
-            conn.close()
 
     # ---------------------------
     # Notificaciones
     # ---------------------------
     def obtener_historial_notificaciones(self) -> List[Notificacion]:
         """
-        Recupera el log de comunicaciones del sistema.
-        Garantiza la trazabilidad de los avisos enviados a pacientes y médicos.
+        Recupera el log completo de comunicaciones del sistema.
+        Para pantallas usar consultar_notificaciones (paginado).
+        """
+        historial, cursor = self.consultar_notificaciones()
+        while cursor is not None:
+            pagina, cursor = self.consultar_notificaciones(despues_de=cursor)
+            historial.extend(pagina)
+        return historial
+
+    def consultar_notificaciones(
+        self,
+        limite: int = 100,
+        despues_de: Optional[int] = None,
+        destinatario: Optional[str] = None,
+        canal: Optional[str] = None,
+        estado: Optional[str] = None,
+        desde: Optional[date] = None,
+        hasta: Optional[date] = None,
+    ) -> Tuple[List[Notificacion], Optional[int]]:
+        """
+        Página del historial de notificaciones, de la más reciente a la más
+        antigua, con filtros opcionales.
+        Paginación por id (no cambia al entregarse la notificación, a
+        diferencia de las fechas): `despues_de` es el cursor que devolvió la
+        página anterior, así cada página cuesta lo mismo sin importar
+        cuántas filas haya antes. desde/hasta filtran por la fecha en que
+        se encoló. Retorna (notificaciones, cursor de
+        la siguiente página o None si no hay más).
         """
-        conn = crear_conexion()
         historial = []
-        
-        if not conn:
-            return []
-            
+        siguiente = None
         try:
-            cursor = conn.cursor()
-            # Usamos LEFT JOIN para buscar el nombre ya sea en pacientes o en médicos
-            sql = """
-                SELECT 
-                    n.destinatario, 
-                    n.mensaje, 
-                    n.canal, 
-                    n.fecha_envio,
-                    n.estado,
-                    COALESCE(p.nombres || ' ' || p.apellidos, m.nombres || ' ' || m.apellidos, 'Desconocido') AS nombre_completo,
-                    CASE 
-                        WHEN p.dni IS NOT NULL THEN 'Paciente'
-                        WHEN m.id IS NOT NULL THEN 'Médico'
-                        ELSE 'Sistema'
-                    END AS tipo_usuario
-                FROM notificaciones n
-                LEFT JOIN pacientes p ON n.destinatario = p.dni
-                LEFT JOIN medicos m ON n.destinatario = CAST(m.id AS TEXT)
-                ORDER BY n.fecha_envio DESC
-            """
-            cursor.execute(sql)
-            
-            for row in cursor.fetchall():
+            sql, parametros = consulta_notificaciones(limite, despues_de, destinatario, canal, estado, desde, hasta)
+            with session() as conn:
+                filas = conn.execute(sql, parametros).fetchall()
+
+            for row in filas:
                 try:
                     # Limpieza de fecha para evitar el error de microsegundos
                     fecha_str = row[3][:19] if row[3] else datetime.now().isoformat()[:19]
                     fecha_valida = datetime.fromisoformat(fecha_str)
                     
-                    # Creamos el objeto Notificacion 
-                    # (Asegúrate de que tu modelo soporte 'nombre_destinatario' y 'tipo')
                     n = Notificacion(
                         destinatario=row[0],
                         mensaje=row[1],
                         canal=row[2],
                         enviada_en=fecha_valida,
-                        estado=row[4]
+                        estado=row[4],
+                        detalle_error=row[8] or ""
                     )
                     # Atributos dinámicos para la UI
                     n.nombre_destinatario = row[5]
@@ -801,75 +803,39 @@ class CitasMedicasController:
                     historial.append(n)
                 except Exception as e:
                     print(f"Error en registro: {e}")
-        finally:
-            conn.close()
-        return historial
 
-    def _notificar(self, destinatario: str, canal: str, mensaje: str,
-                  estado: str = "Enviada", detalle_error: str = ""):
+            if len(filas) == limite:
+                siguiente = filas[-1][7]
+        except Exception as e:
+            print(f"Error técnico al consultar notificaciones: {e}")
+        return historial, siguiente
+
+    def _notificar(self, destinatario: str, canal: str, mensaje: str):
         """
-        Registra la comunicación en la base de datos de forma persistente.
-        Método de soporte interno para trazabilidad y auditoría.
+        Encola la comunicación en la bandeja de salida. El registro queda en
+        notificaciones como 'Pendiente' y el hilo de la bandeja lo entrega y
+        actualiza su estado, fuera del flujo de la operación que la originó.
         """
-        conn = crear_conexion()
-        if not conn:
-            # Si falla la conexión, al menos logueamos en consola
-            print(f"ALERTA: Sin conexión para registrar notificación a {destinatario}")
-            return
-
-        try:
-            cursor = conn.cursor()
-            # Usamos el formato ISO para la fecha, facilitando la lectura 
-            # desde obtener_historial_notificaciones
-            fecha_actual = datetime.now().replace(microsecond=0).isoformat()
-            
-            # Definimos columnas explícitas para evitar el Punto 1
-            sql = """
-                INSERT INTO notificaciones 
-                (destinatario, canal, mensaje, estado, detalle_error, fecha_envio)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """
-            cursor.execute(sql, (
-                destinatario, canal, mensaje, estado, detalle_error, fecha_actual
-            ))
-            
-            conn.commit()
-            
-        except Exception as e:
-            # En notificaciones, un error no debe tumbar la app, pero sí reportarse
-            print(f"Error crítico al guardar registro de notificación: {e}")
-        finally:
-            conn.close()
+        self.bandeja.encolar(destinatario, canal, mensaje)
 
     def _notificar_cita_programada(self, cita: CitaMedica):
         """
-        Sincronización de atributos con el modelo Paciente.
-        Asegura que el canal de comunicación sea detectado correctamente.
+        Notifica la cita al paciente y al médico.
+        El canal del paciente (email, SMS o interno) lo decide la bandeja al
+        enviar, según sus datos de contacto.
         """
-        # 1. Consultamos al paciente usando el controlador inyectado
-        paciente = self.pacientes.consultar_paciente(cita.cc_paciente)
-
-        canal = "interno" # Por defecto
-        if paciente:
-            # CORRECCIÓN: Usamos 'email' y 'telefono' (como están en tu DB/Clase)
-            # No usamos 'telefono1' ni 'telefono2' porque no existen en tu modelo
-            if getattr(paciente, "email", None) and "@" in paciente.email:
-                canal = "email"
-            elif getattr(paciente, "telefono", None) and len(str(paciente.telefono)) > 5:
-                canal = "sms"
-
-        # 2. Construcción del mensaje para el paciente
+        # 1. Construcción del mensaje para el paciente
         msg_paciente = (
             f"Confirmación Cita {cita.codigo}: Especialidad {cita.especialidad} "
             f"con el Dr(a). {cita.medico} el día {cita.fecha.strftime('%d/%m/%Y')} "
             f"a las {cita.hora.strftime('%H:%M')}. Consultorio: {cita.consultorio}."
         )
 
-        # 3. Registro de la notificación en el historial
+        # 2. Encolado en la bandeja (queda en el historial como 'Pendiente')
         # Notificación al Paciente
         self._notificar(
             destinatario=cita.cc_paciente, 
-            canal=canal, 
+            canal=CANAL_AUTOMATICO, 
             mensaje=msg_paciente
         )
         
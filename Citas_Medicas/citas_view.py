@@ -1,15 +1,18 @@
-from datetime import date
+from datetime import date, timedelta
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFrame, QTabWidget, 
-    QTableWidget, QTableWidgetItem, QHeaderView,
+    QHeaderView,
     QComboBox, QDateEdit, QLineEdit, QMessageBox,
-    QAbstractItemView
+    QAbstractItemView, QTableView
 )
 from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtGui import QColor
 from .citas_controller import CitasMedicasController
+from .historial_model import HistorialNotificacionesModel
 from core.theme import AppPalette, get_sheet, STYLES
 from core.utils import get_icon
+from core.tabla_virtual import ModeloTablaVirtual, ProxyTablaVirtual
 from .dialogs import (
     SolicitarCitaDialog, 
     RegistrarAgendaDialog,
@@ -64,9 +67,11 @@ class TabConsultarCitas(QWidget):
         layout.addWidget(filtro_frame)
 
         # -- SECCIÓN 2: TABLA --
-        self.tabla = QTableWidget(0, 7)
         headers = ["Código", "Paciente", "Especialidad", "Médico", "Fecha", "Hora", "Estado"]
-        self.tabla.setHorizontalHeaderLabels(headers)
+        self.modelo = ModeloTablaVirtual(headers, parent=self, color=self._color_estado)
+        self.proxy = ProxyTablaVirtual(self.modelo)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.proxy)
         self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -125,18 +130,15 @@ class TabConsultarCitas(QWidget):
             QMessageBox.information(self, "Buscar", "Ingrese Código o Cédula.")
             return
 
-        self.tabla.setRowCount(0)
+        self.modelo.limpiar()
         if not citas:
             QMessageBox.information(self, "Info", "No se encontraron citas.")
             return
 
         # Procesamiento con validación robusta
-        filas_error = 0
+        filas, filas_error = [], 0
         for c in citas:
             try:
-                row = self.tabla.rowCount()
-                self.tabla.insertRow(row)
-                
                 # Validar y formatear fecha
                 try:
                     if hasattr(c.fecha, 'strftime'):
@@ -158,7 +160,7 @@ class TabConsultarCitas(QWidget):
                     hora_str = str(c.hora) if c.hora else "N/A"
                 
                 # Construir fila con validación de atributos
-                vals = [
+                filas.append((
                     str(c.codigo or ""),
                     str(c.nombre_paciente or ""),
                     str(c.especialidad or ""),
@@ -166,21 +168,17 @@ class TabConsultarCitas(QWidget):
                     fecha_str,
                     hora_str,
                     str(c.estado or "")
-                ]
-                
-                for col, v in enumerate(vals):
-                    item = QTableWidgetItem(v)
-                    if col == 6:  # Columna Estado
-                        self._color_estado(item, c.estado)
-                    self.tabla.setItem(row, col, item)
-                    
+                ))
+
             except Exception as e:
                 filas_error += 1
                 print(f"Error al procesar cita: {e}")
                 import traceback
                 traceback.print_exc()
                 continue
-        
+
+        self.modelo.cargar(filas)
+
         # Solo mostrar advertencia si realmente hubo errores procesando citas
         if filas_error > 0 and filas_error < len(citas):
             QMessageBox.warning(
@@ -189,7 +187,10 @@ class TabConsultarCitas(QWidget):
                 f"Algunos registros tuvieron errores. Ver consola para detalles."
             )
 
-    def _color_estado(self, item, estado):
+    @staticmethod
+    def _color_estado(fila, columna):
+        if columna != 6:  # Solo la columna Estado
+            return None
         colores = {
             "Programada": Qt.GlobalColor.blue,
             "Confirmada": Qt.GlobalColor.blue,
@@ -197,16 +198,14 @@ class TabConsultarCitas(QWidget):
             "Asistió": Qt.GlobalColor.darkGreen,
             "Tardanza": Qt.GlobalColor.darkYellow
         }
-        if estado in colores:
-            item.setForeground(colores[estado])
-            self.setStyleSheet(get_sheet()) # Mantiene consistencia de fuente
+        return QColor(colores[fila[6]]) if fila[6] in colores else None
 
     def _get_selected(self):
-        row = self.tabla.currentRow()
-        if row < 0:
+        fila = self.proxy.fila_actual(self.tabla)
+        if fila is None:
             QMessageBox.warning(self, "Selección", "Seleccione una cita de la tabla.")
             return None
-        return self.tabla.item(row, 0).text()
+        return fila[0]
 
     def _on_modificar(self):
         cod = self._get_selected()
@@ -261,6 +260,9 @@ class TabAgenda(QWidget):
         self.date_fecha.setCalendarPopup(True)
         self.date_fecha.setDate(date.today())
         self.date_fecha.setMinimumWidth(120)
+
+        self.cmb_periodo = QComboBox()
+        self.cmb_periodo.addItems(["Día", "Semana", "Mes"])
         
         btn_ver = QPushButton(" Cargar Agenda")
         btn_ver.setIcon(get_icon("calendar.svg", color="white"))
@@ -273,13 +275,21 @@ class TabAgenda(QWidget):
         top_layout.addSpacing(10)
         top_layout.addWidget(QLabel("Fecha:"))
         top_layout.addWidget(self.date_fecha)
+        top_layout.addWidget(self.cmb_periodo)
         top_layout.addWidget(btn_ver)
         top_layout.addStretch()
         
         layout.addWidget(top_frame)
 
-        self.tabla = QTableWidget(0, 5)
-        self.tabla.setHorizontalHeaderLabels(["Hora", "Paciente", "Especialidad", "Estado", "Código Cita"])
+        self.lbl_resumen = QLabel("")
+        self.lbl_resumen.setStyleSheet(f"color: {AppPalette.black_02};")
+        layout.addWidget(self.lbl_resumen)
+
+        self.modelo = ModeloTablaVirtual(
+            ["Fecha", "Hora", "Paciente", "Especialidad", "Estado", "Código Cita"], parent=self
+        )
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.tabla.setAlternatingRowColors(True)
         self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -302,18 +312,23 @@ class TabAgenda(QWidget):
         qdate = self.date_fecha.date()
         fecha = date(qdate.year(), qdate.month(), qdate.day())
 
-        citas = self.controller.consultar_agenda(id_medico, fecha)
-        self.tabla.setRowCount(0)
-        
-        if not citas:
-            return
+        # Día, semana o mes completo en una sola consulta
+        desde, hasta = self.controller.calcular_rango(fecha, self.cmb_periodo.currentText())
+        try:
+            agenda = self.controller.obtener_agenda_rango([id_medico], desde, hasta)
+        except Exception as e:
+            print(f"Error técnico al consultar agenda: {e}")
+            agenda = {}
+        dias = [agenda[k] for k in sorted(agenda)]
 
-        for c in citas:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            vals = [str(c.hora), c.nombre_paciente, c.especialidad, c.estado, c.codigo]
-            for col, v in enumerate(vals):
-                self.tabla.setItem(row, col, QTableWidgetItem(str(v)))
+        libres = sum(len(d.horas_libres()) for d in dias)
+        total_citas = sum(len(d.citas) for d in dias)
+        self.lbl_resumen.setText(f"{total_citas} cita(s) · {libres} turno(s) libre(s)")
+
+        self.modelo.cargar(
+            (c.fecha.strftime("%d/%m/%Y"), c.hora.strftime("%H:%M"), c.nombre_paciente, c.especialidad, c.estado, c.codigo)
+            for dia in dias for c in dia.citas
+        )
 
     def showEvent(self, event):
         self._cargar_medicos()
@@ -352,9 +367,47 @@ class TabNotificaciones(QWidget):
         
         layout.addLayout(top_layout)
 
-        self.tabla = QTableWidget(0, 6)
-        headers = ["Fecha", "Tipo Usuario", "Nombre", "Contacto", "Canal", "Mensaje"]
-        self.tabla.setHorizontalHeaderLabels(headers)
+        # Filtros (se aplican en la consulta SQL, no sobre filas ya cargadas)
+        filtros_layout = QHBoxLayout()
+        self.txt_destinatario = QLineEdit()
+        self.txt_destinatario.setPlaceholderText("Cédula o ID de médico")
+        self.txt_destinatario.returnPressed.connect(self._cargar)
+
+        self.cmb_canal = QComboBox()
+        self.cmb_canal.addItems(["Todos", "email", "sms", "interno", "sistema"])
+        self.cmb_canal.currentIndexChanged.connect(self._cargar)
+
+        self.cmb_estado = QComboBox()
+        self.cmb_estado.addItems(["Todos", "Pendiente", "Enviada", "Fallida"])
+        self.cmb_estado.currentIndexChanged.connect(self._cargar)
+
+        self.cmb_periodo = QComboBox()
+        self.cmb_periodo.addItems(["Todo", "Hoy", "Últimos 7 días", "Últimos 30 días"])
+        self.cmb_periodo.currentIndexChanged.connect(self._cargar)
+
+        filtros_layout.addWidget(QLabel("Destinatario:"))
+        filtros_layout.addWidget(self.txt_destinatario)
+        filtros_layout.addWidget(QLabel("Canal:"))
+        filtros_layout.addWidget(self.cmb_canal)
+        filtros_layout.addWidget(QLabel("Estado:"))
+        filtros_layout.addWidget(self.cmb_estado)
+        filtros_layout.addWidget(QLabel("Periodo:"))
+        filtros_layout.addWidget(self.cmb_periodo)
+        layout.addLayout(filtros_layout)
+
+        # Modelo perezoso: trae más páginas al llegar al final del scroll
+        self.modelo = HistorialNotificacionesModel(self.controller, [
+            ("Fecha", lambda n: n.enviada_en.strftime("%Y-%m-%d %H:%M")),
+            ("Tipo Usuario", lambda n: getattr(n, 'tipo_usuario', '-')),
+            ("Nombre", lambda n: getattr(n, 'nombre_destinatario', '-')),
+            ("Contacto", lambda n: n.destinatario),
+            ("Canal", lambda n: n.canal),
+            ("Estado", lambda n: n.estado),
+            ("Mensaje", lambda n: n.mensaje),
+        ], parent=self)
+
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.tabla.setAlternatingRowColors(True)
         self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -365,21 +418,13 @@ class TabNotificaciones(QWidget):
         self._cargar()
 
     def _cargar(self):
-        items = self.controller.obtener_historial_notificaciones()
-        self.tabla.setRowCount(0)
-        for n in items:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            vals = [
-                n.enviada_en.strftime("%Y-%m-%d %H:%M"),
-                getattr(n, 'tipo_usuario', '-'),
-                getattr(n, 'nombre_destinatario', '-'),
-                n.destinatario,
-                n.canal,
-                n.mensaje
-            ]
-            for col, v in enumerate(vals):
-                self.tabla.setItem(row, col, QTableWidgetItem(str(v)))
+        dias = {"Hoy": 0, "Últimos 7 días": 7, "Últimos 30 días": 30}.get(self.cmb_periodo.currentText())
+        self.modelo.cargar(
+            destinatario=self.txt_destinatario.text().strip(),
+            canal=self.cmb_canal.currentText() if self.cmb_canal.currentIndex() > 0 else None,
+            estado=self.cmb_estado.currentText() if self.cmb_estado.currentIndex() > 0 else None,
+            desde=date.today() - timedelta(days=dias) if dias is not None else None,
+        )
     
     def showEvent(self, event):
         self._cargar() 
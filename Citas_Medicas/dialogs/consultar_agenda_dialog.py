@@ -3,10 +3,11 @@ from datetime import date
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import (
     QComboBox, QDateEdit, QDialog, QFormLayout, QHBoxLayout,
-    QLabel, QMessageBox, QPushButton, QTableWidget, QTableWidgetItem,
-    QVBoxLayout
+    QLabel, QMessageBox, QPushButton, QTableView, QVBoxLayout
 )
 
+from core.tabla_virtual import ModeloTablaVirtual
+
 from ..citas_controller import CitasMedicasController
 
 
@@ -30,7 +31,8 @@ class ConsultarAgendaDialog(QDialog):
         form = QFormLayout()
 
         self.cmb_medico = QComboBox()
-        self.cmb_medico.addItems(self.controller.obtener_todos_medicos())
+        for m in self.controller.obtener_todos_medicos():
+            self.cmb_medico.addItem(m["nombre_completo"], m["id"])
         form.addRow("Médico:", self.cmb_medico)
 
         self.date_fecha = QDateEdit()
@@ -38,6 +40,10 @@ class ConsultarAgendaDialog(QDialog):
         self.date_fecha.setDate(date.today())
         form.addRow("Fecha:", self.date_fecha)
 
+        self.cmb_periodo = QComboBox()
+        self.cmb_periodo.addItems(["Día", "Semana", "Mes"])
+        form.addRow("Periodo:", self.cmb_periodo)
+
         layout.addLayout(form)
 
         btns = QHBoxLayout()
@@ -50,33 +56,38 @@ class ConsultarAgendaDialog(QDialog):
         btns.addWidget(btn_cerrar)
         layout.addLayout(btns)
 
-        self.tabla = QTableWidget(0, 5)
-        self.tabla.setHorizontalHeaderLabels(["Hora", "Paciente", "Especialidad", "Estado", "Código"])
+        self.modelo = ModeloTablaVirtual(["Fecha", "Hora", "Paciente", "Especialidad", "Estado", "Código"], parent=self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.horizontalHeader().setStretchLastSection(True)
-        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tabla.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         layout.addWidget(self.tabla)
 
     def _consultar(self):
-        medico = self.cmb_medico.currentText().strip()
+        id_medico = self.cmb_medico.currentData()
+        if id_medico is None:
+            return
         qd = self.date_fecha.date()
         fecha = date(qd.year(), qd.month(), qd.day())
 
-        citas = self.controller.consultar_agenda(medico, fecha)
-        self.tabla.setRowCount(0)
+        # Todo el periodo en una sola consulta
+        desde, hasta = self.controller.calcular_rango(fecha, self.cmb_periodo.currentText())
+        agenda = self.controller.obtener_agenda_rango([id_medico], desde, hasta)
+        citas = [c for k in sorted(agenda) for c in agenda[k].citas]
+        self.modelo.limpiar()
 
         if not citas:
-            QMessageBox.information(self, "Agenda", "No existen citas para la fecha seleccionada.")
+            QMessageBox.information(self, "Agenda", "No existen citas para el periodo seleccionado.")
             return
 
-        for c in citas:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            vals = [
+        self.modelo.cargar(
+            (
+                c.fecha.strftime("%d/%m/%Y"),
                 c.hora.strftime("%H:%M"),
                 c.nombre_paciente,
                 c.especialidad,
                 c.estado,
                 c.codigo
-            ]
-            for col, v in enumerate(vals):
-                self.tabla.setItem(row, col, QTableWidgetItem(str(v)))
+            )
+            for c in citas
+        )
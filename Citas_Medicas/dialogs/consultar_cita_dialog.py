@@ -1,10 +1,11 @@
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import (
     QDialog, QFormLayout, QHBoxLayout, QLabel, QLineEdit,
-    QMessageBox, QPushButton, QTableWidget, QTableWidgetItem,
-    QVBoxLayout
+    QMessageBox, QPushButton, QTableView, QVBoxLayout
 )
 
+from core.tabla_virtual import ModeloTablaVirtual
+
 from ..citas_controller import CitasMedicasController
 
 
@@ -46,12 +47,13 @@ class ConsultarCitaDialog(QDialog):
 
         layout.addLayout(btns)
 
-        self.tabla = QTableWidget(0, 7)
-        self.tabla.setHorizontalHeaderLabels(
-            ["Código", "Paciente", "Especialidad", "Médico", "Fecha", "Hora", "Estado"]
+        self.modelo = ModeloTablaVirtual(
+            ["Código", "Paciente", "Especialidad", "Médico", "Fecha", "Hora", "Estado"], parent=self
         )
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.horizontalHeader().setStretchLastSection(True)
-        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tabla.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         layout.addWidget(self.tabla)
 
     def _buscar(self):
@@ -73,17 +75,15 @@ class ConsultarCitaDialog(QDialog):
             QMessageBox.information(self, "Buscar", "Ingrese un código o una cédula para buscar.")
             return
 
-        self.tabla.setRowCount(0)
+        self.modelo.limpiar()
         if not citas:
             QMessageBox.information(self, "Sin resultados", "No se encontraron citas.")
             return
 
-        for c in citas:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            vals = [
+        self.modelo.cargar(
+            (
                 c.codigo, c.nombre_paciente, c.especialidad, c.medico,
                 c.fecha.isoformat(), c.hora.strftime("%H:%M"), c.estado
-            ]
-            for col, v in enumerate(vals):
-                self.tabla.setItem(row, col, QTableWidgetItem(str(v)))
+            )
+            for c in citas
+        )
@@ -1,10 +1,11 @@
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import (
-    QDialog, QHBoxLayout, QLabel, QPushButton,
-    QTableWidget, QTableWidgetItem, QVBoxLayout
+    QAbstractItemView, QDialog, QHBoxLayout, QLabel, QPushButton,
+    QTableView, QVBoxLayout
 )
 
 from ..citas_controller import CitasMedicasController
+from ..historial_model import HistorialNotificacionesModel
 
 
 class HistorialNotificacionesDialog(QDialog):
@@ -34,27 +35,22 @@ class HistorialNotificacionesDialog(QDialog):
         btns.addWidget(btn_cerrar)
         layout.addLayout(btns)
 
-        self.tabla = QTableWidget(0, 5)
-        self.tabla.setHorizontalHeaderLabels(["Fecha/Hora", "Destinatario", "Canal", "Estado", "Mensaje"])
+        # Carga perezosa por páginas al hacer scroll
+        self.modelo = HistorialNotificacionesModel(self.controller, [
+            ("Fecha/Hora", lambda n: n.enviada_en.strftime("%Y-%m-%d %H:%M")),
+            ("Destinatario", lambda n: n.destinatario),
+            ("Canal", lambda n: n.canal),
+            ("Estado", lambda n: n.estado),
+            ("Mensaje", lambda n: n.mensaje),
+        ], parent=self)
+
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.horizontalHeader().setStretchLastSection(True)
-        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         layout.addWidget(self.tabla)
 
         self._cargar()
 
     def _cargar(self):
-        items = self.controller.obtener_historial_notificaciones()
-        self.tabla.setRowCount(0)
-
-        for n in items:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            vals = [
-                n.enviada_en.strftime("%Y-%m-%d %H:%M"),
-                n.destinatario,
-                n.canal,
-                n.estado,
-                n.mensaje
-            ]
-            for col, v in enumerate(vals):
-                self.tabla.setItem(row, col, QTableWidgetItem(str(v)))
+        self.modelo.cargar()
@@ -32,6 +32,8 @@ class SolicitarCitaDialog(QDialog):
         # Aplicar tema consistente
         self.setStyleSheet(get_sheet())
         self._paciente_validado = False
+        # Agenda precargada de la especialidad: {(id_medico, fecha): AgendaDia}
+        self._agenda = {}
         
         self._init_ui()
         ##self.cargar_especialidades()
@@ -112,6 +114,7 @@ class SolicitarCitaDialog(QDialog):
                 self.cmb_medico.addItem("No hay médicos disponibles", None)
         
         self.cmb_medico.blockSignals(False)
+        self._agenda = {}
         self._on_medico_or_fecha_change()
         self.btn_agendar.setEnabled(False)
         
@@ -130,8 +133,7 @@ class SolicitarCitaDialog(QDialog):
         fecha = date(qd.year(), qd.month(), qd.day())
         self.cmb_hora.clear()
 
-        # Enviamos el ID (int) al controlador, no el texto
-        horas = self.controller.obtener_horarios_disponibles(id_medico, fecha)
+        horas = self._horas_libres(id_medico, fecha)
 
         for h in horas:
             self.cmb_hora.addItem(h.strftime("%H:%M"), h)
@@ -150,6 +152,25 @@ class SolicitarCitaDialog(QDialog):
                     self.lbl_paciente.setText("⚠️ Valide al paciente")
                     self.lbl_paciente.setStyleSheet("color: orange;")
 
+    def _horas_libres(self, id_medico: int, fecha: date):
+        """
+        Horas libres del médico en la fecha. La primera vez trae en bloque la
+        semana de todos los médicos de la especialidad, así cambiar de médico
+        o de día dentro de esa semana no vuelve a consultar la BD.
+        """
+        if (id_medico, fecha) not in self._agenda:
+            ids = [self.cmb_medico.itemData(i) for i in range(self.cmb_medico.count())]
+            ids = [i for i in ids if i is not None]
+            try:
+                self._agenda.update(
+                    self.controller.obtener_agenda_rango(ids, fecha, fecha + timedelta(days=6))
+                )
+            except Exception as e:
+                print(f"Error técnico al consultar disponibilidad: {e}")
+                return []
+        dia = self._agenda.get((id_medico, fecha))
+        return dia.horas_libres() if dia else []
+
     def _validar_paciente(self):
         """Valida formato de cédula, existencia en DB y habilita el agendamiento."""
         cc = (self.edt_cc.text() or "").strip()
@@ -247,6 +268,9 @@ class SolicitarCitaDialog(QDialog):
                 [msg],
                 self
             )
+            # La agenda precargada quedó desactualizada: se vuelve a consultar
+            self._agenda = {}
+            self._on_medico_or_fecha_change()
             return
 
         # 5. COMPROBANTE: Usar el nuevo diálogo estilizado
@@ -0,0 +1,36 @@
+from core.tabla_virtual import ModeloTablaVirtual
+
+
+class HistorialNotificacionesModel(ModeloTablaVirtual):
+    """
+    Modelo de tabla del historial de notificaciones con carga perezosa.
+    Trae una página con consultar_notificaciones y pide la siguiente (por
+    cursor) solo cuando la vista llega al final del scroll (fetchMore).
+    `columnas` es una lista de (encabezado, función(notificacion) -> texto).
+    """
+
+    def __init__(self, controller, columnas, tamano_pagina: int = 100, parent=None):
+        super().__init__(
+            [encabezado for encabezado, _ in columnas], tamano_bloque=tamano_pagina, parent=parent,
+            # La última columna (oculta) guarda el detalle del error de entrega
+            ayuda=lambda fila: fila[-1] or None
+        )
+        self.controller = controller
+        self.columnas = columnas
+        self.tamano_pagina = tamano_pagina
+        self.filtros = {}
+
+    def cargar(self, **filtros):
+        """Reinicia el historial con nuevos filtros y trae la primera página."""
+        self.filtros = {k: v for k, v in filtros.items() if v}
+        self.cargar_paginas(self._pagina)
+
+    def _pagina(self, cursor):
+        notificaciones, siguiente = self.controller.consultar_notificaciones(
+            limite=self.tamano_pagina, despues_de=cursor, **self.filtros
+        )
+        filas = [
+            tuple(str(valor(n)) for _, valor in self.columnas) + (n.detalle_error,)
+            for n in notificaciones
+        ]
+        return filas, siguiente
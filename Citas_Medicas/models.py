@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import datetime, date, time
-from typing import Optional
+from typing import List, Optional
 
 
 @dataclass
@@ -29,8 +29,37 @@ class CitaMedica:
 @dataclass
 class Notificacion:
     destinatario: str  # cc_paciente o medico
-    canal: str         # email | sms | app | interno
+    canal: str         # email | sms | app | interno | auto
     mensaje: str
     enviada_en: datetime = field(default_factory=datetime.now)
-    estado: str = "Enviada"     # Enviada | Fallida
+    estado: str = "Enviada"     # Pendiente | Enviada | Fallida
     detalle_error: str = ""
+
+
+@dataclass
+class AgendaDia:
+    """
+    Turnos de un médico en un día. `ocupadas` es un mapa de bits por hora:
+    el bit h está encendido si el turno de las h:00 tiene una cita activa.
+    """
+    id_medico: int
+    fecha: date
+    hora_inicio: int = 9
+    hora_fin: int = 17
+    ocupadas: int = 0
+    citas: List[CitaMedica] = field(default_factory=list)  # incluye canceladas
+
+    def marcar_ocupada(self, hora: time):
+        if hora.minute == 0:
+            self.ocupadas |= 1 << hora.hour
+
+    def esta_libre(self, hora: time) -> bool:
+        return (hora.minute == 0 and self.hora_inicio <= hora.hour < self.hora_fin
+                and not (self.ocupadas >> hora.hour) & 1)
+
+    def horas_libres(self) -> List[time]:
+        return [time(h, 0) for h in range(self.hora_inicio, self.hora_fin)
+                if not (self.ocupadas >> h) & 1]
+
+    def horas_ocupadas(self) -> List[time]:
+        return [time(h, 0) for h in range(24) if (self.ocupadas >> h) & 1]
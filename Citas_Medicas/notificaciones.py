@@ -0,0 +1,276 @@
+"""
+Bandeja de salida (outbox) de notificaciones de Citas Médicas.
+
+Los controladores solo encolan: insertan la notificación como 'Pendiente' en
+la tabla notificaciones y una fila en outbox_notificaciones. Un hilo de fondo
+las toma por lotes, las entrega por el enviador de su canal y escribe el
+resultado ('Enviada' o 'Fallida') en notificaciones. Los fallos se reintentan
+con espera exponencial hasta MAX_INTENTOS.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from core.database import session
+
+# Carpeta donde los enviadores de prueba escriben los mensajes "enviados"
+CARPETA_SALIDA = os.environ.get(
+    "HOSPITAL_NOTIF_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "notificaciones_salida")
+)
+
+MAX_INTENTOS = 5
+ESPERA_BASE = 30        # segundos antes del primer reintento (se duplica en cada fallo)
+ESPERA_MAXIMA = 3600
+TAMANO_LOTE = 50
+INTERVALO = 5.0         # segundos entre revisiones cuando la bandeja está vacía
+RESERVA = 120           # segundos que un lote tomado queda reservado para este hilo
+
+# Canal 'auto': se decide al enviar según los datos de contacto del paciente
+CANAL_AUTOMATICO = "auto"
+# Canales que se entregan al email/teléfono del paciente, no a su cédula
+CANALES_CONTACTO = ("email", "sms")
+
+
+# Mismo formato que CURRENT_TIMESTAMP ('YYYY-MM-DD HH:MM:SS'): las fechas se comparan como texto
+def _ahora() -> str:
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+def _en(segundos: float) -> str:
+    return (datetime.now() + timedelta(seconds=segundos)).isoformat(sep=" ", timespec="seconds")
+
+
+# ---------------------------
+# Enviadores por canal
+# ---------------------------
+class EnviadorCanal:
+    """Entrega un mensaje por un canal. Debe lanzar una excepción si falla."""
+
+    def enviar(self, destino: str, mensaje: str):
+        raise NotImplementedError
+
+
+class EnviadorArchivo(EnviadorCanal):
+    """
+    Sustituto de un proveedor real (SMTP, pasarela SMS): agrega cada mensaje
+    como una línea en un archivo local de CARPETA_SALIDA.
+    """
+
+    def __init__(self, nombre_archivo: str, carpeta: str = None):
+        self.ruta = os.path.join(carpeta or CARPETA_SALIDA, nombre_archivo)
+        self._lock = threading.Lock()
+
+    def enviar(self, destino: str, mensaje: str):
+        if not destino:
+            raise ValueError("Destino vacío")
+        with self._lock:
+            os.makedirs(os.path.dirname(self.ruta), exist_ok=True)
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(f"{_ahora()}\t{destino}\t{mensaje}\n")
+
+
+class EnviadorInterno(EnviadorCanal):
+    """Avisos internos del sistema: el registro en notificaciones es la entrega."""
+
+    def enviar(self, destino: str, mensaje: str):
+        return None
+
+
+_enviadores: Dict[str, EnviadorCanal] = {
+    "email": EnviadorArchivo("email.log"),
+    "sms": EnviadorArchivo("sms.log"),
+    "interno": EnviadorInterno(),
+    "sistema": EnviadorInterno(),
+}
+
+
+def registrar_enviador(canal: str, enviador: EnviadorCanal):
+    """Reemplaza o agrega el enviador de un canal (p.ej. un SMTP real)."""
+    _enviadores[canal] = enviador
+
+
+def resolver_canal(canal: str, email: Optional[str], telefono: Optional[str]) -> Tuple[str, str]:
+    """
+    Retorna (canal, destino) según los datos del paciente. Para 'auto':
+    email si tiene uno válido, si no SMS, si no aviso interno. Para 'email'
+    y 'sms' el destino es ese dato de contacto ("" si el paciente no lo
+    tiene); los avisos internos no tienen destino externo.
+    """
+    email = email if email and "@" in email else ""
+    telefono = str(telefono) if telefono and len(str(telefono)) > 5 else ""
+    if canal == CANAL_AUTOMATICO:
+        if email:
+            return "email", email
+        if telefono:
+            return "sms", telefono
+        return "interno", ""
+    if canal == "email":
+        return canal, email
+    if canal == "sms":
+        return canal, telefono
+    return canal, ""
+
+
+# ---------------------------
+# Bandeja de salida
+# ---------------------------
+class BandejaNotificaciones:
+    """Cola persistente de notificaciones con un hilo que la vacía por lotes."""
+
+    def __init__(self, tamano_lote: int = TAMANO_LOTE, intervalo: float = INTERVALO):
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        # Métricas
+        self.enviadas = 0
+        self.fallidas = 0
+        self.reintentos = 0
+
+    def encolar(self, destinatario: str, canal: str, mensaje: str) -> Optional[int]:
+        """
+        Registra la notificación como 'Pendiente' y la deja en la bandeja.
+        fecha_envio guarda el momento en que se encola y no cambia; la
+        entrega se anota en fecha_entrega.
+        Si hay una sesión abierta en el hilo, se confirma junto con ella.
+        """
+        try:
+            with session() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO notificaciones (destinatario, canal, mensaje, estado, fecha_envio) "
+                    "VALUES (?, ?, ?, 'Pendiente', ?)",
+                    (destinatario, canal, mensaje, _ahora())
+                )
+                id_notificacion = cursor.lastrowid
+                conn.execute(
+                    "INSERT INTO outbox_notificaciones (notificacion_id, proximo_intento) VALUES (?, ?)",
+                    (id_notificacion, _ahora())
+                )
+        except Exception as e:
+            # En notificaciones, un error no debe tumbar la app, pero sí reportarse
+            print(f"Error crítico al encolar notificación: {e}")
+            return None
+        self._evento.set()
+        return id_notificacion
+
+    def iniciar(self):
+        """Arranca el hilo de envío si no está corriendo (idempotente)."""
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="BandejaNotificaciones", daemon=True)
+            self._hilo.start()
+
+    def detener(self, espera: float = 5.0):
+        self._detener.set()
+        self._evento.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+
+    def despertar(self):
+        self._evento.set()
+
+    def pendientes(self) -> int:
+        with session() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outbox_notificaciones").fetchone()[0]
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            try:
+                procesadas = self.procesar_lote()
+            except Exception as e:
+                print(f"Error en la bandeja de notificaciones: {e}")
+                procesadas = 0
+            if procesadas < self.tamano_lote:
+                self._evento.wait(self.intervalo)
+                self._evento.clear()
+
+    def procesar_lote(self) -> int:
+        """Toma hasta tamano_lote notificaciones vencidas, las envía y guarda el resultado."""
+        # 1. Reservar el lote (BEGIN IMMEDIATE: otra instancia no toma las mismas filas)
+        with session(inmediata=True) as conn:
+            lote = conn.execute("""
+                SELECT n.id, n.destinatario, n.canal, n.mensaje, o.intentos, p.email, p.telefono
+                FROM outbox_notificaciones o
+                JOIN notificaciones n ON n.id = o.notificacion_id
+                LEFT JOIN pacientes p ON p.dni = n.destinatario
+                WHERE o.proximo_intento <= ?
+                ORDER BY o.proximo_intento
+                LIMIT ?
+            """, (_ahora(), self.tamano_lote)).fetchall()
+            if not lote:
+                return 0
+            conn.executemany(
+                "UPDATE outbox_notificaciones SET proximo_intento = ? WHERE notificacion_id = ?",
+                [(_en(RESERVA), fila[0]) for fila in lote]
+            )
+
+        # 2. Enviar fuera de la transacción
+        enviadas, reintentar, fallidas = [], [], []
+        for id_notif, destinatario, canal, mensaje, intentos, email, telefono in lote:
+            canal, destino = resolver_canal(canal, email, telefono)
+            if canal in CANALES_CONTACTO and not destino:
+                # Reintentar no sirve: falta el dato de contacto del paciente
+                dato = "email" if canal == "email" else "teléfono"
+                fallidas.append((canal, f"El paciente no tiene {dato} registrado", _ahora(), id_notif))
+                continue
+            try:
+                enviador = _enviadores.get(canal)
+                if enviador is None:
+                    raise ValueError(f"Canal sin enviador: {canal}")
+                enviador.enviar(destino or destinatario, mensaje)
+                enviadas.append((canal, _ahora(), id_notif))
+            except Exception as e:
+                intentos += 1
+                if intentos >= MAX_INTENTOS:
+                    fallidas.append((canal, str(e), _ahora(), id_notif))
+                else:
+                    espera = min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAXIMA)
+                    reintentar.append((canal, str(e), intentos, _en(espera), id_notif))
+
+        # 3. Escribir el estado de entrega en notificaciones
+        with session() as conn:
+            conn.executemany(
+                "UPDATE notificaciones SET canal = ?, estado = 'Enviada', detalle_error = NULL, fecha_entrega = ? WHERE id = ?",
+                enviadas
+            )
+            conn.executemany(
+                "UPDATE notificaciones SET canal = ?, estado = 'Fallida', detalle_error = ?, fecha_entrega = ? WHERE id = ?",
+                fallidas
+            )
+            conn.executemany(
+                "DELETE FROM outbox_notificaciones WHERE notificacion_id = ?",
+                [(fila[-1],) for fila in enviadas + fallidas]
+            )
+            for canal, error, intentos, proximo, id_notif in reintentar:
+                conn.execute("UPDATE notificaciones SET canal = ?, detalle_error = ? WHERE id = ?", (canal, error, id_notif))
+                conn.execute(
+                    "UPDATE outbox_notificaciones SET intentos = ?, proximo_intento = ? WHERE notificacion_id = ?",
+                    (intentos, proximo, id_notif)
+                )
+
+        self.enviadas += len(enviadas)
+        self.fallidas += len(fallidas)
+        self.reintentos += len(reintentar)
+        return len(lote)
+
+
+_bandeja = None
+_bandeja_lock = threading.Lock()
+
+
+def obtener_bandeja() -> BandejaNotificaciones:
+    """Devuelve la bandeja global del proceso (se crea en el primer uso)."""
+    global _bandeja
+    if _bandeja is None:
+        with _bandeja_lock:
+            if _bandeja is None:
+                _bandeja = BandejaNotificaciones()
+    return _bandeja
@@ -8,6 +8,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from core.database import insertar_signos_vitales, obtener_signos_vitales, crear_conexion, actualizar_datos_medicos
 from Pacientes.paciente_controller import PacienteController
 
+# Último registro de signos vitales del paciente (core/diagnostico verifica su plan)
+SQL_ULTIMOS_SIGNOS = """
+    SELECT id FROM pacienteSignosVitales 
+    WHERE cedula = ? 
+    ORDER BY fecha_registro DESC 
+    LIMIT 1
+"""
+
 class ConsultaExternaController:
     def __init__(self, view):
         self.view = view
@@ -138,12 +146,7 @@ class ConsultaExternaController:
                 return False, f"No existe un paciente con cédula {cedula}"
             
             # Verificar si tiene signos vitales
-            cursor.execute("""
-                SELECT id FROM pacienteSignosVitales 
-                WHERE cedula = ? 
-                ORDER BY fecha_registro DESC 
-                LIMIT 1
-            """, (cedula,))
+            cursor.execute(SQL_ULTIMOS_SIGNOS, (cedula,))
             
             tiene_signos = cursor.fetchone()
             
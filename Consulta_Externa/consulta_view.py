@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
-    QTableWidgetItem, QPushButton, QLabel, QTabWidget, 
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView,
+    QPushButton, QLabel, QTabWidget, 
     QFrame, QFormLayout, QLineEdit, QTextEdit, 
     QCheckBox, QMessageBox, QHeaderView, QAbstractItemView, QScrollArea
 )
@@ -9,6 +9,7 @@ from PyQt6.QtCore import Qt, QSize
 # --- IMPORTACIONES DEL NÚCLEO ---
 from core.theme import AppPalette, get_sheet, STYLES
 from core.utils import get_icon
+from core.tabla_virtual import ModeloTablaVirtual, ProxyTablaVirtual
 
 # Reutilizar el mismo diálogo de Historia Clínica del módulo Pacientes
 from Pacientes.paciente_controller import PacienteController
@@ -170,13 +171,16 @@ class ConsultaExternaView(QWidget):
         layout_tabla.addWidget(lbl_titulo_tabla)
 
         # Crear tabla
-        self.tabla_signos_vitales = QTableWidget()
-        self.tabla_signos_vitales.setColumnCount(11)
-        self.tabla_signos_vitales.setHorizontalHeaderLabels([
-            "ID", "Cédula", "Paciente", "Peso (kg)", 
+        # Modelo virtual: las celdas se leen de las tuplas al pintarse
+        self.modelo_signos = ModeloTablaVirtual([
+            "ID", "Cédula", "Paciente", "Peso (kg)",
             "Talla (m)", "Presión", "Motivo", "Fecha/Hora",
             "Código CIE-10", "Observaciones", "Plan Tratamiento"
         ])
+        self.proxy_signos = ProxyTablaVirtual(self.modelo_signos)
+        self.tabla_signos_vitales = QTableView()
+        self.tabla_signos_vitales.setModel(self.proxy_signos)
+        self.tabla_signos_vitales.setSortingEnabled(True)
         
         # Configuración de la tabla
         self.tabla_signos_vitales.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -190,16 +194,16 @@ class ConsultaExternaView(QWidget):
         
         # Estilo de la tabla
         self.tabla_signos_vitales.setStyleSheet(f"""
-            QTableWidget {{
+            QTableView {{
                 background-color: white;
                 border: 1px solid {AppPalette.white_02};
                 border-radius: 4px;
                 gridline-color: {AppPalette.white_02};
             }}
-            QTableWidget::item {{
+            QTableView::item {{
                 padding: 8px;
             }}
-            QTableWidget::item:selected {{
+            QTableView::item:selected {{
                 background-color: {AppPalette.Focus_Bg};
                 color: {AppPalette.Primary};
             }}
@@ -365,23 +369,9 @@ class ConsultaExternaView(QWidget):
 
     def actualizar_tabla_signos_vitales(self, registros):
         """Actualiza la tabla con los registros de signos vitales"""
-        self.tabla_signos_vitales.setRowCount(0)  # Limpiar tabla
-        
-        for row_idx, registro in enumerate(registros):
-            self.tabla_signos_vitales.insertRow(row_idx)
-            # (id, cedula, nombre_paciente, peso, talla, presion, motivo, fecha_registro, 
-            #  codigo_cie10, observaciones, plan_tratamiento)
-            self.tabla_signos_vitales.setItem(row_idx, 0, QTableWidgetItem(str(registro[0]))) # ID
-            self.tabla_signos_vitales.setItem(row_idx, 1, QTableWidgetItem(registro[1])) # Cedula
-            self.tabla_signos_vitales.setItem(row_idx, 2, QTableWidgetItem(registro[2])) # Paciente
-            self.tabla_signos_vitales.setItem(row_idx, 3, QTableWidgetItem(str(registro[3]))) # Peso
-            self.tabla_signos_vitales.setItem(row_idx, 4, QTableWidgetItem(str(registro[4]))) # Talla
-            self.tabla_signos_vitales.setItem(row_idx, 5, QTableWidgetItem(registro[5])) # Presion
-            self.tabla_signos_vitales.setItem(row_idx, 6, QTableWidgetItem(registro[6] if registro[6] else "")) # Motivo
-            self.tabla_signos_vitales.setItem(row_idx, 7, QTableWidgetItem(str(registro[7]))) # Fecha
-            self.tabla_signos_vitales.setItem(row_idx, 8, QTableWidgetItem(registro[8] if registro[8] else "")) # CIE-10
-            self.tabla_signos_vitales.setItem(row_idx, 9, QTableWidgetItem(registro[9] if registro[9] else "")) # Observaciones
-            self.tabla_signos_vitales.setItem(row_idx, 10, QTableWidgetItem(registro[10] if registro[10] else "")) # Plan
+        # (id, cedula, nombre_paciente, peso, talla, presion, motivo, fecha_registro,
+        #  codigo_cie10, observaciones, plan_tratamiento)
+        self.modelo_signos.cargar(registros)
 
 
     # =======================================================
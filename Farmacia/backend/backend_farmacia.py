@@ -1,6 +1,104 @@
 import sqlite3
+from datetime import date
 from sqlite3 import Error
-from core.database import crear_conexion
+from core.database import session
+
+# Tramos de días hasta el vencimiento para el resumen de caducidad:
+# (etiqueta, días máximos); None = sin límite. "Vencidos" son los de días < 0.
+TRAMOS_CADUCIDAD = (
+    ("0-30 días", 30),
+    ("31-90 días", 90),
+    ("91-180 días", 180),
+    ("Más de 180 días", None),
+)
+
+# Consultas de lectura (core/diagnostico verifica sus planes)
+SQL_INVENTARIO_POR_TIPO = "SELECT * FROM inventario WHERE tipo=?"
+SQL_DETALLES_PEDIDO = "SELECT * FROM pedido_detalles WHERE pedido_id=?"
+
+# Cantidad total por nombre y el producto (id menor) que la recibe,
+# como un lote "PED-<id>" con la fecha de caducidad del producto
+SQL_RECIBIR_PEDIDO = """
+    WITH cantidades AS (
+        SELECT nombre_item, SUM(cantidad) AS cantidad
+        FROM pedido_detalles WHERE pedido_id = ? GROUP BY nombre_item
+    ), destinos AS (
+        SELECT (SELECT MIN(i.id) FROM inventario i WHERE i.nombre = c.nombre_item) AS producto_id,
+               c.cantidad
+        FROM cantidades c
+    )
+    INSERT INTO inventario_lotes (producto_id, lote, cantidad, fecha_caducidad)
+    SELECT d.producto_id, 'PED-' || ?, d.cantidad, NULLIF(i.fecha_caducidad, '')
+    FROM destinos d JOIN inventario i ON i.id = d.producto_id
+    WHERE true
+    ON CONFLICT (producto_id, lote) DO UPDATE SET cantidad = cantidad + excluded.cantidad
+"""
+
+# Items del pedido que no tienen producto en inventario
+SQL_FALTANTES_PEDIDO = """
+    SELECT DISTINCT d.nombre_item FROM pedido_detalles d
+    WHERE d.pedido_id = ? AND NOT EXISTS (SELECT 1 FROM inventario i WHERE i.nombre = d.nombre_item)
+    ORDER BY d.id
+"""
+
+
+def consulta_lotes_por_caducidad(hoy, desde=None, hasta=None, limite=None, despues_de=None):
+    """(sql, parámetros) de GestorFarmacia.obtener_lotes_por_caducidad."""
+    condiciones = ["l.cantidad > 0", "l.fecha_caducidad IS NOT NULL", "julianday(l.fecha_caducidad) IS NOT NULL"]
+    params = [hoy]
+    if despues_de is not None:
+        condiciones.append("(l.fecha_caducidad, l.id) > (?, ?)")
+        params.extend(despues_de)
+    if desde:
+        condiciones.append("l.fecha_caducidad >= ?")
+        params.append(desde)
+    if hasta:
+        condiciones.append("l.fecha_caducidad <= ?")
+        params.append(hasta)
+    limitar = ""
+    if limite is not None:
+        limitar = "LIMIT ?"
+        params.append(limite)
+    # (fecha, id) sigue el orden de idx_lotes_caducidad: sin ordenar aparte
+    # y cada página se detiene en LIMIT
+    return f"""
+        SELECT i.nombre, i.tipo, l.lote, l.cantidad, l.fecha_caducidad,
+               CAST(julianday(l.fecha_caducidad) - julianday(?) AS INTEGER), l.id
+        FROM inventario_lotes l JOIN inventario i ON i.id = l.producto_id
+        WHERE {' AND '.join(condiciones)}
+        ORDER BY l.fecha_caducidad, l.id
+        {limitar}
+    """, params
+
+
+def consulta_pedidos_resumen(estado=None, a_proveedor=None, desde=None, hasta=None,
+                             limite=100, antes_de=None):
+    """(sql, parámetros) de GestorFarmacia.obtener_pedidos_resumen."""
+    condiciones, params = [], []
+    if estado:
+        condiciones.append("p.estado = ?")
+        params.append(estado)
+    if a_proveedor is not None:
+        condiciones.append("p.solicitante = 'Farmacia'" if a_proveedor else "p.solicitante != 'Farmacia'")
+    if desde:
+        condiciones.append("p.fecha_creacion >= ?")
+        params.append(desde)
+    if hasta:
+        condiciones.append("p.fecha_creacion < date(?, '+1 day')")
+        params.append(hasta)
+    if antes_de is not None:
+        condiciones.append("p.id < ?")
+        params.append(antes_de)
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    # La subconsulta recorre idx_pedido_detalles_pedido, así los items
+    # salen en el orden en que se agregaron
+    return f"""
+        SELECT p.id, p.solicitante, p.diagnostico_referencia, p.estado, p.fecha_creacion,
+               (SELECT group_concat(d.nombre_item || ' (' || d.cantidad || ')', ', ')
+                FROM pedido_detalles d WHERE d.pedido_id = p.id)
+        FROM pedidos_farmacia p {where}
+        ORDER BY p.id DESC LIMIT ?
+    """, (*params, limite)
 
 class GestorFarmacia:
     def __init__(self):
@@ -8,35 +106,21 @@ class GestorFarmacia:
 
     def _ejecutar_consulta(self, consulta, parametros=()):
         """Ejecuta una consulta SQL de modificación (INSERT, UPDATE, DELETE)."""
-        conn = crear_conexion()
-        if not conn:
-            return False, "Error de conexión con la base de datos."
         try:
-            cursor = conn.cursor()
-            cursor.execute(consulta, parametros)
-            conn.commit()
+            with session() as conn:
+                conn.execute(consulta, parametros)
             return True, "Operación exitosa."
         except Error as e:
             return False, f"Error SQL: {e}"
-        finally:
-            if conn:
-                conn.close()
 
     def _ejecutar_seleccion(self, consulta, parametros=()):
         """Ejecuta una consulta SQL de selección (SELECT)."""
-        conn = crear_conexion()
-        if not conn:
-            return []
         try:
-            cursor = conn.cursor()
-            cursor.execute(consulta, parametros)
-            return cursor.fetchall()
+            with session() as conn:
+                return conn.execute(consulta, parametros).fetchall()
         except Error as e:
             print(f"Error SQL: {e}")
             return []
-        finally:
-            if conn:
-                conn.close()
 
     # --- PROVEEDORES ---
 
@@ -54,43 +138,152 @@ class GestorFarmacia:
     # --- INVENTARIO (MEDICAMENTOS E INSUMOS) ---
 
     def registrar_producto(self, nombre, descripcion, tipo, stock, fecha_caducidad, 
-                          presentacion=None, requiere_receta=0, tipo_material=None, proveedor_id=None):
-        sql = """
-            INSERT INTO inventario (nombre, descripcion, tipo, stock, fecha_caducidad, 
-                                    presentacion, requiere_receta, tipo_material, proveedor_id) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        return self._ejecutar_consulta(sql, (nombre, descripcion, tipo, stock, fecha_caducidad, 
-                                             presentacion, requiere_receta, tipo_material, proveedor_id))
+                          presentacion=None, requiere_receta=0, tipo_material=None, proveedor_id=None,
+                          lote="INICIAL"):
+        """El stock inicial entra como el primer lote del producto (inventario.stock lo suman los triggers)."""
+        try:
+            with session() as conn:
+                cursor = conn.execute("""
+                    INSERT INTO inventario (nombre, descripcion, tipo, stock, fecha_caducidad, 
+                                            presentacion, requiere_receta, tipo_material, proveedor_id) 
+                    VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?)
+                """, (nombre, descripcion, tipo, fecha_caducidad, presentacion, requiere_receta, tipo_material,
+                      proveedor_id))
+                conn.execute(
+                    "INSERT INTO inventario_lotes (producto_id, lote, cantidad, fecha_caducidad) VALUES (?, ?, ?, ?)",
+                    (cursor.lastrowid, lote, stock, fecha_caducidad or None)
+                )
+            return True, "Operación exitosa."
+        except Error as e:
+            return False, f"Error SQL: {e}"
 
     def obtener_inventario(self, tipo=None):
         if tipo:
-            return self._ejecutar_seleccion("SELECT * FROM inventario WHERE tipo=?", (tipo,))
+            return self._ejecutar_seleccion(SQL_INVENTARIO_POR_TIPO, (tipo,))
         return self._ejecutar_seleccion("SELECT * FROM inventario")
 
-    def actualizar_stock(self, id_producto, cantidad_agregar):
-        """Suma (o resta si es negativo) al stock actual."""
-        # Se podría hacer en una sola consulta, pero leemos primero para validar si existe
-        sql_update = "UPDATE inventario SET stock = stock + ? WHERE id = ?"
-        return self._ejecutar_consulta(sql_update, (cantidad_agregar, id_producto))
+    def actualizar_stock(self, id_producto, cantidad_agregar, lote="AJUSTE", fecha_caducidad=None):
+        """
+        Suma (o resta si es negativo) al stock actual, siempre a través de los lotes.
+        Sumar va al lote indicado (con la fecha de caducidad dada o la del
+        producto). Restar descuenta primero de los lotes que vencen antes.
+        """
+        try:
+            with session(inmediata=True) as conn:
+                producto = conn.execute("SELECT fecha_caducidad FROM inventario WHERE id = ?", (id_producto,)).fetchone()
+                if not producto:
+                    return False, "Producto no encontrado."
+                if cantidad_agregar >= 0:
+                    conn.execute("""
+                        INSERT INTO inventario_lotes (producto_id, lote, cantidad, fecha_caducidad)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (producto_id, lote) DO UPDATE SET cantidad = cantidad + excluded.cantidad
+                    """, (id_producto, lote, cantidad_agregar, fecha_caducidad or producto[0] or None))
+                    return True, "Operación exitosa."
+                pendiente = -cantidad_agregar
+                lotes = conn.execute("""
+                    SELECT id, cantidad FROM inventario_lotes WHERE producto_id = ? AND cantidad > 0
+                    ORDER BY fecha_caducidad IS NULL, fecha_caducidad, id
+                """, (id_producto,)).fetchall()
+                if sum(cantidad for _, cantidad in lotes) < pendiente:
+                    return False, "Stock insuficiente."
+                for id_lote, cantidad in lotes:
+                    if pendiente == 0:
+                        break
+                    descuento = min(cantidad, pendiente)
+                    conn.execute("UPDATE inventario_lotes SET cantidad = cantidad - ? WHERE id = ?", (descuento, id_lote))
+                    pendiente -= descuento
+            return True, "Operación exitosa."
+        except Error as e:
+            return False, f"Error SQL: {e}"
+
+    def obtener_lotes_por_caducidad(self, hoy, desde=None, hasta=None, limite=None, despues_de=None):
+        """
+        Lotes con existencias que vencen entre desde y hasta ('YYYY-MM-DD',
+        inclusive; None = sin límite), del más próximo al más lejano; se
+        omiten los de fecha no válida. Hasta `limite` filas, después del
+        cursor despues_de = (fecha_caducidad, id) del último lote visto.
+        Filas: (nombre, tipo, lote, cantidad, fecha_caducidad, días desde `hoy`, id).
+        """
+        return self._ejecutar_seleccion(*consulta_lotes_por_caducidad(hoy, desde, hasta, limite, despues_de))
+
+    def resumen_caducidad(self, hoy=None):
+        """
+        [(tramo, lotes, unidades)] con "Vencidos" y TRAMOS_CADUCIDAD, desde la
+        tabla caducidad_por_dia (una fila por fecha, no por lote).
+        """
+        hoy = hoy or date.today().isoformat()
+        casos, params = ["WHEN fecha_caducidad < ? THEN 'Vencidos'"], [hoy]
+        for etiqueta, dias in TRAMOS_CADUCIDAD:
+            if dias is None:
+                casos.append(f"ELSE '{etiqueta}'")
+            else:
+                casos.append(f"WHEN fecha_caducidad <= date(?, '+{int(dias)} days') THEN '{etiqueta}'")
+                params.append(hoy)
+        filas = dict((tramo, (lotes, unidades)) for tramo, lotes, unidades in self._ejecutar_seleccion(f"""
+            SELECT CASE {' '.join(casos)} END AS tramo, SUM(lotes), SUM(unidades)
+            FROM caducidad_por_dia WHERE unidades > 0 GROUP BY tramo
+        """, params))
+        return [(tramo, *filas.get(tramo, (0, 0)))
+                for tramo in ("Vencidos", *(etiqueta for etiqueta, _ in TRAMOS_CADUCIDAD))]
 
     # --- PEDIDOS ---
 
     def crear_pedido_cabecera(self, solicitante, diagnostico_ref, estado="Pendiente"):
-        conn = crear_conexion()
-        if not conn:
-            return None, "Error de conexión."
         try:
-            cursor = conn.cursor()
-            sql = "INSERT INTO pedidos_farmacia (solicitante, diagnostico_referencia, estado) VALUES (?, ?, ?)"
-            cursor.execute(sql, (solicitante, diagnostico_ref, estado))
-            conn.commit()
-            pedido_id = cursor.lastrowid
+            with session() as conn:
+                cursor = conn.cursor()
+                sql = "INSERT INTO pedidos_farmacia (solicitante, diagnostico_referencia, estado) VALUES (?, ?, ?)"
+                cursor.execute(sql, (solicitante, diagnostico_ref, estado))
+                pedido_id = cursor.lastrowid
             return pedido_id, "Pedido creado."
         except Error as e:
             return None, f"Error abriendo pedido: {e}"
-        finally:
-            conn.close()
+
+    def crear_pedido(self, solicitante, diagnostico_ref, items, estado="Pendiente"):
+        """
+        Crea la cabecera y todos los detalles de un pedido en una sola
+        transacción: si algo falla no queda un pedido a medias.
+        :param items: Lista de dicts {'nombre': ..., 'cantidad': ...}.
+        :return: (pedido_id, "Mensaje") o (None, "Error")
+        """
+        try:
+            with session(inmediata=True) as conn:
+                cursor = conn.execute(
+                    "INSERT INTO pedidos_farmacia (solicitante, diagnostico_referencia, estado) VALUES (?, ?, ?)",
+                    (solicitante, diagnostico_ref, estado)
+                )
+                pedido_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO pedido_detalles (pedido_id, nombre_item, cantidad) VALUES (?, ?, ?)",
+                    [(pedido_id, item['nombre'], item['cantidad']) for item in items]
+                )
+            return pedido_id, "Pedido creado."
+        except Error as e:
+            return None, f"Error creando pedido: {e}"
+
+    def recibir_pedido(self, pedido_id):
+        """
+        Suma al inventario todas las cantidades del pedido y lo marca como
+        Recibido, todo en una transacción (un solo INSERT de lotes; los
+        triggers suman el stock). Cada item va al primer producto con ese
+        nombre; los que no existen en inventario se informan y se omiten.
+        :return: (True, [nombres sin producto]) o (False, "Error")
+        """
+        try:
+            with session(inmediata=True) as conn:
+                pedido = conn.execute("SELECT estado FROM pedidos_farmacia WHERE id=?", (pedido_id,)).fetchone()
+                vacio = not conn.execute("SELECT 1 FROM pedido_detalles WHERE pedido_id=? LIMIT 1", (pedido_id,)).fetchone()
+                if not pedido or vacio:
+                    return False, "Pedido no encontrado o vacío."
+                if pedido[0] == "Recibido":
+                    return False, "El pedido ya fue recibido; el stock no se vuelve a sumar."
+                conn.execute(SQL_RECIBIR_PEDIDO, (pedido_id, pedido_id))
+                faltantes = [fila[0] for fila in conn.execute(SQL_FALTANTES_PEDIDO, (pedido_id,))]
+                conn.execute("UPDATE pedidos_farmacia SET estado='Recibido' WHERE id=?", (pedido_id,))
+            return True, faltantes
+        except Error as e:
+            return False, f"Error al recibir el pedido: {e}"
 
     def agregar_detalle_pedido(self, pedido_id, nombre_item, cantidad):
         sql = "INSERT INTO pedido_detalles (pedido_id, nombre_item, cantidad) VALUES (?, ?, ?)"
@@ -102,8 +295,20 @@ class GestorFarmacia:
             return self._ejecutar_seleccion("SELECT * FROM pedidos_farmacia WHERE estado=?", (estado,))
         return self._ejecutar_seleccion("SELECT * FROM pedidos_farmacia ORDER BY id DESC")
 
+    def obtener_pedidos_resumen(self, estado=None, a_proveedor=None, desde=None, hasta=None,
+                                limite=100, antes_de=None):
+        """
+        Pedidos con sus items ya resumidos ("Nombre (cant), ...") en una sola
+        consulta, del más reciente al más antiguo.
+        a_proveedor: True solo pedidos a proveedores (solicitante 'Farmacia'),
+        False solo internos, None todos. desde/hasta: fechas 'YYYY-MM-DD' de
+        creación, inclusive. antes_de: id del último pedido de la página anterior.
+        Filas: (id, solicitante, referencia, estado, fecha, items).
+        """
+        return self._ejecutar_seleccion(*consulta_pedidos_resumen(estado, a_proveedor, desde, hasta, limite, antes_de))
+
     def obtener_detalles_pedido(self, pedido_id):
-        return self._ejecutar_seleccion("SELECT * FROM pedido_detalles WHERE pedido_id=?", (pedido_id,))
+        return self._ejecutar_seleccion(SQL_DETALLES_PEDIDO, (pedido_id,))
 
     def actualizar_estado_pedido(self, pedido_id, nuevo_estado):
         return self._ejecutar_consulta("UPDATE pedidos_farmacia SET estado=? WHERE id=?", (nuevo_estado, pedido_id))
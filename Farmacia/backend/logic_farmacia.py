@@ -1,9 +1,11 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from .backend_farmacia import GestorFarmacia
 
 class LogicaFarmacia:
     def __init__(self):
         self.db = GestorFarmacia()
+        self.pedidos_por_pagina = 100
+        self.lotes_por_pagina = 200
 
     def _validar_texto(self, texto, nombre_campo):
         if not texto or len(texto.strip()) == 0:
@@ -71,15 +73,11 @@ class LogicaFarmacia:
         ok, msg = self._validar_texto(solicitante, "Solicitante")
         if not ok: return False, msg
 
-        # 1. Crear cabecera
-        pedido_id, msg = self.db.crear_pedido_cabecera(solicitante, f"Departamento: {departamento}")
+        # Cabecera y detalles en una sola transacción
+        pedido_id, msg = self.db.crear_pedido(solicitante, f"Departamento: {departamento}", items)
         if not pedido_id:
             return False, msg
 
-        # 2. Agregar detalles
-        for item in items:
-            self.db.agregar_detalle_pedido(pedido_id, item['nombre'], item['cantidad'])
-        
         return True, f"Pedido Interno #{pedido_id} creado correctamente."
 
     def crear_pedido_proveedor(self, id_proveedor, items):
@@ -89,86 +87,70 @@ class LogicaFarmacia:
             return False, "Proveedor no encontrado."
         nombre_prov = prov[1] # Asumiendo columna 1 es nombre
 
-        pedido_id, msg = self.db.crear_pedido_cabecera("Farmacia", f"Proveedor: {nombre_prov}", estado="Enviado")
+        pedido_id, msg = self.db.crear_pedido("Farmacia", f"Proveedor: {nombre_prov}", items, estado="Enviado")
         if not pedido_id:
             return False, msg
 
-        for item in items:
-            self.db.agregar_detalle_pedido(pedido_id, item['nombre'], item['cantidad'])
-
         return True, f"Pedido a Proveedor #{pedido_id} enviado."
 
-    def consultar_pedidos(self):
-        # Retorna lista de dicts o tuplas más amigables
-        pedidos_raw = self.db.obtener_pedidos()
-        resultado = []
-        for p in pedidos_raw:
-            # p: (id, solicitante, diagnostico_ref, estado, fecha)
-            detalles = self.db.obtener_detalles_pedido(p[0])
-            items_str = ", ".join([f"{d[2]} ({d[3]})" for d in detalles]) # d[2]=nombre, d[3]=cant
-            
-            resultado.append({
-                "id": p[0],
-                "solicitante": p[1],
-                "referencia": p[2],
-                "estado": p[3],
-                "fecha": p[4],
-                "items": items_str
-            })
-        return resultado
+    def consultar_pedidos(self, estado=None, a_proveedor=None, desde=None, hasta=None, antes_de=None):
+        """
+        Una página (pedidos_por_pagina) de pedidos como dicts, del más reciente
+        al más antiguo. Para la página siguiente, antes_de = id del último.
+        Ver GestorFarmacia.obtener_pedidos_resumen para los filtros.
+        """
+        pedidos_raw = self.db.obtener_pedidos_resumen(
+            estado, a_proveedor, desde, hasta, limite=self.pedidos_por_pagina, antes_de=antes_de
+        )
+        return [{
+            "id": p[0],
+            "solicitante": p[1],
+            "referencia": p[2],
+            "estado": p[3],
+            "fecha": p[4],
+            "items": p[5] or ""
+        } for p in pedidos_raw]
 
     def recibir_pedido(self, pedido_id):
-        # 1. Obtener detalles para actualizar stock
-        detalles = self.db.obtener_detalles_pedido(pedido_id)
-        if not detalles:
-            return False, "Pedido no encontrado o vacío."
-        
-        # 2. Actualizar stock para cada item
-        for d in detalles:
-            nombre_item = d[2]
-            cantidad = d[3]
-            # Buscar ID del producto por nombre (una búsqueda simplificada)
-            # Nota: Esto asume nombres únicos o toma el primero que encuentra.
-            # En un sistema real, el pedido debería guardar el ID del producto si es un reabastecimiento exacto.
-            # Dado el esquema actual, buscamos coincidencias.
-            inv = self.db._ejecutar_seleccion("SELECT id FROM inventario WHERE nombre=?", (nombre_item,))
-            if inv:
-                prod_id = inv[0][0]
-                self.db.actualizar_stock(prod_id, cantidad)
-            else:
-                # Si no existe, quizás advertir o crearlo es complejo sin más datos.
-                pass 
-
-        # 3. Marcar como Recibido
-        return self.db.actualizar_estado_pedido(pedido_id, "Recibido")
-        
-    def consultar_caducidad(self, filtro="proximos"): # proximos, vencidos, todos
-        productos = self.db.obtener_inventario() # Trae todos
-        confirmados = []
-        hoy = datetime.now()
-
-        for p in productos:
-            # p[5] es fecha_caducidad en string YYYY-MM-DD
-            try:
-                fecha_cad = datetime.strptime(p[5], "%Y-%m-%d")
-                delta_dias = (fecha_cad - hoy).days
-                
-                agregar = False
-                if filtro == "vencidos" and delta_dias < 0:
-                    agregar = True
-                elif filtro == "proximos" and 0 <= delta_dias <= 30:
-                    agregar = True
-                elif filtro == "todos":
-                    agregar = True
-                
-                if agregar:
-                    confirmados.append({
-                        "nombre": p[1],
-                        "tipo": p[3],
-                        "fecha": p[5],
-                        "dias": delta_dias
-                    })
-            except (ValueError, TypeError):
-                continue
-
-        return confirmados
+        # Stock de todos los items y estado "Recibido" en una sola transacción
+        # Nota: los items se asocian al producto por nombre (el primero que coincide).
+        # En un sistema real, el pedido debería guardar el ID del producto si es un reabastecimiento exacto.
+        ok, resultado = self.db.recibir_pedido(pedido_id)
+        if not ok:
+            return False, resultado
+        if resultado:
+            return True, (f"Pedido #{pedido_id} recibido. Sin producto en inventario (no se sumaron): "
+                          f"{', '.join(resultado)}.")
+        return True, f"Pedido #{pedido_id} recibido y stock actualizado."
+
+    def consultar_caducidad(self, filtro="proximos", despues_de=None): # proximos, vencidos, todos
+        """
+        Una página (lotes_por_pagina) de lotes como dicts, del que vence antes
+        al que vence después. Para la página siguiente, despues_de =
+        (fecha, id) del último.
+        """
+        # Por lote, con el rango de fechas resuelto en SQL sobre el índice de caducidad
+        hoy = date.today()
+        if filtro == "vencidos":
+            desde, hasta = None, hoy - timedelta(days=1)
+        elif filtro == "proximos":
+            desde, hasta = hoy, hoy + timedelta(days=30)
+        else:
+            desde = hasta = None
+        lotes = self.db.obtener_lotes_por_caducidad(
+            hoy.isoformat(), desde and desde.isoformat(), hasta and hasta.isoformat(),
+            limite=self.lotes_por_pagina, despues_de=despues_de
+        )
+        return [{
+            "id": id_lote,
+            "nombre": nombre,
+            "tipo": tipo,
+            "lote": lote,
+            "cantidad": cantidad,
+            "fecha": fecha,
+            "dias": dias
+        } for nombre, tipo, lote, cantidad, fecha, dias, id_lote in lotes]
+
+    def resumen_caducidad(self):
+        """[(tramo, lotes, unidades)]: vencidos y por días restantes (ver TRAMOS_CADUCIDAD)."""
+        return self.db.resumen_caducidad()
@@ -98,6 +98,7 @@ class VentanaFarmacia(QMainWindow):
         
         # Conectar señales entre pestañas si es necesario
         self.page_registro.inventario_actualizado.connect(self.actualizar_todo)
+        self.page_recepcion.inventario_actualizado.connect(self.actualizar_todo)
         self.page_pedidos_prov.pedido_creado.connect(self.actualizar_recepcion)
 
         layout.addWidget(self.tabs)
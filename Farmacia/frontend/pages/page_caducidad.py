@@ -9,6 +9,7 @@ class WidgetCaducidad(QWidget):
     def __init__(self):
         super().__init__()
         self.logic = LogicaFarmacia()
+        self.ultimo = None # (fecha, id) del último lote mostrado (para "Cargar más")
         self.initUI()
 
     def initUI(self):
@@ -19,22 +20,41 @@ class WidgetCaducidad(QWidget):
         self.combo_filtro.addItems(["Próximos a Vencer (30 días)", "Ya Vencidos", "Todos"])
         btn_load = QPushButton("Consultar")
         btn_load.clicked.connect(self.cargar_datos)
+        self.combo_filtro.currentTextChanged.connect(self.cargar_datos)
         
         hbox.addWidget(QLabel("Filtrar por:"))
         hbox.addWidget(self.combo_filtro)
         hbox.addWidget(btn_load)
         layout.addLayout(hbox)
 
+        # Resumen por tramos de días (todo el inventario, sin importar el filtro)
+        self.lbl_resumen = QLabel()
+        self.lbl_resumen.setWordWrap(True)
+        layout.addWidget(self.lbl_resumen)
+
         self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Producto", "Tipo", "Fecha Caducidad", "Días Restantes"])
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["Producto", "Tipo", "Lote", "Cantidad", "Fecha Caducidad", "Días Restantes"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         layout.addWidget(self.table)
 
+        self.btn_mas = QPushButton("Cargar más")
+        self.btn_mas.clicked.connect(self.cargar_mas)
+        layout.addWidget(self.btn_mas)
+
         self.setLayout(layout)
         self.cargar_datos()
 
     def cargar_datos(self):
+        # Vuelve a la primera página con el filtro elegido
+        self.table.setRowCount(0)
+        self.ultimo = None
+        self.cargar_mas()
+        self.lbl_resumen.setText("   |   ".join(
+            f"{tramo}: {lotes} lotes ({unidades} u.)" for tramo, lotes, unidades in self.logic.resumen_caducidad()
+        ))
+
+    def cargar_mas(self):
         map_filtro = {
             "Próximos a Vencer (30 días)": "proximos",
             "Ya Vencidos": "vencidos",
@@ -43,13 +63,16 @@ class WidgetCaducidad(QWidget):
         filtro_txt = self.combo_filtro.currentText()
         filtro_val = map_filtro.get(filtro_txt, "proximos")
         
-        datos = self.logic.consultar_caducidad(filtro_val)
-        self.table.setRowCount(len(datos))
-        
-        for i, item in enumerate(datos):
+        datos = self.logic.consultar_caducidad(filtro_val, despues_de=self.ultimo)
+        inicio = self.table.rowCount()
+        self.table.setRowCount(inicio + len(datos))
+
+        for i, item in enumerate(datos, inicio):
             self.table.setItem(i, 0, QTableWidgetItem(item['nombre']))
             self.table.setItem(i, 1, QTableWidgetItem(item['tipo']))
-            self.table.setItem(i, 2, QTableWidgetItem(item['fecha']))
+            self.table.setItem(i, 2, QTableWidgetItem(item['lote']))
+            self.table.setItem(i, 3, QTableWidgetItem(str(item['cantidad'])))
+            self.table.setItem(i, 4, QTableWidgetItem(item['fecha']))
             
             dias_item = QTableWidgetItem(str(item['dias']))
             if item['dias'] < 0:
@@ -57,4 +80,9 @@ class WidgetCaducidad(QWidget):
             elif item['dias'] <= 30:
                 dias_item.setBackground(QColor("#fefcbf")) # Amarillo suave
                 
-            self.table.setItem(i, 3, dias_item)
+            self.table.setItem(i, 5, dias_item)
+
+        if datos:
+            self.ultimo = (datos[-1]['fecha'], datos[-1]['id'])
+        # Página incompleta = no hay más lotes
+        self.btn_mas.setEnabled(len(datos) == self.logic.lotes_por_pagina)
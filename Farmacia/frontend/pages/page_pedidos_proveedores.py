@@ -12,6 +12,7 @@ class WidgetPedidosProveedores(QWidget):
         super().__init__()
         self.logic = LogicaFarmacia()
         self.items_actuales = []
+        self.ultimo_id = None # Último pedido mostrado (para "Cargar más")
         self.initUI()
 
     def initUI(self):
@@ -68,15 +69,29 @@ class WidgetPedidosProveedores(QWidget):
 
         # --- LISTADO HISTÓRICO ---
         layout.addWidget(QLabel("Pedidos a Proveedores (Enviados):"))
+
+        hbox_hist = QHBoxLayout()
+        hbox_hist.addWidget(QLabel("Estado:"))
+        self.combo_estado = QComboBox()
+        self.combo_estado.addItems(["Todos", "Pendiente", "Enviado", "Recibido"])
+        self.combo_estado.currentTextChanged.connect(self.cargar_historial)
+        hbox_hist.addWidget(self.combo_estado)
+        hbox_hist.addStretch()
+        layout.addLayout(hbox_hist)
         self.tabla_historial = QTableWidget()
         self.tabla_historial.setColumnCount(5)
         self.tabla_historial.setHorizontalHeaderLabels(["ID", "Fecha", "Proveedor", "Estado", "Detalle"])
         self.tabla_historial.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         layout.addWidget(self.tabla_historial)
 
+        hbox_botones = QHBoxLayout()
         btn_refresh = QPushButton("Actualizar Lista")
         btn_refresh.clicked.connect(self.cargar_historial)
-        layout.addWidget(btn_refresh)
+        self.btn_mas = QPushButton("Cargar más antiguos")
+        self.btn_mas.clicked.connect(self.cargar_mas)
+        hbox_botones.addWidget(btn_refresh)
+        hbox_botones.addWidget(self.btn_mas)
+        layout.addLayout(hbox_botones)
 
         self.setLayout(layout)
         self.cargar_proveedores()
@@ -125,14 +140,27 @@ class WidgetPedidosProveedores(QWidget):
             QMessageBox.warning(self, "Error", msg)
 
     def cargar_historial(self):
-        pedidos = self.logic.consultar_pedidos()
-        # Filtramos SOLO solicitante Farmacia
-        pedidos_prov = [p for p in pedidos if p['solicitante'] == "Farmacia"]
-        
-        self.tabla_historial.setRowCount(len(pedidos_prov))
-        for i, p in enumerate(pedidos_prov):
+        # Vuelve a la primera página con el estado elegido
+        self.tabla_historial.setRowCount(0)
+        self.ultimo_id = None
+        self.cargar_mas()
+
+    def cargar_mas(self):
+        estado = self.combo_estado.currentText()
+        pedidos = self.logic.consultar_pedidos(
+            estado=None if estado == "Todos" else estado, a_proveedor=True, antes_de=self.ultimo_id
+        )
+
+        inicio = self.tabla_historial.rowCount()
+        self.tabla_historial.setRowCount(inicio + len(pedidos))
+        for i, p in enumerate(pedidos, inicio):
             self.tabla_historial.setItem(i, 0, QTableWidgetItem(str(p['id'])))
             self.tabla_historial.setItem(i, 1, QTableWidgetItem(str(p['fecha'])))
             self.tabla_historial.setItem(i, 2, QTableWidgetItem(p['referencia'])) # Aquí guardamos "Proveedor: Nombre"
             self.tabla_historial.setItem(i, 3, QTableWidgetItem(p['estado']))
             self.tabla_historial.setItem(i, 4, QTableWidgetItem(p['items']))
+
+        if pedidos:
+            self.ultimo_id = pedidos[-1]['id']
+        # Página incompleta = no hay más pedidos antiguos
+        self.btn_mas.setEnabled(len(pedidos) == self.logic.pedidos_por_pagina)
@@ -2,9 +2,11 @@ from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QGroupBox, QFormLayout, QLineEdit, QPushButton, 
     QMessageBox, QLabel
 )
+from PyQt6.QtCore import pyqtSignal
 from Farmacia.backend.logic_farmacia import LogicaFarmacia
 
 class WidgetRecepcion(QWidget):
+    inventario_actualizado = pyqtSignal() # El stock (y los lotes) cambiaron
     def __init__(self):
         super().__init__()
         self.logic = LogicaFarmacia()
@@ -46,5 +48,6 @@ class WidgetRecepcion(QWidget):
         if ok:
             QMessageBox.information(self, "Éxito", msg)
             self.input_id.clear()
+            self.inventario_actualizado.emit()
         else:
             QMessageBox.warning(self, "Error", msg)
@@ -2,6 +2,10 @@ from typing import Optional
 from core.database import crear_conexion, inicializar_db
 from datetime import datetime
 
+# Hospitalizaciones del paciente (core/diagnostico verifica sus planes)
+SQL_CONTAR_HOSPITALIZACIONES = "SELECT COUNT(1) FROM hospitalizaciones WHERE paciente_id=?"
+SQL_ULTIMA_HOSPITALIZACION = "SELECT id, area FROM hospitalizaciones WHERE paciente_id=? ORDER BY fecha_ingreso DESC"
+
 
 class AdmisionRepository:
     def __init__(self):
@@ -9,24 +13,8 @@ class AdmisionRepository:
             inicializar_db()
         except Exception:
             pass
+        # Las tablas del módulo se crean en core/database.py (inicializar_db)
         self.conn = crear_conexion()
-        self._ensure_tables()
-
-    def _ensure_tables(self):
-        # The core DB already contains pacientes and hospitalizaciones; we ensure minimal data is available
-        if not self.conn:
-            return
-        cur = self.conn.cursor()
-        # Areas table (simple inventory of capacities)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS areas_hospital (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT UNIQUE,
-                capacidad INTEGER DEFAULT 0,
-                ocupadas INTEGER DEFAULT 0
-            )
-        """)
-        self.conn.commit()
 
     def get_paciente_por_cedula(self, cedula: str) -> Optional[dict]:
         if not self.conn:
@@ -42,7 +30,7 @@ class AdmisionRepository:
         if not paciente:
             return False
         cur = self.conn.cursor()
-        row = cur.execute("SELECT COUNT(1) FROM hospitalizaciones WHERE paciente_id=?", (paciente["id"],)).fetchone()
+        row = cur.execute(SQL_CONTAR_HOSPITALIZACIONES, (paciente["id"],)).fetchone()
         return bool(row and row[0] > 0)
 
     def registrar_ingreso(self, cedula: str, motivo: str, area: str) -> str:
@@ -59,8 +47,8 @@ class AdmisionRepository:
             return "No hay camas disponibles en esta área"
         try:
             # insertar hospitalizacion
-            cur.execute("INSERT INTO hospitalizaciones (paciente_id, sala_id, fecha_ingreso, estado_paciente) VALUES (?,?,?,?)",
-                        (paciente["id"], None, datetime.now().isoformat(), "hospitalizado"))
+            cur.execute("INSERT INTO hospitalizaciones (paciente_id, sala_id, fecha_ingreso, estado_paciente, area) VALUES (?,?,?,?,?)",
+                        (paciente["id"], None, datetime.now().isoformat(), "hospitalizado", area))
             # incrementar ocupadas
             cur.execute("UPDATE areas_hospital SET ocupadas = ocupadas + 1 WHERE nombre=?", (area,))
             self.conn.commit()
@@ -73,13 +61,15 @@ class AdmisionRepository:
         if not paciente:
             return "Paciente no registrado"
         cur = self.conn.cursor()
-        row = cur.execute("SELECT id FROM hospitalizaciones WHERE paciente_id=? ORDER BY fecha_ingreso DESC", (paciente["id"],)).fetchone()
+        row = cur.execute(SQL_ULTIMA_HOSPITALIZACION, (paciente["id"],)).fetchone()
         if not row:
             return "El paciente no tiene una hospitalización activa"
         try:
-            hid = row[0]
+            hid, area = row
             cur.execute("DELETE FROM hospitalizaciones WHERE id=?", (hid,))
-            # Nota: no sabemos el área exacta; no decrementamos ocupadas automáticamente
+            # Liberar el lugar en el área del ingreso (las anteriores a la columna area no la tienen)
+            if area:
+                cur.execute("UPDATE areas_hospital SET ocupadas = MAX(ocupadas - 1, 0) WHERE nombre=?", (area,))
             self.conn.commit()
             return "Alta registrada con éxito"
         except Exception:
@@ -10,32 +10,8 @@ class VisitasRepository:
             inicializar_db()
         except Exception:
             pass
+        # Las tablas del módulo se crean en core/database.py (inicializar_db)
         self.conn = crear_conexion()
-        self._ensure_tables()
-
-    def _ensure_tables(self):
-        if not self.conn:
-            return
-        cur = self.conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS visitantes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cedula TEXT UNIQUE,
-                nombre TEXT,
-                apellidos TEXT,
-                restriccion INTEGER DEFAULT 0
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS permisos_visita (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cedula_paciente TEXT,
-                cedula_visitante TEXT,
-                fecha TEXT,
-                hora TEXT
-            )
-        """)
-        self.conn.commit()
 
     def registrar_visitante(self, cedula: str, nombre: str, apellidos: str, restriccion: bool=False) -> bool:
         if not self.conn:
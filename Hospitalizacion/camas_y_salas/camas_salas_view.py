@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QGridLayout, QFrame, QPushButton, QMessageBox, QScrollArea
+    QMainWindow, QWidget, QVBoxLayout, QGridLayout, QFrame, QPushButton, QMessageBox, QScrollArea, QLabel
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from core.theme import get_sheet, STYLES
 from .repository import repo
 
@@ -22,6 +22,17 @@ class CamasSalasView(QMainWindow):
         layout.setSpacing(16)
         layout.setContentsMargins(24, 24, 24, 24)
 
+        # Camas libres por piso: se consulta cada 2 s y solo se redibuja si
+        # cambió la versión de los contadores
+        self.lbl_ocupacion = QLabel()
+        self.lbl_ocupacion.setWordWrap(True)
+        layout.addWidget(self.lbl_ocupacion)
+        self._version_ocupacion = None
+        self.actualizar_ocupacion()
+        self.timer_ocupacion = QTimer(self)
+        self.timer_ocupacion.timeout.connect(self.actualizar_ocupacion)
+        self.timer_ocupacion.start(2000)
+
         # Contenedor con scroll para acomodar más acciones si es necesario
         scroll = QScrollArea()
         scroll.setWidgetResizable(True)
@@ -70,6 +81,20 @@ class CamasSalasView(QMainWindow):
         except Exception:
             pass
 
+    def actualizar_ocupacion(self):
+        ocupacion = repo.ocupacion
+        if ocupacion.version == self._version_ocupacion:
+            return
+        self._version_ocupacion = ocupacion.version
+        partes = []
+        for piso, conteo in sorted(ocupacion.por_ambito("piso").items()):
+            total = sum(conteo.values())
+            if total:
+                partes.append(f"{piso.title()}: {conteo.get('disponible', 0)} libres de {total}")
+        total = ocupacion.conteo()
+        resumen = f"Camas libres: {total.get('disponible', 0)} de {sum(total.values())}"
+        self.lbl_ocupacion.setText(resumen + ("  —  " + "   ".join(partes) if partes else ""))
+
     # Handlers con login y formularios rápidos via QMessageBox + inputs simples
     def registrar_infraestructura(self):
         # Acceso permitido para todos los roles
@@ -99,9 +124,8 @@ class CamasSalasView(QMainWindow):
             # Mostrar salas disponibles
             piso = ubicacion_combo.currentText()
             q = (sala_search.text() or "").strip().lower()
-            for sid, sala in repo.salas.items():
-                if (sala.ubicacion or "").strip().lower() != piso.strip().lower():
-                    continue
+            for sala in repo.salas_de_piso(piso):
+                sid = sala.nombre
                 nombre = sala.nombre_clave or sid
                 text = f"{sid} — {nombre} — {sala.ubicacion}"
                 if not q or q in text.lower():
@@ -206,6 +230,7 @@ class CamasSalasView(QMainWindow):
 
         # Cargar pacientes del módulo Pacientes
         pacientes_cache = []
+        pc = None
         try:
             try:
                 from Pacientes.paciente_controller import PacienteController as _PC
@@ -220,15 +245,20 @@ class CamasSalasView(QMainWindow):
         def refresh_pacientes():
             paciente_list.clear()
             q = (paciente_search.text() or "").strip().lower()
-            for p in pacientes_cache:
-                nombre_comp = f"{p.nombre} {p.apellido}".strip()
-                cc = getattr(p, "cc", "")
-                display = f"{cc} — {nombre_comp}"
+
+            def con_cama(p):
                 # Mostrar solo pacientes que tienen cama asignada en repositorio
-                if not repo.tiene_cama_por_cc(cc):
-                    continue
-                if not q or q in nombre_comp.lower() or q in str(cc).lower():
-                    paciente_list.addItem(display)
+                return repo.tiene_cama_por_cc(getattr(p, "cc", ""))
+
+            # Con texto, la búsqueda indexada reemplaza el recorrido de toda la lista;
+            # el filtro va dentro para que el límite cuente solo los que pasan
+            if q and pc:
+                candidatos = pc.buscar_pacientes(q, filtro=con_cama)
+            else:
+                candidatos = [p for p in pacientes_cache if con_cama(p)]
+            for p in candidatos:
+                nombre_comp = f"{p.nombre} {p.apellido}".strip()
+                paciente_list.addItem(f"{getattr(p, 'cc', '')} — {nombre_comp}")
         paciente_search.textChanged.connect(refresh_pacientes)
         refresh_pacientes()
 
@@ -253,10 +283,10 @@ class CamasSalasView(QMainWindow):
             # Mostrar información adicional: sala/hab/cama y motivo hospitalización + historia clínica
             pac = repo.pacientes.get(selected_pid)
             cama_id = pac.cama_asignada if pac else None
-            cama = repo.camas.get(cama_id) if cama_id else None
+            cama = repo.obtener_cama(cama_id)
             hab = repo._resolve_habitacion(cama.num_habitacion) if cama else None
             sala_id = repo.get_sala_de_paciente(selected_pid)
-            sala = repo.salas.get(sala_id) if sala_id else None
+            sala = repo.obtener_sala(sala_id)
             sala_txt = sala_id or "—"
             sala_nombre = (sala.nombre_clave if sala and sala.nombre_clave else sala_txt)
             hab_txt = (hab.nombre_clave if hab and hab.nombre_clave else (hab.numero if hab else "—"))
@@ -348,9 +378,9 @@ class CamasSalasView(QMainWindow):
             pac = repo.pacientes.get(pid)
             ped = repo.pedidos.get(pid)
             sala_id = repo.get_sala_de_paciente(pid)
-            sala = repo.salas.get(sala_id) if sala_id else None
+            sala = repo.obtener_sala(sala_id)
             cama_id = pac.cama_asignada if pac else None
-            cama = repo.camas.get(cama_id) if cama_id else None
+            cama = repo.obtener_cama(cama_id)
             hab = repo._resolve_habitacion(cama.num_habitacion) if cama else None
             sala_txt = sala_id or "—"
             sala_nombre = (sala.nombre_clave if sala and sala.nombre_clave else sala_txt)
@@ -429,12 +459,12 @@ class CamasSalasView(QMainWindow):
                 info_label.setText("Seleccione una habitación para ver detalles")
                 return
             hab_id = item.data(Qt.ItemDataRole.UserRole)
-            hab = repo.habitaciones.get(hab_id)
+            hab = repo.obtener_habitacion(hab_id)
             if not hab:
                 info_label.setText("Habitación no registrada")
                 return
             # Resolver sala
-            sala = repo.salas.get(hab.sala_id) if hab.sala_id else None
+            sala = repo.obtener_sala(hab.sala_id)
             sala_nombre = (sala.nombre_clave if sala and sala.nombre_clave else (hab.sala_id or "—"))
             sala_ubic = (sala.ubicacion if sala and sala.ubicacion else "—")
             sala_activa = ("sí" if (sala and sala.activa) else "no") if sala else "—"
@@ -442,14 +472,12 @@ class CamasSalasView(QMainWindow):
             camas_ids = []
             camas_disp = 0
             camas_ocup = 0
-            for cid, cama in repo.camas.items():
-                hmatch = repo._resolve_habitacion(cama.num_habitacion)
-                if hmatch and hmatch.numero == hab.numero:
-                    camas_ids.append(cama.nombre_clave or cid)
-                    if cama.estado == "disponible":
-                        camas_disp += 1
-                    elif cama.estado == "ocupada":
-                        camas_ocup += 1
+            for cama in repo.camas_de_habitacion(hab.numero):
+                camas_ids.append(cama.nombre_clave or cama.id_cama)
+                if cama.estado == "disponible":
+                    camas_disp += 1
+                elif cama.estado == "ocupada":
+                    camas_ocup += 1
             capacidad = len(camas_ids)
             camas_list = ", ".join(camas_ids) if camas_ids else "—"
             info_txt = (
@@ -541,7 +569,8 @@ class CamasSalasView(QMainWindow):
         def refresh_salas():
             sala_list.clear()
             q = (sala_search.text() or "").lower()
-            for sid, sala in repo.salas.items():
+            for sala in repo.listar_salas():
+                sid = sala.nombre
                 if not sala.activa:
                     continue
                 nombre = sala.nombre_clave or sid
@@ -554,9 +583,8 @@ class CamasSalasView(QMainWindow):
             # Filtrar por sala fijada
             sala_id = selected_sala_id
             q = (hab_search.text() or "").lower()
-            for hid, hab in repo.habitaciones.items():
-                if sala_id and hab.sala_id != sala_id:
-                    continue
+            habitaciones = repo.habitaciones_de_sala(sala_id) if sala_id else repo.listar_habitaciones()
+            for hab in habitaciones:
                 nombre = hab.nombre_clave or hab.numero
                 text = f"{hab.numero} — {nombre} — {hab.ubicacion} (Estado: {hab.estado})"
                 if q in text.lower():
@@ -569,14 +597,12 @@ class CamasSalasView(QMainWindow):
             hab_sel = None
             if hab_item:
                 hab_id = hab_item.text().split(" — ")[0]
-                hab_sel = repo.habitaciones.get(hab_id)
+                hab_sel = repo.obtener_habitacion(hab_id)
             q = (cama_search.text() or "").lower()
-            for cid, cama in repo.camas.items():
-                if cama.estado != "disponible":
-                    continue
-                hab_cama = repo._resolve_habitacion(cama.num_habitacion)
-                if hab_sel and hab_cama != hab_sel:
-                    continue
+            camas = repo.camas_de_habitacion(hab_sel.numero, "disponible") if hab_sel else repo.camas_con_estado("disponible")
+            for cama in camas:
+                cid = cama.id_cama
+                hab_cama = hab_sel or repo._resolve_habitacion(cama.num_habitacion)
                 nombre_base = hab_cama.nombre_clave if hab_cama and hab_cama.nombre_clave else cama.num_habitacion
                 nombre = cama.nombre_clave or f"{nombre_base}"
                 text = f"{cid} — {nombre}"
@@ -683,6 +709,7 @@ class CamasSalasView(QMainWindow):
 
         # Cargar pacientes desde el módulo Pacientes
         pacientes_cache = []
+        pc = None
         try:
             # Intentar importar el controlador de pacientes para obtener la base en memoria
             try:
@@ -699,18 +726,25 @@ class CamasSalasView(QMainWindow):
         def refresh_pacientes():
             paciente_list.clear()
             q = (paciente_search.text() or "").strip().lower()
-            for p in pacientes_cache:
-                nombre_comp = f"{p.nombre} {p.apellido}".strip()
-                display = f"{p.cc} — {nombre_comp}"
+
+            def no_hospitalizado(p):
                 # Excluir si ya está hospitalizado (según repositorio de hospitalización)
+                nombre_comp = f"{p.nombre} {p.apellido}".strip()
                 try:
-                    ya_hosp = repo.esta_hospitalizado_por_cc(getattr(p, "cc", None)) or repo.esta_hospitalizado_por_nombre(nombre_comp)
+                    return not (repo.esta_hospitalizado_por_cc(getattr(p, "cc", None))
+                                or repo.esta_hospitalizado_por_nombre(nombre_comp))
                 except Exception:
-                    ya_hosp = False
-                if ya_hosp:
-                    continue
-                if not q or q in nombre_comp.lower() or q in (p.cc or "").lower():
-                    paciente_list.addItem(display)
+                    return True
+
+            # Con texto, la búsqueda indexada reemplaza el recorrido de toda la lista;
+            # el filtro va dentro para que el límite cuente solo los que pasan
+            if q and pc:
+                candidatos = pc.buscar_pacientes(q, filtro=no_hospitalizado)
+            else:
+                candidatos = [p for p in pacientes_cache if no_hospitalizado(p)]
+            for p in candidatos:
+                nombre_comp = f"{p.nombre} {p.apellido}".strip()
+                paciente_list.addItem(f"{p.cc} — {nombre_comp}")
         paciente_search.textChanged.connect(refresh_pacientes)
         refresh_pacientes()
 
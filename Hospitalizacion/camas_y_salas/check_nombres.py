@@ -1,6 +1,7 @@
 from .repository import repo
 
 def main():
+    repo.cargar_todo()
     print("Salas:")
     for sid, s in sorted(repo.salas.items()):
         print(f"  {sid} -> nombre_clave={s.nombre_clave} ubicacion={s.ubicacion}")
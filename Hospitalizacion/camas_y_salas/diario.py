@@ -0,0 +1,306 @@
+"""
+Escritura diferida (write-behind) de DbBackedRepository.
+
+Cada cambio del modelo en memoria se encola aquí en lugar de escribirse y
+confirmarse en el momento. Antes de encolarlo se agrega como una línea
+JSON al archivo del diario (junto a la BD), así un cierre inesperado no lo
+pierde: al arrancar, reproducir() vuelve a aplicar las líneas posteriores a
+la última secuencia confirmada (tabla diario_camas_aplicado).
+
+La cola se vacía en una sola transacción cuando llega a `tamano_lote`
+entradas o cada `intervalo` segundos (hilo de fondo), y al cerrar. Los
+cambios de estado repetidos de una misma cama o habitación se combinan:
+solo se escribe el último. Los contadores de ocupación cambiados se
+escriben con cada vaciado (se recalculan al cargar, no van al archivo).
+Los eventos del Historial también pasan por aquí y se anexan a la tabla
+historial_camas (solo inserciones; leer_historial los devuelve como texto).
+
+Las entradas guardan cédulas y números de sala; los IDs de pacientes y
+salas se resuelven al vaciar con dos mapas en caché (dni -> id de paciente,
+número -> id de sala) y una consulta por lote para las cédulas nuevas.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from core.database import session
+from core.pool import obtener_pool
+from .models import Evento
+from .ocupacion import SQL_GUARDAR
+
+TAMANO_LOTE = 200    # entradas en cola que disparan un vaciado
+INTERVALO = 2.0      # segundos entre vaciados del hilo de fondo
+# fsync por entrada: también resiste un corte de energía, a costa de un
+# acceso a disco por cambio (sin él, basta con que el proceso termine mal
+# para que el sistema operativo conserve lo escrito)
+FSYNC = os.environ.get("HOSPITAL_DIARIO_FSYNC", "0") == "1"
+
+# Operaciones cuyo último valor reemplaza a los anteriores de la misma fila
+_COMBINABLES = {"estado_cama", "estado_habitacion"}
+
+
+def ruta_diario() -> str:
+    """Archivo del diario junto a la BD del pool actual."""
+    return obtener_pool().ruta + "-diario-camas"
+
+
+class DiarioCamas:
+    def __init__(self, ruta: Optional[str] = None, tamano_lote: int = TAMANO_LOTE,
+                 intervalo: float = INTERVALO, fsync: bool = FSYNC):
+        self.ruta = ruta or ruta_diario()
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.fsync = fsync
+        # clave -> (secuencia, operación, argumentos) en orden de llegada
+        self._cola: Dict[tuple, tuple] = {}
+        self._secuencia = 0
+        # True cuando _secuencia ya partió de la marca de diario_camas_aplicado
+        self._sembrada = False
+        self._archivo = None
+        self._lock = threading.Lock()
+        self._lock_vaciado = threading.Lock()
+        self._evento = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        # Cachés de IDs de la BD
+        self._paciente_por_dni: Dict[str, int] = {}
+        self._sala_por_numero: Dict[str, int] = {}
+        # Métricas
+        self.encoladas = 0
+        self.escritas = 0
+        self.vaciados = 0
+
+    # Cola
+    def _clave(self, secuencia: int, operacion: str, args: list) -> tuple:
+        if operacion in _COMBINABLES:
+            return (operacion, args[0])
+        if operacion == "ocupacion":
+            return (operacion, *args[:4])
+        return ("+", secuencia)
+
+    def _escribir_lineas(self, entradas):
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "a", encoding="utf-8")
+        self._archivo.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in entradas)
+        self._archivo.flush()
+        if self.fsync:
+            os.fsync(self._archivo.fileno())
+
+    def encolar(self, operacion: str, *args, ocupacion: Optional[List[tuple]] = None):
+        """
+        Registra un cambio en el diario y lo deja en la cola. `ocupacion` son
+        las filas de ServicioOcupacion.filas_pendientes() que cambiaron con él.
+        """
+        if not self._sembrada:
+            self._sembrar_secuencia()
+        with self._lock:
+            self._secuencia += 1
+            entrada = (self._secuencia, operacion, list(args))
+            self._escribir_lineas([entrada])
+            self._cola[self._clave(*entrada)] = entrada
+            for fila in ocupacion or ():
+                self._cola[self._clave(0, "ocupacion", fila)] = (0, "ocupacion", list(fila))
+            self.encoladas += 1
+            lleno = len(self._cola) >= self.tamano_lote
+        self._iniciar()
+        if lleno:
+            self._evento.set()
+
+    def pendientes(self) -> int:
+        return len(self._cola)
+
+    # Vaciado
+    def vaciar(self) -> int:
+        """Escribe la cola en una transacción. Retorna cuántas entradas escribió."""
+        with self._lock_vaciado:
+            with self._lock:
+                lote, self._cola = self._cola, {}
+            if not lote:
+                return 0
+            try:
+                with session(inmediata=True) as conn:
+                    self._aplicar(conn, list(lote.values()))
+            except Exception as e:
+                # Se reintenta en el próximo vaciado; los cambios posteriores prevalecen
+                print(f"Error al vaciar el diario de camas: {e}")
+                with self._lock:
+                    lote.update(self._cola)
+                    self._cola = lote
+                return 0
+            with self._lock:
+                # Lo confirmado ya no hace falta en el archivo: queda solo lo encolado mientras tanto
+                if self._archivo is not None:
+                    self._archivo.close()
+                    self._archivo = None
+                with open(self.ruta, "w", encoding="utf-8"):
+                    pass
+                restantes = [e for e in self._cola.values() if e[1] != "ocupacion"]
+                if restantes:
+                    self._escribir_lineas(restantes)
+            self.escritas += len(lote)
+            self.vaciados += 1
+            return len(lote)
+
+    def _aplicar(self, conn, entradas: list):
+        # Cédulas sin ID en caché: una sola consulta para todo el lote
+        faltan = {args[0] for _, op, args in entradas
+                  if op in ("hospitalizacion", "autorizacion") and args[0] and args[0] not in self._paciente_por_dni}
+        if faltan:
+            self._paciente_por_dni.update((dni, id_) for id_, dni in conn.execute(
+                "SELECT id, dni FROM pacientes WHERE dni IN (SELECT value FROM json_each(?))",
+                (json.dumps(sorted(faltan)),)
+            ))
+        ocupacion = []
+        eventos = []
+        for secuencia, op, args in entradas:
+            if op == "sala":
+                conn.execute(
+                    "INSERT OR IGNORE INTO salas_habitaciones (numero, tipo, estado, ubicacion, capacidad) VALUES (?,?,?,?,?)",
+                    (args[0], "sala", "Disponible", args[1], args[2])
+                )
+            elif op == "habitacion":
+                conn.execute(
+                    "INSERT OR IGNORE INTO salas_habitaciones (numero, tipo, estado, ubicacion) VALUES (?,?,?,?)",
+                    (args[0], "habitacion", "Disponible", args[1])
+                )
+            elif op == "cama":
+                conn.execute(
+                    "INSERT OR IGNORE INTO camas (codigo, habitacion_numero, estado, higiene_ok, nombre_clave) VALUES (?,?,?,?,?)",
+                    (args[0], args[1], "disponible", 1, None)
+                )
+            elif op == "estado_habitacion":
+                conn.execute("UPDATE salas_habitaciones SET estado=? WHERE numero=?", (args[1], args[0]))
+            elif op == "estado_cama":
+                conn.execute("UPDATE camas SET estado=? WHERE codigo=?", (args[1], args[0]))
+            elif op == "hospitalizacion":
+                # (cédula, número de sala o None, fecha, exige sala)
+                dni, sala, fecha, exige_sala = args
+                paciente_id = self._paciente_por_dni.get(dni)
+                sala_id = self._id_sala(conn, sala) if sala else None
+                if paciente_id and (sala_id or not exige_sala):
+                    conn.execute(
+                        "INSERT INTO hospitalizaciones (paciente_id, sala_id, fecha_ingreso, estado_paciente) VALUES (?,?,?,?)",
+                        (paciente_id, sala_id, fecha, "hospitalizado")
+                    )
+            elif op == "autorizacion":
+                paciente_id = self._paciente_por_dni.get(args[0])
+                if paciente_id:
+                    conn.execute("UPDATE hospitalizaciones SET estado_paciente=? WHERE paciente_id=?",
+                                 (args[1], paciente_id))
+            elif op == "ocupacion":
+                ocupacion.append(tuple(args))
+            elif op == "evento":
+                # (fecha, tipo, datos)
+                eventos.append((args[0], args[1], json.dumps(args[2], ensure_ascii=False)))
+        conn.executemany(SQL_GUARDAR, ocupacion)
+        conn.executemany("INSERT INTO historial_camas (fecha, tipo, datos) VALUES (?, ?, ?)", eventos)
+        ultima = max(e[0] for e in entradas)
+        if ultima:
+            conn.execute(
+                "INSERT INTO diario_camas_aplicado (id, secuencia) VALUES (1, ?) "
+                "ON CONFLICT (id) DO UPDATE SET secuencia = MAX(secuencia, excluded.secuencia)",
+                (ultima,)
+            )
+
+    def encolar_evento(self, evento: Evento):
+        """Destino de Historial: el evento se anexa a historial_camas en el próximo vaciado."""
+        self.encolar("evento", datetime.fromtimestamp(evento.fecha).isoformat(sep=" ", timespec="seconds"),
+                     evento.tipo, list(evento.datos))
+
+    def _id_sala(self, conn, numero: str) -> Optional[int]:
+        sala_id = self._sala_por_numero.get(numero)
+        if sala_id is None:
+            fila = conn.execute("SELECT id FROM salas_habitaciones WHERE numero=? AND tipo='sala'", (numero,)).fetchone()
+            if fila:
+                sala_id = self._sala_por_numero[numero] = fila[0]
+        return sala_id
+
+    def cargar_salas(self, conn):
+        """Llena el mapa número -> id de sala de una vez (al cargar el repositorio)."""
+        self._sala_por_numero.update(conn.execute("SELECT numero, id FROM salas_habitaciones WHERE tipo='sala'"))
+
+    # Arranque y cierre
+    def reproducir(self) -> int:
+        """
+        Aplica las entradas del archivo que la BD aún no tiene (cierre
+        inesperado) y lo deja vacío. Retorna cuántas reprodujo.
+        """
+        # La secuencia sigue a la última confirmada aunque el archivo falte
+        # (borrado o BD copiada sin él): si reiniciara en 1, las entradas
+        # nuevas quedarían por debajo de la marca y no se reproducirían
+        aplicada = self._sembrar_secuencia()
+        if not os.path.exists(self.ruta):
+            return 0
+        entradas = []
+        with open(self.ruta, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    entradas.append(tuple(json.loads(linea)))
+                except ValueError:
+                    # Última línea a medio escribir
+                    break
+        with self._lock:
+            self._secuencia = max([aplicada] + [e[0] for e in entradas])
+            for entrada in entradas:
+                if entrada[0] > aplicada:
+                    self._cola[self._clave(*entrada)] = entrada
+            reproducidas = len(self._cola)
+        self.vaciar()
+        return reproducidas
+
+    def _sembrar_secuencia(self) -> int:
+        """Lleva la secuencia local al menos hasta la confirmada en la BD. Retorna esa marca."""
+        with session() as conn:
+            fila = conn.execute("SELECT secuencia FROM diario_camas_aplicado WHERE id = 1").fetchone()
+        aplicada = fila[0] if fila else 0
+        with self._lock:
+            self._secuencia = max(self._secuencia, aplicada)
+            self._sembrada = True
+        return aplicada
+
+    def _iniciar(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="DiarioCamas", daemon=True)
+            self._hilo.start()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._evento.wait(self.intervalo)
+            self._evento.clear()
+            try:
+                self.vaciar()
+            except Exception as e:
+                print(f"Error en el diario de camas: {e}")
+
+    def cerrar(self, espera: float = 5.0):
+        """Detiene el hilo y escribe lo pendiente (se registra con atexit)."""
+        self._detener.set()
+        self._evento.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+        self.vaciar()
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+
+def leer_historial(limite: int = 100, antes_de: Optional[int] = None) -> List[tuple]:
+    """
+    Últimos `limite` eventos guardados como (id, fecha, texto), del más
+    reciente al más antiguo. Para la página siguiente se pasa el id del
+    último de la página actual en `antes_de`.
+    """
+    with session() as conn:
+        filas = conn.execute(
+            "SELECT id, fecha, tipo, datos FROM historial_camas WHERE id < ? ORDER BY id DESC LIMIT ?",
+            (antes_de if antes_de is not None else 2 ** 63 - 1, limite)
+        ).fetchall()
+    return [(id_, fecha, Evento(tipo, tuple(json.loads(datos))).texto()) for id_, fecha, tipo, datos in filas]
@@ -0,0 +1,184 @@
+"""
+Índice de gestión de camas para MemoryRepository.
+
+Guarda solo IDs (los objetos siguen en repo.salas / repo.habitaciones /
+repo.camas) y se actualiza en cada alta o cambio de estado, así las
+preguntas frecuentes no recorren todos los diccionarios:
+
+- camas por habitación, sala, piso y estado;
+- habitaciones por sala y piso, salas por piso;
+- cama de cada paciente y paciente de cada cama;
+- alias de habitación por sufijo numérico ("101" -> "H-PB-101");
+- contadores de secuencia por prefijo de ID ("H-PB-" -> 3);
+- texto de búsqueda (en minúsculas) de cada habitación y cama.
+
+El piso es la ubicación normalizada con clave_piso ("Piso 1" -> "piso 1").
+Los mismos puntos mantienen los contadores de ServicioOcupacion.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+
+from .ocupacion import ServicioOcupacion
+
+# Separador entre campos del texto de búsqueda (no aparece en una consulta)
+_SEP = "\x00"
+
+
+def clave_piso(ubicacion: Optional[str]) -> str:
+    return (ubicacion or "").strip().lower()
+
+
+def prefijo_id(id_: str) -> Optional[str]:
+    """Prefijo de secuencia de un ID: "H-PB-101" -> "H-PB-", "C-H-PB-101-2" -> "C-H-PB-101-"."""
+    if "-" not in id_:
+        return None
+    return id_.rsplit("-", 1)[0] + "-"
+
+
+class IndiceCamas:
+    def __init__(self, ocupacion: Optional[ServicioOcupacion] = None):
+        self.ocupacion = ocupacion or ServicioOcupacion()
+        # Camas
+        self.camas_por_habitacion: Dict[str, Set[str]] = {}
+        self.camas_por_sala: Dict[str, Set[str]] = {}
+        self.camas_por_piso: Dict[str, Set[str]] = {}
+        self.camas_por_estado: Dict[str, Set[str]] = {}
+        self.habitacion_de_cama: Dict[str, str] = {}
+        # Cama -> (sala, piso) con que se contó en los índices y en la ocupación
+        self.ubicacion_de_cama: Dict[str, Tuple[Optional[str], str]] = {}
+        # Camas cuya habitación todavía no está cargada: num_habitacion -> {cama}
+        self.camas_pendientes: Dict[str, Set[str]] = {}
+        # Habitaciones y salas
+        self.habitaciones_por_sala: Dict[str, Set[str]] = {}
+        self.habitaciones_por_piso: Dict[str, Set[str]] = {}
+        self.salas_por_piso: Dict[str, Set[str]] = {}
+        self.habitacion_por_alias: Dict[str, str] = {}
+        # Paciente <-> cama
+        self.cama_de_paciente: Dict[str, str] = {}
+        self.paciente_de_cama: Dict[str, str] = {}
+        # Prefijo de ID -> cantidad de IDs registrados con ese prefijo
+        self.secuencias: Dict[str, int] = {}
+        # Texto de búsqueda por ID
+        self.texto_habitacion: Dict[str, str] = {}
+        self.texto_cama: Dict[str, str] = {}
+
+    # Altas
+    def _contar_id(self, id_: str):
+        prefijo = prefijo_id(id_)
+        if prefijo:
+            self.secuencias[prefijo] = self.secuencias.get(prefijo, 0) + 1
+
+    def secuencia(self, prefijo: str) -> int:
+        """Cantidad de IDs registrados con `prefijo` (base para el siguiente número)."""
+        return self.secuencias.get(prefijo, 0)
+
+    def agregar_sala(self, sala, nueva: bool = True):
+        """Registra la sala; nueva=False si reemplaza a otra con el mismo ID (ya contada)."""
+        if nueva:
+            self._contar_id(sala.nombre)
+        self.salas_por_piso.setdefault(clave_piso(sala.ubicacion), set()).add(sala.nombre)
+
+    def quitar_sala(self, sala):
+        self.salas_por_piso.get(clave_piso(sala.ubicacion), set()).discard(sala.nombre)
+
+    def agregar_habitacion(self, hab, camas: dict, nueva: bool = True):
+        """Registra la habitación y adjunta las camas pendientes que la referencian."""
+        hid = hab.numero
+        if nueva:
+            self._contar_id(hid)
+        self.ocupacion.mover("habitacion", hab.sala_id, clave_piso(hab.ubicacion), None, hab.estado)
+        self.habitaciones_por_piso.setdefault(clave_piso(hab.ubicacion), set()).add(hid)
+        # Las habitaciones sin sala quedan bajo la clave None
+        self.habitaciones_por_sala.setdefault(hab.sala_id, set()).add(hid)
+        self.texto_habitacion[hid] = _SEP.join(
+            (hid.lower(), (hab.ubicacion or "").lower(), (hab.nombre_clave or "").lower())
+        )
+        # Alias por sufijo numérico: gana la primera habitación registrada
+        sufijo = hid.split("-")[-1]
+        if sufijo != hid:
+            self.habitacion_por_alias.setdefault(sufijo, hid)
+        # Camas que esperaban a esta habitación y, si la reemplaza, las que ya tenía
+        adjuntas = set(self.camas_por_habitacion.get(hid, ()))
+        for num in (hid, sufijo):
+            adjuntas |= self.camas_pendientes.pop(num, set())
+        self.camas_por_habitacion.setdefault(hid, set())
+        for cid in adjuntas:
+            if cid in camas:
+                self.quitar_cama(camas[cid])
+                self.agregar_cama(camas[cid], hab, nueva=False)
+
+    def quitar_habitacion(self, hab):
+        """Quita la habitación de los índices por piso y sala (sus camas se reubican al volver a agregarla)."""
+        self.habitaciones_por_piso.get(clave_piso(hab.ubicacion), set()).discard(hab.numero)
+        self.habitaciones_por_sala.get(hab.sala_id, set()).discard(hab.numero)
+        self.texto_habitacion.pop(hab.numero, None)
+        self.ocupacion.mover("habitacion", hab.sala_id, clave_piso(hab.ubicacion), hab.estado, None)
+
+    def agregar_cama(self, cama, hab, nueva: bool = True):
+        """Registra la cama con su habitación ya resuelta (None si aún no está cargada)."""
+        cid = cama.id_cama
+        if nueva:
+            self._contar_id(cid)
+        self.camas_por_estado.setdefault(cama.estado, set()).add(cid)
+        nombre_base = hab.nombre_clave if hab and hab.nombre_clave else cama.num_habitacion
+        self.texto_cama[cid] = _SEP.join(
+            (cid.lower(), (nombre_base or "").lower(), (cama.nombre_clave or "").lower())
+        )
+        if hab is None:
+            # Sin habitación solo cuenta en el total
+            self.camas_pendientes.setdefault(cama.num_habitacion, set()).add(cid)
+            self.ocupacion.mover("cama", None, None, None, cama.estado)
+            return
+        sala, piso = hab.sala_id, clave_piso(hab.ubicacion)
+        self.habitacion_de_cama[cid] = hab.numero
+        self.ubicacion_de_cama[cid] = (sala, piso)
+        self.camas_por_habitacion.setdefault(hab.numero, set()).add(cid)
+        self.camas_por_piso.setdefault(piso, set()).add(cid)
+        if sala:
+            self.camas_por_sala.setdefault(sala, set()).add(cid)
+        self.ocupacion.mover("cama", sala, piso, None, cama.estado)
+
+    def quitar_cama(self, cama):
+        cid = cama.id_cama
+        self.camas_por_estado.get(cama.estado, set()).discard(cid)
+        self.texto_cama.pop(cid, None)
+        hid = self.habitacion_de_cama.pop(cid, None)
+        if hid is None:
+            self.camas_pendientes.get(cama.num_habitacion, set()).discard(cid)
+            self.ocupacion.mover("cama", None, None, cama.estado, None)
+            return
+        sala, piso = self.ubicacion_de_cama.pop(cid)
+        self.camas_por_habitacion.get(hid, set()).discard(cid)
+        self.camas_por_piso.get(piso, set()).discard(cid)
+        self.camas_por_sala.get(sala, set()).discard(cid)
+        self.ocupacion.mover("cama", sala, piso, cama.estado, None)
+
+    # Cambios
+    def cambiar_estado_cama(self, cama, estado: str):
+        """Mueve la cama entre los conjuntos por estado y actualiza cama.estado."""
+        anterior = self.camas_por_estado.get(cama.estado)
+        if anterior is not None:
+            anterior.discard(cama.id_cama)
+        self.camas_por_estado.setdefault(estado, set()).add(cama.id_cama)
+        sala, piso = self.ubicacion_de_cama.get(cama.id_cama, (None, None))
+        self.ocupacion.mover("cama", sala, piso, cama.estado, estado)
+        cama.estado = estado
+
+    def cambiar_estado_habitacion(self, hab, estado: str):
+        self.ocupacion.mover("habitacion", hab.sala_id, clave_piso(hab.ubicacion), hab.estado, estado)
+        hab.estado = estado
+
+    def asignar_paciente(self, id_paciente: str, id_cama: Optional[str]):
+        """Vincula (o desvincula, con id_cama=None) paciente y cama."""
+        previa = self.cama_de_paciente.pop(id_paciente, None)
+        if previa is not None:
+            self.paciente_de_cama.pop(previa, None)
+        if id_cama:
+            self.cama_de_paciente[id_paciente] = id_cama
+            self.paciente_de_cama[id_cama] = id_paciente
+
+    # Búsqueda
+    def buscar(self, textos: Dict[str, str], consulta: str) -> List[str]:
+        """IDs cuyo texto de búsqueda contiene `consulta` (ya en minúsculas)."""
+        if not consulta:
+            return list(textos)
+        return [id_ for id_, texto in textos.items() if consulta in texto]
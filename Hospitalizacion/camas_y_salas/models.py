@@ -1,7 +1,13 @@
+import time
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional
 
-@dataclass
+# Los modelos usan slots: sin __dict__ por instancia (importa con miles de
+# camas en memoria) y sin atributos fuera de los declarados.
+
+@dataclass(slots=True)
 class Habitacion:
     numero: str
     estado: str = "disponible"  # disponible | ocupada | mantenimiento
@@ -9,7 +15,7 @@ class Habitacion:
     sala_id: Optional[str] = None
     nombre_clave: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Cama:
     id_cama: str
     num_habitacion: str
@@ -17,7 +23,7 @@ class Cama:
     higiene_ok: bool = True
     nombre_clave: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Sala:
     nombre: str
     activa: bool = True
@@ -25,7 +31,7 @@ class Sala:
     capacidad: int = 5
     nombre_clave: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Infraestructura:
     nombre: str
     tipo: str  # sala | habitacion | cama
@@ -34,21 +40,83 @@ class Infraestructura:
     # Para habitacion, relacionar con una sala; para cama, ubicacion representa la habitacion destino
     rel_sala_id: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Paciente:
     id_paciente: str
     nombre: str
     estado: str = "en_observacion"  # hospitalizado | alta | en_observacion | pedido_registrado
     cama_asignada: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class PedidoHospitalizacion:
     id_paciente: str
     motivo: str
     estado: str = "pendiente"  # pendiente | autorizado | rechazado
 
-@dataclass
+# Eventos del historial: tipo -> plantilla del texto (los datos van en orden)
+PLANTILLAS_EVENTO = {
+    "paciente_creado": "Paciente creado/asegurado: {} ({})",
+    "habitacion_registrada": "Infraestructura registrada: Habitacion {} ({})",
+    "sala_registrada": "Infraestructura registrada: Sala {} ({})",
+    "cama_registrada": "Infraestructura registrada: Cama {} (hab {})",
+    "consulta_habitacion": "Consulta estado habitación {}: {}",
+    "estado_habitacion": "Habitación {} actualizada a {}",
+    "cama_asignada": "Cama {} asignada a paciente {} en sala {}",
+    "pedido": "Pedido hospitalización registrado: {} motivo {}",
+    "hospitalizacion_autorizada": "Hospitalización autorizada para paciente {}",
+    "hospitalizacion": "Hospitalización registrada: {} cama {} sala {} motivo {} fecha {}",
+    "hospitalizacion_solo_sala": "Hospitalización (solo sala) registrada: {} sala {} motivo {} fecha {}",
+    "hospitalizacion_sin_sala": "Hospitalización (sin sala) registrada: {} motivo {} fecha {}",
+    "consulta_paciente": "Consulta estado paciente {}: {}",
+    "alta_autorizada": "Alta autorizada para paciente {}",
+}
+
+# Eventos que conserva Historial en memoria
+CAPACIDAD_HISTORIAL = 10_000
+
+# Lecturas: quedan en memoria pero no se pasan al destino (no son cambios)
+EVENTOS_SOLO_MEMORIA = frozenset({"consulta_habitacion", "consulta_paciente"})
+
+@dataclass(slots=True)
+class Evento:
+    tipo: str  # clave de PLANTILLAS_EVENTO
+    datos: tuple  # IDs y valores del evento (se comparten, no se copian en un texto)
+    fecha: float = field(default_factory=time.time)
+
+    def texto(self) -> str:
+        return PLANTILLAS_EVENTO[self.tipo].format(*self.datos)
+
 class Historial:
-    eventos: List[str] = field(default_factory=list)
-    def registrar(self, evento: str):
-        self.eventos.append(evento)
+    """
+    Búfer circular con los últimos `capacidad` eventos (None = sin límite).
+    El texto se arma solo al leerlo. `destino`, si se indica, recibe cada
+    evento para guardarlo (DbBackedRepository lo anexa a historial_camas),
+    salvo las consultas de EVENTOS_SOLO_MEMORIA.
+    """
+    def __init__(self, capacidad: Optional[int] = CAPACIDAD_HISTORIAL,
+                 destino: Optional[Callable[[Evento], None]] = None):
+        self._eventos = deque(maxlen=capacidad)
+        self.destino = destino
+        # Eventos registrados desde el arranque (incluye los ya descartados)
+        self.total = 0
+
+    def registrar(self, tipo: str, *datos):
+        evento = Evento(tipo, datos)
+        self._eventos.append(evento)
+        self.total += 1
+        if self.destino is not None and tipo not in EVENTOS_SOLO_MEMORIA:
+            self.destino(evento)
+
+    def __len__(self) -> int:
+        return len(self._eventos)
+
+    def __iter__(self) -> Iterator[Evento]:
+        return iter(self._eventos)
+
+    @property
+    def eventos(self) -> List[str]:
+        """Textos de los eventos en memoria, del más antiguo al más reciente."""
+        return [e.texto() for e in self._eventos]
+
+    def ultimos(self, n: int) -> List[Evento]:
+        return list(islice(reversed(self._eventos), n))[::-1] if n > 0 else []
@@ -0,0 +1,115 @@
+"""
+Contadores de ocupación de camas y habitaciones.
+
+Para cada tipo ("cama" o "habitacion") se lleva la cantidad por estado en
+tres ámbitos: la sala, el piso (clave_piso de la ubicación) y el total del
+hospital (clave ""). IndiceCamas los mueve en cada alta, baja o cambio de
+estado, así "¿cuántas camas libres hay en el piso 1?" es una lectura de
+diccionario en lugar de recorrer todas las camas.
+
+El tablero puede consultar `version` periódicamente y redibujar solo
+cuando cambia. DbBackedRepository guarda los contadores en la tabla
+ocupacion (una fila por tipo, ámbito, clave y estado) para que otros
+procesos los lean con leer_ocupacion sin cargar el repositorio. Los pisos
+que aún no cargó entran con sembrar() desde un conteo en SQL.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from core.database import session
+
+Clave = Tuple[str, str, str]  # (tipo, ámbito, clave)
+
+
+class ServicioOcupacion:
+    def __init__(self):
+        self.conteos: Dict[Clave, Dict[str, int]] = {}
+        # Filas (tipo, ámbito, clave, estado) cambiadas desde el último guardado
+        self._sucias = set()
+        # Aumenta con cada cambio; el tablero lo compara para no redibujar de más
+        self.version = 0
+        # Conteos de pisos aún no cargados: (tipo, piso, estado) -> cantidad
+        self._semillas: Dict[Tuple[str, str, str], int] = {}
+
+    def mover(self, tipo: str, sala: Optional[str], piso: Optional[str],
+              anterior: Optional[str], nuevo: Optional[str]):
+        """Pasa una cama o habitación del estado `anterior` a `nuevo` (None = alta o baja)."""
+        if anterior == nuevo:
+            return
+        ambitos = [("total", "")]
+        if sala:
+            ambitos.append(("sala", sala))
+        if piso is not None:
+            ambitos.append(("piso", piso))
+        for ambito, clave in ambitos:
+            conteo = self.conteos.setdefault((tipo, ambito, clave), {})
+            for estado, delta in ((anterior, -1), (nuevo, 1)):
+                if estado is not None:
+                    conteo[estado] = conteo.get(estado, 0) + delta
+                    self._sucias.add((tipo, ambito, clave, estado))
+        self.version += 1
+
+    def _sumar_piso(self, tipo: str, piso: str, estado: str, cantidad: int):
+        for ambito, clave in (("total", ""), ("piso", piso)):
+            conteo = self.conteos.setdefault((tipo, ambito, clave), {})
+            conteo[estado] = conteo.get(estado, 0) + cantidad
+            self._sucias.add((tipo, ambito, clave, estado))
+        self.version += 1
+
+    def sembrar(self, tipo: str, piso: str, estado: str, cantidad: int):
+        """
+        Cuenta `cantidad` camas o habitaciones de un piso que todavía no se
+        cargó (en el piso y en el total; la sala se conoce al cargarlo).
+        """
+        self._sumar_piso(tipo, piso, estado, cantidad)
+        clave = (tipo, piso, estado)
+        self._semillas[clave] = self._semillas.get(clave, 0) + cantidad
+
+    def quitar_semillas(self, piso: str):
+        """Descuenta lo sembrado para `piso`, antes de agregar lo cargado."""
+        for clave in [c for c in self._semillas if c[1] == piso]:
+            tipo, _, estado = clave
+            self._sumar_piso(tipo, piso, estado, -self._semillas.pop(clave))
+
+    # Consultas (sin recorrer camas)
+    def conteo(self, ambito: str = "total", clave: str = "", tipo: str = "cama") -> Dict[str, int]:
+        """Cantidad por estado en una sala, piso o el total: {'disponible': 12, 'ocupada': 30, ...}."""
+        return {e: n for e, n in self.conteos.get((tipo, ambito, clave), {}).items() if n}
+
+    def disponibles(self, ambito: str = "total", clave: str = "", tipo: str = "cama") -> int:
+        return self.conteos.get((tipo, ambito, clave), {}).get("disponible", 0)
+
+    def por_ambito(self, ambito: str, tipo: str = "cama") -> Dict[str, Dict[str, int]]:
+        """{clave: {estado: cantidad}} de todas las salas o de todos los pisos."""
+        return {clave: self.conteo(ambito, clave, tipo)
+                for (t, a, clave) in self.conteos if t == tipo and a == ambito}
+
+    # Persistencia
+    def filas_pendientes(self) -> List[tuple]:
+        """Filas (tipo, ámbito, clave, estado, cantidad) cambiadas desde la última llamada."""
+        filas = [(t, a, c, e, self.conteos[(t, a, c)][e]) for t, a, c, e in self._sucias]
+        self._sucias.clear()
+        return filas
+
+    def todas_las_filas(self) -> List[tuple]:
+        self._sucias.clear()
+        return [(t, a, c, e, n) for (t, a, c), conteo in self.conteos.items() for e, n in conteo.items()]
+
+
+# Upsert de una fila de ocupación (mismo orden que filas_pendientes)
+SQL_GUARDAR = """
+    INSERT INTO ocupacion (tipo, ambito, clave, estado, cantidad) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (tipo, ambito, clave, estado) DO UPDATE
+    SET cantidad = excluded.cantidad, actualizado = CURRENT_TIMESTAMP
+"""
+
+
+def leer_ocupacion(ambito: str = "piso", tipo: str = "cama") -> Dict[str, Dict[str, int]]:
+    """Lee de la tabla ocupacion {clave: {estado: cantidad}} (lo último que guardó el repositorio)."""
+    resultado: Dict[str, Dict[str, int]] = {}
+    with session() as conn:
+        for clave, estado, cantidad in conn.execute(
+            "SELECT clave, estado, cantidad FROM ocupacion WHERE tipo = ? AND ambito = ? AND cantidad > 0",
+            (tipo, ambito)
+        ):
+            resultado.setdefault(clave, {})[estado] = cantidad
+    return resultado
@@ -1,7 +1,12 @@
 from typing import Dict, Optional, List
+import atexit
+import os
 import sqlite3
-from core.database import crear_conexion, inicializar_db
+from core.database import inicializar_db, session
 from .models import Habitacion, Cama, Sala, Infraestructura, Paciente, PedidoHospitalizacion, Historial
+from .indice import IndiceCamas, clave_piso
+from .ocupacion import ServicioOcupacion, SQL_GUARDAR
+from .diario import DiarioCamas
 
 # Nombres griegos para salas (en español)
 GREEK_NAMES = [
@@ -20,95 +25,237 @@ def letter_sequence(n: int) -> str:
         s = chr(ord('A') + rem) + s
     return s
 
+# Datos de ejemplo (salas, habitaciones, camas y pacientes quemados). En
+# producción se desactivan con HOSPITAL_DATOS_EJEMPLO=0.
+DATOS_EJEMPLO = os.environ.get("HOSPITAL_DATOS_EJEMPLO", "1") != "0"
+
+
+def _secuencia_cama(cama: Cama) -> int:
+    """Secuencia numérica del ID de cama ("C-101-2" -> 2)."""
+    try:
+        return int(cama.id_cama.split('-')[-1])
+    except Exception:
+        return 0
+
+
 class MemoryRepository:
-    def __init__(self):
-        # Datos quemados de ejemplo
-        self.habitaciones: Dict[str, Habitacion] = {
-            "H-PB-101": Habitacion("H-PB-101", "disponible", "Planta Baja"),
-            "H-P1-102": Habitacion("H-P1-102", "ocupada", "Piso 1"),
-            "H-P2-201": Habitacion("H-P2-201", "mantenimiento", "Piso 2"),
-        }
-        self.camas: Dict[str, Cama] = {
-            "C-101-1": Cama("C-101-1", "101", "disponible", True),
-            "C-101-2": Cama("C-101-2", "101", "disponible", True),
-            "C-102-1": Cama("C-102-1", "102", "ocupada", True),
-        }
-        self.salas: Dict[str, Sala] = {
-            "S-PB-01": Sala("S-PB-01", True, "Planta Baja"),
-            "S-P1-02": Sala("S-P1-02", True, "Piso 1"),
-            "S-P2-03": Sala("S-P2-03", False, "Piso 2"),
-        }
-        self.pacientes: Dict[str, Paciente] = {
-            "P001": Paciente("P001", "Juan Perez", "en_observacion"),
-            "P002": Paciente("P002", "Maria Gomez", "hospitalizado", "C-102-1"),
-        }
+    def __init__(self, datos_ejemplo: bool = DATOS_EJEMPLO):
+        self.habitaciones: Dict[str, Habitacion] = {}
+        self.camas: Dict[str, Cama] = {}
+        self.salas: Dict[str, Sala] = {}
+        self.pacientes: Dict[str, Paciente] = {}
         # Índice opcional para mapear cédulas (cc) del módulo Pacientes a IDs internos del repositorio
         self._pacientes_idx_por_cc: Dict[str, str] = {}
+        # Inversos: ID interno -> primera cédula mapeada, nombre normalizado -> primer ID
+        self._cc_por_pid: Dict[str, str] = {}
+        self._pid_por_nombre: Dict[str, str] = {}
+        # Último número usado por _gen_paciente_id
+        self._secuencia_pacientes = 0
+        # Índices secundarios de salas, habitaciones y camas (ver indice.py)
+        # y contadores de ocupación por sala, piso y estado (ver ocupacion.py)
+        self.ocupacion = ServicioOcupacion()
+        self.indice = IndiceCamas(self.ocupacion)
         self.pedidos: Dict[str, PedidoHospitalizacion] = {}
         self.historial = Historial()
         # Mapa de hospitalizaciones registradas sin cama asignada: id_paciente -> {sala, fecha, motivo}
         self.hospitalizaciones: Dict[str, Dict[str, str]] = {}
+        if datos_ejemplo:
+            self._cargar_datos_ejemplo()
 
-        # Inicializar nombres clave para salas y relacionar habitaciones con salas por ubicacion
+    def _cargar_datos_ejemplo(self):
+        # Datos quemados de ejemplo
+        self._agregar_lote(
+            [
+                Sala("S-PB-01", True, "Planta Baja"),
+                Sala("S-P1-02", True, "Piso 1"),
+                Sala("S-P2-03", False, "Piso 2"),
+            ],
+            [
+                Habitacion("H-PB-101", "disponible", "Planta Baja"),
+                Habitacion("H-P1-102", "ocupada", "Piso 1"),
+                Habitacion("H-P2-201", "mantenimiento", "Piso 2"),
+            ],
+            [
+                Cama("C-101-1", "101", "disponible", True),
+                Cama("C-101-2", "101", "disponible", True),
+                Cama("C-102-1", "102", "ocupada", True),
+            ],
+        )
+        for pac in (
+            Paciente("P001", "Juan Perez", "en_observacion"),
+            Paciente("P002", "Maria Gomez", "hospitalizado", "C-102-1"),
+        ):
+            self.pacientes[pac.id_paciente] = pac
+            self._indexar_paciente(pac)
+
+    def _agregar_lote(self, salas: List[Sala], habitaciones: List[Habitacion], camas: List[Cama]):
+        """
+        Nombra e indexa salas, habitaciones y camas recién cargadas (los datos
+        de ejemplo o un piso de la BD). Solo se nombra lo del lote; un
+        reemplazo (mismo ID) conserva el nombre y la sala del anterior.
+        """
         try:
-            # 1) Asignar nombre_clave a salas de forma global (ALFA, BETA, GAMA, ...)
-            for idx, sid in enumerate(sorted(self.salas.keys()), start=1):
-                sala = self.salas.get(sid)
-                if sala:
-                    sala.nombre_clave = GREEK_NAMES[(idx - 1) % len(GREEK_NAMES)]
-
-            # 2) Vincular habitaciones a una sala del mismo piso y nombrarlas como "<SalaClave> <N>"
-            #    Recalcular índices por sala en orden estable
-            for hid, hab in self.habitaciones.items():
-                sala_match = self._find_sala_by_floor(hab.ubicacion)
-                hab.sala_id = sala_match
-            # construir listas por sala
-            habs_por_sala: Dict[str, List[str]] = {}
-            for hid, hab in self.habitaciones.items():
-                if hab.sala_id:
-                    habs_por_sala.setdefault(hab.sala_id, []).append(hid)
-            for sala_id, hids in habs_por_sala.items():
-                # ordenar por ID de habitación para índice determinista
-                for idx, hid in enumerate(sorted(hids), start=1):
-                    hab = self.habitaciones.get(hid)
-                    sala_clave = self.salas[sala_id].nombre_clave if sala_id in self.salas else "Sala"
-                    if hab:
-                        hab.nombre_clave = f"{sala_clave} {idx}"
-
-            # 3) Asignar nombre_clave a camas como "<SalaClave> <N><Letra>" (p.ej., Alfa 1A, Alfa 1B)
-            camas_por_hab: Dict[str, List[str]] = {}
-            for cid, cama in self.camas.items():
-                camas_por_hab.setdefault(cama.num_habitacion, []).append(cid)
-            for hid, cids in camas_por_hab.items():
-                hab = self._resolve_habitacion(hid)
-                if not hab:
-                    continue
-                # ordenar por secuencia numérica del ID de cama
-                def cama_seq(c_id: str) -> int:
-                    try:
-                        parts = c_id.split('-')
-                        return int(parts[-1])
-                    except Exception:
-                        return 0
-                for idx, cid in enumerate(sorted(cids, key=cama_seq), start=1):
-                    cama = self.camas.get(cid)
-                    letra = letter_sequence(idx)
-                    if cama:
-                        # Formato exacto: "Alfa 1A"
-                        base = hab.nombre_clave or hab.numero
-                        cama.nombre_clave = f"{base}{letra}"
+            self._nombrar_salas(salas)
         except Exception:
-            # No interrumpir si falla la inicialización opcional
             pass
+        for sala in salas:
+            self._guardar_sala(sala)
+        try:
+            self._nombrar_habitaciones(habitaciones)
+        except Exception:
+            pass
+        for hab in habitaciones:
+            self._guardar_habitacion(hab)
+        try:
+            self._nombrar_camas(camas)
+        except Exception:
+            # No interrumpir si falla el nombrado opcional
+            pass
+        for cama in camas:
+            self._guardar_cama(cama)
+
+    def _nombrar_salas(self, salas: List[Sala]):
+        # 1) nombre_clave griego (ALFA, BETA, GAMA, ...) por orden de ID dentro del lote
+        for idx, sala in enumerate(sorted(salas, key=lambda s: s.nombre), start=1):
+            previa = self.salas.get(sala.nombre)
+            if previa and previa.nombre_clave:
+                sala.nombre_clave = previa.nombre_clave
+            elif not sala.nombre_clave:
+                sala.nombre_clave = GREEK_NAMES[(idx - 1) % len(GREEK_NAMES)]
+
+    def _nombrar_habitaciones(self, habitaciones: List[Habitacion]):
+        # 2) Vincular habitaciones a una sala del mismo piso y nombrarlas como "<SalaClave> <N>",
+        #    numerando a continuación de las que la sala ya tiene
+        sala_por_codigo: Dict[str, Optional[str]] = {}
+        por_sala: Dict[str, List[Habitacion]] = {}
+        for hab in habitaciones:
+            previa = self.habitaciones.get(hab.numero)
+            if previa and previa.nombre_clave:
+                hab.sala_id = hab.sala_id or previa.sala_id
+                hab.nombre_clave = hab.nombre_clave or previa.nombre_clave
+                continue
+            if not hab.sala_id:
+                code = self._floor_code(hab.ubicacion)
+                if code not in sala_por_codigo:
+                    sala_por_codigo[code] = self._find_sala_by_floor(hab.ubicacion)
+                hab.sala_id = sala_por_codigo[code]
+            if hab.sala_id and not hab.nombre_clave:
+                por_sala.setdefault(hab.sala_id, []).append(hab)
+        for sala_id, habs in por_sala.items():
+            sala_clave = self.salas[sala_id].nombre_clave if sala_id in self.salas else "Sala"
+            # ordenar por ID de habitación para índice determinista
+            inicio = len(self.indice.habitaciones_por_sala.get(sala_id, ())) + 1
+            for idx, hab in enumerate(sorted(habs, key=lambda h: h.numero), start=inicio):
+                hab.nombre_clave = f"{sala_clave} {idx}"
+
+    def _nombrar_camas(self, camas: List[Cama]):
+        # 3) nombre_clave de camas sin nombre como "<SalaClave> <N><Letra>" (p.ej., Alfa 1A, Alfa 1B)
+        por_hab: Dict[str, List[Cama]] = {}
+        for cama in camas:
+            previa = self.camas.get(cama.id_cama)
+            if cama.nombre_clave:
+                continue
+            if previa and previa.nombre_clave:
+                cama.nombre_clave = previa.nombre_clave
+            else:
+                por_hab.setdefault(cama.num_habitacion, []).append(cama)
+        for num, lista in por_hab.items():
+            hab = self._resolve_habitacion(num)
+            if not hab:
+                continue
+            # ordenar por secuencia numérica del ID de cama
+            inicio = len(self.indice.camas_por_habitacion.get(hab.numero, ())) + 1
+            for idx, cama in enumerate(sorted(lista, key=_secuencia_cama), start=inicio):
+                # Formato exacto: "Alfa 1A"
+                base = hab.nombre_clave or hab.numero
+                cama.nombre_clave = f"{base}{letter_sequence(idx)}"
+
+    # Carga bajo demanda: en memoria todo está cargado; DbBackedRepository
+    # los redefine para traer de la BD el piso que haga falta
+    def _asegurar(self, numero: Optional[str]):
+        """Garantiza que la sala, habitación o cama `numero` esté en memoria, si existe."""
+
+    def _asegurar_piso(self, ubicacion: Optional[str]):
+        """Garantiza que las salas, habitaciones y camas del piso estén en memoria."""
+
+    def _asegurar_codigo(self, code: str):
+        """Garantiza en memoria todos los pisos con el código `code` (PB, P1, ...)."""
+
+    def cargar_todo(self):
+        """Garantiza en memoria todas las salas, habitaciones y camas."""
+
+    def obtener_sala(self, sala_id: Optional[str]) -> Optional[Sala]:
+        self._asegurar(sala_id)
+        return self.salas.get(sala_id) if sala_id else None
+
+    def obtener_habitacion(self, numero: Optional[str]) -> Optional[Habitacion]:
+        self._asegurar(numero)
+        return self.habitaciones.get(numero) if numero else None
+
+    def obtener_cama(self, id_cama: Optional[str]) -> Optional[Cama]:
+        self._asegurar(id_cama)
+        return self.camas.get(id_cama) if id_cama else None
+
+    def listar_salas(self) -> List[Sala]:
+        self.cargar_todo()
+        return list(self.salas.values())
+
+    def listar_habitaciones(self) -> List[Habitacion]:
+        self.cargar_todo()
+        return list(self.habitaciones.values())
+
+    def _indexar_paciente(self, pac: Paciente):
+        self._pid_por_nombre.setdefault((pac.nombre or "").strip().lower(), pac.id_paciente)
+        if pac.cama_asignada:
+            self.indice.asignar_paciente(pac.id_paciente, pac.cama_asignada)
+
+    def _mapear_cc(self, cc: str, pid: str):
+        anterior = self._pacientes_idx_por_cc.get(cc)
+        if anterior and anterior != pid and self._cc_por_pid.get(anterior) == cc:
+            del self._cc_por_pid[anterior]
+        self._pacientes_idx_por_cc[cc] = pid
+        self._cc_por_pid.setdefault(pid, cc)
+
+    def _asignar_cama_paciente(self, pac: Paciente, cama: Optional[Cama]):
+        """Ocupa `cama` con el paciente, o libera la que tenía si cama es None."""
+        if cama is None:
+            if pac.cama_asignada in self.camas:
+                self.indice.cambiar_estado_cama(self.camas[pac.cama_asignada], "disponible")
+            pac.cama_asignada = None
+        else:
+            self.indice.cambiar_estado_cama(cama, "ocupada")
+            pac.cama_asignada = cama.id_cama
+        self.indice.asignar_paciente(pac.id_paciente, pac.cama_asignada)
+
+    # Altas o reemplazos (mismo ID) manteniendo el índice
+    def _guardar_sala(self, sala: Sala):
+        previa = self.salas.get(sala.nombre)
+        if previa:
+            self.indice.quitar_sala(previa)
+        self.salas[sala.nombre] = sala
+        self.indice.agregar_sala(sala, nueva=previa is None)
+
+    def _guardar_habitacion(self, hab: Habitacion):
+        previa = self.habitaciones.get(hab.numero)
+        if previa:
+            self.indice.quitar_habitacion(previa)
+        self.habitaciones[hab.numero] = hab
+        self.indice.agregar_habitacion(hab, self.camas, nueva=previa is None)
+
+    def _guardar_cama(self, cama: Cama):
+        previa = self.camas.get(cama.id_cama)
+        if previa:
+            self.indice.quitar_cama(previa)
+        self.camas[cama.id_cama] = cama
+        self.indice.agregar_cama(cama, self._resolve_habitacion(cama.num_habitacion), nueva=previa is None)
 
     def _gen_paciente_id(self) -> str:
         """Genera un nuevo ID interno para paciente (formato P###) evitando colisiones."""
-        n = 1
-        while True:
-            pid = f"P{n:03d}"
-            if pid not in self.pacientes:
-                return pid
+        n = self._secuencia_pacientes + 1
+        while f"P{n:03d}" in self.pacientes:
             n += 1
+        self._secuencia_pacientes = n
+        return f"P{n:03d}"
 
     def ensure_repo_patient(self, cc: Optional[str], nombre: str) -> str:
         """
@@ -122,20 +269,18 @@ class MemoryRepository:
             if mapped and mapped in self.pacientes:
                 return mapped
         # Intento heurístico: si existe un paciente con el mismo nombre, reutilizar su ID
-        for pid, pac in self.pacientes.items():
-            try:
-                if (pac.nombre or "").strip().lower() == (nombre or "").strip().lower():
-                    if cc:
-                        self._pacientes_idx_por_cc[cc] = pid
-                    return pid
-            except Exception:
-                pass
+        pid = self.find_paciente_id_por_nombre(nombre)
+        if pid:
+            if cc:
+                self._mapear_cc(cc, pid)
+            return pid
         # Crear uno nuevo
         new_id = self._gen_paciente_id()
         self.pacientes[new_id] = Paciente(new_id, nombre or f"Paciente {new_id}")
+        self._indexar_paciente(self.pacientes[new_id])
         if cc:
-            self._pacientes_idx_por_cc[cc] = new_id
-        self.historial.registrar(f"Paciente creado/asegurado: {new_id} ({nombre})")
+            self._mapear_cc(cc, new_id)
+        self.historial.registrar("paciente_creado", new_id, nombre)
         return new_id
 
     # Infraestructura
@@ -147,29 +292,34 @@ class MemoryRepository:
 
             if infra.tipo == "habitacion":
                 code = floor_code(infra.ubicacion)
-                seq = 100 + len([h for h in self.habitaciones if h.startswith(f"H-{code}-")]) + 1
+                # La secuencia y la capacidad cuentan lo del piso: que esté cargado
+                self._asegurar_codigo(code)
+                self._asegurar(infra.rel_sala_id)
+                seq = 100 + self.indice.secuencia(f"H-{code}-") + 1
                 hid = f"H-{code}-{seq}"
                 if hid in self.habitaciones:
                     return None
                 # Asignar a una sala (si se provee) y calcular nombre_clave
                 sala_id = infra.rel_sala_id or self._find_sala_by_floor(infra.ubicacion)
                 # Enforce sala capacity: default 5 habitaciones
+                current_count = len(self.indice.habitaciones_por_sala.get(sala_id, ()))
                 if sala_id and sala_id in self.salas:
-                    current_count = len([h for h in self.habitaciones.values() if h.sala_id == sala_id])
                     capacidad = getattr(self.salas[sala_id], "capacidad", 5)
                     if current_count >= capacidad:
                         # sin espacio en la sala
                         return None
                 # índice de habitación dentro de la sala
-                hab_index = 1 + len([h for h in self.habitaciones.values() if h.sala_id == sala_id])
+                hab_index = 1 + current_count
                 sala_clave = self.salas[sala_id].nombre_clave if sala_id and sala_id in self.salas else "Sala"
                 nombre_clave = f"{sala_clave} {hab_index}"
                 self.habitaciones[hid] = Habitacion(hid, "disponible", infra.ubicacion, sala_id=sala_id, nombre_clave=nombre_clave)
-                self.historial.registrar(f"Infraestructura registrada: Habitacion {hid} ({infra.ubicacion})")
+                self.indice.agregar_habitacion(self.habitaciones[hid], self.camas)
+                self.historial.registrar("habitacion_registrada", hid, infra.ubicacion)
                 return hid
             elif infra.tipo == "sala":
                 code = floor_code(infra.ubicacion)
-                seq = 1 + len([s for s in self.salas if s.startswith(f"S-{code}-")])
+                self._asegurar_codigo(code)
+                seq = 1 + self.indice.secuencia(f"S-{code}-")
                 sid = f"S-{code}-{seq:02d}"
                 if sid in self.salas:
                     return None
@@ -178,13 +328,15 @@ class MemoryRepository:
                 # capacidad por defecto 5 si no se provee
                 cap = infra.capacidad if isinstance(infra.capacidad, int) and infra.capacidad > 0 else 5
                 self.salas[sid] = Sala(sid, True, infra.ubicacion, cap, nombre_clave=nombre_griego)
-                self.historial.registrar(f"Infraestructura registrada: Sala {sid} ({infra.ubicacion})")
+                self.indice.agregar_sala(self.salas[sid])
+                self.historial.registrar("sala_registrada", sid, infra.ubicacion)
                 return sid
             elif infra.tipo == "cama":
                 hab_id = infra.ubicacion  # Para cama, 'ubicacion' representa la habitación destino
+                self._asegurar(hab_id)
                 if hab_id not in self.habitaciones:
                     return None
-                seq = 1 + len([c for c in self.camas if c.startswith(f"C-{hab_id}-")])
+                seq = 1 + self.indice.secuencia(f"C-{hab_id}-")
                 cid = f"C-{hab_id}-{seq}"
                 if cid in self.camas:
                     return None
@@ -193,7 +345,8 @@ class MemoryRepository:
                 letra = letter_sequence(seq)
                 clave_base = (hab.nombre_clave if hab and hab.nombre_clave else hab_id)
                 self.camas[cid] = Cama(cid, hab_id, "disponible", True, nombre_clave=f"{clave_base} {letra}")
-                self.historial.registrar(f"Infraestructura registrada: Cama {cid} (hab {hab_id})")
+                self.indice.agregar_cama(self.camas[cid], hab)
+                self.historial.registrar("cama_registrada", cid, hab_id)
                 return cid
             else:
                 return None
@@ -202,32 +355,33 @@ class MemoryRepository:
 
     # Habitaciones
     def consultar_estado_habitacion(self, numero: str) -> Optional[str]:
+        self._asegurar(numero)
         hab = self.habitaciones.get(numero)
         if not hab:
             return None
-        self.historial.registrar(f"Consulta estado habitación {numero}: {hab.estado}")
+        self.historial.registrar("consulta_habitacion", numero, hab.estado)
         return hab.estado
 
     def actualizar_estado_habitacion(self, numero: str, estado: str) -> bool:
+        self._asegurar(numero)
         hab = self.habitaciones.get(numero)
         if not hab:
             return False
         if estado not in {"disponible", "ocupada", "mantenimiento"}:
             return False
-        hab.estado = estado
-        self.historial.registrar(f"Habitación {numero} actualizada a {estado}")
+        self.indice.cambiar_estado_habitacion(hab, estado)
+        self.historial.registrar("estado_habitacion", numero, estado)
         return True
 
     def buscar_habitaciones(self, query: str) -> List[Habitacion]:
+        self.cargar_todo()
         q = (query or "").strip().lower()
-        res: List[Habitacion] = []
-        for hab in self.habitaciones.values():
-            if q in hab.numero.lower() or q in (hab.ubicacion or "").lower() or q in ((hab.nombre_clave or "").lower()):
-                res.append(hab)
+        res = [self.habitaciones[hid] for hid in self.indice.buscar(self.indice.texto_habitacion, q)]
         # ordenar por ubicacion y numero
         return sorted(res, key=lambda h: (h.ubicacion, h.numero))
 
     def buscar_salas(self, query: str) -> List[Sala]:
+        self.cargar_todo()
         q = (query or "").strip().lower()
         res: List[Sala] = []
         for sala in self.salas.values():
@@ -237,17 +391,55 @@ class MemoryRepository:
         return sorted(res, key=lambda s: (s.ubicacion, s.nombre))
 
     def buscar_camas(self, query: str) -> List[Cama]:
+        self.cargar_todo()
         q = (query or "").strip().lower()
-        res: List[Cama] = []
-        for cama in self.camas.values():
-            hab = self._resolve_habitacion(cama.num_habitacion)
-            nombre_base = (hab.nombre_clave if hab and hab.nombre_clave else cama.num_habitacion)
-            display = f"{nombre_base}"
-            if q in (cama.id_cama or "").lower() or q in display.lower() or q in ((cama.nombre_clave or "").lower()):
-                res.append(cama)
+        res = [self.camas[cid] for cid in self.indice.buscar(self.indice.texto_cama, q)]
         # ordenar por estado y id
         return sorted(res, key=lambda c: (c.estado, c.id_cama))
 
+    # Consultas por índice
+    def salas_de_piso(self, ubicacion: str) -> List[Sala]:
+        self._asegurar_piso(ubicacion)
+        return [self.salas[sid] for sid in sorted(self.indice.salas_por_piso.get(clave_piso(ubicacion), ()))]
+
+    def habitaciones_de_sala(self, sala_id: str) -> List[Habitacion]:
+        self._asegurar(sala_id)
+        return [self.habitaciones[hid] for hid in sorted(self.indice.habitaciones_por_sala.get(sala_id, ()))]
+
+    def habitaciones_de_piso(self, ubicacion: str) -> List[Habitacion]:
+        self._asegurar_piso(ubicacion)
+        return [self.habitaciones[hid] for hid in sorted(self.indice.habitaciones_por_piso.get(clave_piso(ubicacion), ()))]
+
+    def camas_de_habitacion(self, numero: str, estado: Optional[str] = None) -> List[Cama]:
+        """Camas de la habitación (ID completo o sufijo), opcionalmente solo las de un estado."""
+        self._asegurar(numero)
+        hab = self._resolve_habitacion(numero)
+        cids = self.indice.camas_por_habitacion.get(hab.numero, set()) if hab else set()
+        if estado is not None:
+            cids = cids & self.indice.camas_por_estado.get(estado, set())
+        return [self.camas[cid] for cid in sorted(cids)]
+
+    def camas_de_sala(self, sala_id: str, estado: Optional[str] = None) -> List[Cama]:
+        self._asegurar(sala_id)
+        cids = self.indice.camas_por_sala.get(sala_id, set())
+        if estado is not None:
+            cids = cids & self.indice.camas_por_estado.get(estado, set())
+        return [self.camas[cid] for cid in sorted(cids)]
+
+    def camas_de_piso(self, ubicacion: str, estado: Optional[str] = None) -> List[Cama]:
+        self._asegurar_piso(ubicacion)
+        cids = self.indice.camas_por_piso.get(clave_piso(ubicacion), set())
+        if estado is not None:
+            cids = cids & self.indice.camas_por_estado.get(estado, set())
+        return [self.camas[cid] for cid in sorted(cids)]
+
+    def camas_con_estado(self, estado: str) -> List[Cama]:
+        self.cargar_todo()
+        return [self.camas[cid] for cid in sorted(self.indice.camas_por_estado.get(estado, ()))]
+
+    def get_paciente_de_cama(self, id_cama: str) -> Optional[str]:
+        return self.indice.paciente_de_cama.get(id_cama)
+
     # Asignaciones
     def asignar_cama(self, id_paciente: str, sala: str, id_cama: str) -> str:
         pac = self.pacientes.get(id_paciente)
@@ -255,6 +447,8 @@ class MemoryRepository:
             return "Paciente no registrado"
         if pac.cama_asignada:
             return "El paciente ya tiene una cama asignada"
+        self._asegurar(sala)
+        self._asegurar(id_cama)
         sl = self.salas.get(sala)
         if not sl:
             return "Sala no registrada"
@@ -268,8 +462,7 @@ class MemoryRepository:
         if not cama.higiene_ok:
             return "La cama no está apta para uso"
         # asignar
-        cama.estado = "ocupada"
-        pac.cama_asignada = id_cama
+        self._asignar_cama_paciente(pac, cama)
         pac.estado = "hospitalizado"
         # Registrar/actualizar la sala asociada a la hospitalización del paciente
         info = self.hospitalizaciones.get(id_paciente)
@@ -277,7 +470,7 @@ class MemoryRepository:
             self.hospitalizaciones[id_paciente] = {"sala": sala, "fecha": "", "motivo": ""}
         else:
             info["sala"] = sala
-        self.historial.registrar(f"Cama {id_cama} asignada a paciente {id_paciente} en sala {sala}")
+        self.historial.registrar("cama_asignada", id_cama, id_paciente, sala)
         return "OK"
 
     # Hospitalización: pedidos y autorizaciones
@@ -287,7 +480,7 @@ class MemoryRepository:
             return False
         self.pedidos[id_paciente] = PedidoHospitalizacion(id_paciente, motivo, "pendiente")
         pac.estado = "pedido_registrado"
-        self.historial.registrar(f"Pedido hospitalización registrado: {id_paciente} motivo {motivo}")
+        self.historial.registrar("pedido", id_paciente, motivo)
         return True
 
     def autorizar_hospitalizacion(self, id_paciente: str) -> str:
@@ -302,7 +495,7 @@ class MemoryRepository:
         if ped:
             ped.estado = "autorizado"
         pac.estado = "hospitalización autorizada"
-        self.historial.registrar(f"Hospitalización autorizada para paciente {id_paciente}")
+        self.historial.registrar("hospitalizacion_autorizada", id_paciente)
         return "OK"
 
     def registrar_hospitalizacion(self, id_paciente: str, fecha: str, sala: str, id_cama: str, motivo: str) -> str:
@@ -310,14 +503,14 @@ class MemoryRepository:
         pac = self.pacientes.get(id_paciente)
         if not pac:
             return "Paciente no registrado"
+        self._asegurar(id_cama)
         cama = self.camas.get(id_cama)
         if not cama or cama.estado != "disponible":
             return "La cama seleccionada no está disponible"
         # asignar cama y actualizar estados
-        cama.estado = "ocupada"
-        pac.cama_asignada = id_cama
+        self._asignar_cama_paciente(pac, cama)
         pac.estado = "hospitalizado"
-        self.historial.registrar(f"Hospitalización registrada: {id_paciente} cama {id_cama} sala {sala} motivo {motivo} fecha {fecha}")
+        self.historial.registrar("hospitalizacion", id_paciente, id_cama, sala, motivo, fecha)
         return "OK"
 
     def registrar_hospitalizacion_solo_sala(self, id_paciente: str, fecha: str, sala: str, motivo: str) -> str:
@@ -325,6 +518,7 @@ class MemoryRepository:
         pac = self.pacientes.get(id_paciente)
         if not pac:
             return "Paciente no registrado"
+        self._asegurar(sala)
         sl = self.salas.get(sala)
         if not sl:
             return "Sala no registrada"
@@ -334,7 +528,8 @@ class MemoryRepository:
         self.hospitalizaciones[id_paciente] = {"sala": sala, "fecha": fecha, "motivo": motivo}
         pac.estado = "hospitalizado"
         pac.cama_asignada = None
-        self.historial.registrar(f"Hospitalización (solo sala) registrada: {id_paciente} sala {sala} motivo {motivo} fecha {fecha}")
+        self.indice.asignar_paciente(id_paciente, None)
+        self.historial.registrar("hospitalizacion_solo_sala", id_paciente, sala, motivo, fecha)
         return "OK"
 
     def registrar_hospitalizacion_sin_sala(self, id_paciente: str, fecha: str, motivo: str) -> str:
@@ -346,7 +541,8 @@ class MemoryRepository:
         self.hospitalizaciones[id_paciente] = {"sala": None, "fecha": fecha, "motivo": motivo}
         pac.estado = "hospitalizado"
         pac.cama_asignada = None
-        self.historial.registrar(f"Hospitalización (sin sala) registrada: {id_paciente} motivo {motivo} fecha {fecha}")
+        self.indice.asignar_paciente(id_paciente, None)
+        self.historial.registrar("hospitalizacion_sin_sala", id_paciente, motivo, fecha)
         return "OK"
 
     def listar_pacientes_hospitalizados_con_sala(self) -> List[str]:
@@ -400,19 +596,12 @@ class MemoryRepository:
         pac = self.pacientes.get(id_paciente)
         if not pac:
             return None
-        self.historial.registrar(f"Consulta estado paciente {id_paciente}: {pac.estado}")
+        self.historial.registrar("consulta_paciente", id_paciente, pac.estado)
         return pac.estado
 
     def find_paciente_id_por_nombre(self, nombre: str) -> Optional[str]:
         """Devuelve el ID interno del repositorio para un nombre exacto (case-insensitive), si existe."""
-        try:
-            target = (nombre or "").strip().lower()
-            for pid, pac in self.pacientes.items():
-                if (pac.nombre or "").strip().lower() == target:
-                    return pid
-        except Exception:
-            pass
-        return None
+        return self._pid_por_nombre.get((nombre or "").strip().lower())
 
     def esta_hospitalizado_por_cc(self, cc: Optional[str]) -> bool:
         """Indica si el paciente mapeado por cédula está hospitalizado. No crea registros nuevos."""
@@ -444,20 +633,13 @@ class MemoryRepository:
         pac.estado = "alta autorizada"
         # liberar cama si tenía
         if pac.cama_asignada and pac.cama_asignada in self.camas:
-            self.camas[pac.cama_asignada].estado = "disponible"
-            pac.cama_asignada = None
-        self.historial.registrar(f"Alta autorizada para paciente {id_paciente}")
+            self._asignar_cama_paciente(pac, None)
+        self.historial.registrar("alta_autorizada", id_paciente)
         return "OK"
 
     def get_cc_por_pid(self, id_paciente: str) -> Optional[str]:
         """Obtiene la cédula asociada a un ID interno del repositorio, si está mapeada."""
-        try:
-            for cc, pid in self._pacientes_idx_por_cc.items():
-                if pid == id_paciente:
-                    return cc
-        except Exception:
-            pass
-        return None
+        return self._cc_por_pid.get(id_paciente)
 
     # Helpers internos
     def _floor_code(self, ubic: str) -> str:
@@ -484,178 +666,218 @@ class MemoryRepository:
         if hab:
             return hab
         # Intentar por sufijo numérico (compatibilidad con datos iniciales "101")
-        for hid, h in self.habitaciones.items():
-            try:
-                if hid.split("-")[-1] == num_habitacion:
-                    return h
-            except Exception:
-                pass
-        return None
+        hid = self.indice.habitacion_por_alias.get(num_habitacion)
+        return self.habitaciones.get(hid) if hid else None
+
+# Columnas de una cama (alias c) en el orden de _cama_de_fila
+_COLUMNAS_CAMA = "c.codigo, c.habitacion_numero, c.estado, c.higiene_ok, COALESCE(c.nombre_clave,'')"
+
+# Camas y habitaciones por piso y estado, para contar la ocupación sin cargarlas
+_SQL_CONTEOS_PISO = """
+    SELECT 'habitacion', ubicacion, COALESCE(NULLIF(estado, ''), 'disponible'), COUNT(*)
+    FROM salas_habitaciones WHERE tipo = 'habitacion' GROUP BY 2, 3
+    UNION ALL
+    SELECT 'cama', h.ubicacion, COALESCE(NULLIF(c.estado, ''), 'disponible'), COUNT(*)
+    FROM camas c JOIN salas_habitaciones h ON h.numero = c.habitacion_numero AND h.tipo = 'habitacion'
+    GROUP BY 2, 3
+"""
+
+# Carga de un piso y búsqueda del piso de un número (core/diagnostico verifica sus planes)
+SQL_SALAS_DE_PISO = ("SELECT numero, tipo, estado, COALESCE(ubicacion,''), COALESCE(capacidad, 5) "
+                     "FROM salas_habitaciones WHERE ubicacion IS ?")
+SQL_CAMAS_DE_PISO = (f"SELECT {_COLUMNAS_CAMA} FROM salas_habitaciones h "
+                     "JOIN camas c ON c.habitacion_numero = h.numero "
+                     "WHERE h.ubicacion IS ? AND h.tipo = 'habitacion'")
+SQL_PISO_DE_NUMERO = "SELECT ubicacion FROM salas_habitaciones WHERE numero = ?"
+SQL_PISO_DE_CAMA = ("SELECT h.ubicacion FROM camas c JOIN salas_habitaciones h ON h.numero = c.habitacion_numero "
+                    "WHERE c.codigo = ?")
+
+
+def _cama_de_fila(fila) -> Cama:
+    codigo, hab_num, estado, higiene_ok, nombre_clave = fila
+    return Cama(codigo, hab_num, estado or "disponible", bool(higiene_ok), nombre_clave or None)
+
 
 class DbBackedRepository(MemoryRepository):
     """Repositorio que sincroniza datos con la BD SQLite interna.
-    - Carga inicial desde BD a memoria
+    - Carga desde BD a memoria por piso, al primer acceso (ver _cargar_piso)
     - Persiste cambios claves (infraestructura, estados, hospitalizaciones)
+      y los eventos del historial con escritura diferida: se encolan en
+      DiarioCamas (ver diario.py) y se escriben por lotes
     """
-    def __init__(self):
-        super().__init__()
+    def __init__(self, datos_ejemplo: bool = DATOS_EJEMPLO):
+        # Pisos de la BD: clave_piso -> ubicaciones tal como están guardadas
+        self._pisos_bd: Dict[str, List[Optional[str]]] = {}
+        self._pisos_cargados = set()
+        super().__init__(datos_ejemplo)
         # Asegurar esquema de BD antes de cargar datos
         try:
             inicializar_db()
         except Exception:
             pass
-        self.conn = crear_conexion()
+        self.diario = DiarioCamas()
+        # Lo que quedó en el diario de una ejecución anterior va antes de cargar
         try:
-            self._load_from_db()
-        except Exception:
+            self.diario.reproducir()
+        except Exception as e:
+            print(f"Error al reproducir el diario de camas: {e}")
+        atexit.register(self.diario.cerrar)
+        # Los eventos del historial se guardan en historial_camas (en memoria quedan los últimos)
+        self.historial.destino = self.diario.encolar_evento
+        try:
+            self._preparar_carga()
+        except Exception as e:
             # Si falla la carga, continuar con memoria
+            print(f"Error al leer los pisos de camas y salas: {e}")
+        # Los datos de ejemplo comparten IDs con la BD: sus pisos se cargan
+        # ya para que los de la BD los reemplacen sin contarse dos veces
+        for ubicacion in {hab.ubicacion for hab in self.habitaciones.values()} | {s.ubicacion for s in self.salas.values()}:
+            self._asegurar_piso(ubicacion)
+        # La tabla ocupacion se reescribe con lo cargado y los conteos de los pisos sin cargar
+        try:
+            with session() as conn:
+                conn.execute("DELETE FROM ocupacion")
+                conn.executemany(SQL_GUARDAR, self.ocupacion.todas_las_filas())
+                self.diario.cargar_salas(conn)
+        except Exception:
             pass
 
-    def _load_from_db(self):
-        if not self.conn:
+    def _encolar(self, operacion: str, *args):
+        """Encola un cambio junto con los contadores de ocupación que movió."""
+        self.diario.encolar(operacion, *args, ocupacion=self.ocupacion.filas_pendientes())
+
+    # Carga por piso
+    def _preparar_carga(self):
+        """
+        Lee solo lo necesario para arrancar: los pisos que hay, cuántas camas
+        y habitaciones tiene cada uno por estado (la ocupación total y por
+        piso queda correcta sin cargarlos) y las camas cuya habitación no
+        está en la BD, que no pertenecen a ningún piso.
+        """
+        with session() as conn:
+            for (ubicacion,) in conn.execute("SELECT DISTINCT ubicacion FROM salas_habitaciones"):
+                self._pisos_bd.setdefault(clave_piso(ubicacion or "Planta Baja"), []).append(ubicacion)
+            for tipo, ubicacion, estado, cantidad in conn.execute(_SQL_CONTEOS_PISO):
+                self.ocupacion.sembrar(tipo, clave_piso(ubicacion or "Planta Baja"), estado, cantidad)
+            sueltas = conn.execute(
+                f"SELECT {_COLUMNAS_CAMA} FROM camas c WHERE NOT EXISTS "
+                "(SELECT 1 FROM salas_habitaciones h WHERE h.numero = c.habitacion_numero AND h.tipo = 'habitacion')"
+            ).fetchall()
+        self._agregar_lote([], [], [_cama_de_fila(f) for f in sueltas])
+
+    def _cargar_piso(self, piso: str):
+        """Trae de la BD las salas, habitaciones y camas de un piso (clave_piso) la primera vez."""
+        if piso in self._pisos_cargados or piso not in self._pisos_bd:
             return
-        cur = self.conn.cursor()
-        # Cargar salas y habitaciones
+        self._pisos_cargados.add(piso)
+        salas: List[Sala] = []
+        habitaciones: List[Habitacion] = []
+        camas: List[Cama] = []
         try:
-            for numero, tipo, estado, ubicacion, capacidad in cur.execute(
-                "SELECT numero, tipo, estado, COALESCE(ubicacion,''), COALESCE(capacidad, 5) FROM salas_habitaciones"
-            ).fetchall():
-                if tipo == "sala":
-                    self.salas[numero] = Sala(numero, activa=(estado.lower() != "inactiva"), ubicacion=ubicacion or "Planta Baja", capacidad=capacidad)
-                elif tipo == "habitacion":
-                    self.habitaciones[numero] = Habitacion(numero, estado=estado or "disponible", ubicacion=ubicacion or "Planta Baja")
-        except Exception:
-            pass
-        # Cargar camas
+            with session() as conn:
+                for ubicacion in self._pisos_bd[piso]:
+                    for numero, tipo, estado, ubic, capacidad in conn.execute(SQL_SALAS_DE_PISO, (ubicacion,)):
+                        if tipo == "sala":
+                            salas.append(Sala(numero, activa=((estado or "").lower() != "inactiva"), ubicacion=ubic or "Planta Baja", capacidad=capacidad))
+                        elif tipo == "habitacion":
+                            habitaciones.append(Habitacion(numero, estado=estado or "disponible", ubicacion=ubic or "Planta Baja"))
+                    camas.extend(_cama_de_fila(f) for f in conn.execute(SQL_CAMAS_DE_PISO, (ubicacion,)))
+        except Exception as e:
+            print(f"Error al cargar el piso {piso}: {e}")
+            self._pisos_cargados.discard(piso)
+            return
+        # Lo contado al arrancar para este piso se reemplaza por lo cargado
+        self.ocupacion.quitar_semillas(piso)
+        self._agregar_lote(salas, habitaciones, camas)
+
+    def _asegurar(self, numero: Optional[str]):
+        if not numero or numero in self.salas or numero in self.habitaciones or numero in self.camas:
+            return
+        if len(self._pisos_cargados) >= len(self._pisos_bd):
+            return
         try:
-            for codigo, hab_num, estado, higiene_ok, nombre_clave in cur.execute(
-                "SELECT codigo, habitacion_numero, estado, higiene_ok, COALESCE(nombre_clave,'') FROM camas"
-            ).fetchall():
-                self.camas[codigo] = Cama(codigo, hab_num, estado or "disponible", bool(higiene_ok), nombre_clave or None)
-        except Exception:
-            pass
+            with session() as conn:
+                fila = (conn.execute(SQL_PISO_DE_NUMERO, (numero,)).fetchone()
+                        or conn.execute(SQL_PISO_DE_CAMA, (numero,)).fetchone())
+        except Exception as e:
+            print(f"Error al buscar el piso de {numero}: {e}")
+            return
+        if fila:
+            self._cargar_piso(clave_piso(fila[0] or "Planta Baja"))
+
+    def _asegurar_piso(self, ubicacion: Optional[str]):
+        self._cargar_piso(clave_piso(ubicacion or "Planta Baja"))
+
+    def _asegurar_codigo(self, code: str):
+        for piso, ubicaciones in list(self._pisos_bd.items()):
+            if piso not in self._pisos_cargados and any(self._floor_code(u) == code for u in ubicaciones):
+                self._cargar_piso(piso)
+
+    def cargar_todo(self):
+        for piso in list(self._pisos_bd):
+            self._cargar_piso(piso)
 
     def registrar_infraestructura(self, infra: Infraestructura) -> Optional[str]:
         assigned = super().registrar_infraestructura(infra)
-        if not assigned or not self.conn:
+        if not assigned:
             return assigned
-        try:
-            cur = self.conn.cursor()
-            if infra.tipo == "sala":
-                cur.execute(
-                    "INSERT OR IGNORE INTO salas_habitaciones (numero, tipo, estado, ubicacion, capacidad) VALUES (?,?,?,?,?)",
-                    (assigned, "sala", "Disponible", infra.ubicacion, infra.capacidad if infra.capacidad else 5)
-                )
-            elif infra.tipo == "habitacion":
-                cur.execute(
-                    "INSERT OR IGNORE INTO salas_habitaciones (numero, tipo, estado, ubicacion) VALUES (?,?,?,?)",
-                    (assigned, "habitacion", "Disponible", infra.ubicacion)
-                )
-            elif infra.tipo == "cama":
-                cur.execute(
-                    "INSERT OR IGNORE INTO camas (codigo, habitacion_numero, estado, higiene_ok, nombre_clave) VALUES (?,?,?,?,?)",
-                    (assigned, infra.ubicacion, "disponible", 1, None)
-                )
-            self.conn.commit()
-        except Exception:
-            # No romper si la persistencia falla
-            pass
+        if infra.tipo == "sala":
+            self._encolar("sala", assigned, infra.ubicacion, infra.capacidad if infra.capacidad else 5)
+        elif infra.tipo == "habitacion":
+            self._encolar("habitacion", assigned, infra.ubicacion)
+        elif infra.tipo == "cama":
+            self._encolar("cama", assigned, infra.ubicacion)
         return assigned
 
     def actualizar_estado_habitacion(self, numero: str, estado: str) -> bool:
         ok = super().actualizar_estado_habitacion(numero, estado)
-        if ok and self.conn:
-            try:
-                cur = self.conn.cursor()
-                cur.execute("UPDATE salas_habitaciones SET estado=? WHERE numero=?", (estado, numero))
-                self.conn.commit()
-            except Exception:
-                pass
+        if ok:
+            self._encolar("estado_habitacion", numero, estado)
         return ok
 
+    def asignar_cama(self, id_paciente: str, sala: str, id_cama: str) -> str:
+        res = super().asignar_cama(id_paciente, sala, id_cama)
+        if res == "OK":
+            self._encolar("estado_cama", id_cama, self.camas[id_cama].estado)
+        return res
+
+    def autorizar_alta(self, id_paciente: str) -> str:
+        pac = self.pacientes.get(id_paciente)
+        cama_liberada = pac.cama_asignada if pac else None
+        res = super().autorizar_alta(id_paciente)
+        if res == "OK" and cama_liberada in self.camas:
+            self._encolar("estado_cama", cama_liberada, self.camas[cama_liberada].estado)
+        return res
+
     def registrar_hospitalizacion(self, id_paciente: str, fecha: str, sala: str, id_cama: str, motivo: str) -> str:
         res = super().registrar_hospitalizacion(id_paciente, fecha, sala, id_cama, motivo)
-        if res == "OK" and self.conn:
-            try:
-                cur = self.conn.cursor()
-                # Resolver paciente_id real mediante cédula (si estuviera mapeada)
-                cc = self.get_cc_por_pid(id_paciente)
-                paciente_id = None
-                if cc:
-                    row = cur.execute("SELECT id FROM pacientes WHERE dni=?", (cc,)).fetchone()
-                    paciente_id = row[0] if row else None
-                # Resolver sala_id por numero
-                sala_row = cur.execute("SELECT id FROM salas_habitaciones WHERE numero=? AND tipo='sala'", (sala,)).fetchone()
-                sala_id = sala_row[0] if sala_row else None
-                if paciente_id and sala_id:
-                    cur.execute(
-                        "INSERT INTO hospitalizaciones (paciente_id, sala_id, fecha_ingreso, estado_paciente) VALUES (?,?,?,?)",
-                        (paciente_id, sala_id, fecha, "hospitalizado")
-                    )
-                    self.conn.commit()
-            except Exception:
-                pass
+        if res == "OK":
+            self._encolar("estado_cama", id_cama, self.camas[id_cama].estado)
+            # La fila de hospitalizaciones requiere paciente (por cédula) y sala registrados
+            cc = self.get_cc_por_pid(id_paciente)
+            if cc:
+                self._encolar("hospitalizacion", cc, sala, fecha, True)
         return res
 
     def registrar_hospitalizacion_solo_sala(self, id_paciente: str, fecha: str, sala: str, motivo: str) -> str:
         res = super().registrar_hospitalizacion_solo_sala(id_paciente, fecha, sala, motivo)
-        if res == "OK" and self.conn:
-            try:
-                cur = self.conn.cursor()
-                cc = self.get_cc_por_pid(id_paciente)
-                paciente_id = None
-                if cc:
-                    row = cur.execute("SELECT id FROM pacientes WHERE dni=?", (cc,)).fetchone()
-                    paciente_id = row[0] if row else None
-                sala_row = cur.execute("SELECT id FROM salas_habitaciones WHERE numero=? AND tipo='sala'", (sala,)).fetchone()
-                sala_id = sala_row[0] if sala_row else None
-                if paciente_id and sala_id:
-                    cur.execute(
-                        "INSERT INTO hospitalizaciones (paciente_id, sala_id, fecha_ingreso, estado_paciente) VALUES (?,?,?,?)",
-                        (paciente_id, sala_id, fecha, "hospitalizado")
-                    )
-                    self.conn.commit()
-            except Exception:
-                pass
+        cc = self.get_cc_por_pid(id_paciente)
+        if res == "OK" and cc:
+            self._encolar("hospitalizacion", cc, sala, fecha, True)
         return res
 
     def registrar_hospitalizacion_sin_sala(self, id_paciente: str, fecha: str, motivo: str) -> str:
         res = super().registrar_hospitalizacion_sin_sala(id_paciente, fecha, motivo)
-        if res == "OK" and self.conn:
-            try:
-                cur = self.conn.cursor()
-                cc = self.get_cc_por_pid(id_paciente)
-                paciente_id = None
-                if cc:
-                    row = cur.execute("SELECT id FROM pacientes WHERE dni=?", (cc,)).fetchone()
-                    paciente_id = row[0] if row else None
-                if paciente_id:
-                    cur.execute(
-                        "INSERT INTO hospitalizaciones (paciente_id, sala_id, fecha_ingreso, estado_paciente) VALUES (?,?,?,?)",
-                        (paciente_id, None, fecha, "hospitalizado")
-                    )
-                    self.conn.commit()
-            except Exception:
-                pass
+        cc = self.get_cc_por_pid(id_paciente)
+        if res == "OK" and cc:
+            self._encolar("hospitalizacion", cc, None, fecha, False)
         return res
 
     def autorizar_hospitalizacion(self, id_paciente: str) -> str:
         res = super().autorizar_hospitalizacion(id_paciente)
-        if res == "OK" and self.conn:
-            try:
-                cur = self.conn.cursor()
-                cc = self.get_cc_por_pid(id_paciente)
-                if cc:
-                    row = cur.execute("SELECT id FROM pacientes WHERE dni=?", (cc,)).fetchone()
-                    pid = row[0] if row else None
-                    if pid:
-                        cur.execute(
-                            "UPDATE hospitalizaciones SET estado_paciente=? WHERE paciente_id=?",
-                            ("hospitalización autorizada", pid)
-                        )
-                        self.conn.commit()
-            except Exception:
-                pass
+        cc = self.get_cc_por_pid(id_paciente)
+        if res == "OK" and cc:
+            self._encolar("autorizacion", cc, "hospitalización autorizada")
         return res
 
 # Repositorio global conectado a BD
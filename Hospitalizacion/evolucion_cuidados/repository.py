@@ -3,6 +3,9 @@ import sqlite3
 from core.database import crear_conexion, inicializar_db
 from datetime import datetime
 
+# Evoluciones del paciente (core/diagnostico verifica su plan)
+SQL_EVOLUCIONES_PACIENTE = "SELECT id, paciente_dni, nota, fecha FROM evoluciones WHERE paciente_dni=? ORDER BY fecha DESC"
+
 
 class EvolucionRepository:
     def __init__(self):
@@ -10,30 +13,8 @@ class EvolucionRepository:
             inicializar_db()
         except Exception:
             pass
+        # Las tablas del módulo se crean en core/database.py (inicializar_db)
         self.conn = crear_conexion()
-        self._ensure_table()
-
-    def _ensure_table(self):
-        if not self.conn:
-            return
-        cur = self.conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS evoluciones (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                paciente_dni TEXT,
-                nota TEXT,
-                fecha TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS cuidados (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                paciente_dni TEXT,
-                datos TEXT,
-                fecha TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        self.conn.commit()
 
     def registrar_evolucion(self, paciente_dni: str, nota: str) -> bool:
         if not self.conn:
@@ -51,7 +32,7 @@ class EvolucionRepository:
         if not self.conn:
             return []
         cur = self.conn.cursor()
-        rows = cur.execute("SELECT id, paciente_dni, nota, fecha FROM evoluciones WHERE paciente_dni=? ORDER BY fecha DESC", (paciente_dni,)).fetchall()
+        rows = cur.execute(SQL_EVOLUCIONES_PACIENTE, (paciente_dni,)).fetchall()
         return [{"id": r[0], "paciente_dni": r[1], "nota": r[2], "fecha": r[3]} for r in rows]
 
 
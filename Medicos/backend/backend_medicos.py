@@ -1,92 +1,175 @@
 # Medicos/backend/backend_medicos.py
 
+import json
 import sqlite3
-import os
+from core.database import crear_conexion, normalizar_nombre, session
+
+# Listados paginados (core/diagnostico verifica sus planes). {orden} es
+# "id" o "+id" y {condiciones} lo que arma filtros_medicos()
+SQL_PAGINA = "SELECT * FROM medicos WHERE {orden} > ?{condiciones} ORDER BY {orden} LIMIT ? OFFSET ?"
+SQL_PAGINA_ANTERIOR = "SELECT * FROM medicos WHERE {orden} < ?{condiciones} ORDER BY {orden} DESC LIMIT ?"
+SQL_CONTAR = "SELECT COUNT(*) FROM medicos WHERE 1=1{condiciones}"
+
+
+def filtros_medicos(buscar, filtro_esp, filtro_est):
+    condiciones = ""
+    params = []
+
+    prefijo = normalizar_nombre(buscar)
+    if prefijo:
+        # Comienzo del nombre o del apellido: rangos sobre los índices de
+        # nombre_normalizado / apellido_normalizado ('ana' -> ['ana', 'anb'))
+        hasta = prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+        condiciones += (" AND ((nombre_normalizado >= ? AND nombre_normalizado < ?)"
+                        " OR (apellido_normalizado >= ? AND apellido_normalizado < ?))")
+        params.extend([prefijo, hasta, prefijo, hasta])
+
+    if filtro_esp and filtro_esp != "Todas las Especialidades":
+        condiciones += " AND especialidad = ?"
+        params.append(filtro_esp)
+
+    if filtro_est and filtro_est != "Todos los Estados":
+        condiciones += " AND estado = ?"
+        params.append(filtro_est)
+
+    return condiciones, params
+
+
+def consulta_pagina(buscar="", filtro_esp="Todas las Especialidades", filtro_est="Todos los Estados",
+                    limite=20, despues_de=0, antes_de=None, desplazamiento=0):
+    """(sql, parámetros) de una página; ver GestorMedicos.obtener_pagina."""
+    condiciones, params = filtros_medicos(buscar, filtro_esp, filtro_est)
+    # Con texto de búsqueda, "+id" impide recorrer la tabla en orden de id
+    # (lento si el nombre es raro): se buscan las coincidencias en los
+    # índices de nombre y solo esas se ordenan.
+    orden = "+id" if normalizar_nombre(buscar) else "id"
+    if antes_de is not None:
+        return (SQL_PAGINA_ANTERIOR.format(orden=orden, condiciones=condiciones),
+                [antes_de, *params, limite])
+    return (SQL_PAGINA.format(orden=orden, condiciones=condiciones),
+            [despues_de, *params, limite, desplazamiento])
+
+
+def consulta_conteo(buscar="", filtro_esp="Todas las Especialidades", filtro_est="Todos los Estados"):
+    """(sql, parámetros) del total de médicos con los filtros dados."""
+    condiciones, params = filtros_medicos(buscar, filtro_esp, filtro_est)
+    return SQL_CONTAR.format(condiciones=condiciones), params
+
 
 class GestorMedicos:
     def __init__(self):
-        # 1. CAMBIO IMPORTANTE: Apuntamos a la base de datos central
-        # Usamos ruta relativa para asegurar que encuentre el archivo en la raíz del proyecto
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.db_name = os.path.join(base_dir, "hospital.db")
-        
-        # Opcional: Ya no llamamos a inicializar_db() aquí forzosamente
-        # porque main.py llama a database.py -> inicializar_db() al arrancar.
+        # La ruta de la base de datos central la define el pool de core/pool.py
+        # (main.py llama a database.py -> inicializar_db() al arrancar).
+        pass
 
     def conectar(self):
-        """Establece conexión con la base de datos central."""
-        return sqlite3.connect(self.db_name)
-
-    # El método inicializar_db se puede conservar como seguridad, 
-    # pero database.py es quien manda ahora.
+        """Obtiene una conexión del pool central (close() la devuelve al pool)."""
+        return crear_conexion()
 
     def registrar_medico(self, cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado):
-        conn = self.conectar()
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-                INSERT INTO medicos (cedula, nombres, apellidos, especialidad, telefono1, telefono2, direccion, estado)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado))
-            conn.commit()
+            with session() as conn:
+                conn.execute('''
+                    INSERT INTO medicos (cedula, nombres, apellidos, especialidad, telefono1, telefono2, direccion, estado)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado))
             return True, "Médico registrado correctamente."
         except sqlite3.IntegrityError:
             # Capturamos si la cédula ya existe (si la pusiste como UNIQUE en la BD)
             return False, "Error: Ya existe un médico con esa cédula."
         except sqlite3.Error as e:
             return False, f"Error al guardar en BD: {e}"
-        finally:
-            conn.close()
+
+    def registrar_medicos_lote(self, filas):
+        """
+        Inserta varios médicos en una sola transacción con executemany.
+        :param filas: Lista de (cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado).
+        :return: (insertados, [(índice en filas, motivo)]) con las filas rechazadas.
+        """
+        rechazadas = []
+        try:
+            with session() as conn:
+                # Cédulas ya registradas (o repetidas en el mismo lote): se rechazan
+                # antes, porque un solo duplicado haría fallar todo el executemany
+                existentes = {c for (c,) in conn.execute(
+                    "SELECT cedula FROM medicos WHERE cedula IN (SELECT value FROM json_each(?))",
+                    (json.dumps([f[0] for f in filas]),)
+                )}
+                nuevas = []
+                for i, fila in enumerate(filas):
+                    if fila[0] in existentes:
+                        rechazadas.append((i, "Ya existe un médico con esa cédula."))
+                        continue
+                    existentes.add(fila[0])
+                    nuevas.append(fila)
+                conn.executemany('''
+                    INSERT INTO medicos (cedula, nombres, apellidos, especialidad, telefono1, telefono2, direccion, estado)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', nuevas)
+            return len(nuevas), rechazadas
+        except sqlite3.Error as e:
+            # La transacción del lote se revirtió completa
+            return 0, [(i, f"Error al guardar en BD: {e}") for i in range(len(filas))]
 
     def obtener_medicos(self, buscar="", filtro_esp="Todas las Especialidades", filtro_est="Todos los Estados"):
-        conn = self.conectar()
-        cursor = conn.cursor()
-        
-        query = "SELECT * FROM medicos WHERE 1=1"
-        params = []
-
-        if buscar:
-            query += " AND (lower(nombres) LIKE ? OR lower(apellidos) LIKE ?)"
-            term = f"%{buscar.lower()}%"
-            params.extend([term, term])
-
-        if filtro_esp and filtro_esp != "Todas las Especialidades":
-            query += " AND especialidad = ?"
-            params.append(filtro_esp)
-
-        if filtro_est and filtro_est != "Todos los Estados":
-            query += " AND estado = ?"
-            params.append(filtro_est)
-
-        cursor.execute(query, params)
-        resultados = cursor.fetchall()
-        conn.close()
-        return resultados
+        condiciones, params = filtros_medicos(buscar, filtro_esp, filtro_est)
+        with session() as conn:
+            return conn.execute(f"SELECT * FROM medicos WHERE 1=1{condiciones}", params).fetchall()
+
+    def obtener_pagina(self, buscar="", filtro_esp="Todas las Especialidades", filtro_est="Todos los Estados",
+                       limite=20, despues_de=0, antes_de=None, desplazamiento=0):
+        """
+        Una página de médicos ordenada por id. Para avanzar o retroceder una
+        página se pasa el id de la última (despues_de) o de la primera
+        (antes_de) fila de la página actual: el costo no depende de qué tan
+        lejos esté la página. desplazamiento (OFFSET) queda para saltos.
+        """
+        sql, params = consulta_pagina(buscar, filtro_esp, filtro_est, limite, despues_de, antes_de, desplazamiento)
+        with session() as conn:
+            filas = conn.execute(sql, params).fetchall()
+        return filas[::-1] if antes_de is not None else filas
+
+    def obtener_medico(self, id_medico):
+        with session() as conn:
+            return conn.execute("SELECT * FROM medicos WHERE id = ?", (id_medico,)).fetchone()
+
+    def contar_medicos(self, buscar="", filtro_esp="Todas las Especialidades", filtro_est="Todos los Estados"):
+        sql, params = consulta_conteo(buscar, filtro_esp, filtro_est)
+        with session() as conn:
+            return conn.execute(sql, params).fetchone()[0]
+
+    def iterar_medicos(self, buscar="", filtro_esp="Todas las Especialidades", filtro_est="Todos los Estados",
+                       tamano_lote=500):
+        """Generador de médicos por lotes (cursor por id), sin traer toda la tabla a memoria."""
+        condiciones, params = filtros_medicos(buscar, filtro_esp, filtro_est)
+        ultimo_id = 0
+        while True:
+            with session() as conn:
+                lote = conn.execute(
+                    f"SELECT * FROM medicos WHERE id > ?{condiciones} ORDER BY id LIMIT ?",
+                    [ultimo_id, *params, tamano_lote]
+                ).fetchall()
+            if not lote:
+                return
+            yield from lote
+            ultimo_id = lote[-1][0]
 
     def actualizar_medico(self, id_medico, cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado):
-        conn = self.conectar()
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-                UPDATE medicos 
-                SET cedula=?, nombres=?, apellidos=?, especialidad=?, telefono1=?, telefono2=?, direccion=?, estado=?
-                WHERE id=?
-            ''', (cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado, id_medico))
-            conn.commit()
+            with session() as conn:
+                conn.execute('''
+                    UPDATE medicos 
+                    SET cedula=?, nombres=?, apellidos=?, especialidad=?, telefono1=?, telefono2=?, direccion=?, estado=?
+                    WHERE id=?
+                ''', (cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado, id_medico))
             return True, "Datos actualizados correctamente."
         except sqlite3.Error as e:
             return False, f"Error al actualizar: {e}"
-        finally:
-            conn.close()
 
     def eliminar_medico(self, id_medico):
-        conn = self.conectar()
-        cursor = conn.cursor()
         try:
-            cursor.execute("DELETE FROM medicos WHERE id=?", (id_medico,))
-            conn.commit()
+            with session() as conn:
+                conn.execute("DELETE FROM medicos WHERE id=?", (id_medico,))
             return True
         except sqlite3.Error:
-            return False
-        finally:
-            conn.close()
\ No newline at end of file
+            return False
\ No newline at end of file
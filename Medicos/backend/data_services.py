@@ -1,58 +1,71 @@
 # Medicos/backend/data_services.py
 
 import csv
+import os
+
+# Cabecera del CSV de médicos (la misma al exportar y al importar)
+COLUMNAS_CSV = ["Cédula", "Nombres", "Apellidos", "Especialidad", "Tel 1", "Tel 2", "Dirección", "Estado"]
+
 
 class ServicioDatos:
     @staticmethod
-    def exportar_csv(archivo_path, datos, columnas):
+    def exportar_csv(archivo_path, filas, total=None, progreso=None):
         """
-        Escribe los datos en un archivo CSV.
+        Escribe los médicos en un archivo CSV a medida que llegan.
         :param archivo_path: Ruta del archivo.
-        :param datos: Lista de tuplas/listas con los datos de la BD.
-        :param columnas: Lista de nombres de columnas para la cabecera.
+        :param filas: Iterable (p.ej. generador) de filas de la tabla medicos:
+                      (id, cedula, nombres, apellidos, especialidad, tel1, tel2, direccion, estado).
+        :param total: Cantidad esperada de filas, para informar el avance.
+        :param progreso: Función opcional que recibe el porcentaje (0-100).
         :return: (True, "Mensaje") o (False, "Error")
         """
         try:
-            # Excluímos la columna 'Acciones' si viene en la lista de columnas UI
-            headers = [c for c in columnas if c != "Acciones"]
-            
+            escritas = 0
             with open(archivo_path, mode='w', newline='', encoding='utf-8') as f:
                 writer = csv.writer(f)
-                writer.writerow(headers)
-                
-                # datos viene como [(id, nombre, ...), ...]
-                # Asumimos que la posición 0 es ID y no la queremos en el CSV, 
-                # o ajustamos según lo que retorne tu BD.
-                # Si tu BD retorna (id, nombre, apellido...), escribimos desde index 1
-                for row in datos:
-                    writer.writerow(row[1:]) 
-            return True, "Datos exportados correctamente."
+                writer.writerow(COLUMNAS_CSV)
+                for row in filas:
+                    # La posición 0 es el ID de la BD y no va en el CSV
+                    writer.writerow(["" if v is None else v for v in row[1:9]])
+                    escritas += 1
+                    if progreso and total and escritas % 500 == 0:
+                        progreso(min(99, escritas * 100 // total))
+            if progreso:
+                progreso(100)
+            return True, f"{escritas} médicos exportados correctamente."
         except Exception as e:
             return False, f"Error al exportar: {e}"
 
     @staticmethod
-    def importar_csv(archivo_path):
+    def leer_csv(archivo_path, progreso=None):
         """
-        Lee un CSV y retorna una lista de filas limpias.
-        :return: (lista_filas, mensaje_error)
+        Generador de (número de línea, fila) que lee el CSV línea a línea,
+        sin cargarlo en memoria. Lanza ValueError si la cabecera no es
+        COLUMNAS_CSV. `progreso` recibe el porcentaje leído del archivo.
         """
-        headers_esperados = ["Nombres", "Apellidos", "Especialidad", "Tel 1", "Tel 2", "Dirección", "Estado"]
-        filas_leidas = []
-        
-        try:
-            with open(archivo_path, mode='r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                cabecera = next(reader, None)
-                
-                # Validación básica de cabecera
-                if not cabecera or cabecera != headers_esperados:
-                    return None, f"El formato del CSV es incorrecto.\nSe esperaban: {headers_esperados}"
-                
-                for row in reader:
-                    # Filtramos filas vacías
-                    if row and len(row) >= 7:
-                        filas_leidas.append(row)
-                        
-            return filas_leidas, None
-        except Exception as e:
-            return None, f"Error al leer archivo: {e}"
\ No newline at end of file
+        tamano = os.path.getsize(archivo_path) or 1
+
+        def lineas(f):
+            # Avance por caracteres leídos (aprox. bytes), avisando solo cuando cambia
+            leidos, ultimo = 0, -1
+            for linea in f:
+                leidos += len(linea)
+                if progreso:
+                    porcentaje = min(99, leidos * 100 // tamano)
+                    if porcentaje != ultimo:
+                        ultimo = porcentaje
+                        progreso(porcentaje)
+                yield linea
+
+        with open(archivo_path, mode='r', newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(lineas(f))
+            cabecera = next(reader, None)
+            # Validación básica de cabecera
+            if not cabecera or [c.strip() for c in cabecera] != COLUMNAS_CSV:
+                raise ValueError(f"El formato del CSV es incorrecto.\nSe esperaban: {COLUMNAS_CSV}")
+            for row in reader:
+                # Filtramos filas vacías
+                if any(c.strip() for c in row):
+                    yield reader.line_num, row
+        if progreso:
+            progreso(100)
@@ -11,6 +11,8 @@ class LogicaMedicos:
         self.pagina_actual = 1
         self.total_paginas = 1
         self.filas_por_pagina = 20
+        self.filtros = ("", "", "")  # (buscar, especialidad, estado) de la última búsqueda
+        self.tamano_lote = 500       # filas por transacción al importar
 
     def _validar_cedula_ecuador(self, cedula):
         """
@@ -96,26 +98,84 @@ class LogicaMedicos:
     def eliminar_medico(self, id_medico):
         return self.db.eliminar_medico(id_medico)
 
+    def importar_medicos(self, filas, detener=None):
+        """
+        Valida y registra médicos desde un iterable de (línea, fila CSV), en
+        lotes de tamano_lote por transacción (executemany). Nunca guarda el
+        archivo completo en memoria: como mucho un lote.
+        :param detener: Función opcional; si retorna True se deja de leer.
+        :return: (importados, [(línea, motivo)] con cada fila rechazada)
+        """
+        importados, errores, lote = 0, [], []
+
+        def guardar():
+            nonlocal importados
+            insertados, rechazadas = self.db.registrar_medicos_lote([fila for _, fila in lote])
+            importados += insertados
+            errores.extend((lote[i][0], motivo) for i, motivo in rechazadas)
+            lote.clear()
+
+        for linea, row in filas:
+            if detener and detener():
+                break
+            if len(row) < 8:
+                errores.append((linea, f"Se esperaban 8 columnas y hay {len(row)}."))
+                continue
+            fila = tuple(c.strip() for c in row[:8])
+            # (cedula, nombres, apellidos, esp, tel1, tel2, dir, est)
+            es_valido, msg = self._validar_comun(*fila[:6], fila[7])
+            if not es_valido:
+                errores.append((linea, msg))
+                continue
+            lote.append((linea, fila))
+            if len(lote) >= self.tamano_lote:
+                guardar()
+        if lote:
+            guardar()
+        return importados, errores
+
+    def contar_resultados(self):
+        """Cantidad de médicos que cumplen los filtros de la última búsqueda."""
+        return self.db.contar_medicos(*self.filtros)
+
+    def iterar_resultados(self):
+        """Médicos de la última búsqueda, por lotes desde la BD (para exportar)."""
+        return self.db.iterar_medicos(*self.filtros)
+
     def actualizar_busqueda(self, buscar="", filtro_esp="", filtro_est=""):
-        self.datos_cache = self.db.obtener_medicos(buscar, filtro_esp, filtro_est)
-        total_items = len(self.datos_cache)
+        self.filtros = (buscar, filtro_esp, filtro_est)
+        # El total se cuenta una vez por búsqueda; cambiar de página no lo recalcula
+        total_items = self.db.contar_medicos(*self.filtros)
         self.total_paginas = 1 if total_items == 0 else math.ceil(total_items / self.filas_por_pagina)
         self.pagina_actual = 1
+        # datos_cache guarda solo la página visible
+        self.datos_cache = self.db.obtener_pagina(*self.filtros, limite=self.filas_por_pagina)
 
     def obtener_pagina_actual_items(self):
-        inicio = (self.pagina_actual - 1) * self.filas_por_pagina
-        fin = inicio + self.filas_por_pagina
-        return self.datos_cache[inicio:fin]
+        return self.datos_cache
 
     def cambiar_pagina(self, delta):
         nueva_pagina = self.pagina_actual + delta
-        if 1 <= nueva_pagina <= self.total_paginas:
-            self.pagina_actual = nueva_pagina
-            return True
-        return False
+        if not 1 <= nueva_pagina <= self.total_paginas:
+            return False
+        # Página contigua: se continúa desde el id del borde de la página actual
+        if delta == 1 and self.datos_cache:
+            pagina = self.db.obtener_pagina(*self.filtros, limite=self.filas_por_pagina,
+                                            despues_de=self.datos_cache[-1][0])
+        elif delta == -1 and self.datos_cache:
+            pagina = self.db.obtener_pagina(*self.filtros, limite=self.filas_por_pagina,
+                                            antes_de=self.datos_cache[0][0])
+        else:
+            pagina = self.db.obtener_pagina(*self.filtros, limite=self.filas_por_pagina,
+                                            desplazamiento=(nueva_pagina - 1) * self.filas_por_pagina)
+        if not pagina:
+            return False
+        self.datos_cache = pagina
+        self.pagina_actual = nueva_pagina
+        return True
 
     def get_info_paginacion(self):
         return self.pagina_actual, self.total_paginas
 
-    def obtener_todos_sin_paginar(self):
-        return self.datos_cache
\ No newline at end of file
+    def obtener_medico(self, id_medico):
+        return self.db.obtener_medico(id_medico)
\ No newline at end of file
@@ -1,18 +1,42 @@
 # Medicos/frontend/pages/consultar_page.py
 
 import re
+from itertools import takewhile
 from PyQt6.QtWidgets import (
     QAbstractItemView, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QComboBox, QPushButton, QFrame, QTableWidget, QTableWidgetItem, 
-    QHeaderView, QMessageBox, QMenu, QStackedWidget, QFormLayout, QFileDialog
+    QComboBox, QPushButton, QFrame, QTableView,
+    QHeaderView, QMessageBox, QMenu, QStackedWidget, QFormLayout, QFileDialog, QProgressDialog
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt6.QtGui import QAction
 
 from Medicos.backend.logic_medicos import LogicaMedicos
 from Medicos.backend.data_services import ServicioDatos
 import core.theme as theme
 import core.utils as utils
+from core.tabla_virtual import ModeloTablaVirtual
+
+
+class TareaCSV(QThread):
+    """
+    Ejecuta una importación o exportación fuera del hilo de la interfaz.
+    `funcion(progreso, detener)` recibe una función para informar el
+    porcentaje y otra que indica si el usuario canceló.
+    """
+    progreso = pyqtSignal(int)
+    terminado = pyqtSignal(object)  # resultado de la función o la excepción
+
+    def __init__(self, funcion, parent=None):
+        super().__init__(parent)
+        self.funcion = funcion
+
+    def run(self):
+        try:
+            resultado = self.funcion(self.progreso.emit, self.isInterruptionRequested)
+        except Exception as e:
+            resultado = e
+        self.terminado.emit(resultado)
+
 
 class WidgetConsultar(QWidget):
     def __init__(self):
@@ -20,6 +44,7 @@ class WidgetConsultar(QWidget):
         self.logic = LogicaMedicos()
         self.data_service = ServicioDatos()
         self.id_seleccionado = None
+        self.tarea = None  # importación/exportación en curso
 
         # --- LAYOUT PRINCIPAL ---
         self.main_layout = QVBoxLayout(self)
@@ -85,31 +110,30 @@ class WidgetConsultar(QWidget):
         self.btn_toggle_panel.setStyleSheet(theme.STYLES["btn_icon_ghost"])
         self.btn_toggle_panel.clicked.connect(self.toggle_side_panel)
 
-        btn_import = QPushButton(" Importar")
-        btn_import.setIcon(utils.get_icon("upload.svg", color=theme.AppPalette.black_02))
-        btn_import.setStyleSheet(theme.STYLES["btn_icon_ghost"])
-        btn_import.clicked.connect(self.manejar_importacion)
+        self.btn_import = QPushButton(" Importar")
+        self.btn_import.setIcon(utils.get_icon("upload.svg", color=theme.AppPalette.black_02))
+        self.btn_import.setStyleSheet(theme.STYLES["btn_icon_ghost"])
+        self.btn_import.clicked.connect(self.manejar_importacion)
 
-        btn_export = QPushButton(" Exportar CSV")
-        btn_export.setIcon(utils.get_icon("download.svg", color="white"))
-        btn_export.setStyleSheet(theme.STYLES["btn_primary"])
-        btn_export.clicked.connect(self.manejar_exportacion)
+        self.btn_export = QPushButton(" Exportar CSV")
+        self.btn_export.setIcon(utils.get_icon("download.svg", color="white"))
+        self.btn_export.setStyleSheet(theme.STYLES["btn_primary"])
+        self.btn_export.clicked.connect(self.manejar_exportacion)
 
         header_layout.addWidget(lbl_titulo)
         header_layout.addStretch()
-        header_layout.addWidget(btn_import)
-        header_layout.addWidget(btn_export)
+        header_layout.addWidget(self.btn_import)
+        header_layout.addWidget(self.btn_export)
         header_layout.addWidget(self.btn_toggle_panel)
 
         self.main_layout.addWidget(header_frame)
 
     def setup_tabla(self, layout):
-        self.tabla = QTableWidget()
-        
         # Columnas
         self.columnas = ["Cédula", "Nombres", "Apellidos", "Especialidad", "Teléfono", "Tel. Alt.", "Estado", "Acciones"]
-        self.tabla.setColumnCount(len(self.columnas))
-        self.tabla.setHorizontalHeaderLabels(self.columnas)
+        self.modelo = ModeloTablaVirtual(self.columnas, parent=self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         self.tabla.verticalHeader().setVisible(False)
         
         # =======================================================
@@ -196,7 +220,12 @@ class WidgetConsultar(QWidget):
         layout.addWidget(QLabel("Buscar:"))
         self.txt_buscar = QLineEdit()
         self.txt_buscar.setPlaceholderText("Nombre o Apellido...")
-        self.txt_buscar.textChanged.connect(self.cargar_datos)
+        # La búsqueda se lanza cuando se deja de escribir, no con cada tecla
+        self.timer_busqueda = QTimer(self)
+        self.timer_busqueda.setSingleShot(True)
+        self.timer_busqueda.setInterval(300)
+        self.timer_busqueda.timeout.connect(self.cargar_datos)
+        self.txt_buscar.textChanged.connect(self.timer_busqueda.start)
         layout.addWidget(self.txt_buscar)
 
         layout.addWidget(QLabel("Especialidad:"))
@@ -301,6 +330,7 @@ class WidgetConsultar(QWidget):
         self.stack_lateral.setCurrentIndex(0)
 
     def cargar_datos(self):
+        self.timer_busqueda.stop()
         self.logic.actualizar_busqueda(
             buscar=self.txt_buscar.text(), 
             filtro_esp=self.filtro_esp.currentText(),
@@ -313,40 +343,20 @@ class WidgetConsultar(QWidget):
             self.mostrar_pagina_actual()
 
     def mostrar_pagina_actual(self):
-        self.tabla.setRowCount(0)
         datos_pagina = self.logic.obtener_pagina_actual_items()
-        
+
+        # Fila de medicos: (id, cedula, nombres, apellidos, especialidad,
+        #                   telefono1, telefono2, direccion, estado)
+        # Orden columnas: [Cédula, Nombres, Apellidos, Especialidad, Teléfono, Tel. Alt., Estado, Acciones]
+        # El ID va como columna extra (oculta) al final de cada tupla
+        self.modelo.cargar(
+            (row[1], row[2], row[3], row[4], row[5], row[6] or "", row[8], "", row[0])
+            for row in datos_pagina
+        )
+
+        # El botón de acciones va en la última columna (solo las filas de la página actual)
         for i, row in enumerate(datos_pagina):
-            self.tabla.insertRow(i)
-            
-            # Mapeo correcto basado en la nueva estructura (9 columnas)
-            id_medico = row[0]
-            cedula = row[1]
-            nombres = row[2]
-            apellidos = row[3]
-            especialidad = row[4]
-            tel1 = row[5]
-            tel2 = row[6] if row[6] else "" # Validación por si es None
-            # direccion = row[7] (No la mostramos en tabla, pero existe)
-            estado = row[7]
-
-            # Lista visual para las columnas de la tabla
-            # Orden columnas: [Cédula, Nombres, Apellidos, Especialidad, Teléfono, Tel. Alt., Estado, Acciones]
-            valores_visuales = [cedula, nombres, apellidos, especialidad, tel1, tel2, estado]
-
-            for col_idx, valor in enumerate(valores_visuales):
-                item = QTableWidgetItem(str(valor))
-                item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft)
-                
-                # Guardamos el ID oculto en la columna 0
-                if col_idx == 0: 
-                    item.setData(Qt.ItemDataRole.UserRole, id_medico)
-                
-                self.tabla.setItem(i, col_idx, item)
-            
-            # El botón de acciones va en la última columna (índice 7 si hay 8 columnas en total)
-            indice_acciones = len(self.columnas) - 1
-            self.crear_boton_acciones(i, id_medico, f"{nombres} {apellidos}")
+            self.crear_boton_acciones(i, row[0], f"{row[2]} {row[3]}")
 
         # Actualizar UI paginación
         pag, total = self.logic.get_info_paginacion()
@@ -411,13 +421,11 @@ class WidgetConsultar(QWidget):
         layout.setAlignment(Qt.AlignmentFlag.AlignCenter) # Centrar los botones en la celda
 
         # Insertar en la columna correcta (la última)
-        indice_acciones = self.tabla.columnCount() - 1
-        self.tabla.setCellWidget(row, indice_acciones, container)
+        indice_acciones = len(self.columnas) - 1
+        self.tabla.setIndexWidget(self.modelo.index(row, indice_acciones), container)
 
     def cargar_formulario_en_panel(self, id_medico):
-        filas = self.logic.obtener_todos_sin_paginar()
-        medico = next((m for m in filas if m[0] == id_medico), None)
-        
+        medico = self.logic.obtener_medico(id_medico)
         if not medico: return
         self.id_seleccionado = id_medico
         
@@ -472,34 +480,78 @@ class WidgetConsultar(QWidget):
     def manejar_exportacion(self):
         archivo, _ = QFileDialog.getSaveFileName(self, "Guardar Médicos", "", "Archivos CSV (*.csv)")
         if not archivo: return
-        
-        datos = self.logic.obtener_todos_sin_paginar()
-        exito, msg = self.data_service.exportar_csv(archivo, datos, self.columnas)
+
+        # Se exporta la búsqueda actual leyendo la BD por lotes en el hilo de trabajo
+        filas = self.logic.iterar_resultados()
+        total = self.logic.contar_resultados()
+
+        def exportar(progreso, detener):
+            resultado = self.data_service.exportar_csv(
+                archivo, takewhile(lambda _: not detener(), filas), total, progreso
+            )
+            return (False, "Exportación cancelada; el archivo quedó incompleto.") if detener() else resultado
+
+        self.iniciar_tarea("Exportando médicos...", exportar, self.fin_exportacion)
+
+    def fin_exportacion(self, resultado):
+        exito, msg = resultado
         if exito:
             QMessageBox.information(self, "Exportar", msg)
         else:
             QMessageBox.critical(self, "Error", msg)
-            
+
     def manejar_importacion(self):
         archivo, _ = QFileDialog.getOpenFileName(self, "Importar Médicos", "", "Archivos CSV (*.csv)")
         if not archivo: return
-        
-        filas, error = self.data_service.importar_csv(archivo)
-        if error:
-            QMessageBox.warning(self, "Error", error)
-            return
 
-        exitos = 0
-        errores = 0
-        for row in filas:
-            ok, _ = self.logic.crear_medico(
-                row[0], row[1], row[2], row[3], row[4], row[5], row[6]
-            )
-            if ok: exitos += 1
-            else: errores += 1
-            
+        def importar(progreso, detener):
+            return self.logic.importar_medicos(self.data_service.leer_csv(archivo, progreso), detener)
+
+        self.iniciar_tarea("Importando médicos...", importar, self.fin_importacion)
+
+    def fin_importacion(self, resultado):
+        exitos, errores = resultado
         self.cargar_datos()
-        QMessageBox.information(self, "Importación", f"Proceso finalizado.\nImportados: {exitos}\nFallidos: {errores}")
+        aviso = QMessageBox(self)
+        aviso.setWindowTitle("Importación")
+        aviso.setText(f"Proceso finalizado.\nImportados: {exitos}\nFallidos: {len(errores)}")
+        if errores:
+            # Detalle por línea del CSV (los primeros, para no saturar el diálogo)
+            detalle = [f"Línea {linea}: {motivo}" for linea, motivo in errores[:500]]
+            if len(errores) > 500:
+                detalle.append(f"... y {len(errores) - 500} más")
+            aviso.setDetailedText("\n".join(detalle))
+        aviso.exec()
+
+    def iniciar_tarea(self, titulo, funcion, al_terminar):
+        """Corre `funcion` en un TareaCSV con un diálogo de progreso cancelable."""
+        if self.tarea is not None and self.tarea.isRunning():
+            return
+        self.btn_import.setEnabled(False)
+        self.btn_export.setEnabled(False)
+
+        dialogo = QProgressDialog(titulo, "Cancelar", 0, 100, self)
+        dialogo.setWindowTitle("Médicos")
+        dialogo.setWindowModality(Qt.WindowModality.WindowModal)
+        dialogo.setMinimumDuration(300)  # no parpadea en archivos pequeños
+        dialogo.setAutoClose(False)
+        dialogo.setAutoReset(False)
+
+        self.tarea = TareaCSV(funcion, self)
+        self.tarea.progreso.connect(dialogo.setValue)
+        dialogo.canceled.connect(self.tarea.requestInterruption)
+
+        def terminado(resultado):
+            dialogo.close()
+            self.btn_import.setEnabled(True)
+            self.btn_export.setEnabled(True)
+            if isinstance(resultado, Exception):
+                QMessageBox.warning(self, "Error", str(resultado))
+            else:
+                al_terminar(resultado)
+
+        self.tarea.terminado.connect(terminado)
+        self.tarea.start()
 
     def validar_numeros_visual(self, widget):
         texto = widget.text()
@@ -0,0 +1,87 @@
+"""
+Búsqueda indexada de pacientes por cédula, nombres y apellidos.
+
+Usa la tabla FTS5 pacientes_fts (migración 6), que los triggers de la BD
+mantienen sincronizada en cada registro, actualización o eliminación de
+pacientes. Cada palabra escrita se busca como prefijo, sin distinguir
+mayúsculas ni tildes, y los resultados vuelven ordenados por relevancia.
+Un texto de solo dígitos es un prefijo de cédula y va directo al índice
+único de pacientes.dni (un rango), sin pasar por el ranking.
+"""
+import re
+from typing import List, Optional
+
+from core.database import session
+
+# Resultados máximos por búsqueda
+LIMITE = 100
+
+# Criterio de los combos de búsqueda -> columna del índice (None = todas)
+COLUMNAS = {"Cédula": "dni", "Nombre": "nombres", "Apellido": "apellidos"}
+
+# Peso de cada columna en bm25 (dni, nombres, apellidos): una cédula que
+# coincide pesa más que un nombre común
+PESOS = (4.0, 1.0, 1.0)
+
+_PALABRA = re.compile(r"\w+")
+
+
+def construir_consulta(texto: str, criterio: Optional[str] = None) -> str:
+    """
+    Convierte el texto del buscador en una expresión MATCH de FTS5.
+    "ana pe" -> '"ana"* AND "pe"*'. Se descarta la puntuación, así el
+    texto del usuario nunca se interpreta como sintaxis de FTS5.
+    """
+    palabras = _PALABRA.findall(texto or "")
+    if not palabras:
+        return ""
+    expresion = " AND ".join(f'"{p}"*' for p in palabras)
+    columna = COLUMNAS.get(criterio)
+    return f"{columna} : ({expresion})" if columna else expresion
+
+
+CAMPOS_PACIENTE = """p.dni, p.nombres, p.apellidos, p.direccion, p.telefono,
+                   p.email, p.telefono_referencia, p.fecha_nacimiento"""
+
+
+# Prefijo de cédula: rango sobre el índice único de pacientes.dni
+SQL_PREFIJO_CEDULA = f"""
+    SELECT {CAMPOS_PACIENTE} FROM pacientes p
+    WHERE p.dni >= ? AND p.dni < ?
+    ORDER BY p.dni
+    LIMIT ? OFFSET ?
+"""
+
+SQL_TEXTO_COMPLETO = f"""
+    SELECT {CAMPOS_PACIENTE}
+    FROM pacientes_fts f
+    JOIN pacientes p ON p.id = f.rowid
+    WHERE pacientes_fts MATCH ?
+    ORDER BY bm25(pacientes_fts, {', '.join(map(str, PESOS))}), p.apellidos, p.nombres
+    LIMIT ? OFFSET ?
+"""
+
+
+def _rango_prefijo(prefijo: str) -> tuple:
+    """('170', '171'): todas las cadenas que empiezan con el prefijo quedan en [desde, hasta)."""
+    return prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
+
+def buscar_pacientes(texto: str, criterio: Optional[str] = None, limite: int = LIMITE,
+                     desde: int = 0) -> List[tuple]:
+    """
+    Retorna hasta `limite` filas (dni, nombres, apellidos, direccion,
+    telefono, email, telefono_referencia, fecha_nacimiento) que coinciden
+    con `texto`, de la más a la menos relevante, saltando las `desde`
+    primeras (páginas siguientes). Texto vacío = lista vacía.
+    """
+    texto = (texto or "").strip()
+    if texto.isdigit() and criterio in (None, "Todo", "Cédula"):
+        with session() as conn:
+            return conn.execute(SQL_PREFIJO_CEDULA, (*_rango_prefijo(texto), limite, desde)).fetchall()
+
+    consulta = construir_consulta(texto, criterio)
+    if not consulta:
+        return []
+    with session() as conn:
+        return conn.execute(SQL_TEXTO_COMPLETO, (consulta, limite, desde)).fetchall()
@@ -2,9 +2,10 @@ from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
     QPushButton, QLineEdit, QLabel, QMessageBox,
     QGroupBox, QTextEdit, QTabWidget, QWidget,
-    QTableWidget, QTableWidgetItem, QHeaderView, QComboBox
+    QTableView, QHeaderView, QComboBox
 )
 from PyQt6.QtCore import Qt
+from core.tabla_virtual import ModeloTablaVirtual, ProxyTablaVirtual
 from ..paciente_controller import PacienteController
 from .submenu_actualizar_dialog import VentanaOpcionesActualizar
 from .actualizar_datos_dialog import ActualizarDatosDialog
@@ -117,18 +118,18 @@ class ConsultarPacienteDialog(QDialog):
                 background-color: white;
                 font-size: 14px;
             }
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 border: 2px solid #3182ce;
                 border-radius: 8px;
                 gridline-color: #e2e8f0;
                 font-size: 13px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 color: #2d3748;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #3182ce;
                 color: white;
             }
@@ -188,14 +189,17 @@ class ConsultarPacienteDialog(QDialog):
         group_tabla = QGroupBox("Pacientes Registrados")
         tabla_layout = QVBoxLayout()
 
-        self.tabla_pacientes = QTableWidget()
-        self.tabla_pacientes.setColumnCount(5)
-        self.tabla_pacientes.setHorizontalHeaderLabels([
+        # Modelo virtual: solo se pintan las filas visibles
+        self.modelo_pacientes = ModeloTablaVirtual([
             "Cédula", "Nombre", "Apellido", "Teléfono", "Email"
         ])
-        self.tabla_pacientes.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.tabla_pacientes.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.tabla_pacientes.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.proxy_pacientes = ProxyTablaVirtual(self.modelo_pacientes)
+        self.tabla_pacientes = QTableView()
+        self.tabla_pacientes.setModel(self.proxy_pacientes)
+        self.tabla_pacientes.setSortingEnabled(True)
+        self.tabla_pacientes.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.tabla_pacientes.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.tabla_pacientes.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
         self.tabla_pacientes.doubleClicked.connect(self.abrir_detalle_paciente)
 
         # Ajustar columnas
@@ -253,45 +257,21 @@ class ConsultarPacienteDialog(QDialog):
 
     def mostrar_pacientes(self, pacientes):
         """Muestra la lista de pacientes en la tabla."""
-        self.tabla_pacientes.setRowCount(0)
-
-        for paciente in pacientes:
-            row = self.tabla_pacientes.rowCount()
-            self.tabla_pacientes.insertRow(row)
-
-            self.tabla_pacientes.setItem(row, 0, QTableWidgetItem(paciente.cc))
-            self.tabla_pacientes.setItem(row, 1, QTableWidgetItem(paciente.nombre))
-            self.tabla_pacientes.setItem(row, 2, QTableWidgetItem(paciente.apellido))
-            self.tabla_pacientes.setItem(row, 3, QTableWidgetItem(paciente.telefono or ""))
-            self.tabla_pacientes.setItem(row, 4, QTableWidgetItem(paciente.email or ""))
+        self.modelo_pacientes.cargar(
+            (p.cc, p.nombre, p.apellido, p.telefono or "", p.email or "")
+            for p in pacientes
+        )
 
     def filtrar_pacientes(self):
         """Filtra los pacientes según el criterio de búsqueda."""
-        texto = self.txt_buscar.text().strip().lower()
-        tipo = self.cmb_tipo_busqueda.currentText()
-
+        texto = self.txt_buscar.text().strip()
         if not texto:
             self.mostrar_pacientes(self.pacientes_lista)
             return
 
-        pacientes_filtrados = []
-        for paciente in self.pacientes_lista:
-            if tipo == "Cédula":
-                if texto in paciente.cc.lower():
-                    pacientes_filtrados.append(paciente)
-            elif tipo == "Nombre":
-                if texto in paciente.nombre.lower():
-                    pacientes_filtrados.append(paciente)
-            elif tipo == "Apellido":
-                if texto in paciente.apellido.lower():
-                    pacientes_filtrados.append(paciente)
-            else:  # Todo
-                if (texto in paciente.cc.lower() or
-                    texto in paciente.nombre.lower() or
-                    texto in paciente.apellido.lower()):
-                    pacientes_filtrados.append(paciente)
-
-        self.mostrar_pacientes(pacientes_filtrados)
+        # Búsqueda indexada en la BD: prefijos, sin tildes, por relevancia
+        tipo = self.cmb_tipo_busqueda.currentText()
+        self.mostrar_pacientes(self.controller.buscar_pacientes(texto, tipo))
 
     def limpiar_busqueda(self):
         """Limpia el campo de búsqueda y muestra todos los pacientes."""
@@ -301,14 +281,12 @@ class ConsultarPacienteDialog(QDialog):
 
     def eliminar_paciente(self):
         """Elimina el paciente seleccionado de la tabla."""
-        row = self.tabla_pacientes.currentRow()
-        if row < 0:
+        fila = self.proxy_pacientes.fila_actual(self.tabla_pacientes)
+        if fila is None:
             QMessageBox.warning(self, "Advertencia", "Seleccione un paciente de la tabla")
             return
 
-        cc = self.tabla_pacientes.item(row, 0).text()
-        nombre = self.tabla_pacientes.item(row, 1).text()
-        apellido = self.tabla_pacientes.item(row, 2).text()
+        cc, nombre, apellido = fila[:3]
 
         # Confirmar eliminación
         respuesta = QMessageBox.question(
@@ -333,12 +311,12 @@ class ConsultarPacienteDialog(QDialog):
 
     def abrir_detalle_paciente(self):
         """Abre la ventana de detalle del paciente seleccionado."""
-        row = self.tabla_pacientes.currentRow()
-        if row < 0:
+        fila = self.proxy_pacientes.fila_actual(self.tabla_pacientes)
+        if fila is None:
             QMessageBox.warning(self, "Advertencia", "Seleccione un paciente de la tabla")
             return
 
-        cc = self.tabla_pacientes.item(row, 0).text()
+        cc = fila[0]
         paciente = self.controller.consultar_paciente(cc)
 
         if paciente:
@@ -351,12 +329,12 @@ class ConsultarPacienteDialog(QDialog):
 
     def modificar_datos_paciente(self):
         """Abre la ventana para modificar datos del paciente seleccionado."""
-        row = self.tabla_pacientes.currentRow()
-        if row < 0:
+        fila = self.proxy_pacientes.fila_actual(self.tabla_pacientes)
+        if fila is None:
             QMessageBox.warning(self, "Advertencia", "Seleccione un paciente de la tabla")
             return
 
-        cc = self.tabla_pacientes.item(row, 0).text()
+        cc = fila[0]
         paciente = self.controller.consultar_paciente(cc)
 
         if paciente:
@@ -0,0 +1,87 @@
+"""
+Eliminación en cascada de pacientes.
+
+PLAN_ELIMINACION declara, del dependiente más profundo al paciente, qué
+filas de cada tabla pertenecen a los pacientes marcados en la tabla
+temporal baja_pacientes (id, dni). Se ejecuta completo dentro de una sola
+transacción: o se borra el paciente con todo lo suyo o no se borra nada.
+Con una o con miles de cédulas cuesta las mismas sentencias (una por tabla).
+Al agregar una tabla que guarde datos del paciente, agregarla aquí.
+"""
+from typing import Iterable
+
+from core.database import session
+
+# Pacientes marcados para la baja (una tabla temporal por conexión)
+SQL_CREAR_BAJA = "CREATE TEMP TABLE IF NOT EXISTS baja_pacientes (id INTEGER PRIMARY KEY, dni TEXT NOT NULL)"
+
+_IDS = "SELECT id FROM temp.baja_pacientes"
+_CEDULAS = "SELECT dni FROM temp.baja_pacientes"
+_CONSULTAS = f"SELECT id FROM consultas WHERE paciente_id IN ({_IDS})"
+_RECETAS = f"SELECT id FROM recetas WHERE consulta_id IN ({_CONSULTAS})"
+_NOTIFICACIONES = f"SELECT id FROM notificaciones WHERE destinatario IN ({_CEDULAS})"
+
+# (tabla, condición WHERE). El orden respeta las llaves foráneas (activas en el pool)
+PLAN_ELIMINACION = (
+    ("outbox_notificaciones", f"notificacion_id IN ({_NOTIFICACIONES})"),
+    ("notificaciones", f"destinatario IN ({_CEDULAS})"),
+    ("entregas", f"paciente_id IN ({_IDS}) OR receta_id IN ({_RECETAS})"),
+    ("recetas", f"consulta_id IN ({_CONSULTAS})"),
+    ("ordenes_servicio", f"consulta_id IN ({_CONSULTAS})"),
+    ("consultas", f"paciente_id IN ({_IDS})"),
+    ("hospitalizaciones", f"paciente_id IN ({_IDS})"),
+    ("citas", f"cc_paciente IN ({_CEDULAS})"),
+    ("pacienteSignosVitales", f"cedula IN ({_CEDULAS})"),
+    ("evoluciones", f"paciente_dni IN ({_CEDULAS})"),
+    ("cuidados", f"paciente_dni IN ({_CEDULAS})"),
+    ("permisos_visita", f"cedula_paciente IN ({_CEDULAS})"),
+    ("anamnesis", f"paciente_dni IN ({_CEDULAS})"),
+    ("historias_clinicas", f"paciente_dni IN ({_CEDULAS})"),
+    ("pacientes", f"id IN ({_IDS})"),
+)
+
+
+def _preparar(conn):
+    conn.execute(SQL_CREAR_BAJA)
+    conn.execute("DELETE FROM temp.baja_pacientes")
+
+
+def _ejecutar_plan(conn) -> dict:
+    """Aplica PLAN_ELIMINACION a los pacientes marcados. Retorna {tabla: filas borradas}."""
+    borradas = {}
+    for tabla, condicion in PLAN_ELIMINACION:
+        borradas[tabla] = conn.execute(f"DELETE FROM {tabla} WHERE {condicion}").rowcount
+    conn.execute("DELETE FROM temp.baja_pacientes")
+    return borradas
+
+
+def eliminar_pacientes(cedulas: Iterable[str]) -> dict:
+    """
+    Elimina los pacientes de `cedulas` con todos sus datos dependientes en
+    una transacción. Retorna {tabla: filas borradas}; las cédulas que no
+    existen se ignoran (borradas['pacientes'] dice cuántos había).
+    """
+    with session(inmediata=True) as conn:
+        _preparar(conn)
+        conn.executemany(
+            "INSERT OR IGNORE INTO temp.baja_pacientes (id, dni) SELECT id, dni FROM pacientes WHERE dni = ?",
+            ((cc,) for cc in cedulas)
+        )
+        return _ejecutar_plan(conn)
+
+
+def purgar_pacientes(condicion: str, parametros: tuple = ()) -> tuple:
+    """
+    Elimina, como eliminar_pacientes, todos los pacientes que cumplen
+    `condicion` (fragmento WHERE sobre pacientes, escrito por el programa,
+    nunca por el usuario; los valores van en `parametros`).
+    Retorna (cédulas eliminadas, {tabla: filas borradas}).
+    """
+    with session(inmediata=True) as conn:
+        _preparar(conn)
+        conn.execute(
+            f"INSERT INTO temp.baja_pacientes (id, dni) SELECT id, dni FROM pacientes WHERE {condicion}",
+            parametros
+        )
+        cedulas = [fila[0] for fila in conn.execute("SELECT dni FROM temp.baja_pacientes")]
+        return cedulas, _ejecutar_plan(conn)
@@ -0,0 +1,187 @@
+"""
+Importación y exportación masiva de pacientes en CSV o JSONL.
+
+Ambos sentidos trabajan por lotes sin cargar el archivo completo en memoria.
+Al importar, cada lote se valida con Paciente.validar_datos (en procesos
+aparte si hay más de un núcleo), las filas válidas se insertan con
+executemany en una transacción por lote y las rechazadas, con la línea y el
+motivo, se escriben en un archivo CSV de rechazos. El archivo usa los
+nombres de campo de Paciente (COLUMNAS); exportar produce el mismo formato.
+"""
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice
+from typing import Optional
+
+from core.database import session
+from .paciente import Paciente
+
+COLUMNAS = ('cc', 'nombre', 'apellido', 'direccion', 'telefono', 'email',
+            'fecha_nacimiento', 'telefono_referencia')
+
+# Columnas de pacientes en el mismo orden que COLUMNAS
+_COLUMNAS_BD = ('dni', 'nombres', 'apellidos', 'direccion', 'telefono', 'email',
+                'fecha_nacimiento', 'telefono_referencia')
+
+# Filas por lote (validación, transacción y lectura al exportar)
+TAMANO_LOTE = 5000
+
+
+def _formato(ruta: str, formato: Optional[str]) -> str:
+    formato = (formato or os.path.splitext(ruta)[1].lstrip('.')).lower()
+    if formato not in ('csv', 'jsonl'):
+        raise ValueError(f"Formato no soportado: {formato!r} (use csv o jsonl)")
+    return formato
+
+
+def _leer_filas(archivo, formato: str):
+    """Genera (número de línea, dict) sin leer el archivo completo."""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila
+    else:
+        for numero, linea in enumerate(archivo, 1):
+            if linea.strip():
+                try:
+                    yield numero, json.loads(linea)
+                except json.JSONDecodeError as e:
+                    yield numero, {'_error': f"JSON inválido: {e.msg}"}
+
+
+def _lotes(iterable, tamano: int):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def validar_lote(lote: list) -> tuple:
+    """
+    Valida un lote [(línea, dict)]. Retorna (válidas, rechazadas) con
+    válidas = [(línea, tupla para INSERT)] y rechazadas = [(línea, motivo, dict)].
+    Función de módulo para poder ejecutarse en otro proceso.
+    """
+    validas, rechazadas = [], []
+    for linea, fila in lote:
+        if not isinstance(fila, dict) or '_error' in fila:
+            motivo = fila.get('_error') if isinstance(fila, dict) else "La línea no es un objeto"
+            rechazadas.append((linea, motivo, {}))
+            continue
+        datos = {k: (str(fila.get(k) or '')).strip() for k in COLUMNAS}
+        try:
+            nacimiento = None
+            if datos['fecha_nacimiento']:
+                nacimiento = date.fromisoformat(datos['fecha_nacimiento'])
+        except ValueError:
+            rechazadas.append((linea, "Fecha de nacimiento inválida (use AAAA-MM-DD).", datos))
+            continue
+        paciente = Paciente(
+            cc=datos['cc'], nombre=datos['nombre'], apellido=datos['apellido'],
+            direccion=datos['direccion'], telefono=datos['telefono'], email=datos['email'],
+            fecha_nacimiento=nacimiento, telefono_referencia=datos['telefono_referencia'] or None
+        )
+        es_valido, mensaje = paciente.validar_datos()
+        if not es_valido:
+            rechazadas.append((linea, mensaje, datos))
+            continue
+        validas.append((linea, (
+            paciente.cc, paciente.nombre, paciente.apellido, paciente.direccion, paciente.telefono,
+            paciente.email, nacimiento.isoformat() if nacimiento else None, paciente.telefono_referencia or ""
+        )))
+    return validas, rechazadas
+
+
+def _validados(lotes, procesos: int):
+    """Resultados de validar_lote en el orden de los lotes, con a lo sumo 2 lotes por proceso en vuelo."""
+    if procesos <= 1:
+        for lote in lotes:
+            yield validar_lote(lote)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        pendientes = deque()
+        for lote in lotes:
+            pendientes.append(ejecutor.submit(validar_lote, lote))
+            if len(pendientes) >= procesos * 2:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+
+def _insertar(validas: list, rechazadas: list) -> int:
+    """Inserta un lote en una transacción; las cédulas repetidas pasan a rechazadas."""
+    with session() as conn:
+        cedulas = [fila[0] for _, fila in validas]
+        existentes = {c for (c,) in conn.execute(
+            "SELECT dni FROM pacientes WHERE dni IN (SELECT value FROM json_each(?))", (json.dumps(cedulas),)
+        )}
+        nuevas, vistas = [], set()
+        for linea, fila in validas:
+            if fila[0] in existentes or fila[0] in vistas:
+                rechazadas.append((linea, "La cédula ya existe.", dict(zip(COLUMNAS, fila))))
+                continue
+            vistas.add(fila[0])
+            nuevas.append(fila)
+        conn.executemany(
+            f"INSERT OR IGNORE INTO pacientes ({', '.join(_COLUMNAS_BD)}, historia_clinica, anamnesis) "
+            f"VALUES ({', '.join('?' * len(_COLUMNAS_BD))}, '', '')",
+            nuevas
+        )
+        return len(nuevas)
+
+
+def importar_pacientes(ruta: str, ruta_rechazos: Optional[str] = None, formato: Optional[str] = None,
+                       procesos: Optional[int] = None, tamano_lote: int = TAMANO_LOTE) -> dict:
+    """
+    Importa pacientes desde `ruta` (CSV con encabezados COLUMNAS o JSONL con
+    esas llaves). Las filas rechazadas van a `ruta_rechazos` (por defecto
+    <ruta>.rechazos.csv). procesos=None usa todos los núcleos; 1 valida en
+    este mismo proceso. Retorna {'leidas', 'importadas', 'rechazadas', 'ruta_rechazos'}.
+    """
+    formato = _formato(ruta, formato)
+    ruta_rechazos = ruta_rechazos or f"{ruta}.rechazos.csv"
+    if procesos is None:
+        procesos = os.cpu_count() or 1
+    resultado = {'leidas': 0, 'importadas': 0, 'rechazadas': 0, 'ruta_rechazos': ruta_rechazos}
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo, \
+            open(ruta_rechazos, 'w', newline='', encoding='utf-8') as salida:
+        rechazos = csv.writer(salida)
+        rechazos.writerow(('linea', 'motivo') + COLUMNAS)
+        for validas, rechazadas in _validados(_lotes(_leer_filas(archivo, formato), tamano_lote), procesos):
+            resultado['leidas'] += len(validas) + len(rechazadas)
+            if validas:
+                resultado['importadas'] += _insertar(validas, rechazadas)
+            rechazadas.sort(key=lambda r: r[0])
+            rechazos.writerows((linea, motivo, *(datos.get(k, '') for k in COLUMNAS))
+                               for linea, motivo, datos in rechazadas)
+            resultado['rechazadas'] += len(rechazadas)
+    return resultado
+
+
+def exportar_pacientes(ruta: str, formato: Optional[str] = None, tamano_lote: int = TAMANO_LOTE) -> int:
+    """Escribe todos los pacientes en `ruta` (CSV o JSONL) por lotes. Retorna cuántos exportó."""
+    formato = _formato(ruta, formato)
+    total, ultimo_id = 0, 0
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo) if formato == 'csv' else None
+        if escritor:
+            escritor.writerow(COLUMNAS)
+        while True:
+            # Por cursor (id) en lugar de OFFSET: cada lote cuesta lo mismo
+            with session() as conn:
+                filas = conn.execute(
+                    f"SELECT id, {', '.join(_COLUMNAS_BD)} FROM pacientes WHERE id > ? ORDER BY id LIMIT ?",
+                    (ultimo_id, tamano_lote)
+                ).fetchall()
+            if not filas:
+                return total
+            ultimo_id = filas[-1][0]
+            if escritor:
+                escritor.writerows(tuple('' if v is None else v for v in fila[1:]) for fila in filas)
+            else:
+                archivo.writelines(json.dumps(dict(zip(COLUMNAS, fila[1:])), ensure_ascii=False) + '\n'
+                                   for fila in filas)
+            total += len(filas)
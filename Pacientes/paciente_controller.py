@@ -1,7 +1,31 @@
-from typing import Optional, List
+import sqlite3
+from typing import Callable, Optional, List
 from datetime import date
 from .paciente import Paciente
-from core.database import crear_conexion
+from core.database import crear_conexion, session
+from core.cache import obtener_cache
+from . import busqueda, eliminacion, intercambio, registro_clinico
+
+# Cachés de lectura compartidas por todas las instancias del proceso (clave:
+# cédula). Cada escritura invalida las entradas del paciente afectado.
+_cache_pacientes = obtener_cache("pacientes")
+_cache_anamnesis = obtener_cache("anamnesis")
+_cache_historias = obtener_cache("historias_clinicas")
+
+# Paciente por cédula (core/diagnostico verifica su plan)
+SQL_PACIENTE_POR_CEDULA = f"SELECT {busqueda.CAMPOS_PACIENTE} FROM pacientes p WHERE p.dni = ?"
+
+
+def invalidar_cache_paciente(cc_paciente: str):
+    """Descarta de las cachés todo lo leído del paciente (datos, anamnesis, HC)."""
+    _cache_pacientes.invalidar(cc_paciente)
+    _cache_anamnesis.invalidar(cc_paciente)
+    _cache_historias.invalidar(cc_paciente)
+
+
+def estadisticas_cache() -> list:
+    """Aciertos/fallos de las cachés de pacientes, anamnesis e historias clínicas."""
+    return [c.estadisticas() for c in (_cache_pacientes, _cache_anamnesis, _cache_historias)]
 
 
 class PacienteController:
@@ -16,10 +40,10 @@ class PacienteController:
         db_connection: Conexión a la base de datos (ajustar según tu implementación)
         """
         self.db = db_connection
-        # Almacenamiento en memoria (temporal, hasta que se implemente BD)
-        self._pacientes_memoria: dict[str, Paciente] = {}  # cc -> Paciente
-        self._anamnesis_memoria: dict[str, dict] = {}  # cc -> datos_anamnesis
-        self._historias_clinicas: dict[str, dict] = {}  # cc -> historia_clinica
+        # Cachés compartidas del proceso (cc -> Paciente / anamnesis / historia clínica)
+        self._pacientes_memoria = _cache_pacientes
+        self._anamnesis_memoria = _cache_anamnesis
+        self._historias_clinicas = _cache_historias
 
 
 
@@ -46,15 +70,10 @@ class PacienteController:
             if self.consultar_paciente(paciente.cc):
                 return False, "El paciente con esta cédula ya existe"
 
-            # Guardar en memoria (temporal)
-            self._pacientes_memoria[paciente.cc] = paciente
-
             # Persistir en base de datos integrada (hospital.db)
             try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    cur.execute(
+                with session() as conn:
+                    cursor = conn.execute(
                         """
                         INSERT OR IGNORE INTO pacientes (
                             dni, nombres, apellidos, fecha_nacimiento, direccion, telefono, email, telefono_referencia, historia_clinica, anamnesis
@@ -73,11 +92,13 @@ class PacienteController:
                             ""
                         )
                     )
-                    conn.commit()
-                    conn.close()
-            except Exception:
-                # No interrumpir si DB falla; se mantiene en memoria
-                pass
+                    insertado = cursor.rowcount > 0
+            except sqlite3.Error as e:
+                print(f"Error DB registrando paciente: {e}")
+                return False, f"Error al guardar el paciente en la base de datos: {e}"
+            invalidar_cache_paciente(paciente.cc)
+            if not insertado:
+                return False, "El paciente con esta cédula ya existe"
 
             return True, "Paciente registrado exitosamente"
         except Exception as e:
@@ -89,33 +110,19 @@ class PacienteController:
         Registra la anamnesis del paciente.
         """
         try:
-            import json
             # Verificar que el paciente existe
             paciente = self.consultar_paciente(cc_paciente)
             if not paciente:
                 return False, "El paciente no existe"
 
-            # Guardar en memoria (temporal)
-            self._anamnesis_memoria[cc_paciente] = datos_anamnesis
-
-            # Persistir en base de datos
+            # Persistir en base de datos (solo los campos recibidos)
             try:
-                conn = crear_conexion()
-                if conn:
-                    # Serializar a JSON string (Crucial para multilínea y caracteres especiales)
-                    json_anamnesis = json.dumps(datos_anamnesis, ensure_ascii=False)
-                    
-                    cur = conn.cursor()
-                    cur.execute(
-                        "UPDATE pacientes SET anamnesis = ? WHERE dni = ?",
-                        (json_anamnesis, cc_paciente)
-                    )
-                    conn.commit()
-                    conn.close()
-            except Exception as e:
+                registro_clinico.guardar_anamnesis(cc_paciente, datos_anamnesis)
+            except sqlite3.Error as e:
                 print(f"Error DB Anamnesis: {e}")
-                # No retornamos False aquí para mantener consistencia con memoria si DB falla
-            
+                return False, f"Error al guardar la anamnesis en la base de datos: {e}"
+            invalidar_cache_paciente(cc_paciente)
+
             return True, "Anamnesis registrada exitosamente"
         except Exception as e:
             return False, f"Error al registrar anamnesis: {str(e)}"
@@ -131,46 +138,23 @@ class PacienteController:
                 return False, "El paciente no existe"
 
             # Verificar si ya tiene historia clínica
-            if cc_paciente in self._historias_clinicas:
+            if self.consultar_historia_clinica(cc_paciente):
                 return False, "El paciente ya tiene historia clínica"
 
             # Crear historia clínica con datos iniciales
             from datetime import datetime
-            numero_historia = f"HC-{cc_paciente}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-
-            historia = {
-                'numero_historia': numero_historia,
-                'cc_paciente': cc_paciente,
-                'fecha_creacion': datetime.now(),
-                'estado': 'Activa',
-                'observaciones': '',
-                'consultas': [],
-                'diagnosticos': [],
-                'tratamientos': []
-            }
-
-            # Guardar en memoria
-            self._historias_clinicas[cc_paciente] = historia
-
-            # Persistencia en Base de Datos (Historia Clínica como JSON)
-            try:
-                conn = crear_conexion()
-                if conn:
-                    import json
-                    # Preparar dict para JSON con fechas como strings
-                    historia_db = historia.copy()
-                    historia_db['fecha_creacion'] = historia['fecha_creacion'].isoformat()
-                    # Si hubiera fecha_modificacion también
+            fecha_creacion = datetime.now()
+            numero_historia = f"HC-{cc_paciente}-{fecha_creacion.strftime('%Y%m%d%H%M%S')}"
 
-                    cur = conn.cursor()
-                    cur.execute(
-                        "UPDATE pacientes SET historia_clinica = ? WHERE dni = ?",
-                        (json.dumps(historia_db), cc_paciente)
-                    )
-                    conn.commit()
-                    conn.close()
-            except Exception as e:
+            # Persistencia en Base de Datos (tabla historias_clinicas)
+            try:
+                creada = registro_clinico.crear_historia(cc_paciente, numero_historia, fecha_creacion)
+            except sqlite3.Error as e:
                 print(f"Error persistiendo HC: {e}")
+                return False, f"Error al guardar la historia clínica en la base de datos: {e}"
+            invalidar_cache_paciente(cc_paciente)
+            if not creada:
+                return False, "El paciente ya tiene historia clínica"
 
             return True, f"Historia clínica {numero_historia} creada exitosamente"
         except Exception as e:
@@ -181,54 +165,18 @@ class PacienteController:
         Consulta la historia clínica del paciente.
         """
         try:
-            # 1. Buscar en memoria
-            if cc_paciente in self._historias_clinicas:
-                return self._historias_clinicas[cc_paciente]
+            # 1. Buscar en caché
+            historia = self._historias_clinicas.obtener(cc_paciente)
+            if historia is not None:
+                return historia
 
-            # 2. Buscar en Base de Datos
+            # 2. Buscar en Base de Datos (trasladando antes el JSON antiguo si quedaba)
             try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    row = cur.execute(
-                        "SELECT historia_clinica FROM pacientes WHERE dni = ?",
-                        (cc_paciente,)
-                    ).fetchone()
-                    conn.close()
-
-                    if row and row[0]:
-                        raw_data = row[0]
-                        import json
-                        from datetime import datetime
-                        
-                        try:
-                            # Intentar parsear como JSON
-                            historia_data = json.loads(raw_data)
-                            
-                            # Recuperar fechas desde string
-                            if 'fecha_creacion' in historia_data and historia_data['fecha_creacion']:
-                                try:
-                                    historia_data['fecha_creacion'] = datetime.fromisoformat(historia_data['fecha_creacion'])
-                                except ValueError:
-                                    pass # Dejar como string o None
-                                    
-                            self._historias_clinicas[cc_paciente] = historia_data
-                            return historia_data
-                            
-                        except json.JSONDecodeError:
-                            # LEGACY: Si falla, es porque antes solo guardábamos el ID como texto plano
-                            numero_historia = str(raw_data).strip()
-                            if not numero_historia:
-                                return None
-
-                            historia = {
-                                'numero_historia': numero_historia,
-                                'cc_paciente': cc_paciente,
-                                'estado': 'Activa',
-                                'fecha_creacion': None # No disponible en legacy
-                            }
-                            self._historias_clinicas[cc_paciente] = historia
-                            return historia
+                registro_clinico.migrar_paciente(cc_paciente)
+                historia = registro_clinico.leer_historia(cc_paciente)
+                if historia is not None:
+                    self._historias_clinicas.guardar(cc_paciente, historia)
+                    return historia
             except Exception as e:
                 print(f"Error consultando HC DB: {e}")
 
@@ -242,41 +190,40 @@ class PacienteController:
         Actualiza la historia clínica del paciente.
         """
         try:
-            if cc_paciente not in self._historias_clinicas:
+            historia_actual = self.consultar_historia_clinica(cc_paciente)
+            if not historia_actual:
                 return False, "El paciente no tiene historia clínica"
 
-            # Actualizar los campos proporcionados
-            for key, value in datos.items():
-                if key in self._historias_clinicas[cc_paciente]:
-                    self._historias_clinicas[cc_paciente][key] = value
-
-            # Persistencia en Base de Datos (Historia Clínica como JSON)
+            # Persistencia en Base de Datos (solo las columnas que cambian)
             try:
-                conn = crear_conexion()
-                if conn:
-                    import json
-                    # Obtener la historia completa actualizada
-                    historia_actual = self._historias_clinicas[cc_paciente]
-                    
-                    # Preparar dict para JSON
-                    historia_db = historia_actual.copy()
-                    if hasattr(historia_actual['fecha_creacion'], 'isoformat'):
-                        historia_db['fecha_creacion'] = historia_actual['fecha_creacion'].isoformat()
-                    
-                    cur = conn.cursor()
-                    cur.execute(
-                        "UPDATE pacientes SET historia_clinica = ? WHERE dni = ?",
-                        (json.dumps(historia_db), cc_paciente)
-                    )
-                    conn.commit()
-                    conn.close()
-            except Exception as e:
+                actualizada = registro_clinico.actualizar_historia(cc_paciente, datos)
+            except sqlite3.Error as e:
                 print(f"Error persistiendo actualización HC: {e}")
+                return False, f"Error al guardar la historia clínica en la base de datos: {e}"
+            invalidar_cache_paciente(cc_paciente)
+            if not actualizada:
+                return False, "El paciente no tiene historia clínica"
 
             return True, "Historia clínica actualizada exitosamente"
         except Exception as e:
             return False, f"Error al actualizar historia clínica: {str(e)}"
 
+    def _actualizar_columna(self, cc_paciente: str, columna: str, valor: str) -> Optional[str]:
+        """
+        Escribe una columna de datos de contacto del paciente. Retorna None si
+        se guardó, o el mensaje de error (las cachés solo se invalidan tras guardar).
+        """
+        try:
+            with session() as conn:
+                cursor = conn.execute(f"UPDATE pacientes SET {columna} = ? WHERE dni = ?", (valor, cc_paciente))
+                if cursor.rowcount == 0:
+                    return "El paciente no existe"
+        except sqlite3.Error as e:
+            print(f"Error DB actualizando {columna}: {e}")
+            return f"Error al guardar en la base de datos: {e}"
+        invalidar_cache_paciente(cc_paciente)
+        return None
+
     def actualizar_direccion(self, cc_paciente: str, nueva_direccion: str) -> tuple[bool, str]:
         """
         Caso de uso: actualizarDirección
@@ -286,24 +233,18 @@ class PacienteController:
             if not nueva_direccion or len(nueva_direccion) < 5:
                 return False, "La dirección debe tener al menos 5 caracteres"
 
-            # Verificar que el paciente existe en memoria
-            if cc_paciente not in self._pacientes_memoria:
+            # Verificar que el paciente existe (caché o BD)
+            paciente = self.consultar_paciente(cc_paciente)
+            if not paciente:
                 return False, "El paciente no existe"
 
-            # Actualizar en memoria
-            self._pacientes_memoria[cc_paciente].direccion = nueva_direccion
-
             # Actualizar en Base de Datos
-            try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    cur.execute("UPDATE pacientes SET direccion = ? WHERE dni = ?", (nueva_direccion, cc_paciente))
-                    conn.commit()
-                    conn.close()
-            except Exception as e:
-                print(f"Error DB updating address: {e}")
-                # Log only, memory is updated
+            error = self._actualizar_columna(cc_paciente, "direccion", nueva_direccion)
+            if error:
+                return False, error
+
+            # Actualizar el objeto ya confirmado el cambio (quien lo tenga abierto lo ve)
+            paciente.direccion = nueva_direccion
 
             return True, "Dirección actualizada exitosamente"
         except Exception as e:
@@ -322,23 +263,18 @@ class PacienteController:
             if not (7 <= len(nuevo_telefono) <= 15):
                 return False, "El teléfono debe tener entre 7 y 15 dígitos"
 
-            # Verificar que el paciente existe en memoria
-            if cc_paciente not in self._pacientes_memoria:
+            # Verificar que el paciente existe (caché o BD)
+            paciente = self.consultar_paciente(cc_paciente)
+            if not paciente:
                 return False, "El paciente no existe"
 
-            # Actualizar en memoria
-            self._pacientes_memoria[cc_paciente].telefono = nuevo_telefono
-
             # Actualizar en Base de Datos
-            try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    cur.execute("UPDATE pacientes SET telefono = ? WHERE dni = ?", (nuevo_telefono, cc_paciente))
-                    conn.commit()
-                    conn.close()
-            except Exception as e:
-                print(f"Error DB updating phone: {e}")
+            error = self._actualizar_columna(cc_paciente, "telefono", nuevo_telefono)
+            if error:
+                return False, error
+
+            # Actualizar el objeto ya confirmado el cambio (quien lo tenga abierto lo ve)
+            paciente.telefono = nuevo_telefono
 
             return True, "Teléfono actualizado exitosamente"
         except Exception as e:
@@ -355,23 +291,18 @@ class PacienteController:
             if not nuevo_email or not re.match(patron_email, nuevo_email):
                 return False, "El email no tiene un formato válido"
 
-            # Verificar que el paciente existe en memoria
-            if cc_paciente not in self._pacientes_memoria:
+            # Verificar que el paciente existe (caché o BD)
+            paciente = self.consultar_paciente(cc_paciente)
+            if not paciente:
                 return False, "El paciente no existe"
 
-            # Actualizar en memoria
-            self._pacientes_memoria[cc_paciente].email = nuevo_email
-
             # Actualizar en Base de Datos
-            try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    cur.execute("UPDATE pacientes SET email = ? WHERE dni = ?", (nuevo_email, cc_paciente))
-                    conn.commit()
-                    conn.close()
-            except Exception as e:
-                print(f"Error DB updating email: {e}")
+            error = self._actualizar_columna(cc_paciente, "email", nuevo_email)
+            if error:
+                return False, error
+
+            # Actualizar el objeto ya confirmado el cambio (quien lo tenga abierto lo ve)
+            paciente.email = nuevo_email
 
             return True, "Email actualizado exitosamente"
         except Exception as e:
@@ -390,23 +321,18 @@ class PacienteController:
             if not (7 <= len(nuevo_telefono_ref) <= 15):
                 return False, "El teléfono de referencia debe tener entre 7 y 15 dígitos"
 
-            # Verificar que el paciente existe en memoria
-            if cc_paciente not in self._pacientes_memoria:
+            # Verificar que el paciente existe (caché o BD)
+            paciente = self.consultar_paciente(cc_paciente)
+            if not paciente:
                 return False, "El paciente no existe"
 
-            # Actualizar en memoria
-            self._pacientes_memoria[cc_paciente].telefono_referencia = nuevo_telefono_ref
-
             # Actualizar en Base de Datos
-            try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    cur.execute("UPDATE pacientes SET telefono_referencia = ? WHERE dni = ?", (nuevo_telefono_ref, cc_paciente))
-                    conn.commit()
-                    conn.close()
-            except Exception as e:
-                print(f"Error DB updating ref phone: {e}")
+            error = self._actualizar_columna(cc_paciente, "telefono_referencia", nuevo_telefono_ref)
+            if error:
+                return False, error
+
+            # Actualizar el objeto ya confirmado el cambio (quien lo tenga abierto lo ve)
+            paciente.telefono_referencia = nuevo_telefono_ref
 
             return True, "Teléfono de referencia actualizado exitosamente"
         except Exception as e:
@@ -414,83 +340,77 @@ class PacienteController:
 
     def eliminar_paciente(self, cc_paciente: str) -> tuple[bool, str]:
         """
-        Elimina un paciente del sistema (Memoria y BD).
+        Elimina un paciente del sistema (BD y cachés) junto con sus citas,
+        consultas, recetas, hospitalizaciones, signos vitales, notificaciones
+        y demás registros dependientes, en una sola transacción.
         """
         try:
-            deleted = False
-            
-            # 1. Eliminar de memoria
-            if cc_paciente in self._pacientes_memoria:
-                del self._pacientes_memoria[cc_paciente]
-                deleted = True
-
-            if cc_paciente in self._anamnesis_memoria:
-                del self._anamnesis_memoria[cc_paciente]
-
-            if cc_paciente in self._historias_clinicas:
-                del self._historias_clinicas[cc_paciente]
-
-            # 2. Eliminar de base de datos (Cascada Manual)
             try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    
-                    # a) Obtener ID numérico (PK) necesario para otras tablas
-                    cur.execute("SELECT id FROM pacientes WHERE dni = ?", (cc_paciente,))
-                    row = cur.fetchone()
-                    
-                    if row:
-                        paciente_id = row[0]
-                        
-                        # b) Borrar Tablas Hijas (nivel 3 - detalles)
-                        # Necesitamos IDs de consultas para borrar recetas/ordenes
-                        cur.execute("SELECT id FROM consultas WHERE paciente_id = ?", (paciente_id,))
-                        consultas_ids = [r[0] for r in cur.fetchall()]
-                        
-                        if consultas_ids:
-                            ids_str = ','.join(map(str, consultas_ids))
-                            cur.execute(f"DELETE FROM recetas WHERE consulta_id IN ({ids_str})")
-                            cur.execute(f"DELETE FROM ordenes_servicio WHERE consulta_id IN ({ids_str})")
-
-                        # c) Borrar Tablas Hijas (nivel 2)
-                        cur.execute("DELETE FROM entregas WHERE paciente_id = ?", (paciente_id,))
-                        cur.execute("DELETE FROM hospitalizaciones WHERE paciente_id = ?", (paciente_id,))
-                        cur.execute("DELETE FROM consultas WHERE paciente_id = ?", (paciente_id,))
-                    
-                    # d) Borrar Citas (referencian al DNI)
-                    cur.execute("DELETE FROM citas WHERE cc_paciente = ?", (cc_paciente,))
-                    
-                    # e) Borrar Paciente (Padre)
-                    cur.execute("DELETE FROM pacientes WHERE dni = ?", (cc_paciente,))
-                    
-                    if cur.rowcount > 0:
-                        deleted = True
-                        
-                    conn.commit()
-                    conn.close()
+                borradas = eliminacion.eliminar_pacientes([cc_paciente])
             except Exception as db_err:
                 print(f"Error borrando de BD: {db_err}")
-                if not deleted: # Si no se borró de memoria ni de BD
-                     return False, f"Error DB: {str(db_err)}"
+                return False, f"Error DB: {str(db_err)}"
+            finally:
+                # Quitar de las cachés (también si la BD falló: se relee)
+                invalidar_cache_paciente(cc_paciente)
 
-            if deleted:
+            if borradas['pacientes']:
                 return True, "Paciente eliminado exitosamente"
             else:
                 return False, "El paciente no existe o ya fue eliminado"
-                
+
         except Exception as e:
             return False, f"Error al eliminar paciente: {str(e)}"
 
+    def eliminar_pacientes(self, cedulas: List[str]) -> tuple[bool, str]:
+        """
+        Eliminación masiva: borra todos los pacientes de `cedulas` con sus
+        registros dependientes en una sola transacción (todos o ninguno).
+        """
+        cedulas = list(dict.fromkeys(cedulas))
+        try:
+            borradas = eliminacion.eliminar_pacientes(cedulas)
+        except Exception as e:
+            print(f"Error borrando de BD: {e}")
+            return False, f"Error al eliminar pacientes: {str(e)}"
+        finally:
+            for cc in cedulas:
+                invalidar_cache_paciente(cc)
+        return True, f"{borradas['pacientes']} pacientes eliminados"
+
+    def importar_pacientes(self, ruta: str, ruta_rechazos: Optional[str] = None) -> tuple[bool, str]:
+        """
+        Importa un padrón de pacientes (CSV o JSONL) por lotes, con la misma
+        validación que registrar_paciente. Las filas rechazadas y su motivo
+        quedan en ruta_rechazos (por defecto <ruta>.rechazos.csv).
+        """
+        try:
+            r = intercambio.importar_pacientes(ruta, ruta_rechazos)
+        except Exception as e:
+            return False, f"Error al importar pacientes: {str(e)}"
+        mensaje = f"{r['importadas']} de {r['leidas']} pacientes importados"
+        if r['rechazadas']:
+            mensaje += f"; {r['rechazadas']} rechazados (ver {r['ruta_rechazos']})"
+        return True, mensaje
+
+    def exportar_pacientes(self, ruta: str) -> tuple[bool, str]:
+        """Exporta todos los pacientes a `ruta` (CSV o JSONL según la extensión)."""
+        try:
+            total = intercambio.exportar_pacientes(ruta)
+        except Exception as e:
+            return False, f"Error al exportar pacientes: {str(e)}"
+        return True, f"{total} pacientes exportados a {ruta}"
+
     def consultar_paciente(self, cc_paciente: str) -> Optional[Paciente]:
         """
         Caso de uso: consultarPaciente
         Consulta un paciente por su cédula (Memoria -> BD).
         """
         try:
-            # 1. Buscar en memoria
-            if cc_paciente in self._pacientes_memoria:
-                return self._pacientes_memoria[cc_paciente]
+            # 1. Buscar en caché
+            paciente = self._pacientes_memoria.obtener(cc_paciente)
+            if paciente is not None:
+                return paciente
 
             # 2. Buscar en base de datos
             try:
@@ -499,10 +419,7 @@ class PacienteController:
                     cur = conn.cursor()
                     # Nota: Asumiendo columnas estándar. Ajustar si fecha_nacimiento falta en DB
                     # Se agrega fecha_nacimiento al SELECT
-                    row = cur.execute(
-                        "SELECT dni, nombres, apellidos, direccion, telefono, email, telefono_referencia, fecha_nacimiento FROM pacientes WHERE dni = ?", 
-                        (cc_paciente,)
-                    ).fetchone()
+                    row = cur.execute(SQL_PACIENTE_POR_CEDULA, (cc_paciente,)).fetchone()
                     conn.close()
                     
                     if row:
@@ -530,8 +447,8 @@ class PacienteController:
                             telefono_referencia=row[6] or None,
                             fecha_nacimiento=fecha_nac
                         )
-                        # Cachear en memoria
-                        self._pacientes_memoria[paciente.cc] = paciente
+                        # Cachear
+                        self._pacientes_memoria.guardar(paciente.cc, paciente)
                         return paciente
             except Exception as e:
                 print(f"Error consultando DB: {e}")
@@ -543,21 +460,19 @@ class PacienteController:
 
     def consultar_paciente_por_codigo(self, codigo_unico: str) -> Optional[Paciente]:
         """
-        Consulta un paciente por su código único.
+        Consulta un paciente por su código único (número de registro en
+        pacientes.id) o, si no hay ninguno con ese número, por su cédula.
         """
         try:
-            # Buscar en memoria por código único
-            for paciente in self._pacientes_memoria.values():
-                if paciente.num_unic == codigo_unico:
-                    return paciente
-
-            # Aquí iría la lógica para consultar en la base de datos
-            # if self.db:
-            #     resultado = self.db.query('pacientes', {'num_unic': codigo_unico})
-            #     if resultado:
-            #         return Paciente.from_dict(resultado)
-
-            return None
+            codigo = str(codigo_unico or "").strip()
+            if codigo.isdigit():
+                with session() as conn:
+                    fila = conn.execute(
+                        f"SELECT {busqueda.CAMPOS_PACIENTE} FROM pacientes p WHERE p.id = ?", (int(codigo),)
+                    ).fetchone()
+                if fila:
+                    return self._paciente_desde_fila(fila)
+            return self.consultar_paciente(codigo) if codigo else None
         except Exception as e:
             print(f"Error al consultar paciente por código: {str(e)}")
             return None
@@ -567,8 +482,8 @@ class PacienteController:
         Obtiene la lista de todos los pacientes registrados.
         """
         try:
-            # Cargar desde BD si disponible y fusionar con memoria
-            pacientes: dict[str, Paciente] = dict(self._pacientes_memoria)
+            # Cargar desde BD (la caché solo acelera lecturas puntuales)
+            pacientes: dict[str, Paciente] = {}
             try:
                 conn = crear_conexion()
                 if conn:
@@ -608,6 +523,56 @@ class PacienteController:
             print(f"Error al obtener pacientes: {str(e)}")
             return []
 
+    def buscar_pacientes(self, texto: str, criterio: str = "Todo", limite: int = busqueda.LIMITE,
+                         filtro: Optional[Callable[[Paciente], bool]] = None) -> List[Paciente]:
+        """
+        Busca pacientes por cédula, nombre o apellido usando el índice de
+        texto completo (prefijos, sin distinguir tildes), ordenados por relevancia.
+        criterio: "Cédula", "Nombre", "Apellido" o "Todo".
+        filtro: si se indica, solo cuentan los pacientes para los que
+        retorna True; se siguen leyendo páginas hasta reunir `limite`
+        o agotar las coincidencias.
+        """
+        encontrados = []
+        desde = 0
+        while len(encontrados) < limite:
+            try:
+                filas = busqueda.buscar_pacientes(texto, criterio, limite, desde)
+            except Exception as e:
+                print(f"Error al buscar pacientes: {str(e)}")
+                break
+            for fila in filas:
+                paciente = self._paciente_desde_fila(fila)
+                if filtro is None or filtro(paciente):
+                    encontrados.append(paciente)
+            if len(filas) < limite:
+                break
+            desde += len(filas)
+        return encontrados[:limite]
+
+    @staticmethod
+    def _paciente_desde_fila(fila) -> Paciente:
+        """Construye un Paciente desde (dni, nombres, apellidos, direccion, telefono, email, telefono_referencia, fecha_nacimiento)."""
+        dni, nombres, apellidos, direccion, telefono, email, tel_ref, fecha_nac_str = fila
+        fecha_nac = None
+        if fecha_nac_str:
+            try:
+                from datetime import datetime
+                formato = '%Y-%m-%d %H:%M:%S' if ' ' in fecha_nac_str else '%Y-%m-%d'
+                fecha_nac = datetime.strptime(fecha_nac_str, formato).date()
+            except ValueError:
+                pass
+        return Paciente(
+            cc=dni,
+            nombre=nombres or "",
+            apellido=apellidos or "",
+            direccion=direccion or "",
+            telefono=telefono or "",
+            email=email or "",
+            telefono_referencia=tel_ref or None,
+            fecha_nacimiento=fecha_nac
+        )
+
     def consultar_telefono_referencia(self, cc_paciente: str) -> Optional[str]:
         """
         Caso de uso: consultarTeléfonoDeReferencia (extend de consultarPaciente)
@@ -638,85 +603,18 @@ class PacienteController:
         Consulta la anamnesis del paciente.
         """
         try:
-            import json
-            # Buscar en memoria primero
-            if cc_paciente in self._anamnesis_memoria:
-                return self._anamnesis_memoria[cc_paciente]
+            # Buscar en caché primero
+            datos = self._anamnesis_memoria.obtener(cc_paciente)
+            if datos is not None:
+                return datos
 
-            # Buscar en Base de Datos
+            # Buscar en Base de Datos (trasladando antes el JSON antiguo si quedaba)
             try:
-                conn = crear_conexion()
-                if conn:
-                    cur = conn.cursor()
-                    row = cur.execute("SELECT anamnesis FROM pacientes WHERE dni = ?", (cc_paciente,)).fetchone()
-                    conn.close()
-                    
-                    if row and row[0]: # Si hay datos
-                        try:
-                            # Intentar parsear JSON
-                            datos = json.loads(row[0])
-                            self._anamnesis_memoria[cc_paciente] = datos
-                            return datos
-                        except json.JSONDecodeError:
-                            # Compatibilidad con versiones antiguas donde se guardaba como texto
-                            # (a veces con saltos de línea y a veces todo "pegado" sin separadores).
-                            import re
-
-                            texto = str(row[0])
-                            texto_norm = texto.replace('\r\n', '\n').replace('\r', '\n')
-
-                            # 1) Intento simple: parsear líneas "key: value"
-                            parsed: dict = {'anamnesis': texto}
-                            for linea in texto_norm.split('\n'):
-                                if ':' not in linea:
-                                    continue
-                                k, v = linea.split(':', 1)
-                                k = k.strip().lower()
-                                v = v.strip()
-                                if k:
-                                    parsed[k] = v
-
-                            # 2) Si el texto viene pegado, extraer por claves conocidas
-                            # Ej: "motivo_consulta: ...enfermedad_actual: ..."
-                            known_keys = [
-                                'cc_paciente',
-                                'motivo_consulta',
-                                'enfermedad_actual',
-                                'antecedentes_personales',
-                                'antecedentes_familiares',
-                                'alergias',
-                            ]
-                            pattern = r"(?i)(" + "|".join(map(re.escape, known_keys)) + r")\s*:\s*"
-                            matches = list(re.finditer(pattern, texto))
-                            if matches:
-                                for i, m in enumerate(matches):
-                                    key = m.group(1).strip().lower()
-                                    start = m.end()
-                                    end = matches[i + 1].start() if i + 1 < len(matches) else len(texto)
-                                    value = texto[start:end].strip()
-                                    if key:
-                                        parsed[key] = value
-
-                            # Normalizar llaves esperadas por las UIs
-                            alias = {
-                                'motivo': 'motivo_consulta',
-                                'motivo de consulta': 'motivo_consulta',
-                                'enfermedad': 'enfermedad_actual',
-                                'enfermedad actual': 'enfermedad_actual',
-                                'antecedentes personales': 'antecedentes_personales',
-                                'antecedentes familiares': 'antecedentes_familiares',
-                            }
-                            normalized: dict = {}
-                            for key in ['motivo_consulta', 'enfermedad_actual', 'antecedentes_personales', 'antecedentes_familiares', 'alergias']:
-                                if key in parsed:
-                                    normalized[key] = parsed[key]
-                            for src, dst in alias.items():
-                                if src in parsed and dst not in normalized:
-                                    normalized[dst] = parsed[src]
-
-                            # No retornar cc_paciente como campo clínico
-                            normalized['anamnesis'] = texto
-                            return normalized if normalized else {"motivo_consulta": texto, "anamnesis": texto}
+                registro_clinico.migrar_paciente(cc_paciente)
+                datos = registro_clinico.leer_anamnesis(cc_paciente)
+                if datos is not None:
+                    self._anamnesis_memoria.guardar(cc_paciente, datos)
+                    return datos
             except Exception as e:
                 print(f"Error consultando anamnesis DB: {e}")
 
@@ -725,20 +623,28 @@ class PacienteController:
             print(f"Error al consultar anamnesis: {str(e)}")
             return None
 
+    def iterar_pacientes(self, tamano_lote: int = 500):
+        """Generador de todos los pacientes por lotes (cursor por id), sin traer la tabla entera a memoria."""
+        ultimo_id = 0
+        while True:
+            with session() as conn:
+                lote = conn.execute(
+                    f"SELECT p.id, {busqueda.CAMPOS_PACIENTE} FROM pacientes p WHERE p.id > ? ORDER BY p.id LIMIT ?",
+                    (ultimo_id, tamano_lote)
+                ).fetchall()
+            if not lote:
+                return
+            for fila in lote:
+                yield self._paciente_desde_fila(fila[1:])
+            ultimo_id = lote[-1][0]
+
     def listar_pacientes(self) -> List[Paciente]:
         """
-        Lista todos los pacientes registrados.
+        Lista todos los pacientes registrados (desde la BD: la caché solo
+        guarda los consultados recientemente).
         """
         try:
-            # Retornar pacientes de memoria
-            pacientes = list(self._pacientes_memoria.values())
-
-            # Aquí iría la lógica para listar todos los pacientes
-            # if self.db:
-            #     resultados = self.db.query_all('pacientes')
-            #     return [Paciente.from_dict(r) for r in resultados]
-
-            return pacientes
+            return list(self.iterar_pacientes())
         except Exception as e:
             print(f"Error al listar pacientes: {str(e)}")
             return []
\ No newline at end of file
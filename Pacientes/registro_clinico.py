@@ -0,0 +1,283 @@
+"""
+Almacenamiento estructurado de la anamnesis y la historia clínica.
+
+Cada campo vive en su propia columna de las tablas anamnesis e
+historias_clinicas (migración 7), así leer o editar un campo no obliga a
+deserializar y volver a escribir todo el registro. Los pacientes anteriores
+guardaban ambos datos como JSON (o texto libre) en pacientes.anamnesis y
+pacientes.historia_clinica: iniciar_migracion() (llamado una vez al arrancar
+la aplicación) los traslada en un hilo de fondo, por lotes, y
+migrar_paciente() traslada al momento el de un paciente que se lee o edita
+antes de que el hilo llegue a él.
+"""
+import json
+import re
+import threading
+from datetime import datetime
+from typing import Optional
+
+from core.database import session
+
+CAMPOS_ANAMNESIS = (
+    'motivo_consulta',
+    'enfermedad_actual',
+    'antecedentes_personales',
+    'antecedentes_familiares',
+    'alergias',
+)
+
+# Campos de la historia clínica que se pueden actualizar
+CAMPOS_HISTORIA = ('numero_historia', 'fecha_creacion', 'estado', 'observaciones')
+
+# Pacientes trasladados por transacción en la migración de fondo
+TAMANO_LOTE = 200
+
+# Consultas (core/diagnostico verifica sus planes)
+SQL_PENDIENTE_PACIENTE = ("SELECT dni, anamnesis, historia_clinica FROM pacientes "
+                          "WHERE dni = ? AND (anamnesis != '' OR historia_clinica != '')")
+SQL_LOTE_PENDIENTE = ("SELECT id, dni, anamnesis, historia_clinica FROM pacientes "
+                      "WHERE id > ? AND (anamnesis != '' OR historia_clinica != '') ORDER BY id LIMIT ?")
+SQL_LEER_ANAMNESIS = f"SELECT {', '.join(CAMPOS_ANAMNESIS)}, texto_original FROM anamnesis WHERE paciente_dni = ?"
+# {asignaciones}: "campo = ?, " por cada campo presente
+SQL_ACTUALIZAR_HISTORIA = ("UPDATE historias_clinicas SET {asignaciones}fecha_modificacion = ? "
+                           "WHERE paciente_dni = ?")
+
+# Formatos antiguos de anamnesis en texto: "motivo de consulta: ..." -> campo
+_ALIAS = {
+    'motivo': 'motivo_consulta',
+    'motivo de consulta': 'motivo_consulta',
+    'enfermedad': 'enfermedad_actual',
+    'enfermedad actual': 'enfermedad_actual',
+    'antecedentes personales': 'antecedentes_personales',
+    'antecedentes familiares': 'antecedentes_familiares',
+}
+_CLAVES_TEXTO = ('cc_paciente',) + CAMPOS_ANAMNESIS
+_PATRON_CLAVES = re.compile(r"(?i)(" + "|".join(map(re.escape, _CLAVES_TEXTO)) + r")\s*:\s*")
+
+
+# True cuando el traslado recorrió todos los pacientes: desde entonces ya
+# no quedan JSON antiguos (los pacientes nuevos no los tienen)
+_migracion_completa = False
+
+
+def _ahora() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+# --- Formatos antiguos ---
+def interpretar_anamnesis_legado(texto: str) -> tuple:
+    """
+    Convierte el contenido antiguo de pacientes.anamnesis en
+    ({campo: valor}, texto_original). texto_original es siempre el texto
+    tal cual venía (JSON o texto libre), para no perder claves ni líneas que
+    no encajan en ningún campo al separarlo.
+    """
+    try:
+        datos = json.loads(texto)
+        if isinstance(datos, dict):
+            return {k: datos[k] for k in CAMPOS_ANAMNESIS if datos.get(k) is not None}, texto
+    except json.JSONDecodeError:
+        pass
+
+    # Texto libre, a veces con una línea por campo y a veces todo "pegado"
+    texto = str(texto)
+    leidos = {}
+    for linea in texto.replace('\r\n', '\n').replace('\r', '\n').split('\n'):
+        if ':' in linea:
+            clave, valor = linea.split(':', 1)
+            if clave.strip():
+                leidos[clave.strip().lower()] = valor.strip()
+    coincidencias = list(_PATRON_CLAVES.finditer(texto))
+    for i, m in enumerate(coincidencias):
+        fin = coincidencias[i + 1].start() if i + 1 < len(coincidencias) else len(texto)
+        leidos[m.group(1).lower()] = texto[m.end():fin].strip()
+
+    datos = {k: leidos[k] for k in CAMPOS_ANAMNESIS if k in leidos}
+    for origen, destino in _ALIAS.items():
+        if origen in leidos and destino not in datos:
+            datos[destino] = leidos[origen]
+    if not datos:
+        datos = {'motivo_consulta': texto}
+    return datos, texto
+
+
+def interpretar_historia_legado(texto: str) -> Optional[dict]:
+    """
+    Convierte el contenido antiguo de pacientes.historia_clinica (JSON o,
+    en versiones más viejas, solo el número de historia) en {campo: valor}.
+    Las claves fuera de CAMPOS_HISTORIA no se pierden: _trasladar guarda el
+    texto completo en historias_clinicas.texto_original.
+    """
+    try:
+        datos = json.loads(texto)
+    except json.JSONDecodeError:
+        datos = None
+    if not isinstance(datos, dict):
+        numero = str(texto).strip()
+        return {'numero_historia': numero} if numero else None
+    if not datos.get('numero_historia'):
+        return None
+    return {k: datos[k] for k in CAMPOS_HISTORIA if datos.get(k) is not None}
+
+
+# --- Traslado desde pacientes ---
+def _trasladar(conn, filas) -> int:
+    """
+    Inserta en las tablas nuevas los datos antiguos de `filas` y vacía las
+    columnas de pacientes. El texto antiguo completo queda en texto_original
+    de cada tabla, así vaciar las columnas no borra nada.
+    """
+    for dni, anamnesis, historia in filas:
+        if anamnesis:
+            datos, original = interpretar_anamnesis_legado(anamnesis)
+            # OR IGNORE: si ya hay una anamnesis estructurada, es más reciente
+            conn.execute(
+                f"INSERT OR IGNORE INTO anamnesis (paciente_dni, {', '.join(CAMPOS_ANAMNESIS)}, texto_original) "
+                f"VALUES (?, {', '.join('?' * len(CAMPOS_ANAMNESIS))}, ?)",
+                (dni, *(datos.get(k) for k in CAMPOS_ANAMNESIS), original)
+            )
+        datos = interpretar_historia_legado(historia) if historia else None
+        if datos:
+            conn.execute(
+                "INSERT OR IGNORE INTO historias_clinicas "
+                "(paciente_dni, numero_historia, fecha_creacion, estado, observaciones, texto_original) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (dni, datos['numero_historia'], datos.get('fecha_creacion'),
+                 datos.get('estado') or 'Activa', datos.get('observaciones') or '', historia)
+            )
+        conn.execute("UPDATE pacientes SET anamnesis = '', historia_clinica = '' WHERE dni = ?", (dni,))
+    return len(filas)
+
+
+def migrar_paciente(cc_paciente: str) -> bool:
+    """Traslada los datos antiguos de un paciente si aún los tiene. Retorna True si había algo."""
+    if _migracion_completa:
+        return False
+    # Lectura previa sin bloqueo: casi siempre no queda nada que trasladar
+    with session() as conn:
+        if conn.execute(SQL_PENDIENTE_PACIENTE, (cc_paciente,)).fetchone() is None:
+            return False
+    with session(inmediata=True) as conn:
+        return _trasladar(conn, conn.execute(SQL_PENDIENTE_PACIENTE, (cc_paciente,)).fetchall()) > 0
+
+
+def migrar_lote(desde_id: int = 0, tamano: int = TAMANO_LOTE) -> tuple:
+    """
+    Traslada hasta `tamano` pacientes con datos antiguos a partir de
+    pacientes.id > desde_id. Retorna (trasladados, último id revisado o None si terminó).
+    """
+    with session(inmediata=True) as conn:
+        filas = conn.execute(SQL_LOTE_PENDIENTE, (desde_id, tamano)).fetchall()
+        if not filas:
+            return 0, None
+        _trasladar(conn, [fila[1:] for fila in filas])
+        return len(filas), filas[-1][0]
+
+
+def migrar_pendientes(tamano: int = TAMANO_LOTE) -> int:
+    """Traslada todos los pacientes con datos antiguos, un lote por transacción."""
+    global _migracion_completa
+    total, cursor = 0, 0
+    while cursor is not None:
+        trasladados, cursor = migrar_lote(cursor, tamano)
+        total += trasladados
+    _migracion_completa = True
+    return total
+
+
+_hilo = None
+_hilo_lock = threading.Lock()
+
+
+def iniciar_migracion():
+    """Lanza (una vez por proceso) el traslado de fondo de los registros antiguos."""
+    global _hilo
+    with _hilo_lock:
+        if _hilo is not None:
+            return
+        _hilo = threading.Thread(target=_migrar_en_fondo, name="MigracionRegistroClinico", daemon=True)
+        _hilo.start()
+
+
+def _migrar_en_fondo():
+    try:
+        total = migrar_pendientes()
+        if total:
+            print(f"✓ Registros clínicos trasladados a tablas propias: {total}")
+    except Exception as e:
+        # Lo que falte se traslada al leer cada paciente o en el próximo arranque
+        print(f"Error trasladando registros clínicos: {e}")
+
+
+# --- Lectura y escritura por campo ---
+def leer_anamnesis(cc_paciente: str) -> Optional[dict]:
+    with session() as conn:
+        fila = conn.execute(SQL_LEER_ANAMNESIS, (cc_paciente,)).fetchone()
+    if fila is None:
+        return None
+    datos = {k: v for k, v in zip(CAMPOS_ANAMNESIS, fila) if v is not None}
+    datos['cc_paciente'] = cc_paciente
+    if fila[-1]:
+        datos['anamnesis'] = fila[-1]
+    return datos
+
+
+def guardar_anamnesis(cc_paciente: str, datos: dict):
+    """Crea la anamnesis o actualiza solo los campos presentes en `datos`."""
+    migrar_paciente(cc_paciente)  # lo antiguo primero, para no pisarlo después
+    campos = [k for k in CAMPOS_ANAMNESIS if k in datos]
+    asignaciones = ''.join(f"{k} = excluded.{k}, " for k in campos)
+    with session() as conn:
+        conn.execute(
+            f"INSERT INTO anamnesis (paciente_dni, {''.join(k + ', ' for k in campos)}fecha_modificacion) "
+            f"VALUES (?, {'?, ' * len(campos)}?) "
+            f"ON CONFLICT (paciente_dni) DO UPDATE SET {asignaciones}fecha_modificacion = excluded.fecha_modificacion",
+            (cc_paciente, *(datos[k] for k in campos), _ahora())
+        )
+
+
+def leer_historia(cc_paciente: str) -> Optional[dict]:
+    with session() as conn:
+        fila = conn.execute(
+            "SELECT numero_historia, fecha_creacion, estado, observaciones, fecha_modificacion, texto_original "
+            "FROM historias_clinicas WHERE paciente_dni = ?",
+            (cc_paciente,)
+        ).fetchone()
+    if fila is None:
+        return None
+    historia = dict(zip(('numero_historia', 'fecha_creacion', 'estado', 'observaciones', 'fecha_modificacion'), fila))
+    historia['cc_paciente'] = cc_paciente
+    if fila[-1]:
+        historia['texto_original'] = fila[-1]
+    for campo in ('fecha_creacion', 'fecha_modificacion'):
+        if historia[campo]:
+            try:
+                historia[campo] = datetime.fromisoformat(historia[campo])
+            except ValueError:
+                pass  # Dejar como texto
+    return historia
+
+
+def crear_historia(cc_paciente: str, numero_historia: str, fecha_creacion: datetime) -> bool:
+    """Inserta la historia clínica. Retorna False si el paciente ya tenía una."""
+    migrar_paciente(cc_paciente)
+    with session() as conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO historias_clinicas (paciente_dni, numero_historia, fecha_creacion) VALUES (?, ?, ?)",
+            (cc_paciente, numero_historia, fecha_creacion.isoformat())
+        )
+        return cursor.rowcount > 0
+
+
+def actualizar_historia(cc_paciente: str, datos: dict) -> bool:
+    """Escribe solo los campos de CAMPOS_HISTORIA presentes en `datos`. Retorna False si no hay historia."""
+    migrar_paciente(cc_paciente)
+    campos = [k for k in CAMPOS_HISTORIA if k in datos]
+    valores = [datos[k].isoformat() if hasattr(datos[k], 'isoformat') else datos[k] for k in campos]
+    with session() as conn:
+        cursor = conn.execute(
+            SQL_ACTUALIZAR_HISTORIA.format(asignaciones=''.join(k + ' = ?, ' for k in campos)),
+            (*valores, _ahora(), cc_paciente)
+        )
+        return cursor.rowcount > 0
+
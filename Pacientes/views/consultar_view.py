@@ -1,8 +1,8 @@
 # Pacientes/views/consultar_view.py
 
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
-    QTableWidgetItem, QPushButton, QLabel, QLineEdit, 
+    QWidget, QVBoxLayout, QHBoxLayout, QTableView,
+    QPushButton, QLabel, QLineEdit, 
     QHeaderView, QMessageBox, QAbstractItemView, QFrame, QComboBox
 )
 from PyQt6.QtCore import Qt
@@ -10,6 +10,7 @@ from PyQt6.QtCore import Qt
 # Imports del Core
 from core.theme import AppPalette, STYLES
 from core.utils import get_icon
+from core.tabla_virtual import ModeloTablaVirtual, ProxyTablaVirtual
 
 # Imports del Módulo
 # Nota: Asumimos que los diálogos de edición siguen en su carpeta original o dialogs.py
@@ -22,6 +23,7 @@ class ConsultarPacienteView(QWidget):
         super().__init__()
         self.controller = controller
         self.pacientes_lista = []
+        self.pacientes_por_cc = {}
         self.init_ui()
         
     def init_ui(self):
@@ -63,9 +65,12 @@ class ConsultarPacienteView(QWidget):
         table_layout = QVBoxLayout(table_frame)
         table_layout.setContentsMargins(0, 0, 0, 0)
 
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(5)
-        self.tabla.setHorizontalHeaderLabels(["Cédula", "Nombre", "Apellido", "Teléfono", "Email"])
+        # Modelo virtual: la vista solo pide las celdas visibles
+        self.modelo = ModeloTablaVirtual(["Cédula", "Nombre", "Apellido", "Teléfono", "Email"])
+        self.proxy = ProxyTablaVirtual(self.modelo)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.proxy)
+        self.tabla.setSortingEnabled(True)
         
         # Configuración de la tabla para que se vea profesional
         self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
@@ -127,46 +132,27 @@ class ConsultarPacienteView(QWidget):
         self.mostrar_datos(self.pacientes_lista)
 
     def mostrar_datos(self, pacientes):
-        self.tabla.setRowCount(0)
-        for p in pacientes:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            self.tabla.setItem(row, 0, QTableWidgetItem(p.cc))
-            self.tabla.setItem(row, 1, QTableWidgetItem(p.nombre))
-            self.tabla.setItem(row, 2, QTableWidgetItem(p.apellido))
-            self.tabla.setItem(row, 3, QTableWidgetItem(p.telefono or "-"))
-            self.tabla.setItem(row, 4, QTableWidgetItem(p.email or "-"))
+        # Índice por cédula para recuperar el objeto completo de la fila seleccionada
+        self.pacientes_por_cc = {p.cc: p for p in pacientes}
+        self.modelo.cargar(
+            (p.cc, p.nombre, p.apellido, p.telefono or "-", p.email or "-")
+            for p in pacientes
+        )
 
     def filtrar_pacientes(self):
-        texto = self.txt_buscar.text().strip().lower()
-        criterio = self.cmb_filtro.currentText()
-
+        texto = self.txt_buscar.text().strip()
         if not texto:
             self.mostrar_datos(self.pacientes_lista)
             return
 
-        filtrados = []
-        for p in self.pacientes_lista:
-            match = False
-            if criterio == "Cédula" and texto in p.cc.lower(): match = True
-            elif criterio == "Nombre" and texto in p.nombre.lower(): match = True
-            elif criterio == "Apellido" and texto in p.apellido.lower(): match = True
-            elif criterio == "Todo":
-                if (texto in p.cc.lower() or texto in p.nombre.lower() or texto in p.apellido.lower()):
-                    match = True
-            
-            if match: filtrados.append(p)
-        
-        self.mostrar_datos(filtrados)
+        # Búsqueda indexada en la BD: prefijos, sin tildes, por relevancia
+        criterio = self.cmb_filtro.currentText()
+        self.mostrar_datos(self.controller.buscar_pacientes(texto, criterio))
 
     def get_paciente_seleccionado(self):
-        row = self.tabla.currentRow()
-        if row < 0: return None
-        cc = self.tabla.item(row, 0).text()
-        # Buscamos en la lista memoria para tener el objeto completo rápido
-        for p in self.pacientes_lista:
-            if p.cc == cc: return p
-        return None
+        fila = self.proxy.fila_actual(self.tabla)
+        if fila is None: return None
+        return self.pacientes_por_cc.get(fila[0])
 
     def abrir_detalle(self):
         paciente = self.get_paciente_seleccionado()
@@ -0,0 +1,103 @@
+"""
+Cachés en memoria acotadas (LRU con caducidad) compartidas por todo el proceso.
+
+Cada caché se obtiene por nombre con obtener_cache(), así todas las
+instancias de un controlador leen y escriben la misma. Una entrada se
+descarta al superar la capacidad (la menos usada primero) o al cumplir
+`ttl` segundos, para no servir datos que otro proceso ya cambió en la BD.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+CAPACIDAD = 1000      # entradas por caché
+TTL = 300.0           # segundos que una entrada se considera vigente
+
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """Diccionario acotado y seguro entre hilos con contadores de aciertos y fallos."""
+
+    def __init__(self, nombre: str, capacidad: int = CAPACIDAD, ttl: float = TTL):
+        self.nombre = nombre
+        self.capacidad = max(1, int(capacidad))
+        self.ttl = ttl
+        self._datos = OrderedDict()   # clave -> (valor, vence)
+        self._lock = threading.Lock()
+        # Métricas
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+        self.invalidaciones = 0
+
+    def obtener(self, clave, defecto=None):
+        """Valor vigente de `clave` o `defecto`. Marca la entrada como recién usada."""
+        with self._lock:
+            entrada = self._datos.get(clave, _AUSENTE)
+            if entrada is not _AUSENTE and entrada[1] > time.monotonic():
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            if entrada is not _AUSENTE:
+                del self._datos[clave]  # caducada
+            self.fallos += 1
+            return defecto
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+                self.descartes += 1
+
+    def invalidar(self, clave) -> bool:
+        """Quita `clave`. Retorna True si estaba en la caché."""
+        with self._lock:
+            self.invalidaciones += 1
+            return self._datos.pop(clave, _AUSENTE) is not _AUSENTE
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def valores(self) -> list:
+        """Valores vigentes (sin contar como aciertos ni cambiar el orden)."""
+        ahora = time.monotonic()
+        with self._lock:
+            return [valor for valor, vence in self._datos.values() if vence > ahora]
+
+    def __len__(self):
+        return len(self._datos)
+
+    def estadisticas(self) -> dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            "nombre": self.nombre,
+            "entradas": len(self._datos),
+            "capacidad": self.capacidad,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+            "descartes": self.descartes,
+            "invalidaciones": self.invalidaciones,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def obtener_cache(nombre: str, capacidad: int = CAPACIDAD, ttl: float = TTL) -> CacheLRU:
+    """Devuelve la caché `nombre` del proceso (se crea en el primer uso)."""
+    with _caches_lock:
+        if nombre not in _caches:
+            _caches[nombre] = CacheLRU(nombre, capacidad, ttl)
+        return _caches[nombre]
+
+
+def estadisticas() -> list:
+    """Estadísticas de todas las cachés creadas en el proceso."""
+    with _caches_lock:
+        return [cache.estadisticas() for cache in _caches.values()]
@@ -1,48 +1,517 @@
-import sqlite3
+import os
+import threading
 from sqlite3 import Error
 
+from core.pool import session, configurar_pool, obtener_pool, al_conectar
+
+# --- PERFIL DE RENDIMIENTO ---
+# PRAGMAs aplicados a cada conexión del pool. Cada valor puede ajustarse por
+# despliegue con una variable de entorno HOSPITAL_DB_<PRAGMA>
+# (p.ej. HOSPITAL_DB_MMAP_SIZE=0 en equipos con poca memoria).
+PERFIL_RENDIMIENTO = {
+    "busy_timeout": 5000,      # ms de espera ante un bloqueo antes de fallar (va primero)
+    "journal_mode": "WAL",     # lectores y escritores no se bloquean entre sí
+    "synchronous": "NORMAL",   # seguro con WAL; evita un fsync por commit
+    "cache_size": -16000,      # negativo = KiB (≈16 MB por conexión)
+    "mmap_size": 134217728,    # 128 MB de lectura mapeada en memoria
+    "temp_store": "MEMORY",
+}
+
+for _pragma in PERFIL_RENDIMIENTO:
+    _valor = os.environ.get(f"HOSPITAL_DB_{_pragma.upper()}")
+    if _valor is not None:
+        PERFIL_RENDIMIENTO[_pragma] = int(_valor) if _valor.lstrip("-").isdigit() else _valor
+
+
+def configurar_perfil(**cambios):
+    """
+    Ajusta el perfil de rendimiento en tiempo de ejecución.
+    Las conexiones ya abiertas se recrean para que tomen los nuevos valores.
+    """
+    desconocidos = set(cambios) - set(PERFIL_RENDIMIENTO)
+    if desconocidos:
+        raise ValueError(f"PRAGMA no soportado en el perfil: {', '.join(sorted(desconocidos))}")
+    PERFIL_RENDIMIENTO.update(cambios)
+    configurar_pool()
+
+
+@al_conectar
+def aplicar_perfil(conn):
+    """Aplica PERFIL_RENDIMIENTO a una conexión recién abierta."""
+    for pragma, valor in PERFIL_RENDIMIENTO.items():
+        if valor is None:
+            continue
+        try:
+            # journal_mode es persistente en el archivo: solo se cambia si difiere,
+            # así una conexión nueva no compite por el bloqueo exclusivo.
+            if pragma == "journal_mode":
+                actual = conn.execute("PRAGMA journal_mode").fetchone()[0]
+                if actual.lower() == str(valor).lower():
+                    continue
+            conn.execute(f"PRAGMA {pragma} = {valor}")
+        except Error as e:
+            print(f"Aviso: no se pudo aplicar PRAGMA {pragma}={valor}: {e}")
+
 def crear_conexion():
-    """Establece la conexión con la base de datos SQLite."""
+    """
+    Obtiene una conexión del pool compartido.
+    Llamar a close() la devuelve al pool en lugar de cerrarla.
+    """
     try:
-        conn = sqlite3.connect('hospital.db')
-        # Habilitamos las llaves foráneas para que las relaciones funcionen
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        return obtener_pool().adquirir()
     except Error as e:
         print(f"Error de conexión: {e}")
         return None
 
 def migrar_columnas_signos_vitales(conn):
     """Agrega las nuevas columnas a pacienteSignosVitales si no existen."""
-    try:
-        cursor = conn.cursor()
-        
-        # Verificar columnas existentes
-        cursor.execute("PRAGMA table_info(pacienteSignosVitales)")
-        columnas_existentes = [columna[1] for columna in cursor.fetchall()]
-        
-        # Agregar columnas nuevas si no existen
-        columnas_nuevas = {
-            'codigo_cie10': 'TEXT',
-            'observaciones': 'TEXT',
-            'plan_tratamiento': 'TEXT',
-            'fecha_actualizacion_medica': 'TIMESTAMP'
-        }
-        
-        # for columna, tipo in columnas_nuevas.items():
-        #     if columna not in columnas_existentes:
-        #         try:
-        #             cursor.execute(f"ALTER TABLE pacienteSignosVitales ADD COLUMN {columna} {tipo}")
-        #             print(f"✓ Columna '{columna}' agregada a pacienteSignosVitales")
-        #         except Error as e:
-        #             print(f"Advertencia al agregar columna '{columna}': {e}")
-        
-        # conn.commit()
-    except Exception as e:
-        print(f"Error en migración de columnas: {e}")
+    cursor = conn.cursor()
+
+    # Verificar columnas existentes
+    cursor.execute("PRAGMA table_info(pacienteSignosVitales)")
+    columnas_existentes = [columna[1] for columna in cursor.fetchall()]
+
+    # Agregar columnas nuevas si no existen
+    columnas_nuevas = {
+        'codigo_cie10': 'TEXT',
+        'observaciones': 'TEXT',
+        'plan_tratamiento': 'TEXT',
+        'fecha_actualizacion_medica': 'TIMESTAMP'
+    }
+
+    for columna, tipo in columnas_nuevas.items():
+        if columna not in columnas_existentes:
+            cursor.execute(f"ALTER TABLE pacienteSignosVitales ADD COLUMN {columna} {tipo}")
+            print(f"✓ Columna '{columna}' agregada a pacienteSignosVitales")
+
+def cancelar_citas_duplicadas(conn):
+    """
+    Deja una sola cita activa por médico, fecha y hora (la más antigua) antes
+    de crear el índice único de turnos. Las repetidas pasan a 'Cancelada' y se
+    listan para que recepción las reprograme.
+    """
+    duplicadas = conn.execute("""
+        SELECT c.id, c.codigo FROM citas c
+        WHERE c.estado != 'Cancelada' AND EXISTS (
+            SELECT 1 FROM citas o
+            WHERE o.id_medico = c.id_medico AND o.fecha = c.fecha AND o.hora = c.hora
+              AND o.estado != 'Cancelada' AND o.id < c.id
+        )
+    """).fetchall()
+    for id_cita, codigo in duplicadas:
+        conn.execute(
+            "UPDATE citas SET estado = 'Cancelada', "
+            "comentario = trim(coalesce(comentario, '') || ' Turno duplicado, reprogramar.') WHERE id = ?",
+            (id_cita,)
+        )
+        print(f"⚠ Cita {codigo} cancelada: turno duplicado, reprogramar")
+
+# Letras que se pliegan al normalizar nombres para buscarlos sin tildes
+_PLIEGUE_NOMBRES = {"á": "a", "é": "e", "í": "i", "ó": "o", "ú": "u", "ü": "u", "ñ": "n"}
+_TABLA_PLIEGUE = str.maketrans(_PLIEGUE_NOMBRES)
+
+
+def normalizar_nombre(texto: str) -> str:
+    """'  José Núñez ' -> 'jose nunez': minúsculas, sin tildes ni espacios repetidos."""
+    return " ".join((texto or "").lower().translate(_TABLA_PLIEGUE).split())
+
+
+def sql_normalizar_nombre(expresion: str) -> str:
+    """
+    La misma normalización que normalizar_nombre escrita en SQL, para que los
+    triggers la apliquen en cualquier conexión (lower() de SQLite solo
+    convierte ASCII, por eso las letras con tilde se reemplazan una a una).
+    """
+    sql = expresion
+    for letra, base in _PLIEGUE_NOMBRES.items():
+        sql = f"replace(replace({sql}, '{letra}', '{base}'), '{letra.upper()}', '{base}')"
+    return f"lower(trim({sql}))"
 
-def inicializar_db():
-    """Crea todas las tablas del sistema hospitalario integrado."""
+
+_NOMBRE_MEDICO = sql_normalizar_nombre("{0}.nombres || ' ' || {0}.apellidos")
+_APELLIDO_MEDICO = sql_normalizar_nombre("{0}.apellidos || ' ' || {0}.nombres")
+
+# Suma (signo='') o resta (signo='-') un lote en caducidad_por_dia desde un trigger
+_SUMAR_CADUCIDAD = """
+            INSERT INTO caducidad_por_dia (fecha_caducidad, lotes, unidades)
+            SELECT {fila}.fecha_caducidad, {signo}({fila}.cantidad > 0), {signo}{fila}.cantidad
+            WHERE {fila}.fecha_caducidad IS NOT NULL
+            ON CONFLICT (fecha_caducidad) DO UPDATE
+            SET lotes = lotes + excluded.lotes, unidades = unidades + excluded.unidades;"""
+
+# --- MIGRACIONES VERSIONADAS ---
+# Cada migración es (versión, descripción, pasos). Los pasos son sentencias SQL
+# o funciones que reciben la conexión. La versión aplicada se guarda en
+# PRAGMA user_version y el detalle en la tabla migraciones_aplicadas.
+# Nunca modificar una migración ya publicada: agregar una nueva al final.
+MIGRACIONES = [
+    (1, "Columnas de consulta médica en pacienteSignosVitales", [
+        migrar_columnas_signos_vitales,
+    ]),
+    (2, "Índices para las consultas frecuentes de los controladores", [
+        "CREATE INDEX IF NOT EXISTS idx_citas_medico_fecha ON citas (id_medico, fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_citas_paciente ON citas (cc_paciente)",
+        "CREATE INDEX IF NOT EXISTS idx_signos_cedula_fecha ON pacienteSignosVitales (cedula, fecha_registro)",
+        "CREATE INDEX IF NOT EXISTS idx_consultas_paciente ON consultas (paciente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_hospitalizaciones_paciente ON hospitalizaciones (paciente_id, fecha_ingreso)",
+        "CREATE INDEX IF NOT EXISTS idx_pedido_detalles_pedido ON pedido_detalles (pedido_id)",
+        "CREATE INDEX IF NOT EXISTS idx_inventario_nombre ON inventario (nombre)",
+        "CREATE INDEX IF NOT EXISTS idx_inventario_tipo ON inventario (tipo)",
+        "CREATE INDEX IF NOT EXISTS idx_evoluciones_paciente ON evoluciones (paciente_dni, fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_permisos_visita_fecha ON permisos_visita (fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_medicos_especialidad ON medicos (especialidad, estado)",
+    ]),
+    (3, "Un solo turno activo por médico, fecha y hora", [
+        cancelar_citas_duplicadas,
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_citas_turno_activo ON citas (id_medico, fecha, hora) "
+        "WHERE estado != 'Cancelada'",
+    ]),
+    (4, "Bandeja de salida de notificaciones", [
+        """
+        CREATE TABLE IF NOT EXISTS outbox_notificaciones (
+            notificacion_id INTEGER PRIMARY KEY,
+            intentos INTEGER NOT NULL DEFAULT 0,
+            proximo_intento TEXT NOT NULL,
+            FOREIGN KEY (notificacion_id) REFERENCES notificaciones(id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_outbox_proximo ON outbox_notificaciones (proximo_intento)",
+    ]),
+    (5, "Índices del historial de notificaciones (paginación por fecha)", [
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_fecha ON notificaciones (fecha_envio)",
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_destinatario ON notificaciones (destinatario, fecha_envio)",
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_estado ON notificaciones (estado, fecha_envio)",
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_canal ON notificaciones (canal, fecha_envio)",
+    ]),
+    (6, "Índice de texto completo para la búsqueda de pacientes", [
+        # Contenido externo: el índice lee dni/nombres/apellidos de pacientes
+        # por su id y los triggers lo mantienen al día en cada escritura.
+        # remove_diacritics 2 hace que 'jose' encuentre 'José' y 'nunez' 'Núñez'.
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS pacientes_fts USING fts5(
+            dni, nombres, apellidos,
+            content='pacientes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='1 2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pacientes_fts_insert AFTER INSERT ON pacientes BEGIN
+            INSERT INTO pacientes_fts (rowid, dni, nombres, apellidos)
+            VALUES (new.id, new.dni, new.nombres, new.apellidos);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pacientes_fts_delete AFTER DELETE ON pacientes BEGIN
+            INSERT INTO pacientes_fts (pacientes_fts, rowid, dni, nombres, apellidos)
+            VALUES ('delete', old.id, old.dni, old.nombres, old.apellidos);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pacientes_fts_update AFTER UPDATE OF dni, nombres, apellidos ON pacientes BEGIN
+            INSERT INTO pacientes_fts (pacientes_fts, rowid, dni, nombres, apellidos)
+            VALUES ('delete', old.id, old.dni, old.nombres, old.apellidos);
+            INSERT INTO pacientes_fts (rowid, dni, nombres, apellidos)
+            VALUES (new.id, new.dni, new.nombres, new.apellidos);
+        END
+        """,
+        # Indexar los pacientes que ya existían
+        "INSERT INTO pacientes_fts (pacientes_fts) VALUES ('rebuild')",
+    ]),
+    (7, "Anamnesis e historia clínica en tablas propias (antes JSON en pacientes)", [
+        # Solo el DDL: los JSON/textos antiguos de pacientes.anamnesis e
+        # historia_clinica los traslada una vez Pacientes.registro_clinico en
+        # segundo plano (o al leer ese paciente), sin alargar el arranque.
+        """
+        CREATE TABLE IF NOT EXISTS anamnesis (
+            paciente_dni TEXT PRIMARY KEY,
+            motivo_consulta TEXT,
+            enfermedad_actual TEXT,
+            antecedentes_personales TEXT,
+            antecedentes_familiares TEXT,
+            alergias TEXT,
+            texto_original TEXT,
+            fecha_modificacion TEXT,
+            FOREIGN KEY (paciente_dni) REFERENCES pacientes (dni)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS historias_clinicas (
+            paciente_dni TEXT PRIMARY KEY,
+            numero_historia TEXT NOT NULL,
+            fecha_creacion TEXT,
+            estado TEXT NOT NULL DEFAULT 'Activa',
+            observaciones TEXT NOT NULL DEFAULT '',
+            fecha_modificacion TEXT,
+            FOREIGN KEY (paciente_dni) REFERENCES pacientes (dni)
+        )
+        """,
+    ]),
+    (8, "Índices de las tablas hijas para la eliminación en cascada de pacientes", [
+        # Sin ellos cada DELETE (y cada verificación de llave foránea al
+        # borrar el padre) recorre la tabla hija completa
+        "CREATE INDEX IF NOT EXISTS idx_entregas_paciente ON entregas (paciente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_entregas_receta ON entregas (receta_id)",
+        "CREATE INDEX IF NOT EXISTS idx_recetas_consulta ON recetas (consulta_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ordenes_servicio_consulta ON ordenes_servicio (consulta_id)",
+        "CREATE INDEX IF NOT EXISTS idx_cuidados_paciente ON cuidados (paciente_dni)",
+        "CREATE INDEX IF NOT EXISTS idx_permisos_visita_paciente ON permisos_visita (cedula_paciente)",
+    ]),
+    (9, "Nombres normalizados e indexados para la búsqueda de médicos", [
+        # 'nombres apellidos' y 'apellidos nombres' en minúsculas y sin tildes:
+        # buscar por el comienzo del nombre o del apellido es un rango sobre
+        # un índice, en lugar de lower(...) LIKE '%x%' sobre toda la tabla.
+        "ALTER TABLE medicos ADD COLUMN nombre_normalizado TEXT",
+        "ALTER TABLE medicos ADD COLUMN apellido_normalizado TEXT",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS medicos_nombre_insert AFTER INSERT ON medicos BEGIN
+            UPDATE medicos SET nombre_normalizado = {_NOMBRE_MEDICO.format('new')},
+                               apellido_normalizado = {_APELLIDO_MEDICO.format('new')}
+            WHERE id = new.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS medicos_nombre_update AFTER UPDATE OF nombres, apellidos ON medicos BEGIN
+            UPDATE medicos SET nombre_normalizado = {_NOMBRE_MEDICO.format('new')},
+                               apellido_normalizado = {_APELLIDO_MEDICO.format('new')}
+            WHERE id = new.id;
+        END
+        """,
+        # Normalizar los médicos que ya existían
+        f"UPDATE medicos SET nombre_normalizado = {_NOMBRE_MEDICO.format('medicos')}, "
+        f"apellido_normalizado = {_APELLIDO_MEDICO.format('medicos')}",
+        "CREATE INDEX IF NOT EXISTS idx_medicos_nombre_normalizado ON medicos (nombre_normalizado)",
+        "CREATE INDEX IF NOT EXISTS idx_medicos_apellido_normalizado ON medicos (apellido_normalizado)",
+    ]),
+    (10, "Índices del historial de pedidos de farmacia (filtro por estado y fecha)", [
+        # Con el id implícito al final del índice, (estado) ya entrega los
+        # pedidos de un estado en orden de id para paginar sin ordenar
+        "CREATE INDEX IF NOT EXISTS idx_pedidos_farmacia_estado ON pedidos_farmacia (estado)",
+        "CREATE INDEX IF NOT EXISTS idx_pedidos_farmacia_fecha ON pedidos_farmacia (fecha_creacion)",
+    ]),
+    (11, "Lotes de inventario con índice de caducidad y resumen por fecha de vencimiento", [
+        """
+        CREATE TABLE IF NOT EXISTS inventario_lotes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            producto_id INTEGER NOT NULL,
+            lote TEXT NOT NULL,
+            cantidad INTEGER NOT NULL DEFAULT 0 CHECK (cantidad >= 0),
+            fecha_caducidad TEXT,
+            fecha_ingreso TEXT DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (producto_id, lote),
+            FOREIGN KEY (producto_id) REFERENCES inventario (id)
+        )
+        """,
+        # Solo los lotes con existencias importan para los vencimientos
+        "CREATE INDEX IF NOT EXISTS idx_lotes_caducidad ON inventario_lotes (fecha_caducidad) WHERE cantidad > 0",
+        # Unidades y lotes con existencias por fecha de vencimiento. Es una
+        # tabla pequeña (una fila por fecha) que los triggers actualizan con
+        # cada movimiento; los tramos de días se calculan sobre ella.
+        """
+        CREATE TABLE IF NOT EXISTS caducidad_por_dia (
+            fecha_caducidad TEXT PRIMARY KEY,
+            lotes INTEGER NOT NULL DEFAULT 0,
+            unidades INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        # El stock de cada producto pasa a ser un lote inicial (antes de crear
+        # los triggers, para no sumarlo dos veces)
+        "UPDATE inventario SET stock = MAX(COALESCE(stock, 0), 0)",
+        "INSERT OR IGNORE INTO inventario_lotes (producto_id, lote, cantidad, fecha_caducidad) "
+        "SELECT id, 'INICIAL', stock, NULLIF(fecha_caducidad, '') FROM inventario",
+        "INSERT INTO caducidad_por_dia (fecha_caducidad, lotes, unidades) "
+        "SELECT fecha_caducidad, SUM(cantidad > 0), SUM(cantidad) FROM inventario_lotes "
+        "WHERE fecha_caducidad IS NOT NULL GROUP BY fecha_caducidad",
+        # inventario.stock queda como la suma de sus lotes
+        f"""
+        CREATE TRIGGER IF NOT EXISTS lotes_insert AFTER INSERT ON inventario_lotes BEGIN
+            UPDATE inventario SET stock = stock + new.cantidad WHERE id = new.producto_id;
+            {_SUMAR_CADUCIDAD.format(signo='', fila='new')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS lotes_delete AFTER DELETE ON inventario_lotes BEGIN
+            UPDATE inventario SET stock = stock - old.cantidad WHERE id = old.producto_id;
+            {_SUMAR_CADUCIDAD.format(signo='-', fila='old')}
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS lotes_update AFTER UPDATE OF producto_id, cantidad, fecha_caducidad
+        ON inventario_lotes BEGIN
+            UPDATE inventario SET stock = stock - old.cantidad WHERE id = old.producto_id;
+            UPDATE inventario SET stock = stock + new.cantidad WHERE id = new.producto_id;
+            {_SUMAR_CADUCIDAD.format(signo='-', fila='old')}
+            {_SUMAR_CADUCIDAD.format(signo='', fila='new')}
+        END
+        """,
+    ]),
+    (12, "Ocupación de camas y habitaciones por sala, piso y estado; área de cada hospitalización", [
+        # Una fila por (tipo, ámbito, clave, estado); la escribe el repositorio
+        # de camas_y_salas en cada cambio y la leen los tableros
+        """
+        CREATE TABLE IF NOT EXISTS ocupacion (
+            tipo TEXT NOT NULL,
+            ambito TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            estado TEXT NOT NULL,
+            cantidad INTEGER NOT NULL DEFAULT 0,
+            actualizado TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (tipo, ambito, clave, estado)
+        ) WITHOUT ROWID
+        """,
+        # Para descontar de areas_hospital.ocupadas al dar el alta
+        "ALTER TABLE hospitalizaciones ADD COLUMN area TEXT",
+    ]),
+    (13, "Última secuencia confirmada del diario de escritura diferida de camas y salas", [
+        """
+        CREATE TABLE IF NOT EXISTS diario_camas_aplicado (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            secuencia INTEGER NOT NULL
+        )
+        """,
+    ]),
+    (14, "Índices para cargar camas y salas por piso", [
+        "CREATE INDEX IF NOT EXISTS idx_salas_habitaciones_ubicacion ON salas_habitaciones (ubicacion, tipo)",
+        "CREATE INDEX IF NOT EXISTS idx_camas_habitacion ON camas (habitacion_numero)",
+    ]),
+    (15, "Historial de eventos de camas y salas (solo inserciones)", [
+        # Un evento por fila: tipo (clave de PLANTILLAS_EVENTO en
+        # camas_y_salas/models.py) y sus datos como arreglo JSON
+        """
+        CREATE TABLE IF NOT EXISTS historial_camas (
+            id INTEGER PRIMARY KEY,
+            fecha TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            datos TEXT NOT NULL DEFAULT '[]'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS historial_camas_sin_update BEFORE UPDATE ON historial_camas BEGIN
+            SELECT RAISE(ABORT, 'historial_camas solo admite inserciones');
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS historial_camas_sin_delete BEFORE DELETE ON historial_camas BEGIN
+            SELECT RAISE(ABORT, 'historial_camas solo admite inserciones');
+        END
+        """,
+    ]),
+    (16, "Texto original de las historias clínicas trasladadas", [
+        # El JSON antiguo completo, con las claves que no tienen columna propia
+        "ALTER TABLE historias_clinicas ADD COLUMN texto_original TEXT",
+    ]),
+    (17, "Historial de notificaciones paginado por id; fecha de entrega aparte", [
+        # fecha_envio queda como la fecha en que se encoló (no cambia) y la
+        # bandeja escribe la entrega en fecha_entrega
+        "ALTER TABLE notificaciones ADD COLUMN fecha_entrega TEXT",
+        "UPDATE notificaciones SET fecha_entrega = fecha_envio WHERE estado IN ('Enviada', 'Fallida')",
+        # Índices de un filtro: recorren en orden de id (rowid), el del cursor
+        "DROP INDEX IF EXISTS idx_notificaciones_destinatario",
+        "DROP INDEX IF EXISTS idx_notificaciones_estado",
+        "DROP INDEX IF EXISTS idx_notificaciones_canal",
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_destinatario ON notificaciones (destinatario)",
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_estado ON notificaciones (estado)",
+        "CREATE INDEX IF NOT EXISTS idx_notificaciones_canal ON notificaciones (canal)",
+    ]),
+    (18, "Fechas de notificaciones con el formato de CURRENT_TIMESTAMP", [
+        # La bandeja las escribía con 'T' entre fecha y hora; como texto no
+        # se ordenan bien junto a las de CURRENT_TIMESTAMP
+        "UPDATE notificaciones SET fecha_envio = replace(fecha_envio, 'T', ' ') WHERE fecha_envio LIKE '%T%'",
+        "UPDATE notificaciones SET fecha_entrega = replace(fecha_entrega, 'T', ' ') WHERE fecha_entrega LIKE '%T%'",
+        "UPDATE outbox_notificaciones SET proximo_intento = replace(proximo_intento, 'T', ' ') "
+        "WHERE proximo_intento LIKE '%T%'",
+    ]),
+]
+
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def aplicar_migraciones(conn):
+    """
+    Ejecuta, en orden y cada una en su propia transacción, las migraciones
+    posteriores a PRAGMA user_version. Retorna la lista de versiones aplicadas.
+    Si una falla se revierte y se detiene, para reintentarla en el próximo arranque.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migraciones_aplicadas (
+            version INTEGER PRIMARY KEY,
+            descripcion TEXT NOT NULL,
+            fecha_aplicacion TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+
+    version_actual = conn.execute("PRAGMA user_version").fetchone()[0]
+    aplicadas = []
+    for version, descripcion, pasos in MIGRACIONES:
+        if version <= version_actual:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for paso in pasos:
+                if callable(paso):
+                    paso(conn)
+                else:
+                    conn.execute(paso)
+            conn.execute(
+                "INSERT OR REPLACE INTO migraciones_aplicadas (version, descripcion) VALUES (?, ?)",
+                (version, descripcion)
+            )
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+            aplicadas.append(version)
+            print(f"✓ Migración {version} aplicada: {descripcion}")
+        except Error as e:
+            conn.rollback()
+            print(f"Error en migración {version} ({descripcion}): {e}")
+            break
+    return aplicadas
+
+# Guardia de esquema: evita repetir el DDL en cada repositorio/controlador.
+# Guarda la ruta de la BD ya verificada (configurar_pool puede cambiarla).
+_esquema_listo_en = None
+_esquema_lock = threading.Lock()
+ejecuciones_ddl = 0  # cuántas veces se ejecutó el DDL completo en este proceso
+
+
+def esquema_actualizado(conn) -> bool:
+    """Indica si la BD ya tiene todas las tablas y migraciones (según user_version)."""
+    return conn.execute("PRAGMA user_version").fetchone()[0] >= VERSION_ESQUEMA
+
+
+def inicializar_db(forzar: bool = False):
+    """
+    Garantiza que el esquema esté creado y migrado.
+    Solo ejecuta el DDL si user_version está desactualizado, y como mucho una
+    vez por proceso y BD; las llamadas siguientes retornan de inmediato.
+    Los cambios de esquema deben agregarse como una migración nueva en
+    MIGRACIONES para que las BD existentes los reciban.
+    """
+    global _esquema_listo_en
+    ruta = obtener_pool().ruta
+    if _esquema_listo_en == ruta and not forzar:
+        return
+    with _esquema_lock:
+        if _esquema_listo_en == ruta and not forzar:
+            return
+        if not forzar:
+            with session() as conn:
+                if esquema_actualizado(conn):
+                    _esquema_listo_en = ruta
+                    return
+        # Si una migración falló, la BD queda sin marcar y se reintenta en
+        # la próxima llamada en vez de seguir con un esquema a medias
+        if _crear_esquema():
+            _esquema_listo_en = ruta
+
+
+def _crear_esquema() -> bool:
+    """
+    Crea todas las tablas del sistema hospitalario integrado.
+    Retorna True si el esquema quedó en VERSION_ESQUEMA.
+    """
+    global ejecuciones_ddl
+    ejecuciones_ddl += 1
     conn = crear_conexion()
     if conn:
         cursor = conn.cursor()
@@ -278,39 +747,101 @@ def inicializar_db():
             )
         """)
 
+        # --- TABLAS DE LOS SUBMÓDULOS DE HOSPITALIZACIÓN Y CITAS ---
+        # (Centralizadas aquí para que las migraciones puedan indexarlas)
+
+        # 15. Visitas
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS visitantes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cedula TEXT UNIQUE,
+                nombre TEXT,
+                apellidos TEXT,
+                restriccion INTEGER DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS permisos_visita (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cedula_paciente TEXT,
+                cedula_visitante TEXT,
+                fecha TEXT,
+                hora TEXT
+            )
+        """)
+
+        # 16. Evolución y Cuidados
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS evoluciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                paciente_dni TEXT,
+                nota TEXT,
+                fecha TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cuidados (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                paciente_dni TEXT,
+                datos TEXT,
+                fecha TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # 17. Admisión (capacidad por área)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS areas_hospital (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT UNIQUE,
+                capacidad INTEGER DEFAULT 0,
+                ocupadas INTEGER DEFAULT 0
+            )
+        """)
+
+        # 18. Horarios de atención de médicos (Citas)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS horarios_medicos (
+                id_medico INTEGER PRIMARY KEY,
+                hora_inicio INTEGER DEFAULT 9,
+                hora_fin INTEGER DEFAULT 17,
+                FOREIGN KEY (id_medico) REFERENCES medicos(id) ON DELETE CASCADE
+            )
+        """)
+
         conn.commit()
         
-        # Ejecutar migración para agregar columnas nuevas si es necesario
-        migrar_columnas_signos_vitales(conn)
-        
+        # Ejecutar migraciones pendientes (columnas nuevas, índices, ...)
+        aplicar_migraciones(conn)
+        completo = esquema_actualizado(conn)
+
         conn.close()
-        print("¡Estructura completa del Hospital creada con éxito!")
+        if completo:
+            print("¡Estructura completa del Hospital creada con éxito!")
+        else:
+            print(f"El esquema quedó incompleto (se esperaba la versión {VERSION_ESQUEMA}); se reintentará.")
+        return completo
+    return False
 
 # --- Funciones para el CRUD de Signos Vitales ---
 
 def insertar_signos_vitales(cedula, peso, talla, presion, motivo):
     """Inserta un nuevo registro de signos vitales para un paciente."""
-    conn = crear_conexion()
-    if conn:
-        try:
+    try:
+        with session() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO pacienteSignosVitales (cedula, peso, talla, presion, motivo)
                 VALUES (?, ?, ?, ?, ?)
             """, (cedula, peso, talla, presion, motivo))
-            conn.commit()
             return cursor.lastrowid
-        except Error as e:
-            print(f"Error al insertar signos vitales: {e}")
-            return None
-        finally:
-            conn.close()
+    except Error as e:
+        print(f"Error al insertar signos vitales: {e}")
+        return None
 
 def obtener_signos_vitales():
     """Obtiene todos los registros de signos vitales, unidos con los nombres de los pacientes."""
-    conn = crear_conexion()
-    if conn:
-        try:
+    try:
+        with session() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT 
@@ -330,17 +861,14 @@ def obtener_signos_vitales():
                 ORDER BY sv.fecha_registro DESC
             """)
             return cursor.fetchall()
-        except Error as e:
-            print(f"Error al obtener signos vitales: {e}")
-            return []
-        finally:
-            conn.close()
+    except Error as e:
+        print(f"Error al obtener signos vitales: {e}")
+        return []
 
 def actualizar_datos_medicos(cedula, codigo_cie10, observaciones, plan_tratamiento):
     """Actualiza los datos médicos en el registro más reciente de signos vitales del paciente."""
-    conn = crear_conexion()
-    if conn:
-        try:
+    try:
+        with session() as conn:
             cursor = conn.cursor()
             # Buscar el registro más reciente del paciente que no tenga datos médicos
             cursor.execute("""
@@ -356,15 +884,11 @@ def actualizar_datos_medicos(cedula, codigo_cie10, observaciones, plan_tratamien
                     LIMIT 1
                 )
             """, (codigo_cie10, observaciones, plan_tratamiento, cedula))
-            conn.commit()
             filas_afectadas = cursor.rowcount
             return filas_afectadas > 0
-        except Error as e:
-            print(f"Error al actualizar datos médicos: {e}")
-            return False
-        finally:
-            conn.close()
-    return False
+    except Error as e:
+        print(f"Error al actualizar datos médicos: {e}")
+        return False
 
 
 if __name__ == '__main__':
@@ -0,0 +1,64 @@
+"""
+Diagnósticos de rendimiento de la base de datos. Cada área tiene su módulo
+en este paquete (estres, planes, interfaz, citas, pacientes, medicos,
+farmacia, camas) y MODOS asocia cada modo con la función que lo ejecuta.
+
+Uso:
+    python -m core.diagnostico estres [segundos]
+    python -m core.diagnostico planes
+    python -m core.diagnostico arranque
+    python -m core.diagnostico modulos
+    python -m core.diagnostico reservas [procesos]
+    python -m core.diagnostico notificaciones [citas]
+    python -m core.diagnostico tablas [filas]
+    python -m core.diagnostico busqueda [pacientes]
+    python -m core.diagnostico cache [lecturas]
+    python -m core.diagnostico clinico [pacientes]
+    python -m core.diagnostico eliminacion [pacientes]
+    python -m core.diagnostico importacion [filas]
+    python -m core.diagnostico medicos_csv [filas]
+    python -m core.diagnostico medicos_busqueda [medicos]
+    python -m core.diagnostico pedidos [pedidos]
+    python -m core.diagnostico pedidos_lote [pedidos]
+    python -m core.diagnostico caducidad [productos]
+    python -m core.diagnostico camas [camas]
+    python -m core.diagnostico ocupacion [camas]
+    python -m core.diagnostico diario [cambios]
+    python -m core.diagnostico paginado [camas]
+    python -m core.diagnostico memoria [camas] [eventos]
+"""
+from . import camas, citas, estres, farmacia, interfaz, medicos, pacientes, planes
+
+# modo -> función que recibe los argumentos que siguen al modo
+MODOS = {
+    "estres": estres.modo_estres,
+    "planes": planes.modo_planes,
+    "arranque": interfaz.modo_arranque,
+    "modulos": interfaz.modo_modulos,
+    "reservas": citas.modo_reservas,
+    "notificaciones": citas.modo_notificaciones,
+    "tablas": interfaz.modo_tablas,
+    "busqueda": pacientes.modo_busqueda,
+    "cache": pacientes.modo_cache,
+    "clinico": pacientes.modo_clinico,
+    "eliminacion": pacientes.modo_eliminacion,
+    "importacion": pacientes.modo_importacion,
+    "medicos_csv": medicos.modo_medicos_csv,
+    "medicos_busqueda": medicos.modo_medicos_busqueda,
+    "pedidos": farmacia.modo_pedidos,
+    "pedidos_lote": farmacia.modo_pedidos_lote,
+    "caducidad": farmacia.modo_caducidad,
+    "camas": camas.modo_camas,
+    "ocupacion": camas.modo_ocupacion,
+    "diario": camas.modo_diario,
+    "paginado": camas.modo_paginado,
+    "memoria": camas.modo_memoria,
+}
+
+
+def main(argv):
+    modo = MODOS.get(argv[0]) if argv else None
+    if modo is None:
+        print(__doc__)
+        return
+    modo(argv[1:])
@@ -0,0 +1,5 @@
+import sys
+
+from core.diagnostico import main
+
+main(sys.argv[1:])
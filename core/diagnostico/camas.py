@@ -0,0 +1,584 @@
+"""
+Índices, ocupación, diario, carga por piso y memoria de camas y salas.
+
+Uso:
+    python -m core.diagnostico camas [camas]
+    python -m core.diagnostico ocupacion [camas]
+    python -m core.diagnostico diario [cambios]
+    python -m core.diagnostico paginado [camas]
+    python -m core.diagnostico memoria [camas] [eventos]
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from .comun import RAIZ
+
+
+def medir_camas(camas: int = 5_000, consultas: int = 500, movimientos: int = 2_000) -> dict:
+    """
+    Crea `camas` camas (2 pisos, salas de 10 habitaciones y 5 camas por
+    habitación) con registrar_infraestructura y compara las consultas de
+    camas_y_salas recorriendo los diccionarios (como antes) con los índices
+    de IndiceCamas. Tras `movimientos` asignaciones y altas al azar
+    verifica que los índices coincidan con recalcularlos desde cero.
+    """
+    import random
+    from core import database as db
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "camas.db"))
+    db.inicializar_db()
+    from Hospitalizacion.camas_y_salas.indice import clave_piso
+    from Hospitalizacion.camas_y_salas.models import Infraestructura
+    from Hospitalizacion.camas_y_salas.repository import MemoryRepository
+
+    repo = MemoryRepository()
+    azar = random.Random(11)
+    # En Piso 1 y Piso 2 la secuencia choca con salas de ejemplo (S-P1-02, S-P2-03)
+    pisos = ["Planta Baja", "Piso 3"]
+    r = {}
+
+    t = time.perf_counter()
+    habitaciones = []
+    for i in range(-(-camas // 50)):
+        sala = repo.registrar_infraestructura(Infraestructura("", "sala", 10, pisos[i % len(pisos)]))
+        for _ in range(10):
+            hab = repo.registrar_infraestructura(Infraestructura("", "habitacion", 0, pisos[i % len(pisos)], sala))
+            habitaciones.append(hab)
+            for _ in range(5):
+                repo.registrar_infraestructura(Infraestructura("", "cama", 0, hab))
+    r["alta_s"] = time.perf_counter() - t
+    r["camas"] = len(repo.camas)
+
+    # Consultas de antes: recorrer todas las camas / habitaciones / cédulas
+    def resolver_antes(num):
+        if num in repo.habitaciones:
+            return repo.habitaciones[num]
+        return next((h for hid, h in repo.habitaciones.items() if hid.split("-")[-1] == num), None)
+
+    def camas_de_habitacion_antes(hid):
+        return [c for c in repo.camas.values() if (h := resolver_antes(c.num_habitacion)) and h.numero == hid]
+
+    def buscar_camas_antes(q):
+        res = []
+        for cama in repo.camas.values():
+            hab = resolver_antes(cama.num_habitacion)
+            base = hab.nombre_clave if hab and hab.nombre_clave else cama.num_habitacion
+            if q in cama.id_cama.lower() or q in base.lower() or q in (cama.nombre_clave or "").lower():
+                res.append(cama)
+        return sorted(res, key=lambda c: (c.estado, c.id_cama))
+
+    for n in range(camas // 2):
+        repo.ensure_repo_patient(f"{n:010d}", f"Paciente {n}")
+    cedulas = list(repo._pacientes_idx_por_cc.items())
+
+    muestra = [azar.choice(habitaciones) for _ in range(consultas)]
+    pruebas = {
+        "camas de una habitación": (lambda h: camas_de_habitacion_antes(h), lambda h: repo.camas_de_habitacion(h), muestra),
+        "buscar_camas": (lambda h: buscar_camas_antes(h.lower()), lambda h: repo.buscar_camas(h), muestra[:20]),
+        "cédula de un paciente": (
+            lambda p: next((cc for cc, pid in repo._pacientes_idx_por_cc.items() if pid == p), None),
+            repo.get_cc_por_pid, [azar.choice(cedulas)[1] for _ in range(consultas)]),
+    }
+    r["consultas"] = {}
+    for nombre, (antes, ahora, args) in pruebas.items():
+        t = time.perf_counter()
+        esperado = [antes(a) for a in args]
+        ms_antes = (time.perf_counter() - t) * 1000 / len(args)
+        t = time.perf_counter()
+        obtenido = [ahora(a) for a in args]
+        ms_ahora = (time.perf_counter() - t) * 1000 / len(args)
+        iguales = all(sorted(map(repr, e)) == sorted(map(repr, o)) if isinstance(e, list) else e == o
+                      for e, o in zip(esperado, obtenido))
+        r["consultas"][nombre] = (ms_antes, ms_ahora, iguales)
+
+    pids = [pid for _, pid in cedulas]
+    t = time.perf_counter()
+    for _ in range(movimientos):
+        pid = azar.choice(pids)
+        if repo.pacientes[pid].cama_asignada:
+            repo.autorizar_alta(pid)
+        else:
+            repo.registrar_hospitalizacion_solo_sala(pid, "", azar.choice(list(repo.salas)), "")
+            libres = repo.camas_de_sala(repo.get_sala_de_paciente(pid), "disponible")
+            if libres:
+                repo.asignar_cama(pid, repo.get_sala_de_paciente(pid), libres[0].id_cama)
+    r["movimientos_ms"] = (time.perf_counter() - t) * 1000 / movimientos
+
+    # Recalcular los índices desde los diccionarios y comparar
+    indice = repo.indice
+    por_estado, por_hab, por_sala, por_piso = {}, {}, {}, {}
+    for cama in repo.camas.values():
+        hab = resolver_antes(cama.num_habitacion)
+        por_estado.setdefault(cama.estado, set()).add(cama.id_cama)
+        por_hab.setdefault(hab.numero, set()).add(cama.id_cama)
+        por_piso.setdefault(clave_piso(hab.ubicacion), set()).add(cama.id_cama)
+        if hab.sala_id:
+            por_sala.setdefault(hab.sala_id, set()).add(cama.id_cama)
+    ocupantes = {p.cama_asignada: pid for pid, p in repo.pacientes.items() if p.cama_asignada}
+
+    def sin_vacios(d):
+        return {k: v for k, v in d.items() if v}
+    r["coherente"] = (
+        sin_vacios(indice.camas_por_estado) == por_estado
+        and sin_vacios(indice.camas_por_habitacion) == por_hab
+        and sin_vacios(indice.camas_por_sala) == por_sala
+        and sin_vacios(indice.camas_por_piso) == por_piso
+        and indice.paciente_de_cama == ocupantes
+        and all(repo.camas[c].estado == "ocupada" for c in ocupantes)
+        and all(ok for _, _, ok in r["consultas"].values())
+    )
+    return r
+
+
+def medir_ocupacion(camas: int = 5_000, consultas: int = 200, movimientos: int = 1_000) -> dict:
+    """
+    Con `camas` camas en un DbBackedRepository sobre una BD temporal, compara
+    contar las camas libres por piso recorriendo todas las camas (como
+    antes) con ServicioOcupacion, y verifica tras `movimientos`
+    asignaciones, altas y cambios de estado de habitación que los
+    contadores y la tabla ocupacion coincidan con recontar. También
+    comprueba que el alta de Admisión devuelva el lugar al área.
+    """
+    import random
+    from core import database as db
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "ocupacion.db"))
+    db.inicializar_db(forzar=True)
+    from Hospitalizacion.camas_y_salas.indice import clave_piso
+    from Hospitalizacion.camas_y_salas.models import Infraestructura
+    from Hospitalizacion.camas_y_salas.ocupacion import leer_ocupacion
+    from Hospitalizacion.camas_y_salas.repository import DbBackedRepository
+
+    repo = DbBackedRepository()
+    azar = random.Random(5)
+    pisos = ["Planta Baja", "Piso 3"]  # sin choques con las salas de ejemplo
+    for i in range(-(-camas // 50)):
+        sala = repo.registrar_infraestructura(Infraestructura("", "sala", 10, pisos[i % 2]))
+        for _ in range(10):
+            hab = repo.registrar_infraestructura(Infraestructura("", "habitacion", 0, pisos[i % 2], sala))
+            for _ in range(5):
+                repo.registrar_infraestructura(Infraestructura("", "cama", 0, hab))
+    r = {"camas": len(repo.camas)}
+
+    def libres_por_piso_antes():
+        libres = {}
+        for cama in repo.camas.values():
+            hab = repo._resolve_habitacion(cama.num_habitacion)
+            if hab and cama.estado == "disponible":
+                piso = clave_piso(hab.ubicacion)
+                libres[piso] = libres.get(piso, 0) + 1
+        return libres
+
+    def libres_por_piso_ahora():
+        return {piso: c["disponible"] for piso, c in repo.ocupacion.por_ambito("piso").items() if c.get("disponible")}
+
+    for nombre, funcion in (("antes", libres_por_piso_antes), ("ahora", libres_por_piso_ahora)):
+        t = time.perf_counter()
+        for _ in range(consultas):
+            funcion()
+        r[f"{nombre}_ms"] = (time.perf_counter() - t) * 1000 / consultas
+    t = time.perf_counter()
+    for _ in range(consultas):
+        leer_ocupacion("piso")
+    r["tabla_ms"] = (time.perf_counter() - t) * 1000 / consultas
+
+    pids = [repo.ensure_repo_patient(None, f"Paciente {n}") for n in range(camas // 2)]
+    salas = list(repo.salas)
+    t = time.perf_counter()
+    for _ in range(movimientos):
+        pid = azar.choice(pids)
+        if azar.random() < 0.1:
+            repo.actualizar_estado_habitacion(azar.choice(list(repo.habitaciones)),
+                                              azar.choice(["disponible", "ocupada", "mantenimiento"]))
+        elif repo.pacientes[pid].cama_asignada:
+            repo.autorizar_alta(pid)
+        else:
+            sala = azar.choice(salas)
+            libres = repo.camas_de_sala(sala, "disponible")
+            if libres:
+                repo.pacientes[pid].estado = "hospitalizado"
+                repo.asignar_cama(pid, sala, libres[0].id_cama)
+    repo.diario.vaciar()
+    r["movimientos_ms"] = (time.perf_counter() - t) * 1000 / movimientos
+
+    # Recontar desde los diccionarios
+    esperado = {}
+    for tipo, elementos in (("cama", repo.camas.values()), ("habitacion", repo.habitaciones.values())):
+        for e in elementos:
+            hab = repo._resolve_habitacion(e.num_habitacion) if tipo == "cama" else e
+            ambitos = [("total", "")]
+            if hab:
+                ambitos.append(("piso", clave_piso(hab.ubicacion)))
+                if hab.sala_id:
+                    ambitos.append(("sala", hab.sala_id))
+            for ambito, clave in ambitos:
+                conteo = esperado.setdefault((tipo, ambito, clave), {})
+                conteo[e.estado] = conteo.get(e.estado, 0) + 1
+    contadores = {k: {e: n for e, n in c.items() if n} for k, c in repo.ocupacion.conteos.items()}
+    contadores = {k: c for k, c in contadores.items() if c}
+    tabla = {}
+    for tipo in ("cama", "habitacion"):
+        for ambito in ("total", "piso", "sala"):
+            for clave, conteo in leer_ocupacion(ambito, tipo).items():
+                tabla[(tipo, ambito, clave)] = conteo
+    r["coherente"] = contadores == esperado and tabla == esperado and libres_por_piso_antes() == libres_por_piso_ahora()
+
+    # Admisión: ingreso y alta en un área de 1 lugar
+    from Hospitalizacion.Gestion_Admision_Alta.repository import AdmisionRepository
+    admision = AdmisionRepository()
+    with db.session() as conn:
+        conn.execute("INSERT INTO pacientes (dni, nombres, apellidos) VALUES ('1700000001', 'Ana', 'Prueba')")
+        conn.execute("INSERT INTO areas_hospital (nombre, capacidad, ocupadas) VALUES ('UCI', 1, 0)")
+    admision.registrar_ingreso("1700000001", "", "UCI")
+    admision.registrar_alta("1700000001", "")
+    r["area_liberada"] = admision.registrar_ingreso("1700000001", "", "UCI") == "Ingreso registrado con éxito"
+    return r
+
+
+def medir_diario(cambios: int = 20_000, camas: int = 500) -> dict:
+    """
+    Compara escribir cada cambio de estado de cama con su propio commit
+    (como antes DbBackedRepository) con encolarlo en DiarioCamas, con
+    `cambios` asignaciones y altas sobre `camas` camas. Después un proceso
+    hijo encola hospitalizaciones y cambios y termina con os._exit sin
+    vaciar; al crear el repositorio de nuevo el diario debe reproducirlos
+    una sola vez.
+    """
+    import random
+    from core import database as db
+
+    ruta = os.path.join(tempfile.mkdtemp(), "diario.db")
+    db.configurar_pool(ruta)
+    db.inicializar_db(forzar=True)
+    from Hospitalizacion.camas_y_salas import diario as modulo_diario
+    from Hospitalizacion.camas_y_salas.models import Infraestructura
+    from Hospitalizacion.camas_y_salas.ocupacion import SQL_GUARDAR
+    from Hospitalizacion.camas_y_salas.repository import DbBackedRepository
+
+    # Sin vaciados por tiempo durante la medición
+    modulo_diario.INTERVALO = 3600
+    repo = DbBackedRepository()
+    repo.diario.intervalo = 3600
+    for _ in range(-(-camas // 50)):
+        sala = repo.registrar_infraestructura(Infraestructura("", "sala", 10, "Piso 3"))
+        for _ in range(10):
+            hab = repo.registrar_infraestructura(Infraestructura("", "habitacion", 0, "Piso 3", sala))
+            for _ in range(5):
+                repo.registrar_infraestructura(Infraestructura("", "cama", 0, hab))
+    repo.diario.vaciar()
+    ids = [c for c in repo.camas if c.startswith("C-H-P3-")]
+    azar = random.Random(3)
+    secuencia = [(azar.choice(ids), azar.choice(["ocupada", "disponible", "mantenimiento"])) for _ in range(cambios)]
+    r = {"cambios": cambios, "camas": len(ids)}
+
+    # Antes: el estado de la cama y los contadores de ocupación con un commit por cambio
+    conn = db.crear_conexion()
+    t = time.perf_counter()
+    for codigo, estado in secuencia:
+        repo.indice.cambiar_estado_cama(repo.camas[codigo], estado)
+        conn.execute("UPDATE camas SET estado=? WHERE codigo=?", (estado, codigo))
+        conn.executemany(SQL_GUARDAR, repo.ocupacion.filas_pendientes())
+        conn.commit()
+    r["antes_s"] = time.perf_counter() - t
+    conn.close()
+
+    # Ahora: al diario, con el vaciado por tamaño de lote en el hilo de fondo
+    vaciados = repo.diario.vaciados
+    t = time.perf_counter()
+    for codigo, estado in secuencia:
+        repo.indice.cambiar_estado_cama(repo.camas[codigo], estado)
+        repo._encolar("estado_cama", codigo, estado)
+    r["encolar_s"] = time.perf_counter() - t
+    repo.diario.vaciar()
+    r["ahora_s"] = time.perf_counter() - t
+    r["vaciados"] = repo.diario.vaciados - vaciados
+    with db.session() as c:
+        en_bd = dict(c.execute("SELECT codigo, estado FROM camas WHERE codigo LIKE 'C-H-P3-%'"))
+    r["estados_ok"] = en_bd == {c: repo.camas[c].estado for c in ids}
+
+    # Cierre inesperado: el hijo encola y termina sin vaciar
+    with db.session() as c:
+        c.executemany("INSERT INTO pacientes (dni, nombres, apellidos) VALUES (?, 'Paciente', ?)",
+                      [(f"17{n:08d}", str(n)) for n in range(20)])
+    sala_p3 = sorted(s for s in repo.salas if s.startswith("S-P3-"))[0]
+    hijo = f"""
+import os
+from core import database as db
+db.configurar_pool({ruta!r})
+from Hospitalizacion.camas_y_salas import diario
+diario.INTERVALO = diario.TAMANO_LOTE = 10 ** 9
+from Hospitalizacion.camas_y_salas.repository import repo
+for n in range(20):
+    pid = repo.ensure_repo_patient("17%08d" % n, "Paciente %d" % n)
+    repo.registrar_hospitalizacion_solo_sala(pid, "2026-01-01", {sala_p3!r}, "prueba")
+    libre = repo.camas_de_piso("Piso 3", "disponible")[0]
+    repo.asignar_cama(pid, {sala_p3!r}, libre.id_cama)
+print(repo.diario.pendientes(), flush=True)
+os._exit(1)
+"""
+    salida = subprocess.run([sys.executable, "-c", hijo], capture_output=True, text=True,
+                            cwd=RAIZ)
+    if salida.returncode != 1:
+        print(salida.stderr)
+    r["pendientes_hijo"] = int(salida.stdout.strip().splitlines()[-1]) if salida.stdout.strip() else 0
+    with db.session() as c:
+        antes_hosp = c.execute("SELECT COUNT(*) FROM hospitalizaciones").fetchone()[0]
+    r["reproducidas"] = DbBackedRepository().diario.escritas
+    # Una segunda carga no debe aplicarlas otra vez
+    DbBackedRepository()
+    with db.session() as c:
+        r["hospitalizaciones"] = c.execute("SELECT COUNT(*) FROM hospitalizaciones").fetchone()[0] - antes_hosp
+        r["ocupadas_sala"] = c.execute(
+            "SELECT COUNT(*) FROM camas c JOIN salas_habitaciones h ON h.numero = c.habitacion_numero "
+            "WHERE c.estado = 'ocupada' AND c.codigo LIKE ?", ("C-H-P3-%",)
+        ).fetchone()[0]
+    r["recuperado"] = r["pendientes_hijo"] > 0 and r["hospitalizaciones"] == 20
+    return r
+
+
+def medir_paginado(camas: int = 20_000) -> dict:
+    """
+    Arranque de DbBackedRepository sobre una BD con `camas` camas en 40
+    pisos: cargándolo todo (como antes, con los datos de ejemplo) contra la
+    carga por piso sin datos de ejemplo. Mide tiempo y memoria del arranque
+    y del primer acceso a un piso, y que la ocupación total no cambie al
+    terminar de cargar los demás.
+    """
+    import random
+    import tracemalloc
+    from core import database as db
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "paginado.db"))
+    db.inicializar_db(forzar=True)
+    from Hospitalizacion.camas_y_salas.repository import DbBackedRepository
+
+    azar = random.Random(11)
+    pisos = [f"Edificio {e} {p}" for e in range(1, 11) for p in ("Planta Baja", "Piso 1", "Piso 2", "Piso 3")]
+    por_piso = max(1, camas // len(pisos))
+    salas, habitaciones, filas_camas = [], [], []
+    for i, piso in enumerate(pisos):
+        for s in range(5):
+            salas.append((f"S-{i}-{s:02d}", "sala", "Disponible", piso, 10))
+        for h in range(-(-por_piso // 10)):
+            hid = f"H-{i}-{100 + h}"
+            habitaciones.append((hid, "habitacion", "disponible", piso, None))
+            for c in range(1, 11):
+                filas_camas.append((f"C-{hid}-{c}", hid, azar.choice(["disponible", "ocupada", "mantenimiento"])))
+    with db.session() as conn:
+        conn.executemany("INSERT INTO salas_habitaciones (numero, tipo, estado, ubicacion, capacidad) VALUES (?,?,?,?,?)",
+                         salas + habitaciones)
+        conn.executemany("INSERT INTO camas (codigo, habitacion_numero, estado) VALUES (?,?,?)", filas_camas)
+    r = {"camas": len(filas_camas), "pisos": len(pisos)}
+
+    def antes():
+        repo = DbBackedRepository(datos_ejemplo=True)
+        repo.cargar_todo()
+        return repo
+
+    def ahora():
+        return DbBackedRepository(datos_ejemplo=False)
+
+    for nombre, crear in (("antes", antes), ("ahora", ahora)):
+        t = time.perf_counter()
+        repo = crear()
+        r[f"{nombre}_s"] = time.perf_counter() - t
+        del repo
+        tracemalloc.start()
+        repo = crear()
+        r[f"{nombre}_mb"] = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        tracemalloc.stop()
+        r[f"{nombre}_camas"] = len(repo.camas)
+        del repo
+
+    repo = ahora()
+    totales = (repo.ocupacion.conteo(), repo.ocupacion.conteo(tipo="habitacion"))
+    por_piso_bd = repo.ocupacion.por_ambito("piso")
+    t = time.perf_counter()
+    libres = repo.camas_de_piso(pisos[7], "disponible")
+    r["primer_acceso_ms"] = (time.perf_counter() - t) * 1000
+    t = time.perf_counter()
+    repo.camas_de_piso(pisos[7], "disponible")
+    r["segundo_acceso_ms"] = (time.perf_counter() - t) * 1000
+    r["camas_tras_acceso"] = len(repo.camas)
+    r["nombradas"] = sum(1 for c in repo.camas.values() if c.nombre_clave)
+    # Una cama de otro piso, por ID, carga solo ese piso
+    r["por_id"] = repo.obtener_cama(filas_camas[-1][0]) is not None and len(repo._pisos_cargados) == 2
+    repo.cargar_todo()
+    r["coherente"] = (
+        bool(libres)
+        and (repo.ocupacion.conteo(), repo.ocupacion.conteo(tipo="habitacion")) == totales
+        and repo.ocupacion.por_ambito("piso") == por_piso_bd
+        and len(repo.camas) == len(filas_camas)
+    )
+    return r
+
+
+def medir_memoria(camas: int = 10_000, eventos: int = 1_000_000) -> dict:
+    """
+    Memoria de `camas` camas (y una habitación cada 10) con los modelos con
+    slots contra los mismos dataclasses con __dict__ (como antes), y de
+    `eventos` eventos de historial: lista de textos (antes), eventos tipados
+    sin límite y el búfer circular de Historial. Luego comprueba que
+    DbBackedRepository anexa los eventos a historial_camas y que la tabla
+    rechaza cambios.
+    """
+    import dataclasses
+    import tracemalloc
+    from core import database as db
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "memoria.db"))
+    db.inicializar_db(forzar=True)
+    from Hospitalizacion.camas_y_salas.diario import leer_historial
+    from Hospitalizacion.camas_y_salas.models import CAPACIDAD_HISTORIAL, Cama, Habitacion, Historial
+    from Hospitalizacion.camas_y_salas.repository import DbBackedRepository
+
+    def sin_slots(cls):
+        return dataclasses.make_dataclass(cls.__name__ + "Antes", [
+            (f.name, f.type, dataclasses.field(default=f.default)) if f.default is not dataclasses.MISSING
+            else (f.name, f.type) for f in dataclasses.fields(cls)
+        ])
+
+    def medir(funcion):
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        resultado = funcion()
+        usado = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        return resultado, usado
+
+    # Los textos (IDs, nombres) se crean antes: se mide lo que agrega cada objeto
+    hids = [f"H-P1-{100 + i}" for i in range(-(-camas // 10))]
+    filas = [(f"C-{hids[i // 10]}-{i % 10 + 1}", hids[i // 10], f"Alfa {i // 10 + 1}{chr(65 + i % 10)}")
+             for i in range(camas)]
+    r = {"camas": camas, "eventos": eventos}
+    for nombre, (cls_cama, cls_hab) in (("antes", (sin_slots(Cama), sin_slots(Habitacion))),
+                                        ("ahora", (Cama, Habitacion))):
+        _, usado = medir(lambda: ([cls_cama(cid, hid, "disponible", True, clave) for cid, hid, clave in filas],
+                                  [cls_hab(hid, "disponible", "Piso 1") for hid in hids]))
+        r[f"modelos_{nombre}_mb"] = usado / 2 ** 20
+
+    pacientes = [f"P{n:03d}" for n in range(1, 501)]
+    salas = [f"S-P1-{n:02d}" for n in range(1, 11)]
+    ids_camas = [f[0] for f in filas]
+
+    def eventos_antes():
+        lista = []
+        for n in range(eventos):
+            lista.append(f"Cama {ids_camas[n % camas]} asignada a paciente {pacientes[n % 500]} en sala {salas[n % 10]}")
+        return lista
+
+    def eventos_historial(capacidad):
+        def llenar():
+            historial = Historial(capacidad)
+            for n in range(eventos):
+                historial.registrar("cama_asignada", ids_camas[n % camas], pacientes[n % 500], salas[n % 10])
+            return historial
+        return llenar
+
+    for nombre, funcion in (("antes", eventos_antes), ("tipados", eventos_historial(None)),
+                            ("bufer", eventos_historial(CAPACIDAD_HISTORIAL))):
+        t = time.perf_counter()
+        resultado = funcion()
+        r[f"historial_{nombre}_s"] = time.perf_counter() - t
+        del resultado
+        resultado, usado = medir(funcion)
+        r[f"historial_{nombre}_mb"] = usado / 2 ** 20
+        r[f"historial_{nombre}_ultimos"] = resultado[-3:] if nombre == "antes" else [e.texto() for e in resultado.ultimos(3)]
+        del resultado
+    r["textos_iguales"] = r["historial_antes_ultimos"] == r["historial_tipados_ultimos"] == r["historial_bufer_ultimos"]
+
+    # Persistencia en historial_camas
+    repo = DbBackedRepository(datos_ejemplo=False)
+    guardar = min(eventos, 20_000)
+    t = time.perf_counter()
+    for n in range(guardar):
+        repo.historial.registrar("cama_asignada", ids_camas[n % camas], pacientes[n % 500], salas[n % 10])
+    repo.diario.vaciar()
+    r["persistir_s"] = time.perf_counter() - t
+    r["persistidos"] = guardar
+    with db.session() as conn:
+        r["en_tabla"] = conn.execute("SELECT COUNT(*) FROM historial_camas").fetchone()[0]
+    r["leido_ok"] = leer_historial(1)[0][2] == repo.historial.ultimos(1)[0].texto()
+    try:
+        with db.session() as conn:
+            conn.execute("DELETE FROM historial_camas")
+        r["solo_inserciones"] = False
+    except sqlite3.DatabaseError:
+        r["solo_inserciones"] = True
+    return r
+
+
+def modo_camas(args):
+    camas = int(args[0]) if args else 5_000
+    r = medir_camas(camas)
+    print(f"{r['camas']} camas registradas en {r['alta_s']:.2f} s")
+    for nombre, (ms_antes, ms_ahora, iguales) in r["consultas"].items():
+        print(f"  {nombre:25s} antes={ms_antes:8.3f} ms   ahora={ms_ahora:8.3f} ms"
+              f"   {'iguales' if iguales else 'DISTINTOS'}")
+    print(f"asignación o alta: {r['movimientos_ms']:.3f} ms por movimiento")
+    print(f"índices coinciden con recalcularlos: {'sí' if r['coherente'] else 'NO'}")
+    sys.exit(0 if r["coherente"] else 1)
+
+
+def modo_ocupacion(args):
+    camas = int(args[0]) if args else 5_000
+    r = medir_ocupacion(camas)
+    print(f"{r['camas']} camas")
+    print(f"  camas libres por piso: recorriendo camas {r['antes_ms']:.3f} ms, "
+          f"contadores {r['ahora_ms']:.4f} ms, tabla ocupacion {r['tabla_ms']:.3f} ms")
+    print(f"asignación, alta o cambio de habitación (con escritura en BD): {r['movimientos_ms']:.3f} ms")
+    print(f"contadores y tabla coinciden con recontar: {'sí' if r['coherente'] else 'NO'}")
+    print(f"el alta de Admisión libera el lugar del área: {'sí' if r['area_liberada'] else 'NO'}")
+    sys.exit(0 if r["coherente"] and r["area_liberada"] else 1)
+
+
+def modo_diario(args):
+    cambios = int(args[0]) if args else 20_000
+    r = medir_diario(cambios)
+    print(f"{r['cambios']} cambios de estado sobre {r['camas']} camas")
+    print(f"  antes (commit por cambio): {r['antes_s']:6.2f} s ({r['cambios'] / r['antes_s']:,.0f} cambios/s)")
+    print(f"  diario (encolar + vaciar): {r['ahora_s']:6.2f} s ({r['cambios'] / r['ahora_s']:,.0f} cambios/s), "
+          f"encolar {r['encolar_s']:.2f} s, {r['vaciados']} transacciones")
+    print(f"estados en BD iguales a memoria: {'sí' if r['estados_ok'] else 'NO'}")
+    print(f"cierre inesperado: {r['pendientes_hijo']} entradas en cola, {r['reproducidas']} reproducidas al "
+          f"arrancar, {r['hospitalizaciones']} hospitalizaciones (esperadas 20, sin duplicar)")
+    ok = r["estados_ok"] and r["recuperado"]
+    sys.exit(0 if ok else 1)
+
+
+def modo_paginado(args):
+    camas = int(args[0]) if args else 20_000
+    r = medir_paginado(camas)
+    print(f"{r['camas']} camas en {r['pisos']} pisos")
+    print(f"  antes (todo al arrancar, con datos de ejemplo): {r['antes_s']:6.2f} s, "
+          f"{r['antes_mb']:6.1f} MB, {r['antes_camas']} camas en memoria")
+    print(f"  por piso (sin datos de ejemplo):                {r['ahora_s']:6.2f} s, "
+          f"{r['ahora_mb']:6.1f} MB, {r['ahora_camas']} camas en memoria")
+    print(f"primer acceso a un piso: {r['primer_acceso_ms']:.1f} ms ({r['camas_tras_acceso']} camas cargadas, "
+          f"{r['nombradas']} nombradas); siguiente: {r['segundo_acceso_ms']:.3f} ms")
+    print(f"una cama de otro piso por ID carga solo ese piso: {'sí' if r['por_id'] else 'NO'}")
+    print(f"ocupación igual antes y después de cargar todo: {'sí' if r['coherente'] else 'NO'}")
+    sys.exit(0 if r["coherente"] and r["por_id"] else 1)
+
+
+def modo_memoria(args):
+    camas = int(args[0]) if args else 10_000
+    eventos = int(args[1]) if len(args) > 1 else 1_000_000
+    r = medir_memoria(camas, eventos)
+    print(f"{r['camas']} camas y {r['camas'] // 10} habitaciones")
+    print(f"  dataclass con __dict__ (antes): {r['modelos_antes_mb']:6.2f} MB   "
+          f"con slots: {r['modelos_ahora_mb']:6.2f} MB")
+    print(f"{r['eventos']} eventos de historial")
+    for nombre, titulo in (("antes", "lista de textos (antes)"), ("tipados", "eventos tipados sin límite"),
+                           ("bufer", "búfer circular de Historial")):
+        print(f"  {titulo:28s} {r[f'historial_{nombre}_mb']:8.1f} MB   {r[f'historial_{nombre}_s']:5.2f} s")
+    print(f"mismos textos en los últimos eventos: {'sí' if r['textos_iguales'] else 'NO'}")
+    print(f"historial_camas: {r['en_tabla']} de {r['persistidos']} eventos en {r['persistir_s']:.2f} s; "
+          f"leer_historial coincide: {'sí' if r['leido_ok'] else 'NO'}; "
+          f"rechaza borrar: {'sí' if r['solo_inserciones'] else 'NO'}")
+    ok = r["textos_iguales"] and r["en_tabla"] == r["persistidos"] and r["leido_ok"] and r["solo_inserciones"]
+    sys.exit(0 if ok else 1)
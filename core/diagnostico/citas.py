@@ -0,0 +1,179 @@
+"""
+Reservas concurrentes de turnos y bandeja de notificaciones de Citas Médicas.
+
+Uso:
+    python -m core.diagnostico reservas [procesos]
+    python -m core.diagnostico notificaciones [citas]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from .comun import cedula_valida
+
+
+def _recepcion(ruta: str, indice: int, fechas: list, cola):
+    """Una 'recepción': intenta agendar todos los turnos de las fechas dadas."""
+    import random
+    from datetime import date, time
+    from core import database as db
+    from Citas_Medicas.citas_controller import CitasMedicasController
+
+    db.configurar_pool(ruta)
+    controller = CitasMedicasController()
+    cc = cedula_valida(indice)
+    turnos = [(date.fromisoformat(f), time(h, 0)) for f in fechas for h in range(9, 17)]
+    random.shuffle(turnos)
+    exitos = ocupados = errores = 0
+    for fecha, hora in turnos:
+        ok, msg, _ = controller.solicitar_cita(cc, 1, fecha, hora)
+        if ok:
+            exitos += 1
+        elif "ocupado" in msg or "no tiene horarios" in msg:
+            ocupados += 1
+        else:
+            errores += 1
+            print(msg)
+    cola.put((exitos, ocupados, errores))
+
+
+def estres_reservas(procesos: int = 6, dias: int = 5) -> dict:
+    """
+    Varios procesos agendan a la vez los mismos turnos de un médico (8 por
+    día) con pacientes distintos. Devuelve citas creadas, rechazos por turno
+    ocupado, errores técnicos y turnos con más de una cita activa.
+    """
+    from datetime import date, timedelta
+    from core import database as db
+
+    ruta = os.path.join(tempfile.mkdtemp(), "reservas.db")
+    db.configurar_pool(ruta)
+    db.inicializar_db()
+    with db.session() as conn:
+        conn.execute(
+            "INSERT INTO medicos (id, cedula, nombres, apellidos, especialidad, direccion) "
+            "VALUES (1, '1700000001', 'Ana', 'Prueba', 'General', 'C-1')"
+        )
+        conn.executemany(
+            "INSERT INTO pacientes (dni, nombres, apellidos) VALUES (?, 'Paciente', ?)",
+            [(cedula_valida(i), str(i)) for i in range(procesos)]
+        )
+    fechas = [(date.today() + timedelta(days=30 + d)).isoformat() for d in range(dias)]
+
+    cola = multiprocessing.Queue()
+    trabajadores = [multiprocessing.Process(target=_recepcion, args=(ruta, i, fechas, cola)) for i in range(procesos)]
+    for p in trabajadores:
+        p.start()
+    resultados = [cola.get() for _ in trabajadores]
+    for p in trabajadores:
+        p.join()
+
+    with db.session() as conn:
+        creadas = conn.execute("SELECT COUNT(*) FROM citas WHERE estado != 'Cancelada'").fetchone()[0]
+        duplicados = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM citas WHERE estado != 'Cancelada'
+                GROUP BY id_medico, fecha, hora HAVING COUNT(*) > 1
+            )
+        """).fetchone()[0]
+    return {
+        "turnos": dias * 8,
+        "intentos": dias * 8 * procesos,
+        "exitos": sum(r[0] for r in resultados),
+        "ocupados": sum(r[1] for r in resultados),
+        "errores": sum(r[2] for r in resultados),
+        "citas_en_bd": creadas,
+        "turnos_duplicados": duplicados,
+    }
+
+
+def estres_notificaciones(citas: int = 40, demora_envio: float = 0.05) -> dict:
+    """
+    Agenda `citas` citas con un enviador de email lento (demora_envio s por
+    mensaje) y uno de SMS que falla al primer intento. Mide la latencia de
+    solicitar_cita y el tiempo hasta que la bandeja queda vacía.
+    """
+    from datetime import date, time as hora, timedelta
+    from core import database as db
+    from Citas_Medicas import notificaciones
+    from Citas_Medicas.citas_controller import CitasMedicasController
+
+    carpeta = tempfile.mkdtemp()
+    db.configurar_pool(os.path.join(carpeta, "notificaciones.db"))
+    db.inicializar_db()
+    with db.session() as conn:
+        conn.execute(
+            "INSERT INTO medicos (id, cedula, nombres, apellidos, especialidad, direccion) "
+            "VALUES (1, '1700000001', 'Ana', 'Prueba', 'General', 'C-1')"
+        )
+        # Pacientes pares con email, impares solo con teléfono
+        conn.executemany(
+            "INSERT INTO pacientes (dni, nombres, apellidos, email, telefono) VALUES (?, 'Paciente', ?, ?, ?)",
+            [(cedula_valida(i), str(i), f"p{i}@correo.ec" if i % 2 == 0 else None, "0991234567")
+             for i in range(citas)]
+        )
+
+    class EmailLento(notificaciones.EnviadorArchivo):
+        def enviar(self, destino, mensaje):
+            time.sleep(demora_envio)
+            super().enviar(destino, mensaje)
+
+    class SmsInestable(notificaciones.EnviadorArchivo):
+        vistos = set()
+
+        def enviar(self, destino, mensaje):
+            if mensaje not in self.vistos:
+                self.vistos.add(mensaje)
+                raise ConnectionError("Pasarela SMS no disponible")
+            super().enviar(destino, mensaje)
+
+    notificaciones.ESPERA_BASE = 0
+    notificaciones.registrar_enviador("email", EmailLento("email.log", carpeta))
+    notificaciones.registrar_enviador("sms", SmsInestable("sms.log", carpeta))
+
+    controller = CitasMedicasController()
+    controller.bandeja.intervalo = 0.05
+    inicio = date.today() + timedelta(days=30)
+    latencias = []
+    t0 = time.perf_counter()
+    for i in range(citas):
+        fecha = inicio + timedelta(days=i // 8)
+        t = time.perf_counter()
+        ok, msg, _ = controller.solicitar_cita(cedula_valida(i), 1, fecha, hora(9 + i % 8, 0))
+        latencias.append(time.perf_counter() - t)
+        if not ok:
+            print(msg)
+    while controller.bandeja.pendientes():
+        time.sleep(0.02)
+    total = time.perf_counter() - t0
+
+    with db.session() as conn:
+        estados = dict(conn.execute("SELECT estado || '/' || canal, COUNT(*) FROM notificaciones GROUP BY 1").fetchall())
+    return {
+        "latencia_media_ms": sum(latencias) / len(latencias) * 1000,
+        "latencia_max_ms": max(latencias) * 1000,
+        "bandeja_vacia_s": total,
+        "reintentos": controller.bandeja.reintentos,
+        "estados": estados,
+    }
+
+
+def modo_reservas(args):
+    procesos = int(args[0]) if args else 6
+    r = estres_reservas(procesos)
+    print(f"turnos={r['turnos']} intentos={r['intentos']} exitos={r['exitos']} "
+          f"ocupados={r['ocupados']} errores={r['errores']} "
+          f"citas_en_bd={r['citas_en_bd']} turnos_duplicados={r['turnos_duplicados']}")
+    ok = r["turnos_duplicados"] == 0 and r["exitos"] == r["citas_en_bd"] == r["turnos"]
+    sys.exit(0 if ok else 1)
+
+
+def modo_notificaciones(args):
+    citas = int(args[0]) if args else 40
+    r = estres_notificaciones(citas)
+    print(f"solicitar_cita: media={r['latencia_media_ms']:.2f} ms max={r['latencia_max_ms']:.2f} ms")
+    print(f"bandeja vacía a los {r['bandeja_vacia_s']:.2f} s, reintentos={r['reintentos']}")
+    for estado, n in sorted(r["estados"].items()):
+        print(f"  {estado:18s} {n}")
@@ -0,0 +1,26 @@
+"""Utilidades compartidas por los diagnósticos."""
+import os
+import sys
+
+# Raíz del proyecto (donde está main.py), para los procesos hijos
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def cedula_valida(n: int) -> str:
+    """Cédula ecuatoriana sintética (provincia 17) con dígito verificador correcto."""
+    base = f"17{n:07d}"
+    suma = 0
+    for i, d in enumerate(base):
+        valor = int(d) * (2 if i % 2 == 0 else 1)
+        suma += valor - 9 if valor > 9 else valor
+    return base + str((10 - suma % 10) % 10)
+
+
+def memoria_maxima_mb() -> float:
+    """Pico de memoria residente del proceso (0 si la plataforma no lo informa)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024 if sys.platform == "darwin" else 1024)
@@ -0,0 +1,106 @@
+"""
+Concurrencia de lectores y escritores con distintos perfiles de SQLite.
+
+Uso:
+    python -m core.diagnostico estres [segundos]
+"""
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+
+def _preparar_bd(ruta: str, perfil: dict, filas: int = 2000):
+    """Crea una BD de prueba con el esquema completo y un inventario poblado."""
+    from core import database as db
+
+    db.PERFIL_RENDIMIENTO.update(perfil)
+    db.configurar_pool(ruta)
+    db.inicializar_db()
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO inventario (nombre, tipo, stock) VALUES (?, 'Medicamento', 100)",
+            [(f"Producto {i}",) for i in range(filas)]
+        )
+
+
+def _escritor(ruta: str, perfil: dict, segundos: float, cola):
+    from core import database as db
+
+    db.PERFIL_RENDIMIENTO.update(perfil)
+    db.configurar_pool(ruta)
+    escrituras = errores = 0
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        try:
+            # Simula un pedido de Farmacia: varias actualizaciones en una transacción
+            with db.session() as conn:
+                for _ in range(20):
+                    conn.execute("UPDATE inventario SET stock = stock + 1 WHERE id = abs(random()) % 2000 + 1")
+            escrituras += 1
+        except sqlite3.OperationalError:
+            errores += 1
+    cola.put(("escritor", escrituras, errores, 0.0))
+
+
+def _lector(ruta: str, perfil: dict, segundos: float, cola):
+    from core import database as db
+
+    db.PERFIL_RENDIMIENTO.update(perfil)
+    db.configurar_pool(ruta)
+    lecturas = errores = 0
+    peor = 0.0
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        t0 = time.perf_counter()
+        try:
+            # Simula la agenda de Citas leyendo mientras Farmacia escribe
+            with db.session() as conn:
+                conn.execute("SELECT count(*), sum(stock) FROM inventario").fetchone()
+            lecturas += 1
+        except sqlite3.OperationalError:
+            errores += 1
+        peor = max(peor, time.perf_counter() - t0)
+    cola.put(("lector", lecturas, errores, peor))
+
+
+def estres_concurrente(perfil: dict, escritores: int = 2, lectores: int = 4, segundos: float = 3.0) -> dict:
+    """
+    Lanza procesos lectores y escritores sobre una BD temporal con el perfil
+    indicado y devuelve operaciones completadas, errores por bloqueo y la
+    peor latencia de lectura.
+    """
+    ruta = os.path.join(tempfile.mkdtemp(), "estres.db")
+    _preparar_bd(ruta, perfil)
+
+    cola = multiprocessing.Queue()
+    procesos = [multiprocessing.Process(target=_escritor, args=(ruta, perfil, segundos, cola)) for _ in range(escritores)]
+    procesos += [multiprocessing.Process(target=_lector, args=(ruta, perfil, segundos, cola)) for _ in range(lectores)]
+    for p in procesos:
+        p.start()
+    resultados = [cola.get() for _ in procesos]
+    for p in procesos:
+        p.join()
+
+    resumen = {"escrituras": 0, "lecturas": 0, "errores": 0, "peor_lectura_ms": 0.0}
+    for tipo, ops, errores, peor in resultados:
+        resumen["escrituras" if tipo == "escritor" else "lecturas"] += ops
+        resumen["errores"] += errores
+        resumen["peor_lectura_ms"] = max(resumen["peor_lectura_ms"], peor * 1000)
+    return resumen
+
+
+def modo_estres(args):
+    from core.database import PERFIL_RENDIMIENTO
+
+    segundos = float(args[0]) if args else 3.0
+    perfiles = {
+        "por defecto": {"busy_timeout": 5000, "journal_mode": "DELETE", "synchronous": "FULL",
+                        "cache_size": -2000, "mmap_size": 0, "temp_store": "DEFAULT"},
+        "hospital": dict(PERFIL_RENDIMIENTO),
+    }
+    for nombre, perfil in perfiles.items():
+        r = estres_concurrente(perfil, segundos=segundos)
+        print(f"{nombre:12s} escrituras={r['escrituras']:6d} lecturas={r['lecturas']:7d} "
+              f"errores={r['errores']:3d} peor_lectura={r['peor_lectura_ms']:.1f} ms")
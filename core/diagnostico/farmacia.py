@@ -0,0 +1,281 @@
+"""
+Historial de pedidos, pedidos por lote y caducidad de Farmacia.
+
+Uso:
+    python -m core.diagnostico pedidos [pedidos]
+    python -m core.diagnostico pedidos_lote [pedidos]
+    python -m core.diagnostico caducidad [productos]
+"""
+import os
+import sys
+import tempfile
+import time
+
+
+def medir_pedidos(pedidos: int = 20_000, items: int = 4) -> dict:
+    """
+    Compara el historial de pedidos de antes (todas las cabeceras y luego
+    una consulta de detalles por pedido) con el de ahora (una consulta con
+    group_concat por página de LogicaFarmacia.pedidos_por_pagina).
+    """
+    from core import database as db
+    from Farmacia.backend.logic_farmacia import LogicaFarmacia
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "pedidos.db"))
+    db.inicializar_db()
+    estados = ("Pendiente", "Enviado", "Recibido")
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO pedidos_farmacia (id, solicitante, diagnostico_referencia, estado, fecha_creacion) "
+            "VALUES (?, ?, 'Departamento: UCI', ?, datetime('2024-01-01', '+' || ? || ' hours'))",
+            ((i, "Farmacia" if i % 2 else f"Enf. {i % 50}", estados[i % 3], i) for i in range(1, pedidos + 1))
+        )
+        conn.executemany(
+            "INSERT INTO pedido_detalles (pedido_id, nombre_item, cantidad) VALUES (?, ?, ?)",
+            ((i, f"Producto {(i + j) % 300}", j + 1) for i in range(1, pedidos + 1) for j in range(items))
+        )
+        conn.execute("ANALYZE")
+
+    logica = LogicaFarmacia()
+    t = time.perf_counter()
+    antes = []
+    for p in logica.db.obtener_pedidos():
+        detalles = logica.db.obtener_detalles_pedido(p[0])
+        antes.append((p[0], ", ".join(f"{d[2]} ({d[3]})" for d in detalles)))
+    r = {"antes_ms": (time.perf_counter() - t) * 1000, "antes_consultas": len(antes) + 1}
+
+    t = time.perf_counter()
+    primera = logica.consultar_pedidos(a_proveedor=True)
+    r["pagina_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    ahora, ultimo, consultas = [], None, 0
+    while True:
+        pagina = logica.consultar_pedidos(antes_de=ultimo)
+        consultas += 1
+        ahora.extend((p["id"], p["items"]) for p in pagina)
+        if len(pagina) < logica.pedidos_por_pagina:
+            break
+        ultimo = pagina[-1]["id"]
+    r["todas_ms"] = (time.perf_counter() - t) * 1000
+    r["todas_consultas"] = consultas
+
+    t = time.perf_counter()
+    filtradas = logica.consultar_pedidos(estado="Recibido", desde="2024-03-01", hasta="2024-03-31")
+    r["filtro_ms"] = (time.perf_counter() - t) * 1000
+    r["coinciden"] = (
+        ahora == antes and len(primera) == logica.pedidos_por_pagina
+        and all(p["solicitante"] == "Farmacia" for p in primera)
+        and all(p["estado"] == "Recibido" and "2024-03" in p["fecha"] for p in filtradas)
+    )
+    return r
+
+
+def medir_pedidos_lote(pedidos: int = 20, lineas: int = 500) -> dict:
+    """
+    Crea y recibe `pedidos` pedidos de `lineas` items: antes (cabecera y
+    cada detalle con su propio commit, stock item por item) y ahora
+    (GestorFarmacia.crear_pedido y recibir_pedido, una transacción cada
+    uno). Luego verifica que un fallo a mitad de la creación o de la
+    recepción no deje nada aplicado.
+    """
+    from core import database as db
+    from Farmacia.backend.backend_farmacia import GestorFarmacia
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "pedidos_lote.db"))
+    db.inicializar_db()
+    gestor = GestorFarmacia()
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO inventario (nombre, tipo, stock, fecha_caducidad) VALUES (?, 'Medicamento', 0, '2030-01-01')",
+            ((f"Producto {i}",) for i in range(lineas))
+        )
+    items = [{"nombre": f"Producto {i}", "cantidad": 1} for i in range(lineas)]
+
+    t = time.perf_counter()
+    for _ in range(pedidos):
+        pedido_id, _ = gestor.crear_pedido_cabecera("Farmacia", "Proveedor: X", estado="Enviado")
+        for item in items:
+            gestor.agregar_detalle_pedido(pedido_id, item["nombre"], item["cantidad"])
+        for d in gestor.obtener_detalles_pedido(pedido_id):
+            inv = gestor._ejecutar_seleccion("SELECT id FROM inventario WHERE nombre=?", (d[2],))
+            gestor.actualizar_stock(inv[0][0], d[3])
+        gestor.actualizar_estado_pedido(pedido_id, "Recibido")
+    r = {"antes_s": time.perf_counter() - t}
+
+    t = time.perf_counter()
+    ids = [gestor.crear_pedido("Farmacia", "Proveedor: X", items, estado="Enviado")[0] for _ in range(pedidos)]
+    r["crear_s"] = time.perf_counter() - t
+    t = time.perf_counter()
+    recibidos = [gestor.recibir_pedido(pedido_id) for pedido_id in ids]
+    r["recibir_s"] = time.perf_counter() - t
+
+    with db.session() as conn:
+        stock = conn.execute("SELECT MIN(stock), MAX(stock) FROM inventario").fetchone()
+        pedidos_antes = conn.execute("SELECT COUNT(*) FROM pedidos_farmacia").fetchone()[0]
+        # Un item inválido (cantidad NULL) a mitad del pedido y un fallo a mitad de la recepción
+        conn.execute(f"""
+            CREATE TRIGGER falla_recepcion BEFORE UPDATE OF stock ON inventario
+            WHEN new.nombre = 'Producto {lineas // 2}' BEGIN SELECT RAISE(ABORT, 'falla simulada'); END
+        """)
+    invalido = items[:lineas // 2] + [{"nombre": "Roto", "cantidad": None}] + items[lineas // 2:]
+    creado, _ = gestor.crear_pedido("Farmacia", "Proveedor: X", invalido)
+    pendiente, _ = gestor.crear_pedido("Farmacia", "Proveedor: X", items, estado="Enviado")
+    recibido, _ = gestor.recibir_pedido(pendiente)
+    with db.session() as conn:
+        conn.execute("DROP TRIGGER falla_recepcion")
+        r["atomico"] = (
+            creado is None and not recibido
+            and conn.execute("SELECT COUNT(*) FROM pedidos_farmacia").fetchone()[0] == pedidos_antes + 1
+            and conn.execute("SELECT MIN(stock), MAX(stock) FROM inventario").fetchone() == stock
+            and conn.execute("SELECT estado FROM pedidos_farmacia WHERE id=?", (pendiente,)).fetchone()[0] == "Enviado"
+        )
+    r["completo"] = all(ok and not faltantes for ok, faltantes in recibidos) and stock == (2 * pedidos, 2 * pedidos)
+    r["lineas"] = pedidos * lineas
+    return r
+
+
+def medir_caducidad(productos: int = 20_000, lotes: int = 5, movimientos: int = 2_000) -> dict:
+    """
+    Compara consultar_caducidad de antes (todo el inventario a Python y
+    strptime por fila) con la consulta por rango sobre inventario_lotes (la
+    primera página, que es lo que muestra la vista, y todas las páginas), y
+    el resumen por tramos (caducidad_por_dia) con recalcularlo desde los
+    lotes. Tras `movimientos` entradas y salidas al azar verifica que
+    inventario.stock y el resumen sigan coincidiendo con los lotes.
+    """
+    import random
+    from datetime import date, datetime, timedelta
+    from core import database as db
+    from Farmacia.backend.logic_farmacia import LogicaFarmacia
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "caducidad.db"))
+    db.inicializar_db()
+    hoy = date.today()
+    azar = random.Random(7)
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO inventario (id, nombre, tipo, stock, fecha_caducidad) VALUES (?, ?, 'Medicamento', 0, ?)",
+            ((i, f"Producto {i}", (hoy + timedelta(days=i % 900 - 200)).isoformat()) for i in range(1, productos + 1))
+        )
+        conn.executemany(
+            "INSERT INTO inventario_lotes (producto_id, lote, cantidad, fecha_caducidad) VALUES (?, ?, ?, ?)",
+            ((i, f"L{j}", azar.randint(0, 50), (hoy + timedelta(days=azar.randint(-200, 700))).isoformat())
+             for i in range(1, productos + 1) for j in range(lotes))
+        )
+        conn.execute("ANALYZE")
+    logica = LogicaFarmacia()
+
+    def antes(filtro):
+        confirmados = []
+        ahora = datetime.now()
+        for p in logica.db.obtener_inventario():
+            try:
+                delta = (datetime.strptime(p[5], "%Y-%m-%d") - ahora).days
+            except (ValueError, TypeError):
+                continue
+            if filtro == "todos" or (filtro == "vencidos" and delta < 0) or (filtro == "proximos" and 0 <= delta <= 30):
+                confirmados.append(p[1])
+        return confirmados
+
+    def todas_las_paginas(filtro):
+        lotes, cursor = [], None
+        while True:
+            pagina = logica.consultar_caducidad(filtro, despues_de=cursor)
+            lotes.extend(pagina)
+            if len(pagina) < logica.lotes_por_pagina:
+                return lotes
+            cursor = (pagina[-1]["fecha"], pagina[-1]["id"])
+
+    r = {"filtros": {}, "paginas_completas": True}
+    with db.session() as conn:
+        con_existencias = conn.execute(
+            "SELECT COUNT(*) FROM inventario_lotes WHERE cantidad > 0 AND fecha_caducidad IS NOT NULL"
+        ).fetchone()[0]
+    for filtro in ("proximos", "vencidos", "todos"):
+        t = time.perf_counter()
+        n_antes = len(antes(filtro))
+        ms_antes = (time.perf_counter() - t) * 1000
+        t = time.perf_counter()
+        n_pagina = len(logica.consultar_caducidad(filtro))
+        ms_pagina = (time.perf_counter() - t) * 1000
+        t = time.perf_counter()
+        lotes_filtro = todas_las_paginas(filtro)
+        r["filtros"][filtro] = (ms_antes, n_antes, ms_pagina, n_pagina,
+                                (time.perf_counter() - t) * 1000, len(lotes_filtro))
+        if len({l["id"] for l in lotes_filtro}) != len(lotes_filtro):
+            r["paginas_completas"] = False
+        if filtro == "todos" and len(lotes_filtro) != con_existencias:
+            r["paginas_completas"] = False
+
+    for _ in range(movimientos):
+        producto = azar.randint(1, productos)
+        cantidad = azar.randint(-30, 30)
+        logica.db.actualizar_stock(producto, cantidad, lote=f"M{azar.randint(0, 3)}",
+                                   fecha_caducidad=(hoy + timedelta(days=azar.randint(-10, 400))).isoformat())
+
+    t = time.perf_counter()
+    resumen = logica.resumen_caducidad()
+    r["resumen_ms"] = (time.perf_counter() - t) * 1000
+    r["resumen"] = resumen
+    with db.session() as conn:
+        t = time.perf_counter()
+        directo = conn.execute("""
+            SELECT SUM(fecha_caducidad < :h), SUM(CASE WHEN fecha_caducidad < :h THEN cantidad END)
+            FROM inventario_lotes WHERE cantidad > 0 AND fecha_caducidad IS NOT NULL
+        """, {"h": hoy.isoformat()}).fetchone()
+        r["resumen_directo_ms"] = (time.perf_counter() - t) * 1000
+        descuadres = conn.execute("""
+            SELECT COUNT(*) FROM inventario i
+            WHERE i.stock != (SELECT COALESCE(SUM(cantidad), 0) FROM inventario_lotes WHERE producto_id = i.id)
+        """).fetchone()[0]
+        por_dia = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT fecha_caducidad, SUM(cantidad > 0) AS lotes, SUM(cantidad) AS unidades
+                FROM inventario_lotes WHERE fecha_caducidad IS NOT NULL GROUP BY fecha_caducidad
+            ) l FULL JOIN caducidad_por_dia c USING (fecha_caducidad)
+            WHERE c.lotes IS NOT l.lotes OR c.unidades IS NOT l.unidades
+        """).fetchone()[0]
+    r["coherente"] = descuadres == 0 and por_dia == 0 and resumen[0][1:] == tuple(directo)
+    return r
+
+
+def modo_pedidos(args):
+    pedidos = int(args[0]) if args else 20_000
+    r = medir_pedidos(pedidos)
+    print(f"{pedidos} pedidos")
+    print(f"  antes (N+1):   {r['antes_ms']:8.1f} ms en {r['antes_consultas']} consultas (todo el historial)")
+    print(f"  primera página: {r['pagina_ms']:7.1f} ms en 1 consulta")
+    print(f"  todo paginado:  {r['todas_ms']:7.1f} ms en {r['todas_consultas']} consultas")
+    print(f"  estado + mes:   {r['filtro_ms']:7.1f} ms")
+    print(f"mismos pedidos e items que antes: {'sí' if r['coinciden'] else 'NO'}")
+    sys.exit(0 if r["coinciden"] else 1)
+
+
+def modo_pedidos_lote(args):
+    pedidos = int(args[0]) if args else 20
+    r = medir_pedidos_lote(pedidos)
+    n = r["lineas"]
+    print(f"{pedidos} pedidos de 500 líneas ({n} líneas)")
+    print(f"  antes (crear + recibir línea por línea): {r['antes_s']:6.2f} s ({n / r['antes_s']:,.0f} líneas/s)")
+    print(f"  crear_pedido (una transacción):         {r['crear_s']:6.2f} s ({n / r['crear_s']:,.0f} líneas/s)")
+    print(f"  recibir_pedido (una transacción):       {r['recibir_s']:6.2f} s ({n / r['recibir_s']:,.0f} líneas/s)")
+    print(f"stock completo: {'sí' if r['completo'] else 'NO'}; "
+          f"fallo a mitad sin cambios parciales: {'sí' if r['atomico'] else 'NO'}")
+    sys.exit(0 if r["completo"] and r["atomico"] else 1)
+
+
+def modo_caducidad(args):
+    productos = int(args[0]) if args else 20_000
+    r = medir_caducidad(productos)
+    print(f"{productos} productos con 5 lotes cada uno")
+    for filtro, (ms_antes, n_antes, ms_pagina, n_pagina, ms_todas, n_todas) in r["filtros"].items():
+        print(f"  {filtro:9s} antes={ms_antes:7.1f} ms ({n_antes:6d} productos)   "
+              f"primera página={ms_pagina:6.1f} ms ({n_pagina:4d} lotes)   "
+              f"todas={ms_todas:7.1f} ms ({n_todas:6d} lotes)")
+    print(f"resumen por tramos: {r['resumen_ms']:.1f} ms (recorrer los lotes: {r['resumen_directo_ms']:.1f} ms)")
+    for tramo, lotes, unidades in r["resumen"]:
+        print(f"  {tramo:16s} {lotes:7d} lotes {unidades:9d} u.")
+    print(f"páginas sin repetir ni saltar lotes: {'sí' if r['paginas_completas'] else 'NO'}")
+    print(f"stock y resumen coinciden con los lotes tras entradas y salidas: {'sí' if r['coherente'] else 'NO'}")
+    sys.exit(0 if r["coherente"] and r["paginas_completas"] else 1)
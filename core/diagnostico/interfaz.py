@@ -0,0 +1,175 @@
+"""
+Arranque de la aplicación, carga de cada módulo y tablas grandes en la interfaz.
+
+Uso:
+    python -m core.diagnostico arranque
+    python -m core.diagnostico modulos
+    python -m core.diagnostico tablas [filas]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from .comun import RAIZ, cedula_valida
+
+
+# Mismo recorrido que `python main.py`: esquema, ventana y luego cada
+# página (los repositorios y controladores también llaman a inicializar_db)
+_SCRIPT_ARRANQUE = """
+import time
+t0 = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+import main
+from core import database as db
+db.inicializar_db()
+app = QApplication([])
+ventana = main.MenuPrincipal()
+t1 = time.perf_counter()
+for indice in sorted(main.PAGINAS):
+    ventana.construir_pagina(indice)
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f} {db.ejecuciones_ddl}")
+"""
+
+
+def medir_arranque(ruta: str) -> tuple:
+    """
+    Arranca la aplicación en un proceso nuevo como main.py (inicializar_db y
+    menú principal) y construye todas las páginas. Devuelve (ms hasta la
+    ventana, ms de construir las páginas, veces que se ejecutó el DDL).
+    """
+    entorno = dict(os.environ, HOSPITAL_DB=ruta, QT_QPA_PLATFORM="offscreen")
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_ARRANQUE], cwd=RAIZ, env=entorno,
+        capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    ventana_ms, paginas_ms, ddl = salida.split()
+    return float(ventana_ms), float(paginas_ms), int(ddl)
+
+
+_SCRIPT_MODULOS = """
+import time
+t0 = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+import main
+app = QApplication([])
+ventana = main.MenuPrincipal()
+t1 = time.perf_counter()
+print(f"ventana {(t1 - t0) * 1000:.1f}")
+for indice in sorted(main.PAGINAS):
+    ventana.construir_pagina(indice)
+for nombre, ms in ventana.tiempos_carga.items():
+    print(f"modulo {ms:.1f} {nombre}")
+"""
+
+
+def perfilar_modulos(ruta: str) -> tuple:
+    """
+    Abre el menú principal en un proceso nuevo y construye cada página en
+    orden. Devuelve (ms hasta mostrar la ventana, {módulo: ms de carga}).
+    """
+    raiz = RAIZ
+    entorno = dict(os.environ, HOSPITAL_DB=ruta, QT_QPA_PLATFORM="offscreen")
+    salida = subprocess.run(
+        [sys.executable, "-c", _SCRIPT_MODULOS], cwd=raiz, env=entorno,
+        capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    ventana_ms, modulos = 0.0, {}
+    for linea in salida:
+        if linea.startswith("ventana "):
+            ventana_ms = float(linea.split()[1])
+        elif linea.startswith("modulo "):
+            _, ms, nombre = linea.split(" ", 2)
+            modulos[nombre] = float(ms)
+    return ventana_ms, modulos
+
+
+def medir_tablas(filas: int = 100_000) -> dict:
+    """
+    Compara, con `filas` pacientes sintéticos, el llenado de un QTableWidget
+    (un QTableWidgetItem por celda) contra ModeloTablaVirtual: carga hasta
+    el primer pintado, scroll al final, orden y filtro. Corre sin pantalla.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import QApplication, QTableView, QTableWidget, QTableWidgetItem
+    from core.tabla_virtual import ModeloTablaVirtual, ProxyTablaVirtual
+
+    app = QApplication.instance() or QApplication([])
+    encabezados = ["Cédula", "Nombre", "Apellido", "Teléfono", "Email"]
+    datos = [(cedula_valida(i), f"Nombre{i % 977}", f"Apellido{i % 1013}", f"09{i:08d}", f"p{i}@correo.ec")
+             for i in range(filas)]
+
+    def cronometrar(funcion):
+        t = time.perf_counter()
+        funcion()
+        app.processEvents()
+        return (time.perf_counter() - t) * 1000
+
+    r = {}
+    tabla = QTableWidget(0, len(encabezados))
+    tabla.resize(900, 600)
+    tabla.show()
+
+    def llenar_widget():
+        tabla.setRowCount(0)
+        for fila in datos:
+            i = tabla.rowCount()
+            tabla.insertRow(i)
+            for col, valor in enumerate(fila):
+                tabla.setItem(i, col, QTableWidgetItem(valor))
+
+    r["widget_carga_ms"] = cronometrar(llenar_widget)
+    r["widget_orden_ms"] = cronometrar(lambda: tabla.sortItems(2))
+    tabla.close()
+
+    modelo = ModeloTablaVirtual(encabezados)
+    proxy = ProxyTablaVirtual(modelo)
+    vista = QTableView()
+    vista.setModel(proxy)
+    vista.setSortingEnabled(True)
+    vista.resize(900, 600)
+    vista.show()
+    app.processEvents()
+    r["virtual_carga_ms"] = cronometrar(lambda: modelo.cargar(datos))
+    r["virtual_filas_expuestas"] = modelo.rowCount()
+    r["virtual_scroll_ms"] = cronometrar(vista.scrollToBottom)
+    r["virtual_orden_ms"] = cronometrar(lambda: vista.sortByColumn(2, Qt.SortOrder.AscendingOrder))
+    r["virtual_filtro_ms"] = cronometrar(lambda: proxy.filtrar("apellido7", [2]))
+    r["virtual_filtro_siguiente_ms"] = cronometrar(lambda: proxy.filtrar("apellido77", [2]))
+    r["virtual_coincidencias"] = modelo.total()
+    vista.close()
+    return r
+
+
+def modo_arranque(args):
+    ruta = os.path.join(tempfile.mkdtemp(), "arranque.db")
+    ok = True
+    # El DDL debe correr una vez en una BD nueva y ninguna en una existente
+    for etiqueta, esperado in (("BD nueva", 1), ("BD existente", 0)):
+        ventana_ms, paginas_ms, ddl = medir_arranque(ruta)
+        print(f"{etiqueta:13s} ventana: {ventana_ms:8.1f} ms, todas las páginas: {paginas_ms:8.1f} ms, "
+              f"ejecuciones de DDL: {ddl} (esperadas {esperado})")
+        ok = ok and ddl == esperado
+    sys.exit(0 if ok else 1)
+
+
+def modo_modulos(args):
+    ruta = os.path.join(tempfile.mkdtemp(), "modulos.db")
+    ventana_ms, modulos = perfilar_modulos(ruta)
+    print(f"{'Ventana principal':20s} {ventana_ms:8.1f} ms")
+    for nombre, ms in modulos.items():
+        print(f"  {nombre:18s} {ms:8.1f} ms (al construir la página)")
+
+
+def modo_tablas(args):
+    filas = int(args[0]) if args else 100_000
+    r = medir_tablas(filas)
+    print(f"{filas} filas")
+    print(f"QTableWidget   carga={r['widget_carga_ms']:9.1f} ms  orden={r['widget_orden_ms']:8.1f} ms")
+    print(f"Modelo virtual carga={r['virtual_carga_ms']:9.1f} ms  ({r['virtual_filas_expuestas']} filas expuestas)")
+    print(f"               scroll al final={r['virtual_scroll_ms']:.1f} ms  orden={r['virtual_orden_ms']:.1f} ms")
+    print(f"               filtro={r['virtual_filtro_ms']:.1f} ms  siguiente tecla={r['virtual_filtro_siguiente_ms']:.1f} ms"
+          f"  ({r['virtual_coincidencias']} coincidencias)")
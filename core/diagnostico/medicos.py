@@ -0,0 +1,158 @@
+"""
+Importación CSV y búsqueda paginada de médicos.
+
+Uso:
+    python -m core.diagnostico medicos_csv [filas]
+    python -m core.diagnostico medicos_busqueda [medicos]
+"""
+import os
+import sys
+import tempfile
+import time
+from itertools import islice
+
+from .comun import cedula_valida, memoria_maxima_mb
+
+
+def medir_medicos_csv(filas: int = 50_000, uno_a_uno: int = 2_000) -> dict:
+    """
+    Genera un CSV de `filas` médicos (1% inválidos y 0,5% con cédula
+    repetida) y compara el registro fila por fila con crear_medico (como
+    hacía la página Consultar) contra importar_medicos por lotes. Luego
+    exporta la tabla completa leyendo la BD por lotes.
+    """
+    import csv
+    from core import database as db
+    from Medicos.backend.data_services import COLUMNAS_CSV, ServicioDatos
+    from Medicos.backend.logic_medicos import LogicaMedicos
+
+    carpeta = tempfile.mkdtemp()
+    origen = os.path.join(carpeta, "medicos.csv")
+    with open(origen, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(COLUMNAS_CSV)
+        for i in range(filas):
+            cc = cedula_valida(i - 7 if i % 200 == 199 else i)  # repetida
+            nombre = "Luis Alberto" if i % 100 != 50 else "Luis 2"  # inválido
+            escritor.writerow((cc, nombre, "Vega Ortiz", "Cardiología", "0991234567", "",
+                               f"Av. Colón E{i % 300}-15", "Activo"))
+    r = {"memoria_inicial_mb": memoria_maxima_mb()}
+
+    db.configurar_pool(os.path.join(carpeta, "uno_a_uno.db"))
+    db.inicializar_db()
+    logica = LogicaMedicos()
+    t = time.perf_counter()
+    for _, fila in islice(ServicioDatos.leer_csv(origen), uno_a_uno):
+        logica.crear_medico(*fila)
+    r["uno_a_uno_ms"] = (time.perf_counter() - t) * 1000
+
+    db.configurar_pool(os.path.join(carpeta, "lotes.db"))
+    db.inicializar_db(forzar=True)
+    avances = []
+    t = time.perf_counter()
+    r["importados"], errores = logica.importar_medicos(ServicioDatos.leer_csv(origen, avances.append))
+    r["lotes_s"] = time.perf_counter() - t
+    r["rechazados"] = len(errores)
+    r["avisos_progreso"] = len(avances)
+    r["memoria_importacion_mb"] = memoria_maxima_mb()
+
+    destino = os.path.join(carpeta, "exportados.csv")
+    t = time.perf_counter()
+    ok, _ = ServicioDatos.exportar_csv(destino, logica.iterar_resultados(), logica.contar_resultados())
+    r["exportacion_s"] = time.perf_counter() - t
+    with open(destino, encoding="utf-8") as archivo:
+        r["exportados"] = sum(1 for _ in archivo) - 1
+
+    r["completo"] = (
+        ok and avances[-1] == 100
+        and r["importados"] + r["rechazados"] == filas
+        and r["exportados"] == r["importados"]
+    )
+    return r
+
+
+def medir_busqueda_medicos(medicos: int = 100_000) -> dict:
+    """
+    Compara la página de médicos de antes (todas las coincidencias con
+    lower(...) LIKE '%x%' traídas a Python y cortadas ahí) con la de ahora
+    (COUNT aparte + una página por rango sobre el nombre normalizado).
+    También mide avanzar 50 páginas seguidas sin filtro.
+    """
+    from core import database as db
+    from Medicos.backend.logic_medicos import LogicaMedicos
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "medicos.db"))
+    db.inicializar_db()
+    nombres = ("José", "María", "Ana", "Luis", "Carmen", "Jorge", "Lucía", "Pedro", "Sofía", "Andrés")
+    apellidos = ("Núñez", "Pérez", "Vega", "Ortiz", "Andrade", "Zambrano", "Cevallos", "Mora", "León", "Paz")
+    especialidades = ("Medicina General", "Cardiología", "Pediatría", "Dermatología", "Neurología")
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO medicos (cedula, nombres, apellidos, especialidad, telefono1, estado) "
+            "VALUES (?, ?, ?, ?, '0991234567', 'Activo')",
+            ((cedula_valida(i), f"{nombres[i % 10]} {nombres[i // 10 % 10]}",
+              f"{apellidos[i // 100 % 10]}{i // 1000 if i % 997 else 'x'} {apellidos[i % 7]}",
+              especialidades[i % 5]) for i in range(medicos))
+        )
+        conn.execute("ANALYZE")
+
+    def antes(buscar):
+        term = f"%{buscar.lower()}%"
+        with db.session() as conn:
+            filas = conn.execute(
+                "SELECT * FROM medicos WHERE 1=1 AND (lower(nombres) LIKE ? OR lower(apellidos) LIKE ?)",
+                (term, term)
+            ).fetchall()
+        return len(filas), filas[:20]
+
+    logica = LogicaMedicos()
+    r = {"consultas": {}}
+    for buscar in ("jose", "núñez", "andrade5", "zambranox", "nadie"):
+        t = time.perf_counter()
+        n_antes, _ = antes(buscar)
+        ms_antes = (time.perf_counter() - t) * 1000
+        t = time.perf_counter()
+        logica.actualizar_busqueda(buscar, "Todas las Especialidades", "Todos los Estados")
+        ms_ahora = (time.perf_counter() - t) * 1000
+        r["consultas"][buscar] = (ms_antes, n_antes, ms_ahora, logica.total_paginas)
+
+    logica.actualizar_busqueda("", "Todas las Especialidades", "Todos los Estados")
+    ids = [f[0] for f in logica.obtener_pagina_actual_items()]
+    t = time.perf_counter()
+    for _ in range(50):
+        logica.cambiar_pagina(1)
+        ids.extend(f[0] for f in logica.obtener_pagina_actual_items())
+    r["avanzar_50_ms"] = (time.perf_counter() - t) * 1000
+    logica.cambiar_pagina(-1)
+    # Las páginas no se saltan ni repiten filas, y retroceder vuelve a la anterior
+    r["paginas_coherentes"] = (
+        ids == sorted(set(ids)) and len(ids) == 51 * logica.filas_por_pagina
+        and [f[0] for f in logica.obtener_pagina_actual_items()] == ids[-40:-20]
+    )
+    return r
+
+
+def modo_medicos_csv(args):
+    filas = int(args[0]) if args else 50_000
+    r = medir_medicos_csv(filas)
+    print(f"CSV de {filas} médicos")
+    print(f"  fila por fila: {r['uno_a_uno_ms'] / 2_000:.2f} ms por fila (muestra de 2000)")
+    print(f"  por lotes:     {r['importados']} importados, {r['rechazados']} rechazados en {r['lotes_s']:.1f} s "
+          f"({filas / r['lotes_s']:,.0f} filas/s, {r['avisos_progreso']} avisos de progreso)")
+    print(f"  exportar:      {r['exportados']} en {r['exportacion_s']:.1f} s")
+    print(f"memoria máxima: {r['memoria_inicial_mb']:.0f} MB al inicio, "
+          f"{r['memoria_importacion_mb']:.0f} MB tras importar")
+    print(f"conteos coherentes: {'sí' if r['completo'] else 'NO'}")
+    sys.exit(0 if r["completo"] else 1)
+
+
+def modo_medicos_busqueda(args):
+    medicos = int(args[0]) if args else 100_000
+    r = medir_busqueda_medicos(medicos)
+    print(f"{medicos} médicos")
+    for buscar, (ms_antes, n_antes, ms_ahora, paginas) in r["consultas"].items():
+        print(f"  {buscar!r:12s} antes={ms_antes:8.1f} ms ({n_antes:6d} filas a Python)   "
+              f"ahora={ms_ahora:6.1f} ms (conteo + página 1 de {paginas})")
+    print(f"avanzar 50 páginas: {r['avanzar_50_ms']:.1f} ms")
+    print(f"páginas sin huecos ni repetidos: {'sí' if r['paginas_coherentes'] else 'NO'}")
+    sys.exit(0 if r["paginas_coherentes"] else 1)
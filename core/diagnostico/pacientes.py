@@ -0,0 +1,393 @@
+"""
+Búsqueda, caché, registro clínico, eliminación e importación de pacientes.
+
+Uso:
+    python -m core.diagnostico busqueda [pacientes]
+    python -m core.diagnostico cache [lecturas]
+    python -m core.diagnostico clinico [pacientes]
+    python -m core.diagnostico eliminacion [pacientes]
+    python -m core.diagnostico importacion [filas]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from .comun import cedula_valida, memoria_maxima_mb
+
+
+def medir_busqueda(pacientes: int = 100_000) -> dict:
+    """
+    Compara la búsqueda de pacientes por nombre: el recorrido en Python
+    sobre obtener_todos_pacientes (lo que hacía cada tecla) contra el
+    índice FTS5. También comprueba que el índice sigue a INSERT/UPDATE/DELETE.
+    """
+    from core import database as db
+    from Pacientes import busqueda
+    from Pacientes.paciente_controller import PacienteController
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "busqueda.db"))
+    db.inicializar_db()
+    nombres = ["José", "María", "Ana", "Luis", "Íñigo", "Sofía", "Andrés", "Lucía"]
+    apellidos = ["Pérez", "Núñez", "Gómez", "Álvarez", "Torres", "Ramírez", "Castillo"]
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO pacientes (dni, nombres, apellidos) VALUES (?, ?, ?)",
+            [(cedula_valida(i), f"{nombres[i % 8]} {i % 997}", f"{apellidos[i % 7]} {i % 991}")
+             for i in range(pacientes)]
+        )
+
+    controller = PacienteController()
+    consultas = ["jose", "nunez 12", "alv", "1700"]
+    r = {"consultas": {}}
+    for texto in consultas:
+        t = time.perf_counter()
+        todos = controller.obtener_todos_pacientes()
+        recorrido = [p for p in todos if texto in f"{p.cc} {p.nombre} {p.apellido}".lower()]
+        ms_recorrido = (time.perf_counter() - t) * 1000
+        t = time.perf_counter()
+        indexados = controller.buscar_pacientes(texto)
+        ms_indice = (time.perf_counter() - t) * 1000
+        r["consultas"][texto] = (ms_recorrido, len(recorrido), ms_indice, len(indexados))
+
+    # Sincronización por triggers
+    cedula = cedula_valida(pacientes + 1)
+    with db.session() as conn:
+        conn.execute("INSERT INTO pacientes (dni, nombres, apellidos) VALUES (?, 'Zoë', 'Ñandú')", (cedula,))
+        alta = [f[0] for f in busqueda.buscar_pacientes("zoe nandu")]
+        conn.execute("UPDATE pacientes SET nombres = 'Zacarías' WHERE dni = ?", (cedula,))
+        cambio = [f[0] for f in busqueda.buscar_pacientes("zacarias")] + [f[0] for f in busqueda.buscar_pacientes("zoe")]
+        conn.execute("DELETE FROM pacientes WHERE dni = ?", (cedula,))
+        baja = busqueda.buscar_pacientes("zacarias nandu")
+    r["sincronizado"] = alta == [cedula] and cambio == [cedula] and not baja
+    return r
+
+
+def medir_cache(lecturas: int = 20_000, pacientes: int = 2_000) -> dict:
+    """
+    Lecturas de pacientes con sesgo (el 80% sobre el 20% de las cédulas)
+    repartidas entre dos instancias de PacienteController, como hacen las
+    vistas. Compara el tiempo sin caché (se limpia antes de cada lectura) y
+    con la caché compartida, y verifica que una escritura en una instancia
+    invalida lo que la otra tenía en caché.
+    """
+    import random
+    from core import database as db
+    from Pacientes import paciente_controller as pcm
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "cache.db"))
+    db.inicializar_db()
+    cedulas = [cedula_valida(i) for i in range(pacientes)]
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO pacientes (dni, nombres, apellidos, telefono, anamnesis) VALUES (?, 'Ana', ?, '0991234567', '{}')",
+            [(cc, f"Paciente {i}") for i, cc in enumerate(cedulas)]
+        )
+    vistas = [pcm.PacienteController(), pcm.PacienteController()]
+    azar = random.Random(7)
+    frecuentes = cedulas[:pacientes // 5]
+    secuencia = [azar.choice(frecuentes if azar.random() < 0.8 else cedulas) for _ in range(lecturas)]
+    caches = [pcm._cache_pacientes, pcm._cache_anamnesis]
+
+    def leer(limpiar: bool) -> float:
+        t = time.perf_counter()
+        for i, cc in enumerate(secuencia):
+            if limpiar:
+                for c in caches:
+                    c.limpiar()
+            vista = vistas[i % 2]
+            vista.consultar_paciente(cc)
+            vista.consultar_anamnesis(cc)
+        return (time.perf_counter() - t) * 1000
+
+    r = {"sin_cache_ms": leer(limpiar=True)}
+    for c in caches:
+        c.limpiar()
+        c.aciertos = c.fallos = c.descartes = c.invalidaciones = 0
+    r["con_cache_ms"] = leer(limpiar=False)
+    r["estadisticas"] = pcm.estadisticas_cache()
+
+    # Escritura en una vista, lectura en la otra
+    cc = frecuentes[0]
+    vistas[0].consultar_paciente(cc)
+    vistas[1].actualizar_telefono(cc, "0987654321")
+    r["coherente"] = vistas[0].consultar_paciente(cc).telefono == "0987654321"
+    return r
+
+
+def medir_clinico(pacientes: int = 20_000) -> dict:
+    """
+    Compara la anamnesis/historia clínica como JSON en pacientes (leer el
+    texto completo, deserializar, cambiar un campo, serializar y reescribir)
+    con las columnas de anamnesis/historias_clinicas, y mide el traslado
+    único de los registros antiguos. Verifica que no se pierde ningún campo.
+    """
+    import json
+    import random
+    from core import database as db
+    from Pacientes import registro_clinico as rc
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "clinico.db"))
+    db.inicializar_db()
+    cedulas = [cedula_valida(i) for i in range(pacientes)]
+    texto = "Refiere dolor abdominal de tres días de evolución, sin fiebre. " * 4
+
+    def anamnesis(i):
+        return {"cc_paciente": cedulas[i], **{k: f"{k} {i}: {texto}" for k in rc.CAMPOS_ANAMNESIS}}
+
+    def historia(i):
+        return {"numero_historia": f"HC-{cedulas[i]}", "cc_paciente": cedulas[i], "estado": "Activa",
+                "fecha_creacion": "2024-01-02T03:04:05", "observaciones": texto,
+                "consultas": [], "diagnosticos": [], "tratamientos": []}
+
+    with db.session() as conn:
+        conn.executemany(
+            "INSERT INTO pacientes (dni, nombres, apellidos, anamnesis, historia_clinica) VALUES (?, 'Ana', 'Pérez', ?, ?)",
+            [(cc, json.dumps(anamnesis(i), ensure_ascii=False), json.dumps(historia(i)))
+             for i, cc in enumerate(cedulas)]
+        )
+    azar = random.Random(3)
+    muestra = [azar.randrange(pacientes) for _ in range(2_000)]
+
+    def cronometrar(operacion) -> float:
+        t = time.perf_counter()
+        for i in muestra:
+            operacion(i)
+        return (time.perf_counter() - t) * 1000
+
+    # Como lo hacía el controlador: el JSON completo en cada lectura o escritura
+    def leer_json(i):
+        with db.session() as conn:
+            fila = conn.execute("SELECT anamnesis FROM pacientes WHERE dni = ?", (cedulas[i],)).fetchone()
+        return json.loads(fila[0])["alergias"]
+
+    def actualizar_json(i):
+        with db.session() as conn:
+            fila = conn.execute("SELECT historia_clinica FROM pacientes WHERE dni = ?", (cedulas[i],)).fetchone()
+            datos = json.loads(fila[0])
+            datos["observaciones"] = f"Control {i}"
+            conn.execute("UPDATE pacientes SET historia_clinica = ? WHERE dni = ?", (json.dumps(datos), cedulas[i]))
+
+    r = {"json_lectura_ms": cronometrar(leer_json), "json_actualizacion_ms": cronometrar(actualizar_json)}
+    with db.session() as conn:
+        bytes_json = conn.execute(
+            "SELECT sum(length(anamnesis) + length(historia_clinica)) FROM pacientes").fetchone()[0]
+    r["json_bytes_por_paciente"] = bytes_json / pacientes
+
+    t = time.perf_counter()
+    r["trasladados"] = rc.migrar_pendientes()
+    r["migracion_ms"] = (time.perf_counter() - t) * 1000
+
+    def leer_columna(i):
+        with db.session() as conn:
+            return conn.execute("SELECT alergias FROM anamnesis WHERE paciente_dni = ?", (cedulas[i],)).fetchone()[0]
+
+    r["columna_lectura_ms"] = cronometrar(leer_columna)
+    r["columna_actualizacion_ms"] = cronometrar(
+        lambda i: rc.actualizar_historia(cedulas[i], {"observaciones": f"Control {i}"}))
+    r["registro_lectura_ms"] = cronometrar(lambda i: rc.leer_anamnesis(cedulas[i]))
+
+    # Ningún campo se pierde en el traslado y los JSON quedan vacíos
+    completo = all(
+        {k: v for k, v in (rc.leer_anamnesis(cedulas[i]) or {}).items() if k in rc.CAMPOS_ANAMNESIS}
+        == {k: anamnesis(i)[k] for k in rc.CAMPOS_ANAMNESIS}
+        and (rc.leer_historia(cedulas[i]) or {}).get("numero_historia") == f"HC-{cedulas[i]}"
+        for i in muestra[:200]
+    )
+    with db.session() as conn:
+        pendientes = conn.execute(
+            "SELECT COUNT(*) FROM pacientes WHERE anamnesis != '' OR historia_clinica != ''").fetchone()[0]
+    r["completo"] = completo and pendientes == 0 and r["trasladados"] == pacientes
+    return r
+
+
+def medir_eliminacion(pacientes: int = 5_000, uno_a_uno: int = 200) -> dict:
+    """
+    Crea `pacientes` pacientes con una fila en cada tabla dependiente y mide
+    la eliminación de `uno_a_uno` de ellos con eliminar_paciente, de la mitad
+    del resto con la eliminación masiva y de la otra mitad con una purga por
+    condición. Verifica que no quedan huérfanos ni se toca a otros pacientes.
+    """
+    from core import database as db
+    from Pacientes import eliminacion
+    from Pacientes.paciente_controller import PacienteController
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "eliminacion.db"))
+    db.inicializar_db()
+    conservados = 100
+    total = pacientes + conservados
+    cedulas = [cedula_valida(i) for i in range(total)]
+    with db.session() as conn:
+        conn.execute(
+            "INSERT INTO medicos (id, cedula, nombres, apellidos, especialidad) "
+            "VALUES (1, '1700000001', 'Ana', 'Prueba', 'General')"
+        )
+        conn.execute("INSERT INTO salas_habitaciones (id, numero, tipo) VALUES (1, 'S-1', 'General')")
+        # Ids de pacientes, citas, consultas, recetas y notificaciones = i + 1
+        filas = [(i + 1, cc) for i, cc in enumerate(cedulas)]
+        conn.executemany("INSERT INTO pacientes (id, dni, nombres, apellidos) VALUES (?, ?, 'Ana', 'Pérez')", filas)
+        conn.executemany(
+            "INSERT INTO citas (id, codigo, cc_paciente, id_medico, fecha, hora) "
+            "VALUES (?, 'C' || ?, ?, 1, date('2025-01-01', '+' || ? || ' days'), '08:00')",
+            [(i, i, cc, i) for i, cc in filas])
+        conn.executemany("INSERT INTO consultas (id, cita_id, paciente_id) VALUES (?, ?, ?)", [(i, i, i) for i, _ in filas])
+        conn.executemany("INSERT INTO recetas (id, consulta_id, medicamento) VALUES (?, ?, 'Paracetamol')",
+                         [(i, i) for i, _ in filas])
+        conn.executemany("INSERT INTO ordenes_servicio (consulta_id, tipo_orden) VALUES (?, 'Examen')", [(i,) for i, _ in filas])
+        conn.executemany("INSERT INTO entregas (paciente_id, receta_id) VALUES (?, ?)", [(i, i) for i, _ in filas])
+        conn.executemany("INSERT INTO hospitalizaciones (paciente_id, sala_id) VALUES (?, 1)", [(i,) for i, _ in filas])
+        conn.executemany("INSERT INTO pacienteSignosVitales (cedula, peso, talla, presion) VALUES (?, 70, 1.7, '120/80')", [(cc,) for _, cc in filas])
+        conn.executemany("INSERT INTO evoluciones (paciente_dni, nota) VALUES (?, 'Estable')", [(cc,) for _, cc in filas])
+        conn.executemany("INSERT INTO cuidados (paciente_dni, datos) VALUES (?, '{}')", [(cc,) for _, cc in filas])
+        conn.executemany("INSERT INTO permisos_visita (cedula_paciente, cedula_visitante) VALUES (?, '1700000002')",
+                         [(cc,) for _, cc in filas])
+        conn.executemany("INSERT INTO notificaciones (id, destinatario, mensaje) VALUES (?, ?, 'Recordatorio')", filas)
+        conn.executemany("INSERT INTO outbox_notificaciones (notificacion_id, proximo_intento) VALUES (?, '2025-01-01')",
+                         [(i,) for i, _ in filas])
+        conn.executemany("INSERT INTO anamnesis (paciente_dni, alergias) VALUES (?, 'Ninguna')", [(cc,) for _, cc in filas])
+        conn.executemany("INSERT INTO historias_clinicas (paciente_dni, numero_historia) VALUES (?, 'HC-' || ?)",
+                         [(cc, cc) for _, cc in filas])
+
+    controller = PacienteController()
+    r = {}
+    t = time.perf_counter()
+    for cc in cedulas[:uno_a_uno]:
+        controller.eliminar_paciente(cc)
+    r["uno_a_uno_ms"] = (time.perf_counter() - t) * 1000
+    r["uno_a_uno"] = uno_a_uno
+
+    mitad = uno_a_uno + (pacientes - uno_a_uno) // 2
+    t = time.perf_counter()
+    r["masivo"] = eliminacion.eliminar_pacientes(cedulas[uno_a_uno:mitad])["pacientes"]
+    r["masivo_ms"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    purgadas, _ = eliminacion.purgar_pacientes("id BETWEEN ? AND ?", (mitad + 1, pacientes))
+    r["purga_ms"] = (time.perf_counter() - t) * 1000
+    r["purga"] = len(purgadas)
+
+    # Cada tabla del plan debe quedar con una fila por paciente conservado
+    with db.session() as conn:
+        r["restantes"] = {tabla: conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+                          for tabla, _ in eliminacion.PLAN_ELIMINACION}
+        r["conservados_intactos"] = conn.execute(
+            "SELECT COUNT(*) FROM pacientes WHERE id > ?", (pacientes,)).fetchone()[0] == conservados
+    r["completo"] = r["conservados_intactos"] and all(n == conservados for n in r["restantes"].values())
+    return r
+
+
+def medir_importacion(filas: int = 1_000_000) -> dict:
+    """
+    Genera un padrón CSV de `filas` pacientes (1% inválidos y 0,5% con
+    cédula repetida), lo importa por lotes, lo exporta a CSV y JSONL y
+    reimporta el JSONL en otra BD. Mide filas por segundo y el pico de
+    memoria, que no debe crecer con el tamaño del archivo.
+    """
+    import csv
+    from core import database as db
+    from Pacientes import intercambio
+
+    carpeta = tempfile.mkdtemp()
+    origen = os.path.join(carpeta, "padron.csv")
+    with open(origen, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(intercambio.COLUMNAS)
+        for i in range(filas):
+            cc = cedula_valida(i - 7 if i % 200 == 199 else i)  # repetida
+            nombre = "Ana María" if i % 100 != 50 else "Ana 2"   # inválido
+            escritor.writerow((cc, nombre, "Pérez Núñez", f"Av. Amazonas N{i % 500}-12", "0991234567",
+                               f"p{i}@correo.ec", f"{1940 + i % 80}-{1 + i % 12:02d}-{1 + i % 28:02d}", ""))
+    r = {"archivo_mb": os.path.getsize(origen) / 1024 / 1024, "memoria_inicial_mb": memoria_maxima_mb()}
+
+    db.configurar_pool(os.path.join(carpeta, "importacion.db"))
+    db.inicializar_db()
+    t = time.perf_counter()
+    r["importacion"] = intercambio.importar_pacientes(origen)
+    r["importacion_s"] = time.perf_counter() - t
+    r["memoria_importacion_mb"] = memoria_maxima_mb()
+
+    exportados = {}
+    for formato in ("csv", "jsonl"):
+        destino = os.path.join(carpeta, f"exportados.{formato}")
+        t = time.perf_counter()
+        exportados[formato] = (intercambio.exportar_pacientes(destino), time.perf_counter() - t)
+    r["exportacion"] = exportados
+
+    db.configurar_pool(os.path.join(carpeta, "reimportacion.db"))
+    db.inicializar_db(forzar=True)
+    t = time.perf_counter()
+    r["reimportacion"] = intercambio.importar_pacientes(os.path.join(carpeta, "exportados.jsonl"))
+    r["reimportacion_s"] = time.perf_counter() - t
+    r["memoria_final_mb"] = memoria_maxima_mb()
+
+    importadas = r["importacion"]["importadas"]
+    r["completo"] = (
+        importadas + r["importacion"]["rechazadas"] == filas
+        and all(n == importadas for n, _ in exportados.values())
+        and r["reimportacion"]["importadas"] == importadas
+    )
+    return r
+
+
+def modo_busqueda(args):
+    pacientes = int(args[0]) if args else 100_000
+    r = medir_busqueda(pacientes)
+    print(f"{pacientes} pacientes")
+    for texto, (ms_r, n_r, ms_i, n_i) in r["consultas"].items():
+        print(f"  {texto!r:12s} recorrido={ms_r:8.1f} ms ({n_r:6d})   índice={ms_i:6.1f} ms ({n_i} mejores)")
+    print(f"índice sincronizado con INSERT/UPDATE/DELETE: {'sí' if r['sincronizado'] else 'NO'}")
+    sys.exit(0 if r["sincronizado"] else 1)
+
+
+def modo_cache(args):
+    lecturas = int(args[0]) if args else 20_000
+    r = medir_cache(lecturas)
+    print(f"{lecturas} lecturas (paciente + anamnesis) en dos instancias")
+    print(f"  sin caché: {r['sin_cache_ms']:8.1f} ms   con caché: {r['con_cache_ms']:8.1f} ms")
+    for e in r["estadisticas"]:
+        print(f"  {e['nombre']:18s} entradas={e['entradas']:5d}/{e['capacidad']} aciertos={e['aciertos']} "
+              f"fallos={e['fallos']} tasa={e['tasa_aciertos']:.0%} descartes={e['descartes']}")
+    print(f"escritura en una instancia visible en la otra: {'sí' if r['coherente'] else 'NO'}")
+    sys.exit(0 if r["coherente"] else 1)
+
+
+def modo_clinico(args):
+    pacientes = int(args[0]) if args else 20_000
+    r = medir_clinico(pacientes)
+    print(f"{pacientes} pacientes, JSON de {r['json_bytes_por_paciente']:.0f} bytes por paciente")
+    print(f"  leer un campo:        JSON {r['json_lectura_ms']:8.1f} ms   columna {r['columna_lectura_ms']:8.1f} ms"
+          f"   (anamnesis completa {r['registro_lectura_ms']:.1f} ms)")
+    print(f"  actualizar un campo:  JSON {r['json_actualizacion_ms']:8.1f} ms   columna {r['columna_actualizacion_ms']:8.1f} ms")
+    print(f"traslado único de {r['trasladados']} registros: {r['migracion_ms']:.0f} ms")
+    print(f"sin pérdida de campos y sin JSON pendientes: {'sí' if r['completo'] else 'NO'}")
+    sys.exit(0 if r["completo"] else 1)
+
+
+def modo_eliminacion(args):
+    pacientes = int(args[0]) if args else 5_000
+    r = medir_eliminacion(pacientes)
+    print(f"{pacientes} pacientes con datos en {len(r['restantes'])} tablas")
+    print(f"  uno a uno: {r['uno_a_uno']:6d} pacientes en {r['uno_a_uno_ms']:8.1f} ms "
+          f"({r['uno_a_uno_ms'] / r['uno_a_uno']:.2f} ms c/u)")
+    print(f"  masivo:    {r['masivo']:6d} pacientes en {r['masivo_ms']:8.1f} ms "
+          f"({r['masivo_ms'] / max(r['masivo'], 1):.3f} ms c/u)")
+    print(f"  purga:     {r['purga']:6d} pacientes en {r['purga_ms']:8.1f} ms")
+    sobrantes = {t: n for t, n in r["restantes"].items() if n != 100}
+    print(f"sin huérfanos y otros pacientes intactos: {'sí' if r['completo'] else f'NO {sobrantes}'}")
+    sys.exit(0 if r["completo"] else 1)
+
+
+def modo_importacion(args):
+    filas = int(args[0]) if args else 1_000_000
+    r = medir_importacion(filas)
+    imp, re_imp = r["importacion"], r["reimportacion"]
+    print(f"padrón de {filas} filas ({r['archivo_mb']:.0f} MB), {os.cpu_count()} núcleos")
+    print(f"  importar CSV:    {imp['importadas']} importadas, {imp['rechazadas']} rechazadas "
+          f"en {r['importacion_s']:.1f} s ({filas / r['importacion_s']:,.0f} filas/s)")
+    for formato, (n, s) in r["exportacion"].items():
+        print(f"  exportar {formato:6s} {n} en {s:.1f} s ({n / s:,.0f} filas/s)")
+    print(f"  reimportar JSONL: {re_imp['importadas']} en {r['reimportacion_s']:.1f} s")
+    print(f"memoria máxima: {r['memoria_inicial_mb']:.0f} MB al inicio, "
+          f"{r['memoria_importacion_mb']:.0f} MB tras importar, {r['memoria_final_mb']:.0f} MB al final")
+    print(f"conteos coherentes: {'sí' if r['completo'] else 'NO'}")
+    sys.exit(0 if r["completo"] else 1)
@@ -0,0 +1,145 @@
+"""
+Planes de consulta de las lecturas frecuentes de los controladores.
+
+Uso:
+    python -m core.diagnostico planes
+"""
+import os
+import re
+import sys
+import tempfile
+
+
+def consultas_criticas() -> dict:
+    """
+    Consultas con filtro de los controladores que deben resolverse con un
+    índice: {nombre: (tabla, sql, parámetros)}. El SQL sale de las
+    constantes SQL_* y funciones consulta_* que ejecuta cada módulo, así el
+    chequeo no se desactualiza al cambiar una consulta. parámetros None =
+    todos NULL (el plan no depende de los valores).
+    """
+    from datetime import date
+
+    from Citas_Medicas import citas_controller as citas
+    from Consulta_Externa import consulta_controller as consulta
+    from Farmacia.backend import backend_farmacia as farmacia
+    from Hospitalizacion.Gestion_Admision_Alta import repository as admision
+    from Hospitalizacion.camas_y_salas import repository as camas
+    from Hospitalizacion.evolucion_cuidados import repository as evolucion
+    from Medicos.backend import backend_medicos as medicos
+    from Pacientes import busqueda, eliminacion, paciente_controller, registro_clinico
+
+    marcas = "?, ?, ?"
+    criticas = {
+        "Citas.obtener_agenda_rango (horarios)":
+            ("horarios_medicos", citas.SQL_HORARIOS_MEDICOS.format(marcas=marcas), None),
+        "Citas.obtener_agenda_rango":
+            ("citas", citas.SQL_AGENDA_RANGO.format(marcas=marcas), None),
+        "Citas.consultar_cita_por_codigo": ("citas", citas.SQL_CITA_POR_CODIGO, None),
+        "Citas.consultar_citas_por_paciente": ("citas", citas.SQL_CITAS_POR_PACIENTE, None),
+        "Citas.obtener_medicos_por_especialidad": ("medicos", citas.SQL_MEDICOS_POR_ESPECIALIDAD, None),
+        "Citas.obtener_agenda_medico": ("horarios_medicos", citas.SQL_AGENDA_MEDICO, None),
+        "Citas.consultar_notificaciones (página siguiente)":
+            ("notificaciones", *citas.consulta_notificaciones(despues_de=1000)),
+        "Citas.consultar_notificaciones (destinatario)":
+            ("notificaciones", *citas.consulta_notificaciones(destinatario="1700000001")),
+        "Citas.consultar_notificaciones (estado)":
+            ("notificaciones", *citas.consulta_notificaciones(estado="Fallida", desde=date(2026, 1, 1))),
+        "Medicos.obtener_pagina (búsqueda por nombre)": ("medicos", *medicos.consulta_pagina("ana")),
+        "Medicos.obtener_pagina (anterior, búsqueda por nombre)":
+            ("medicos", *medicos.consulta_pagina("ana", antes_de=100)),
+        "Medicos.contar_medicos (búsqueda por nombre)":
+            ("medicos", *medicos.consulta_conteo("ana", "Cardiología")),
+        "Pacientes.consultar_paciente": ("pacientes", paciente_controller.SQL_PACIENTE_POR_CEDULA, None),
+        "Pacientes.buscar_pacientes": ("pacientes", busqueda.SQL_TEXTO_COMPLETO, None),
+        "Pacientes.buscar_pacientes (prefijo de cédula)": ("pacientes", busqueda.SQL_PREFIJO_CEDULA, None),
+        "Pacientes.consultar_anamnesis": ("anamnesis", registro_clinico.SQL_LEER_ANAMNESIS, None),
+        "Pacientes.actualizar_historia_clinica":
+            ("historias_clinicas", registro_clinico.SQL_ACTUALIZAR_HISTORIA.format(asignaciones="observaciones = ?, "), None),
+        "Pacientes.registro_clinico (paciente pendiente)": ("pacientes", registro_clinico.SQL_PENDIENTE_PACIENTE, None),
+        "Pacientes.registro_clinico (lote de migración)": ("pacientes", registro_clinico.SQL_LOTE_PENDIENTE, None),
+        "ConsultaExterna.verificar_paciente_tiene_signos_vitales":
+            ("pacienteSignosVitales", consulta.SQL_ULTIMOS_SIGNOS, None),
+        "Farmacia.obtener_detalles_pedido": ("pedido_detalles", farmacia.SQL_DETALLES_PEDIDO, None),
+        "Farmacia.obtener_inventario(tipo)": ("inventario", farmacia.SQL_INVENTARIO_POR_TIPO, None),
+        "Farmacia.recibir_pedido (lotes)": ("pedido_detalles", farmacia.SQL_RECIBIR_PEDIDO, None),
+        "Farmacia.recibir_pedido (faltantes)": ("pedido_detalles", farmacia.SQL_FALTANTES_PEDIDO, None),
+        "Farmacia.consultar_pedidos (estado, página siguiente)":
+            ("pedidos_farmacia", *farmacia.consulta_pedidos_resumen(estado="Pendiente", antes_de=100)),
+        "Farmacia.consultar_pedidos (rango de fechas)":
+            ("pedidos_farmacia", *farmacia.consulta_pedidos_resumen(desde="2026-01-01", hasta="2026-01-31")),
+        "Farmacia.consultar_caducidad (rango de fechas)":
+            ("inventario_lotes", *farmacia.consulta_lotes_por_caducidad("2026-01-01", "2026-01-01", "2026-03-31")),
+        "Farmacia.consultar_caducidad (todos, página siguiente)":
+            ("inventario_lotes", *farmacia.consulta_lotes_por_caducidad("2026-01-01", limite=200,
+                                                                         despues_de=("2026-06-01", 1000))),
+        "Admision.esta_hospitalizado": ("hospitalizaciones", admision.SQL_CONTAR_HOSPITALIZACIONES, None),
+        "Admision.registrar_alta": ("hospitalizaciones", admision.SQL_ULTIMA_HOSPITALIZACION, None),
+        "CamasSalas._cargar_piso (salas y habitaciones)": ("salas_habitaciones", camas.SQL_SALAS_DE_PISO, None),
+        "CamasSalas._cargar_piso (camas)": ("camas", camas.SQL_CAMAS_DE_PISO, None),
+        "CamasSalas._asegurar (piso de un número)": ("salas_habitaciones", camas.SQL_PISO_DE_NUMERO, None),
+        "CamasSalas._asegurar (piso de una cama)": ("camas", camas.SQL_PISO_DE_CAMA, None),
+        "Evolucion.listar_por_paciente": ("evoluciones", evolucion.SQL_EVOLUCIONES_PACIENTE, None),
+    }
+    # Cada paso de la baja en cascada, sobre la tabla temporal de pacientes marcados
+    for tabla, condicion in eliminacion.PLAN_ELIMINACION:
+        criticas[f"Pacientes.eliminar_pacientes ({tabla})"] = (tabla, f"DELETE FROM {tabla} WHERE {condicion}", None)
+    return criticas
+
+
+# "FROM tabla alias" / "JOIN tabla AS alias": los planes nombran las tablas por su alias
+_TABLA_ALIAS = re.compile(r"\b(?:FROM|JOIN)\s+(?:temp\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NO_ALIAS = {"where", "on", "join", "left", "inner", "cross", "natural", "order", "group", "limit", "using", "set"}
+
+
+def _alias_de_tablas(sql: str) -> dict:
+    alias = {}
+    for tabla, nombre in _TABLA_ALIAS.findall(sql):
+        alias[tabla] = tabla
+        if nombre and nombre.lower() not in _NO_ALIAS:
+            alias[nombre] = tabla
+    return alias
+
+
+def verificar_planes(conn) -> dict:
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre consultas_criticas() y devuelve
+    {nombre: (usa_indice, [detalle del plan])}. Una consulta falla si el plan
+    recorre (SCAN) su tabla objetivo, aunque sea en orden de un índice, o si
+    recorre cualquier otra tabla de la BD sin índice. Las tablas FTS5
+    (SCAN ... VIRTUAL TABLE INDEX) usan su propio índice; las temporales y
+    las CTE no son tablas de la BD.
+    """
+    from Pacientes import eliminacion
+
+    conn.execute(eliminacion.SQL_CREAR_BAJA)
+    tablas_bd = {nombre for (nombre,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    resultado = {}
+    for nombre, (objetivo, sql, parametros) in consultas_criticas().items():
+        if parametros is None:
+            parametros = (None,) * sql.count("?")
+        plan = [fila[3] for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(parametros)).fetchall()]
+        alias = _alias_de_tablas(sql)
+        usa_indice = True
+        for paso in plan:
+            if not paso.startswith("SCAN "):
+                continue
+            tabla = alias.get(paso.split()[1], paso.split()[1])
+            if tabla == objetivo or (
+                tabla in tablas_bd and "USING" not in paso and "VIRTUAL TABLE INDEX" not in paso
+            ):
+                usa_indice = False
+        resultado[nombre] = (usa_indice, plan)
+    return resultado
+
+
+def modo_planes(args):
+    from core import database as db
+
+    db.configurar_pool(os.path.join(tempfile.mkdtemp(), "planes.db"))
+    db.inicializar_db()
+    with db.session() as conn:
+        resultado = verificar_planes(conn)
+    for nombre, (ok, plan) in resultado.items():
+        print(f"{'OK  ' if ok else 'FALLA'} {nombre}: {' | '.join(plan)}")
+    sys.exit(0 if all(ok for ok, _ in resultado.values()) else 1)
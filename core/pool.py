@@ -0,0 +1,280 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Ruta central de la base de datos (raíz del proyecto). Puede sobrescribirse por
+# despliegue con la variable de entorno HOSPITAL_DB.
+DB_PATH = os.environ.get(
+    "HOSPITAL_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hospital.db")
+)
+
+# Conexiones ociosas que cada hilo conserva abiertas para reutilizar.
+POOL_SIZE = int(os.environ.get("HOSPITAL_DB_POOL", "4"))
+
+
+# Funciones que se aplican a cada conexión nueva (p.ej. el perfil de PRAGMAs
+# de core/database.py). Se registran con al_conectar().
+_configuradores = []
+
+
+def al_conectar(func):
+    """Registra `func(conn)` para que se ejecute sobre cada conexión nueva."""
+    if func not in _configuradores:
+        _configuradores.append(func)
+    return func
+
+
+class _CacheHilo(threading.local):
+    """Estado propio de cada hilo: conexiones libres y sesión activa."""
+
+    def __init__(self):
+        self.libres = []
+        self.sesion = None
+        self.profundidad = 0
+        self.inmediata = False  # la sesión activa ya tiene el bloqueo de escritura
+
+
+class ConexionPool:
+    """
+    Envoltura de sqlite3.Connection entregada por el pool.
+    Se usa igual que una conexión normal, pero close() la devuelve al pool
+    en lugar de cerrarla. Como contexto (`with conn:`) confirma o revierte
+    la transacción igual que sqlite3.Connection, entrega la misma envoltura
+    y no devuelve la conexión al pool.
+    """
+
+    __slots__ = ("_conn", "_pool", "_hilo")
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+        self._hilo = threading.get_ident()
+
+    def __getattr__(self, nombre):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, nombre)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        """Devuelve la conexión al pool (idempotente)."""
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        self._pool.liberar(conn, self._hilo)
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones SQLite con caché por hilo.
+    Cada hilo reutiliza hasta `tamano` conexiones ociosas en vez de abrir una
+    nueva por cada consulta, y `session()` agrupa varias operaciones en una
+    sola conexión y transacción.
+    """
+
+    def __init__(self, ruta: str = DB_PATH, tamano: int = POOL_SIZE):
+        self.ruta = ruta
+        self.tamano = max(1, int(tamano))
+        self._cache = _CacheHilo()
+        self._lock = threading.Lock()
+        self._todas = []  # para cerrar todo al reconfigurar
+        self._prestadas = set()
+        # Métricas
+        self.conexiones_creadas = 0
+        self.prestamos = 0
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.ruta, check_same_thread=False)
+        # Habilitamos las llaves foráneas para que las relaciones funcionen
+        conn.execute("PRAGMA foreign_keys = ON")
+        for configurar in _configuradores:
+            configurar(conn)
+        with self._lock:
+            self.conexiones_creadas += 1
+            self._todas.append(conn)
+        return conn
+
+    def adquirir(self) -> ConexionPool:
+        """Entrega una conexión del hilo actual (reutilizada o nueva)."""
+        cache = self._cache
+        conn = cache.libres.pop() if cache.libres else self._conectar()
+        with self._lock:
+            self.prestamos += 1
+            self._prestadas.add(id(conn))
+        return ConexionPool(conn, self)
+
+    def liberar(self, conn: sqlite3.Connection, hilo: int = None):
+        """Recibe una conexión devuelta; descarta cambios sin confirmar."""
+        with self._lock:
+            self._prestadas.discard(id(conn))
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._descartar(conn)
+            return
+        cache = self._cache
+        mismo_hilo = hilo is None or hilo == threading.get_ident()
+        if mismo_hilo and len(cache.libres) < self.tamano:
+            cache.libres.append(conn)
+        else:
+            self._descartar(conn)
+
+    def _descartar(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn in self._todas:
+                self._todas.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def session(self, inmediata: bool = False):
+        """
+        Contexto transaccional: confirma al salir sin errores y revierte si
+        ocurre una excepción. Las sesiones anidadas en el mismo hilo comparten
+        la conexión y la transacción de la sesión externa.
+
+        Con inmediata=True la transacción externa abre con BEGIN IMMEDIATE y
+        toma el bloqueo de escritura desde el inicio, para que una lectura y
+        la escritura que depende de ella no se intercalen con otro proceso.
+        Una sesión inmediata anidada en una diferida toma el bloqueo en ese
+        momento (BEGIN IMMEDIATE si la externa aún no escribió; si ya
+        escribió, la externa ya lo tiene).
+        """
+        cache = self._cache
+        if cache.sesion is not None:
+            if inmediata and not cache.inmediata:
+                # sqlite3 abre la transacción implícita justo antes de la
+                # primera escritura, que toma el bloqueo: sin transacción
+                # abierta todavía se puede empezar como IMMEDIATE
+                if not cache.sesion.in_transaction:
+                    cache.sesion.execute("BEGIN IMMEDIATE")
+                cache.inmediata = True
+            cache.profundidad += 1
+            try:
+                yield cache.sesion
+            finally:
+                cache.profundidad -= 1
+            return
+
+        conn = self.adquirir()
+        cache.sesion = conn
+        cache.inmediata = inmediata
+        try:
+            if inmediata:
+                conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cache.sesion = None
+            cache.inmediata = False
+            conn.close()
+
+    def cerrar(self):
+        """
+        Cierra las conexiones ociosas del pool. Las que siguen prestadas
+        (p.ej. repositorios con conexión de larga vida) no se interrumpen.
+        """
+        with self._lock:
+            ociosas = [c for c in self._todas if id(c) not in self._prestadas]
+            self._todas = [c for c in self._todas if id(c) in self._prestadas]
+        for conn in ociosas:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._cache = _CacheHilo()
+
+    def estadisticas(self) -> dict:
+        return {
+            "ruta": self.ruta,
+            "tamano": self.tamano,
+            "conexiones_creadas": self.conexiones_creadas,
+            "prestamos": self.prestamos,
+            "abiertas": len(self._todas),
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def obtener_pool() -> PoolConexiones:
+    """Devuelve el pool global del proceso (se crea en el primer uso)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PoolConexiones()
+    return _pool
+
+
+def configurar_pool(ruta: str = None, tamano: int = None) -> PoolConexiones:
+    """Reemplaza el pool global (p.ej. otra ruta de BD o tamaño por despliegue)."""
+    global _pool
+    with _pool_lock:
+        anterior = _pool
+        _pool = PoolConexiones(
+            ruta or (anterior.ruta if anterior else DB_PATH),
+            tamano or (anterior.tamano if anterior else POOL_SIZE),
+        )
+    if anterior:
+        anterior.cerrar()
+    return _pool
+
+
+def session(inmediata: bool = False):
+    """Atajo: `with session() as conn:` sobre el pool global."""
+    return obtener_pool().session(inmediata)
+
+
+def estadisticas() -> dict:
+    return obtener_pool().estadisticas()
+
+
+if __name__ == '__main__':
+    # Benchmark: conexiones abiertas por operación (antes vs. después del pool).
+    # Simula el flujo de solicitar_cita: 4 accesos a BD por operación.
+    import tempfile
+    import time
+
+    OPERACIONES = 500
+    ruta = os.path.join(tempfile.mkdtemp(), "bench.db")
+    sqlite3.connect(ruta).execute("CREATE TABLE t (x INTEGER)").connection.commit()
+
+    t0 = time.perf_counter()
+    conexiones = 0
+    for i in range(OPERACIONES):
+        for _ in range(4):
+            conn = sqlite3.connect(ruta)
+            conn.execute("PRAGMA foreign_keys = ON")
+            conexiones += 1
+            conn.execute("INSERT INTO t VALUES (?)", (i,))
+            conn.commit()
+            conn.close()
+    antes = time.perf_counter() - t0
+    print(f"Antes : {conexiones / OPERACIONES:.2f} conexiones/op, {antes * 1000 / OPERACIONES:.3f} ms/op")
+
+    pool = configurar_pool(ruta)
+    t0 = time.perf_counter()
+    for i in range(OPERACIONES):
+        with session() as conn:
+            for _ in range(4):
+                with session() as sub:
+                    sub.execute("INSERT INTO t VALUES (?)", (i,))
+    despues = time.perf_counter() - t0
+    print(f"Despues: {pool.conexiones_creadas / OPERACIONES:.3f} conexiones/op, {despues * 1000 / OPERACIONES:.3f} ms/op")
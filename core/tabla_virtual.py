@@ -0,0 +1,216 @@
+"""
+Modelo de tabla virtual compartido para listados grandes (pacientes, signos
+vitales, citas, médicos, notificaciones).
+
+En lugar de crear un QTableWidgetItem por celda, las filas se guardan como
+tuplas en un almacén compacto y la vista solo pide las celdas visibles. Las
+filas se exponen por bloques (canFetchMore/fetchMore) y el orden y el filtro
+se calculan sobre el almacén completo, no solo sobre lo ya mostrado.
+
+Uso típico:
+    self.modelo = ModeloTablaVirtual(["Cédula", "Nombre"])
+    self.proxy = ProxyTablaVirtual(self.modelo)
+    self.tabla = QTableView(); self.tabla.setModel(self.proxy)
+    self.modelo.cargar((p.cc, p.nombre) for p in pacientes)
+    self.proxy.filtrar("ana", columnas=[1])
+"""
+from operator import itemgetter
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+# Filas que se agregan a la vista en cada fetchMore
+TAMANO_BLOQUE = 200
+
+
+class ModeloTablaVirtual(QAbstractTableModel):
+    """
+    QAbstractTableModel de solo lectura sobre un almacén de tuplas.
+
+    Dos fuentes posibles:
+      - cargar(filas): todas las filas ya están en memoria (lista del controlador).
+      - cargar_paginas(obtener_pagina): la BD entrega páginas por cursor;
+        obtener_pagina(cursor) -> (filas, siguiente_cursor o None).
+
+    Opcionales: color(fila, columna) -> color del texto o None, y
+    ayuda(fila) -> tooltip o None. Las filas pueden traer columnas extra
+    (más allá de los encabezados) para uso de estas funciones.
+    """
+
+    def __init__(self, encabezados, tamano_bloque: int = TAMANO_BLOQUE, parent=None,
+                 color=None, ayuda=None):
+        super().__init__(parent)
+        self.encabezados = list(encabezados)
+        self.tamano_bloque = max(1, int(tamano_bloque))
+        self.color = color
+        self.ayuda = ayuda
+        self._filas = []          # almacén completo (tuplas)
+        self._vista = None        # índices del almacén que pasan el filtro (None = todas)
+        self._visibles = 0        # filas ya expuestas a la vista
+        self._obtener_pagina = None
+        self._cursor = None
+        self._texto = ""
+        self._columnas = None
+        self._busqueda = {}       # columnas -> texto en minúsculas de cada fila
+
+    # --- Carga ---
+    def cargar(self, filas):
+        """Reemplaza el contenido con filas en memoria (iterable de secuencias)."""
+        self.beginResetModel()
+        self._filas = [tuple(f) for f in filas]
+        self._busqueda = {}
+        self._obtener_pagina = None
+        self._cursor = None
+        self._aplicar_filtro()
+        self._visibles = min(self.tamano_bloque, self.total())
+        self.endResetModel()
+
+    def cargar_paginas(self, obtener_pagina):
+        """Reemplaza el contenido con una fuente paginada y trae la primera página."""
+        filas, cursor = obtener_pagina(None)
+        self.beginResetModel()
+        self._filas = [tuple(f) for f in filas]
+        self._busqueda = {}
+        self._obtener_pagina = obtener_pagina
+        self._cursor = cursor
+        self._aplicar_filtro()
+        self._visibles = self.total()
+        self.endResetModel()
+
+    def limpiar(self):
+        self.cargar([])
+
+    def total(self) -> int:
+        """Filas que pasan el filtro actual (incluidas las aún no expuestas)."""
+        return len(self._filas) if self._vista is None else len(self._vista)
+
+    def fila(self, fila_modelo: int) -> tuple:
+        """Tupla completa de una fila visible del modelo."""
+        return self._filas[fila_modelo if self._vista is None else self._vista[fila_modelo]]
+
+    # --- Carga perezosa ---
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._visibles < self.total() or (self._obtener_pagina is not None and self._cursor is not None)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        if self._visibles >= self.total() and self._obtener_pagina is not None and self._cursor is not None:
+            nuevas, self._cursor = self._obtener_pagina(self._cursor)
+            inicio = len(self._filas)
+            self._filas.extend(tuple(f) for f in nuevas)
+            self._busqueda = {}
+            if self._vista is not None:
+                self._vista.extend(i for i in range(inicio, len(self._filas)) if self._acepta(self._filas[i]))
+        hasta = min(self._visibles + self.tamano_bloque, self.total())
+        if hasta > self._visibles:
+            self.beginInsertRows(QModelIndex(), self._visibles, hasta - 1)
+            self._visibles = hasta
+            self.endInsertRows()
+
+    # --- Orden y filtro sobre el almacén completo ---
+    # (con una fuente paginada aplican a las páginas ya traídas)
+    def sort(self, columna, orden=Qt.SortOrder.AscendingOrder):
+        if not 0 <= columna < len(self.encabezados):
+            return
+        self.layoutAboutToBeChanged.emit()
+        valor = itemgetter(columna)
+        descendente = orden == Qt.SortOrder.DescendingOrder
+        try:
+            self._filas.sort(key=valor, reverse=descendente)
+        except TypeError:
+            # Columna con None o tipos mezclados: None al final
+            self._filas.sort(key=lambda f: (valor(f) is None, "" if valor(f) is None else str(valor(f))),
+                             reverse=descendente)
+        self._busqueda = {}
+        self._aplicar_filtro()
+        self.layoutChanged.emit()
+
+    def filtrar(self, texto: str, columnas=None):
+        """
+        Deja solo las filas que contienen `texto` (sin distinguir mayúsculas)
+        en alguna de `columnas` (índices; None = todas). Texto vacío = sin filtro.
+        """
+        self.beginResetModel()
+        self._texto = (texto or "").strip().lower()
+        self._columnas = columnas
+        self._aplicar_filtro()
+        self._visibles = min(self.tamano_bloque, self.total())
+        self.endResetModel()
+
+    def _aplicar_filtro(self):
+        if not self._texto:
+            self._vista = None
+            return
+        # Texto de búsqueda por fila, calculado una vez por carga y columnas,
+        # así cada tecla del buscador solo recorre cadenas ya preparadas
+        columnas = tuple(self._columnas) if self._columnas is not None else tuple(range(len(self.encabezados)))
+        textos = self._busqueda.get(columnas)
+        if textos is None:
+            textos = [self._texto_busqueda(f, columnas) for f in self._filas]
+            self._busqueda[columnas] = textos
+        texto = self._texto
+        self._vista = [i for i, t in enumerate(textos) if texto in t]
+
+    @staticmethod
+    def _texto_busqueda(fila, columnas) -> str:
+        # El separador evita coincidencias que crucen dos columnas
+        return "\x1f".join("" if fila[c] is None else str(fila[c]).lower() for c in columnas)
+
+    def _acepta(self, fila) -> bool:
+        columnas = self._columnas if self._columnas is not None else range(len(self.encabezados))
+        return self._texto in self._texto_busqueda(fila, columnas)
+
+    # --- Datos ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._visibles
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.encabezados)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            valor = self.fila(index.row())[index.column()]
+            return "" if valor is None else str(valor)
+        if role == Qt.ItemDataRole.UserRole:
+            return self.fila(index.row())[index.column()]
+        if role == Qt.ItemDataRole.ForegroundRole and self.color is not None:
+            return self.color(self.fila(index.row()), index.column())
+        if role == Qt.ItemDataRole.ToolTipRole and self.ayuda is not None:
+            return self.ayuda(self.fila(index.row()))
+        return None
+
+    def headerData(self, seccion, orientacion, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientacion == Qt.Orientation.Horizontal:
+            return self.encabezados[seccion]
+        return None
+
+
+class ProxyTablaVirtual(QSortFilterProxyModel):
+    """
+    Proxy de orden y filtro para ModeloTablaVirtual. Delega ambos al modelo
+    para que apliquen sobre todas las filas, incluidas las que la vista aún
+    no ha pedido, en lugar de ordenar/filtrar solo el bloque cargado.
+    """
+
+    def __init__(self, modelo: ModeloTablaVirtual, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(modelo)
+
+    def sort(self, columna, orden=Qt.SortOrder.AscendingOrder):
+        self.sourceModel().sort(columna, orden)
+
+    def filtrar(self, texto: str, columnas=None):
+        self.sourceModel().filtrar(texto, columnas)
+
+    def fila(self, fila_proxy: int) -> tuple:
+        """Tupla de la fila mostrada en la posición `fila_proxy` de la vista."""
+        return self.sourceModel().fila(self.mapToSource(self.index(fila_proxy, 0)).row())
+
+    def fila_actual(self, vista):
+        """Tupla de la fila seleccionada en `vista` o None si no hay selección."""
+        indice = vista.currentIndex()
+        return self.fila(indice.row()) if indice.isValid() else None
@@ -375,9 +375,9 @@ def get_sheet() -> str:
     }}
 
     /* =======================================================
-       6. TABLAS (QTableWidget)
+       6. TABLAS (QTableView / QTableWidget)
        ======================================================= */
-    QTableWidget {{
+    QTableView {{
         background-color: {c.Bg_Card};
         gridline-color: {c.hover};
         border: 1px solid {c.Border};
@@ -387,12 +387,12 @@ def get_sheet() -> str:
         outline: none;
     }}
     
-    QTableWidget::item {{
+    QTableView::item {{
         padding: 5px;
         border-bottom: 1px solid {c.Border}; 
     }}
 
-    QTableWidget::item:selected {{
+    QTableView::item:selected {{
         background-color: {c.Focus_Bg};
         color: {c.Focus};
         font-weight: bold;
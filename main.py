@@ -1,27 +1,86 @@
 import sys
+import time
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QFrame, QStackedWidget, QSizePolicy
 )
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup
+from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QParallelAnimationGroup, QTimer
 
 # --- IMPORTACIONES ---
 import core.utils as utils
 from core.theme import AppPalette as HospitalPalette
 from core.widgets import SidebarButton
 
-# Importamos tus módulos (Asegúrate de que las carpetas existan)
-from Pacientes.paciente_view import PacienteView
-from Pacientes.paciente_controller import PacienteController
-from Consulta_Externa.consulta_controller import ConsultaExternaController
-from Consulta_Externa.consulta_view import ConsultaExternaView
-from Hospitalizacion.hospitalizacion_view import HospitalizacionView
-from Farmacia.frontend.frontend_farmacia import VentanaFarmacia
-from Citas_Medicas import CitasMedicasView, CitasMedicasController
 from core.database import inicializar_db
-from Medicos.frontend import module_medicos
 from dashboard_view import DashboardView
 
+
+# --- Helper para cargar ventanas QMainWindow dentro de widgets ---
+def embed(window):
+    # Transformamos la ventana en un widget simple
+    window.setWindowFlags(Qt.WindowType.Widget)
+    window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, False)
+    return window
+
+
+def iniciar_traslado_clinico():
+    """Lanza el traslado de fondo de los registros clínicos antiguos."""
+    try:
+        from Pacientes import registro_clinico
+        registro_clinico.iniciar_migracion()
+    except Exception as e:
+        print(f"Aviso: no se pudo iniciar el traslado clínico: {e}")
+
+
+# --- Fábricas de páginas ---
+# Cada módulo se importa y se construye la primera vez que se navega a él,
+# así el arranque solo carga el Dashboard.
+def crear_citas(menu):
+    from Citas_Medicas import CitasMedicasView, CitasMedicasController
+    return embed(CitasMedicasView(controller=CitasMedicasController()))
+
+
+def crear_pacientes(menu):
+    from Pacientes.paciente_view import PacienteView
+    from Pacientes.paciente_controller import PacienteController
+    return embed(PacienteView(controller=PacienteController()))
+
+
+def crear_consulta(menu):
+    from Consulta_Externa.consulta_controller import ConsultaExternaController
+    from Consulta_Externa.consulta_view import ConsultaExternaView
+    view = ConsultaExternaView()
+    controller_consulta = ConsultaExternaController(view)
+    view.set_controller(controller_consulta)
+    return view
+
+
+def crear_farmacia(menu):
+    from Farmacia.frontend.frontend_farmacia import VentanaFarmacia
+    return embed(VentanaFarmacia())
+
+
+def crear_hospitalizacion(menu):
+    from Hospitalizacion.hospitalizacion_view import HospitalizacionView
+    return embed(HospitalizacionView(parent=menu))
+
+
+def crear_medicos(menu):
+    from Medicos.frontend import module_medicos
+    return embed(module_medicos.VentanaPrincipal())
+
+
+# Índice del stack -> (atributo en MenuPrincipal, nombre, fábrica)
+PAGINAS = {
+    1: ("view_citas", "Citas Médicas", crear_citas),
+    2: ("view_pacientes", "Pacientes", crear_pacientes),
+    3: ("view_consulta", "Consulta Externa", crear_consulta),
+    4: ("view_farmacia", "Farmacia", crear_farmacia),
+    5: ("view_hosp", "Hospitalización", crear_hospitalizacion),
+    6: ("view_medicos", "Médicos", crear_medicos),
+}
+
+
 class MenuPrincipal(QMainWindow):
     """
     Menú principal del sistema de gestión hospitalaria.
@@ -37,6 +96,8 @@ class MenuPrincipal(QMainWindow):
         self.sidebar_expanded = True
         self.nav_btns = []
         self.section_labels = []
+        # Tiempo de construcción (ms) de cada página ya cargada
+        self.tiempos_carga = {}
 
         # Widget Central y Layout Principal
         central_widget = QWidget()
@@ -191,7 +252,8 @@ class MenuPrincipal(QMainWindow):
         # 1. Cambiar visualmente el activo
         for btn in self.nav_btns:
             btn.update_style(btn == sender_btn)
-        # 2. Cambiar página del stack
+        # 2. Cambiar página del stack (se construye en la primera visita)
+        self.construir_pagina(sender_btn.page_index)
         self.stack.setCurrentIndex(sender_btn.page_index)
 
     def toggle_sidebar(self):
@@ -271,48 +333,47 @@ class MenuPrincipal(QMainWindow):
 
     def load_modules(self):
         # --- 0. Inicio (Dashboard) ---
+        t0 = time.perf_counter()
         self.view_dashboard = DashboardView()
         # Conectamos la señal de los botones para que naveguen
         self.view_dashboard.solicitar_navegacion.connect(self.navegar_por_indice)
-        
         self.stack.addWidget(self.view_dashboard)
+        self.tiempos_carga["Inicio"] = (time.perf_counter() - t0) * 1000
 
-        # --- Helper para cargar ventanas QMainWindow dentro de widgets ---
-        def embed(window):
-            # Transformamos la ventana en un widget simple
-            window.setWindowFlags(Qt.WindowType.Widget)
-            window.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, False)
-            return window
-
-        # --- 1. Citas ---
-        self.view_citas = embed(CitasMedicasView(controller=CitasMedicasController()))
-        self.stack.addWidget(self.view_citas)
-
-        # --- 2. Pacientes ---
-        self.view_pacientes = embed(PacienteView(controller=PacienteController()))
-        self.stack.addWidget(self.view_pacientes)
-
-        self.view_consulta = ConsultaExternaView()
-        controller_consulta = ConsultaExternaController(self.view_consulta)
-        self.view_consulta.set_controller(controller_consulta)
-        self.stack.addWidget(self.view_consulta)
-
-        # --- 4. Farmacia ---
-        self.view_farmacia = embed(VentanaFarmacia())
-        self.stack.addWidget(self.view_farmacia)
-
-        # --- 5. Hospitalización ---
-        self.view_hosp = embed(HospitalizacionView(parent=self))
-        self.stack.addWidget(self.view_hosp)
-
-        # --- 6. Médicos ---
-        self.view_medicos = embed(module_medicos.VentanaPrincipal())
-        self.stack.addWidget(self.view_medicos)
+        # --- 1..6. Módulos: se reserva su lugar y se construyen al navegar ---
+        self.paginas_pendientes = {}
+        for indice in sorted(PAGINAS):
+            reserva = QWidget()
+            self.stack.addWidget(reserva)
+            self.paginas_pendientes[indice] = reserva
 
         # Iniciar en la primera opción
         if self.nav_btns:
             self.nav_btns[0].click()
 
+    def construir_pagina(self, indice):
+        """Importa y construye la página `indice` si aún no se ha cargado."""
+        reserva = self.paginas_pendientes.get(indice)
+        if reserva is None:
+            return
+        atributo, nombre, fabrica = PAGINAS[indice]
+        t0 = time.perf_counter()
+        try:
+            # Los módulos asumen el esquema creado (no-op si ya está listo)
+            inicializar_db()
+            pagina = fabrica(self)
+        except Exception as e:
+            print(f"Error al cargar el módulo {nombre}: {e}")
+            return
+        self.tiempos_carga[nombre] = (time.perf_counter() - t0) * 1000
+        setattr(self, atributo, pagina)
+
+        # Reemplazar la reserva por la página real en la misma posición
+        del self.paginas_pendientes[indice]
+        self.stack.removeWidget(reserva)
+        self.stack.insertWidget(indice, pagina)
+        reserva.deleteLater()
+
 if __name__ == '__main__':
     # Inicializar/actualizar esquema de BD antes de cargar módulos
     try:
@@ -322,4 +383,7 @@ if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = MenuPrincipal()
     window.show()
+    # Traslado de fondo (una sola vez) de las anamnesis/HC antiguas
+    # guardadas como JSON; se lanza tras mostrar la ventana
+    QTimer.singleShot(0, iniciar_traslado_clinico)
     sys.exit(app.exec())
\ No newline at end of file